@@ -29,6 +29,7 @@ import getpass
 import platform
 import secrets
 import urllib.request
+import urllib.parse
 import urllib.error
 import base64
 import hashlib
@@ -37,8 +38,23 @@ import html
 import stat
 import time
 import errno
+import threading
+import gzip
+import io
+import calendar
+import codecs
+import heapq
+import itertools
+import queue
+import atexit
+import bisect
+import traceback
+import select
+import socket
 from functools import partial
+from array import array
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 
 
 def resolve_user_shell():
@@ -99,6 +115,15 @@ else:  # pragma: no cover
     except ImportError:
         QtMultimedia = None
 SoundEffectClass = getattr(QtMultimedia, "QSoundEffect", None) if QtMultimedia is not None else None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import fcntl
+    import termios
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = termios = None
 
 
 PROJECT_ROOT = os.path.expanduser("~/PROJECTS")
@@ -114,18 +139,113 @@ SAFE_DIR_LOG = DATA_DIR / "git_safe_directory.log"
 PROJECT_META_FILE = DATA_DIR / "projects_meta.json"
 SETTINGS_FILE = CONFIG_DIR / "settings.json"
 CREDS_FILE = CONFIG_DIR / "credentials.enc"
+PERSIST_DEBOUNCE_MS = 400  # settings/projects_meta writes coalesce within this quiet period
+PERSIST_BACKUPS = 5  # rotated copies kept as <file>.bak.1 (newest) .. .bak.N
+PERSIST_BACKUP_INTERVAL = 3600  # seconds between backup rotations
 SYSTEM_LISTS = ["My Day", "Planned", "Important", "Completed"]
+UI_MUTATION_BUDGET_MS = 8  # per event-loop turn; leaves the rest of a 60 Hz frame for painting
+UI_MUTATION_LATENCY_BUCKETS_MS = (1, 2, 4, 8, 16, 33, 66, 133, 250, 500, 1000)
+UI_HEARTBEAT_MS = 50  # event-loop heartbeat; lag is how late each beat fires
+UI_STALL_MS = 200  # lag at or past this is a stall: the watchdog samples the UI thread's stack
+UI_STALL_SAMPLES = 10  # stack samples kept per stall, one every UI_STALL_MS while it lasts
+UI_LAG_WINDOW = 1200  # recent beats (~1 minute) behind the p50/p99 figures
+UI_HANG_SECS = 15  # a UI thread stuck this long gets all thread stacks dumped by faulthandler, even inside C code
+JOB_PRIORITY_HIGH = 0  # user is waiting on the result (focus, project list)
+JOB_PRIORITY_NORMAL = 1
+JOB_PRIORITY_LOW = 2  # bulk/background work (exports, auto-commits)
+JOB_RESOURCE_LIMITS = {"network": 4}  # max concurrent jobs per resource prefix; anything else defaults to 1
+CONSISTENCY_DEBOUNCE_MS = 50  # coalesces bursts of marker/mount/manifest events into one check
+CONSISTENCY_SAFETY_NET_MS = 60_000  # slow fallback check in case a change source is missed
+CONSISTENCY_RESYNC_BACKOFF = 10.0  # seconds; repeated desyncs inside this window wait for the safety net
+PROC_SCAN_TIMEOUT = 5.0  # seconds before a /proc open-handle scan gives up and reports a partial result
+PROC_SCAN_WORKERS = 8
+TERMINAL_SCROLLBACK_LINES = 10_000  # rows kept above the live screen, stored run-length encoded
+TERMINAL_ESCAPE_MAX = 4096  # an unterminated escape/OSC longer than this is dropped instead of buffered
+TERMINAL_READ_MIN = 4096  # pty read size adapts between these bounds with output rate
+TERMINAL_READ_MAX = 256 * 1024
+TERMINAL_FLUSH_MS = 16  # decoded output is handed to the display at most once per frame
+TERMINAL_FLUSH_BUDGET_MS = 8  # per-flush display time the flush size adapts towards
+TERMINAL_BACKLOG_LIMIT = 4 * 1024 * 1024  # undisplayed chars before pty reads pause (the writer then blocks)
+TERMINAL_SESSION_DIR = DATA_DIR / "terminal_sessions"  # sessions.json layout + <id>.jsonl.gz scrollback
+TERMINAL_IDLE_SECS = 300  # a hidden session untouched this long has its scrollback spilled to disk
+TERMINAL_IDLE_SCROLLBACK_LINES = 500  # rows an idle session keeps in memory after spilling
+TERMINAL_RECORD_SESSIONS = False  # opt-in ("Rec"): output goes to <id>.cast (asciicast v2) + an indexed transcript
+TERMINAL_RECORD_SEGMENT_BYTES = 64 * 1024 * 1024  # the live cast file rotates into an archived <id>.<n> segment past this ...
+TERMINAL_RECORD_SEGMENT_AGE = 86400  # ... or once it is older than this
+TERMINAL_RECORD_MAX_BYTES = 256 * 1024 * 1024  # oldest segments are deleted once all cast files together pass this ...
+TERMINAL_RECORD_MAX_AGE = 14 * 86400  # ... or once their last output is older than this, so recorded output never piles up
+TERMINAL_INDEX_BLOCK_BYTES = 128 * 1024  # transcript block size the trigram index tracks per bit
+TERMINAL_REPLAY_MAX_IDLE = 2.0  # replay never pauses longer than this between recorded events
+PROJECT_INDEX_DEBOUNCE_MS = 1500  # quiet period after a filesystem event before the project is re-indexed
+PROJECT_INDEX_STALE_SECS = 24 * 3600  # safety-net re-index age; directory watches miss in-place file edits
+PROJECT_INDEX_SWEEP_SECS = 10 * 60  # how often the safety net looks for stale projects
+PROJECT_INDEX_SWEEP_MAX = 4  # stale projects (oldest first) re-indexed per sweep, so no sweep walks every tree
+PROJECT_INDEX_BATCH = 8  # projects indexed per background job
+PROJECT_INDEX_MAX_WATCHES = 4096  # inotify watches shared by all projects
+PROJECT_INDEX_SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", "node_modules", ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache"}
+LANGUAGE_EXTENSIONS = {
+    ".py": "Python",
+    ".pyi": "Python",
+    ".js": "JavaScript",
+    ".mjs": "JavaScript",
+    ".jsx": "JavaScript",
+    ".ts": "TypeScript",
+    ".tsx": "TypeScript",
+    ".sh": "Shell",
+    ".bash": "Shell",
+    ".zsh": "Shell",
+    ".c": "C",
+    ".h": "C",
+    ".cc": "C++",
+    ".cpp": "C++",
+    ".hpp": "C++",
+    ".rs": "Rust",
+    ".go": "Go",
+    ".java": "Java",
+    ".kt": "Kotlin",
+    ".rb": "Ruby",
+    ".php": "PHP",
+    ".lua": "Lua",
+    ".html": "HTML",
+    ".css": "CSS",
+    ".scss": "CSS",
+    ".sql": "SQL",
+    ".md": "Markdown",
+    ".json": "JSON",
+    ".yaml": "YAML",
+    ".yml": "YAML",
+    ".toml": "TOML",
+}
 AUTOGIT_LOG = Path("~/.autogit/auto_git.log").expanduser()
 AUTOGIT_IGNORE = Path("~/.autogit/ignore_globs.txt").expanduser()
 AUTOGIT_WATCH = Path("~/.autogit/dirs_main.txt").expanduser()
 ACTIVE_PROJECT_PATH = os.path.expanduser("~/active_project")
 FOCUS_MARKER = os.path.expanduser("~/.focused_project")
 PROJECT_MANIFEST = ".project.json"
-AUDIT_LOG = DATA_DIR / "audit.log"
+AUDIT_LOG = DATA_DIR / "audit.log"  # pre-SQLite text trail; imported into AUDIT_DB once
+AUDIT_DB = DATA_DIR / "audit.db"
 TASKS_WATCH_FILE = DATA_DIR / ".tasks.json"
 STABILITY_LOG = CONFIG_DIR / "stability.log"
 STABILITY_STATE = CONFIG_DIR / "stability.json"
 STABILITY_MARKER = CONFIG_DIR / ".stability_last_run"
+STABILITY_DIAGNOSTIC_LOG = DATA_DIR / "stability_diagnostic.log"
+STABILITY_STATE_CAP = 200  # newest failures/corrections kept in stability.json
+LOG_FLUSH_INTERVAL = 0.5  # seconds the log writer thread gathers lines before one batched write per file
+LOG_ROTATE_BYTES = 5 * 1024 * 1024  # a log is rotated once it would grow past this ...
+LOG_ROTATE_SECS = 7 * 86400  # ... or once the live file is this old
+LOG_BACKUPS = 5  # rotated logs kept as <log>.1.gz (newest) .. .N.gz
+TRACE_BUFFER_SPANS = 50_000  # finished tracing spans kept in memory (oldest dropped first)
+TRACE_DB_STATEMENT_MIN_MS = 1.0  # SQL statements at least this slow get their own span; transactions always do
+TRACE_DIR = DATA_DIR / "traces"  # default location for exported Chrome trace files
+LOG_QUEUE_LIMIT = 100_000  # queued log lines beyond this are dropped and counted instead of growing memory
+UI_STALL_LOG = DATA_DIR / "ui_stalls.log"
+UI_HANG_DUMP = DATA_DIR / "ui_hang_traceback.log"
+METRICS_FILE = DATA_DIR / "metrics.prom"  # Prometheus text exposition, rewritten every METRICS_EXPORT_SECS
+METRICS_SOCKET = DATA_DIR / "metrics.sock"  # same exposition per connection: curl --unix-socket <path> http://localhost/metrics
+METRICS_EXPORT_SECS = 15
+METRICS_HISTORY_POINTS = 300  # one-second samples kept per series for the Debug window sparklines
+METRICS_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # exported le bounds (s)
+HISTOGRAM_SUB_BUCKETS = 32  # linear sub-buckets per power of two in recorded histograms (~3% quantile error)
 DEFAULT_TASK_PROMPT = Path.home() / "PROJECTS" / "SINGULARITY-CONSOLE" / ".PROMPTS" / "ToDo.prompt"
 DEFAULT_OVERVIEW_FILES = ("OVERVIEW.md", "overview.md", "README.md", "README.MD", "readme.md")
 TASK_STATUS_VALUES = ["pending", "in_progress", "blocked", "review", "completed"]
@@ -136,7 +256,25 @@ TASK_ALLOWED_TRANSITIONS = {
     "review": {"completed"},
     "completed": set(),  # terminal per spec
 }
-TASK_CAP = 5000
+TASK_CAP = 1_000_000  # default cap; override with settings["task_cap"] (0 disables the cap)
+TASK_PAGE_SIZE = 500
+TASK_CHANGE_POLL_MS = 1000  # PRAGMA data_version poll interval for cross-process task changes
+TASK_JOURNAL_RETAIN = 100_000  # newest task_changes rows kept by prune_changes()
+TASK_EXPORT_CHUNK_ROWS = 2000
+TASK_EXPORT_DATE_FIELDS = ("due_date", "created_at", "updated_at", "completed_at")
+TASK_RECURRENCE_RULES = ["none", "daily", "weekdays", "weekly", "monthly", "custom"]
+SCHEDULER_MAX_SLEEP_MS = 10 * 60 * 1000  # re-check wall clock at least this often (QTimer is monotonic; suspend pauses it)
+TASK_COMPLEXITY_WEIGHTS = {"low": 1, "moderate": 2, "medium": 2, "high": 3}  # critical-path weight; unknown -> 1
+TASK_DEPENDENCY_REF_RE = re.compile(r"[A-Za-z]+-\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+TASK_AGGREGATE_COLUMNS = ("total", "pending", "in_progress", "blocked", "review", "completed", "overdue", "my_day", "planned", "important")
+# Keyset-paginated system views: filter, ordered key columns (index order) and direction.
+TASK_LIST_VIEWS = {
+    "My Day": ("t.my_day_date=?", ("t.completed", "t.order_index", "t.id"), "ASC"),
+    "Planned": ("t.due_date IS NOT NULL", ("t.due_date", "t.completed", "t.id"), "ASC"),
+    "Important": ("t.priority=1", ("t.completed", "t.order_index", "t.id"), "ASC"),
+    "Completed": ("t.completed=1", ("COALESCE(t.completed_at, '')", "t.id"), "DESC"),
+    None: ("t.list_id=?", ("t.completed", "t.order_index", "t.id"), "ASC"),
+}
 NORMAL_SCALE_MAX = 1.20
 HIGH_SCALE_THRESHOLD = 1.40
 EXTREME_SCALE_THRESHOLD = 1.60
@@ -275,7 +413,7 @@ class InteractionSoundFilter(QtCore.QObject):
 
 
 class TerminalProcess(QtCore.QObject):
-    output_ready = QtCore.pyqtSignal(bytes)
+    output_ready = QtCore.pyqtSignal(str)
     terminated = QtCore.pyqtSignal(int)
 
     def __init__(self, shell=None, cwd=None, env=None, parent=None):
@@ -287,6 +425,17 @@ class TerminalProcess(QtCore.QObject):
         self.master_fd: int | None = None
         self._notifier: QtCore.QSocketNotifier | None = None
         self._poll_timer: QtCore.QTimer | None = None
+        self._winsize = (24, 80)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._read_size = TERMINAL_READ_MIN
+        self._backlog: list[str] = []
+        self._backlog_chars = 0
+        self._flush_chars = TERMINAL_READ_MAX
+        self._last_flush = 0.0
+        self._paused = False
+        self._flush_timer = QtCore.QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self._flush_output)
         self._start_process()
 
     def _start_process(self):
@@ -295,6 +444,8 @@ class TerminalProcess(QtCore.QObject):
         except OSError:
             self.terminated.emit(-1)
             return
+        self._apply_winsize()
+        self._decoder.reset()
         kwargs = {
             "stdin": slave_fd,
             "stdout": slave_fd,
@@ -333,7 +484,7 @@ class TerminalProcess(QtCore.QObject):
         if self.master_fd is None:
             return
         try:
-            chunk = os.read(self.master_fd, 4096)
+            chunk = os.read(self.master_fd, self._read_size)
         except OSError as exc:
             if exc.errno in {errno.EIO, errno.EBADF}:
                 self._maybe_terminate()
@@ -341,22 +492,92 @@ class TerminalProcess(QtCore.QObject):
         if not chunk:
             self._maybe_terminate()
             return
+        METRIC_TERMINAL_OUT.inc(len(chunk))
+        if len(chunk) == self._read_size:
+            self._read_size = min(TERMINAL_READ_MAX, self._read_size * 2)
+        elif len(chunk) < self._read_size // 4:
+            self._read_size = max(TERMINAL_READ_MIN, self._read_size // 2)
+        text = self._decoder.decode(chunk)
+        if not text:
+            return
+        self._backlog.append(text)
+        self._backlog_chars += len(text)
+        if self._backlog_chars > TERMINAL_BACKLOG_LIMIT and self._notifier and not self._paused:
+            self._paused = True
+            self._notifier.setEnabled(False)
+        if not self._flush_timer.isActive():
+            # An idle terminal flushes on the next loop turn so keystroke echo is not delayed.
+            since = (time.monotonic() - self._last_flush) * 1000
+            self._flush_timer.start(max(0, int(TERMINAL_FLUSH_MS - since)))
+
+    def _flush_output(self, drain=False):
+        if not self._backlog:
+            return
+        text = "".join(self._backlog)
+        if drain or len(text) <= self._flush_chars:
+            chunk, rest = text, ""
+        else:
+            chunk, rest = text[: self._flush_chars], text[self._flush_chars :]
+        self._backlog = [rest] if rest else []
+        self._backlog_chars = len(rest)
+        started = time.perf_counter()
         self.output_ready.emit(chunk)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._last_flush = time.monotonic()
+        # Size the next flush so the display keeps to its per-frame budget.
+        if elapsed_ms > TERMINAL_FLUSH_BUDGET_MS and len(chunk) >= self._flush_chars // 2:
+            self._flush_chars = max(TERMINAL_READ_MIN, int(self._flush_chars * TERMINAL_FLUSH_BUDGET_MS / elapsed_ms))
+        elif elapsed_ms < TERMINAL_FLUSH_BUDGET_MS / 2:
+            self._flush_chars = min(TERMINAL_BACKLOG_LIMIT, self._flush_chars * 2)
+        if self._paused and self._backlog_chars <= TERMINAL_BACKLOG_LIMIT // 2:
+            self._paused = False
+            if self._notifier:
+                self._notifier.setEnabled(True)
+        if self._backlog and not self._flush_timer.isActive():
+            self._flush_timer.start(TERMINAL_FLUSH_MS)
 
     def _check_process(self):
         if not self.process:
             return
         rc = self.process.poll()
         if rc is not None:
+            self._drain_pty()
             self._cleanup_resources()
             self.terminated.emit(rc)
 
+    def _drain_pty(self):
+        # Output still queued in the pty when the shell exits; bounded in case something else holds the slave open.
+        remaining = TERMINAL_BACKLOG_LIMIT
+        while self.master_fd is not None and remaining > 0:
+            try:
+                ready, _, _ = select.select([self.master_fd], [], [], 0)
+                chunk = os.read(self.master_fd, TERMINAL_READ_MAX) if ready else b""
+            except OSError:
+                return
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            self._backlog.append(self._decoder.decode(chunk))
+
     def _maybe_terminate(self):
-        if self.process and self.process.poll() is None:
+        rc = self.process.poll() if self.process else None
+        if self.process and rc is None:
+            # Slave side hung up but the shell has not been reaped yet; the poll timer reports the exit.
+            if self._notifier:
+                self._notifier.setEnabled(False)
             return
         self._cleanup_resources()
+        if rc is not None:
+            self.terminated.emit(rc)
 
     def _cleanup_resources(self):
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self._backlog.append(tail)
+        self._flush_timer.stop()
+        self._flush_output(drain=True)
+        self._backlog_chars = 0
+        self._paused = False
         if self._poll_timer:
             self._poll_timer.stop()
             self._poll_timer.deleteLater()
@@ -378,7 +599,21 @@ class TerminalProcess(QtCore.QObject):
         if isinstance(data, str):
             data = data.encode("utf-8")
         try:
-            os.write(self.master_fd, data)
+            METRIC_TERMINAL_IN.inc(os.write(self.master_fd, data))
+        except OSError:
+            pass
+
+    def resize(self, cols, rows):
+        self._winsize = (max(1, int(rows)), max(1, int(cols)))
+        self._apply_winsize()
+
+    def _apply_winsize(self):
+        # TIOCSWINSZ on the master also delivers SIGWINCH to the foreground process group.
+        if self.master_fd is None or fcntl is None:
+            return
+        rows, cols = self._winsize
+        try:
+            fcntl.ioctl(self.master_fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, cols, 0, 0))
         except OSError:
             pass
 
@@ -413,7 +648,1376 @@ class TerminalProcess(QtCore.QObject):
         self._cleanup_resources()
 
 
-class PhotonTerminalDisplay(QtWidgets.QPlainTextEdit):
+class TerminalScreen:
+    """VT100/xterm screen model: incremental escape parser, cell grid, scrollback ring and dirty rows."""
+
+    # Cell attributes pack into one 64-bit int: fg (25 bits), bg (25 bits), then style flags.
+    # A colour of 0 is the default, 1..256 a palette index + 1, TRUECOLOR | 0xRRGGBB a direct colour.
+    COLOR_MASK = (1 << 25) - 1
+    BG_SHIFT = 25
+    TRUECOLOR = 1 << 24
+    BOLD = 1 << 50
+    DIM = 1 << 51
+    ITALIC = 1 << 52
+    UNDERLINE = 1 << 53
+    REVERSE = 1 << 54
+    HIDDEN = 1 << 55
+    STRIKE = 1 << 56
+    _SGR_SET = {1: BOLD, 2: DIM, 3: ITALIC, 4: UNDERLINE, 7: REVERSE, 8: HIDDEN, 9: STRIKE, 21: UNDERLINE}
+    _SGR_CLEAR = {22: BOLD | DIM, 23: ITALIC, 24: UNDERLINE, 27: REVERSE, 28: HIDDEN, 29: STRIKE}
+    _DEC_GRAPHICS = str.maketrans(
+        "`abcdefghijklmnopqrstuvwxyz{|}~",
+        "◆▒␉␌␍␊°±␤␋┘┐┌└┼⎺⎻─⎼⎽├┤┴┬│≤≥π≠£·",
+    )
+
+    # Double-width (East Asian wide/fullwidth, emoji) code points take two cells: the character and WIDE_PAD.
+    WIDE_PAD = "\x00"
+    _WIDE_CHARS = (
+        "\u1100-\u115f\u231a\u231b\u2329\u232a\u23e9-\u23ec\u23f0\u23f3\u25fd\u25fe\u2614\u2615\u2648-\u2653"
+        "\u267f\u2693\u26a1\u26aa\u26ab\u26bd\u26be\u26c4\u26c5\u26ce\u26d4\u26ea\u26f2\u26f3\u26f5\u26fa\u26fd"
+        "\u2705\u270a\u270b\u2728\u274c\u274e\u2753-\u2755\u2757\u2795-\u2797\u27b0\u27bf\u2b1b\u2b1c\u2b50\u2b55"
+        "\u2e80-\u303e\u3041-\u33ff\u3400-\u4dbf\u4e00-\u9fff\ua000-\ua4cf\ua960-\ua97f\uac00-\ud7a3"
+        "\uf900-\ufaff\ufe10-\ufe19\ufe30-\ufe6f\uff00-\uff60\uffe0-\uffe6"
+        "\U0001f004\U0001f0cf\U0001f18e\U0001f191-\U0001f19a\U0001f200-\U0001f251\U0001f300-\U0001f320"
+        "\U0001f32d-\U0001f335\U0001f337-\U0001f37c\U0001f37e-\U0001f393\U0001f3a0-\U0001f3ca\U0001f3cf-\U0001f3d3"
+        "\U0001f3e0-\U0001f3f0\U0001f3f4\U0001f3f8-\U0001f43e\U0001f440\U0001f442-\U0001f4fc\U0001f4ff-\U0001f53d"
+        "\U0001f54b-\U0001f54e\U0001f550-\U0001f567\U0001f57a\U0001f595\U0001f596\U0001f5a4\U0001f5fb-\U0001f64f"
+        "\U0001f680-\U0001f6c5\U0001f6cc\U0001f6d0-\U0001f6d2\U0001f6d5-\U0001f6d7\U0001f6eb\U0001f6ec"
+        "\U0001f6f4-\U0001f6fc\U0001f7e0-\U0001f7eb\U0001f90c-\U0001f93a\U0001f93c-\U0001f945\U0001f947-\U0001f9ff"
+        "\U0001fa70-\U0001faff\U00020000-\U0002fffd\U00030000-\U0003fffd"
+    )
+    # A few coarse ranges covering every _WIDE_CHARS codepoint; the bulk line regexes stay as fast as ASCII-only.
+    _WIDE_SPAN = (
+        "\u1100-\u115f\u231a-\u23f3\u25fd-\u27bf\u2b1b-\u2b55\u2e80-\ua4cf\ua960-\ua97f\uac00-\ud7a3"
+        "\uf900-\ufaff\ufe10-\ufe6f\uff00-\uffe6\U0001f000-\U0003fffd"
+    )
+    _WIDE_RE = re.compile("[" + _WIDE_CHARS + "]+")
+    _TEXT_RE = re.compile(r"[^\x00-\x1f\x7f]+")
+    _LINES_RE = re.compile(r"(?:[^\x00-\x1f\x7f" + _WIDE_SPAN + r"]*\r\n){2,}")
+    _STYLED_LINE_RE = re.compile(r"(?:[^\x00-\x1f\x7f" + _WIDE_SPAN + r"]|\x1b\[[0-9;]*m)*\r\n")
+    _SGR_SPLIT_RE = re.compile(r"\x1b\[([0-9;]*)m")
+    _CSI_RE = re.compile(r"\x1b\[([<=>?]?)([0-9;:]*)([ -/]*)([@-~])")
+    _OSC_RE = re.compile(r"\x1b\]([^\x07\x1b]*)(?:\x07|\x1b\\)")
+    _STRING_RE = re.compile(r"\x1b[P^_X][^\x1b]*\x1b\\")
+    _ESC_RE = re.compile(r"\x1b([ -/]*)([0-~])")
+    _PARTIAL_RE = re.compile(r"\x1b(?:\[[<=>?]?[0-9;:]*[ -/]*|\][^\x07\x1b]*\x1b?|[P^_X][^\x1b]*\x1b?|[ -/]*)\Z")
+
+    def __init__(self, cols=80, rows=24, scrollback=TERMINAL_SCROLLBACK_LINES):
+        self.cols = max(1, cols)
+        self.rows = max(1, rows)
+        self.scrollback: deque = deque(maxlen=scrollback)
+        self.title = ""
+        self.cwd = None
+        self.responses: list[str] = []
+        self._pending = ""
+        self._sgr_cache: dict[tuple, int] = {}
+        self.reset()
+
+    # -- state ----------------------------------------------------------------------------------
+
+    def reset(self):
+        self.attr = 0
+        self.x = 0
+        self.y = 0
+        self.top = 0
+        self.bottom = self.rows - 1
+        self.autowrap = True
+        self.insert_mode = False
+        self.app_cursor = False
+        self.cursor_visible = True
+        self.bracketed_paste = False
+        self.alt_active = False
+        self._wrap_pending = False
+        self._graphics = False
+        self._saved = None
+        self._main = None
+        self._chars, self._attrs = self._blank_grid(self.rows)
+        self.dirty: set[int] = set()
+        self.full_dirty = True
+
+    def clear(self):
+        """Drop scrollback and blank the screen, keeping the cursor line (the prompt) at the top."""
+        self.scrollback.clear()
+        chars, attrs = self._chars[self.y], self._attrs[self.y]
+        self._chars, self._attrs = self._blank_grid(self.rows)
+        self._chars[0], self._attrs[0] = chars, attrs
+        self.y = 0
+        self.full_dirty = True
+
+    def resize(self, cols, rows):
+        cols, rows = max(1, cols), max(1, rows)
+        if (cols, rows) == (self.cols, self.rows):
+            return
+        grids = [(self._chars, self._attrs, True)]
+        if self._main is not None:
+            grids.append((self._main[0], self._main[1], False))
+        for chars, attrs, active in grids:
+            for row in range(len(chars)):
+                self._fit_row(chars, attrs, row, cols)
+            if rows < len(chars):
+                excess = len(chars) - rows
+                # Trim blank rows below the cursor first, then push the top into scrollback.
+                while excess and len(chars) - 1 > (self.y if active else 0) and not "".join(chars[-1]).strip():
+                    chars.pop()
+                    attrs.pop()
+                    excess -= 1
+                for _ in range(excess):
+                    line_chars, line_attrs = chars.pop(0), attrs.pop(0)
+                    if not self.alt_active or not active:
+                        self.scrollback.append(self._encode_row(line_chars, line_attrs))
+                    if active:
+                        self.y = max(0, self.y - 1)
+            while len(chars) < rows:
+                chars.append([" "] * cols)
+                attrs.append(array("Q", [0]) * cols)
+        self.cols, self.rows = cols, rows
+        self.top, self.bottom = 0, rows - 1
+        self.x = min(self.x, cols - 1)
+        self.y = min(self.y, rows - 1)
+        self._wrap_pending = False
+        self.full_dirty = True
+
+    def take_dirty(self):
+        full, rows = self.full_dirty, self.dirty
+        self.full_dirty = False
+        self.dirty = set()
+        return full, rows
+
+    def line_count(self):
+        return len(self.scrollback) + self.rows
+
+    def line(self, index):
+        """Return (text, runs) for scrollback+screen line `index`; runs are (column, attr) starts."""
+        backlog = len(self.scrollback)
+        if index < backlog:
+            text, attrs = self.scrollback[index]
+        elif 0 <= index - backlog < self.rows:
+            text, attrs = self._encode_row(self._chars[index - backlog], self._attrs[index - backlog])
+        else:
+            return "", ()
+        return text, self._runs(attrs)
+
+    def export_scrollback(self):
+        """Scrollback rows as JSON-friendly [text, attr] or [text, [[col, attr], ...]] pairs, oldest first."""
+        return self.export_rows(self.scrollback)
+
+    @classmethod
+    def export_rows(cls, entries):
+        """`export_scrollback` for a snapshot of scrollback entries; touches no screen state, so workers can run it."""
+        return [[text, attrs if isinstance(attrs, int) else [list(run) for run in cls._runs(attrs)]] for text, attrs in entries]
+
+    @staticmethod
+    def decode_rows(rows):
+        """Exported rows back into scrollback entries; the inverse of `export_rows`, also safe off the UI thread."""
+        entries = []
+        for text, attrs in rows:
+            if not isinstance(attrs, int):
+                runs = attrs
+                attrs = array("Q")
+                for i, (col, attr) in enumerate(runs):
+                    end = runs[i + 1][0] if i + 1 < len(runs) else len(text)
+                    attrs.extend(array("Q", [attr]) * max(0, end - col))
+            entries.append((str(text), attrs))
+        return entries
+
+    def prepend_scrollback(self, entries):
+        """Put decoded entries in front of the current scrollback, as far as the ring has room."""
+        room = (self.scrollback.maxlen or len(entries)) - len(self.scrollback)
+        if room <= 0:
+            return
+        self.scrollback.extendleft(reversed(entries[-room:]))
+        self.full_dirty = True
+
+    def _blank_grid(self, rows):
+        blank = array("Q", [0]) * self.cols
+        return [[" "] * self.cols for _ in range(rows)], [array("Q", blank) for _ in range(rows)]
+
+    def _fit_row(self, chars, attrs, row, cols):
+        width = len(chars[row])
+        if width > cols:
+            if chars[row][cols] == self.WIDE_PAD:
+                chars[row][cols - 1] = " "
+            del chars[row][cols:]
+            del attrs[row][cols:]
+        elif width < cols:
+            chars[row].extend(" " * (cols - width))
+            attrs[row].extend(array("Q", [0]) * (cols - width))
+
+    @staticmethod
+    def _encode_row(chars, attrs):
+        """Pack a grid row for scrollback: joined text plus one attr int, or an attr array when mixed."""
+        text = "".join(chars)
+        first = attrs[0] if attrs else 0
+        if attrs.count(first) == len(attrs):
+            return (text.rstrip(" ") if not first else text), first
+        stripped = len(text.rstrip(" "))
+        if attrs[stripped:].count(0) == len(attrs) - stripped:
+            return text[:stripped], attrs[:stripped]
+        return text, array("Q", attrs)
+
+    @staticmethod
+    def _encode_line(text, attrs, cols):
+        """`_encode_row` for a line of at most `cols` cells given without its blank (attr 0) padding."""
+        n = len(text)
+        first = attrs[0] if n else 0
+        if attrs.count(first) == n and (not first or n == cols):
+            return (text.rstrip(" ") if not first else text), first
+        stripped = len(text.rstrip(" "))
+        if attrs[stripped:].count(0) == n - stripped:
+            return text[:stripped], attrs[:stripped]
+        return text.ljust(cols), attrs + array("Q", [0]) * (cols - n)
+
+    @staticmethod
+    def _runs(attrs):
+        if isinstance(attrs, int):
+            return ((0, attrs),) if attrs else ()
+        return tuple((col, attr) for col, attr in enumerate(attrs) if col == 0 or attr != attrs[col - 1])
+
+    # -- parser ---------------------------------------------------------------------------------
+
+    def feed(self, text):
+        if self._pending:
+            text = self._pending + text
+            self._pending = ""
+        pos = 0
+        end = len(text)
+        match_text = self._TEXT_RE.match
+        match_csi = self._CSI_RE.match
+        while pos < end:
+            if self.x == 0 and self.y == self.bottom and self._plain_scroll_ok():
+                m = self._LINES_RE.match(text, pos)
+                if m:
+                    self._scroll_lines(m.group())
+                    pos = m.end()
+                    continue
+                consumed = self._scroll_styled_lines(text, pos)
+                if consumed:
+                    pos += consumed
+                    continue
+            m = match_text(text, pos)
+            if m:
+                self._write(m.group())
+                pos = m.end()
+                continue
+            ch = text[pos]
+            if ch == "\x1b":
+                m = match_csi(text, pos)
+                if m:
+                    self._csi(*m.groups())
+                    pos = m.end()
+                    continue
+                consumed = self._escape(text, pos)
+                if consumed is None:
+                    if end - pos > TERMINAL_ESCAPE_MAX:
+                        pos += 1
+                        continue
+                    self._pending = text[pos:]
+                    break
+                pos = consumed
+                continue
+            pos += 1
+            self._control(ch)
+
+    def _plain_scroll_ok(self):
+        return (
+            not self.attr
+            and self.top == 0
+            and self.bottom == self.rows - 1
+            and self.autowrap
+            and not (self.alt_active or self.insert_mode or self._graphics)
+            and not self._attrs[self.bottom].count(0) - self.cols
+            and not "".join(self._chars[self.bottom]).strip()
+        )
+
+    def _scroll_lines(self, block):
+        """Bulk path for plain CR/LF lines written at a blank bottom row, i.e. `cat` of a log."""
+        cols = self.cols
+        lines = block.split("\r\n")
+        lines.pop()
+        if max(map(len, lines)) > cols:
+            lines = [line[i : i + cols] for line in lines for i in range(0, len(line) or 1, cols)]
+        keep = self.rows - 1
+        count = len(lines)
+        pushed = min(count, keep)
+        self.scrollback.extend(self._encode_row(self._chars[r], self._attrs[r]) for r in range(pushed))
+        if count > keep:
+            overflow = lines[: count - keep][-(self.scrollback.maxlen or count) :]
+            self.scrollback.extend([(line, 0) for line in overflow])
+            lines = lines[count - keep :]
+        bottom_chars, bottom_attrs = self._chars[keep], self._attrs[keep]
+        self._chars = self._chars[pushed:keep] + [list(line.ljust(cols)) for line in lines] + [bottom_chars]
+        self._attrs = self._attrs[pushed:keep] + [array("Q", [0]) * cols for _ in lines] + [bottom_attrs]
+        self._wrap_pending = False
+        self.full_dirty = True
+
+    def _scroll_styled_lines(self, text, pos):
+        """Bulk path for SGR-coloured CR/LF lines (`ls --color`, compiler logs); returns the chars consumed.
+
+        Stops before a line that would wrap, holds a wide character or leaves a background colour set
+        at its line feed, so the rows it builds match what the escape-by-escape path would produce.
+        """
+        cols = self.cols
+        bg_mask = self.COLOR_MASK << self.BG_SHIFT
+        match = self._STYLED_LINE_RE.match
+        split = self._SGR_SPLIT_RE.split
+        cache = self._sgr_cache
+        attr = self.attr
+        rows = []
+        start = pos
+        while True:
+            m = match(text, pos)
+            if not m:
+                break
+            line = text[pos : m.end() - 2]
+            start_attr = attr
+            pieces = split(line)
+            attrs = array("Q", [attr]) * len(pieces[0])
+            for i in range(1, len(pieces), 2):
+                new = cache.get((attr, pieces[i]))
+                if new is None:
+                    self.attr = attr
+                    self._sgr(pieces[i])
+                    new = self.attr
+                attr = new
+                if pieces[i + 1]:
+                    attrs.extend(array("Q", [attr]) * len(pieces[i + 1]))
+            shown = "".join(pieces[::2]) if len(pieces) > 1 else line
+            if len(shown) > cols or attr & bg_mask:
+                attr = start_attr
+                break
+            rows.append((shown, attrs))
+            pos = m.end()
+        self.attr = attr
+        if not rows:
+            return 0
+        keep = self.rows - 1
+        count = len(rows)
+        pushed = min(count, keep)
+        self.scrollback.extend(self._encode_row(self._chars[r], self._attrs[r]) for r in range(pushed))
+        if count > keep:
+            overflow = rows[: count - keep][-(self.scrollback.maxlen or count) :]
+            self.scrollback.extend(self._encode_line(shown, attrs, cols) for shown, attrs in overflow)
+            rows = rows[count - keep :]
+        blank = array("Q", [0])
+        bottom_chars, bottom_attrs = self._chars[keep], self._attrs[keep]
+        self._chars = self._chars[pushed:keep] + [list(shown.ljust(cols)) for shown, _ in rows] + [bottom_chars]
+        self._attrs = self._attrs[pushed:keep] + [attrs + blank * (cols - len(shown)) for shown, attrs in rows] + [bottom_attrs]
+        self._wrap_pending = False
+        self.full_dirty = True
+        return pos - start
+
+    def _control(self, ch):
+        if ch in "\n\x0b\x0c":
+            self._linefeed()
+        elif ch == "\r":
+            self.x = 0
+            self._wrap_pending = False
+        elif ch == "\b":
+            if self.x > 0:
+                self.x -= 1
+            self._wrap_pending = False
+        elif ch == "\t":
+            self.x = min(self.cols - 1, (self.x // 8 + 1) * 8)
+            self._wrap_pending = False
+
+    def _escape(self, text, pos):
+        m = self._CSI_RE.match(text, pos)
+        if m:
+            self._csi(*m.groups())
+            return m.end()
+        m = self._OSC_RE.match(text, pos)
+        if m:
+            self._osc(m.group(1))
+            return m.end()
+        m = self._STRING_RE.match(text, pos)
+        if m:
+            return m.end()
+        if self._PARTIAL_RE.match(text, pos):
+            return None
+        m = self._ESC_RE.match(text, pos)
+        if m:
+            self._esc(*m.groups())
+            return m.end()
+        return pos + 1
+
+    def _esc(self, intermediate, final):
+        if intermediate:
+            if intermediate == "(":
+                self._graphics = final == "0"
+            return
+        if final == "7":
+            self._save_cursor()
+        elif final == "8":
+            self._restore_cursor()
+        elif final == "D":
+            self._linefeed()
+        elif final == "E":
+            self.x = 0
+            self._linefeed()
+        elif final == "M":
+            self._reverse_index()
+        elif final == "c":
+            self.reset()
+
+    def _osc(self, payload):
+        code, _, value = payload.partition(";")
+        if code in ("0", "2"):
+            self.title = value
+        elif code == "7" and value.startswith("file://"):
+            rest = value[len("file://"):]
+            slash = rest.find("/")
+            if slash >= 0:
+                self.cwd = rest[slash:]
+
+    def _csi(self, private, params, intermediate, final):
+        if intermediate:
+            return
+        if private == "?":
+            if final in "hl":
+                self._set_private_modes(params, final == "h")
+            return
+        if private == ">":
+            if final == "c":
+                self.responses.append("\x1b[>0;10;1c")
+            return
+        if private:
+            return
+        if final == "m":
+            self._sgr(params)
+            return
+        args = [int(p) if p.isdigit() else 0 for p in params.replace(":", ";").split(";")] if params else []
+        first = args[0] if args else 0
+        n = first or 1
+        x, y = self.x, self.y
+        if final in "Hf":
+            col = args[1] if len(args) > 1 and args[1] else 1
+            self._move_to(col - 1, n - 1)
+        elif final == "A":
+            self._move_to(x, max(self.top if y >= self.top else 0, y - n))
+        elif final in "Be":
+            self._move_to(x, min(self.bottom if y <= self.bottom else self.rows - 1, y + n))
+        elif final in "Ca":
+            self._move_to(x + n, y)
+        elif final == "D":
+            self._move_to(x - n, y)
+        elif final == "E":
+            self._move_to(0, min(self.bottom if y <= self.bottom else self.rows - 1, y + n))
+        elif final == "F":
+            self._move_to(0, max(self.top if y >= self.top else 0, y - n))
+        elif final in "G`":
+            self._move_to(n - 1, y)
+        elif final == "d":
+            self._move_to(x, n - 1)
+        elif final == "J":
+            self._erase_display(first)
+        elif final == "K":
+            self._erase_line(first)
+        elif final == "X":
+            self._erase(y, x, min(self.cols, x + n))
+        elif final == "P":
+            self._delete_chars(n)
+        elif final == "@":
+            self._insert_chars(n)
+        elif final == "L":
+            self._insert_lines(n)
+        elif final == "M":
+            self._delete_lines(n)
+        elif final == "S":
+            self._scroll_up(n)
+        elif final == "T":
+            self._scroll_down(n)
+        elif final == "r":
+            top = (first or 1) - 1
+            bottom = (args[1] if len(args) > 1 and args[1] else self.rows) - 1
+            if 0 <= top < bottom < self.rows:
+                self.top, self.bottom = top, bottom
+                self._move_to(0, 0)
+        elif final == "s":
+            self._save_cursor()
+        elif final == "u":
+            self._restore_cursor()
+        elif final in "hl":
+            if 4 in args:
+                self.insert_mode = final == "h"
+        elif final == "n":
+            if first == 6:
+                self.responses.append(f"\x1b[{self.y + 1};{self.x + 1}R")
+            elif first == 5:
+                self.responses.append("\x1b[0n")
+        elif final == "c":
+            if not first:
+                self.responses.append("\x1b[?1;2c")
+
+    def _set_private_modes(self, params, on):
+        for mode in params.split(";"):
+            if mode == "1":
+                self.app_cursor = on
+            elif mode == "7":
+                self.autowrap = on
+            elif mode == "25":
+                self.cursor_visible = on
+                self.dirty.add(self.y)
+            elif mode in ("47", "1047"):
+                self._set_alt_screen(on)
+            elif mode == "1049":
+                if on and not self.alt_active:
+                    self._save_cursor()
+                    self._set_alt_screen(True)
+                elif not on and self.alt_active:
+                    self._set_alt_screen(False)
+                    self._restore_cursor()
+            elif mode == "2004":
+                self.bracketed_paste = on
+
+    def _sgr(self, params):
+        key = (self.attr, params)
+        cached = self._sgr_cache.get(key)
+        if cached is None:
+            if len(self._sgr_cache) > 4096:
+                self._sgr_cache.clear()
+            cached = self._sgr_cache[key] = self._apply_sgr(self.attr, params)
+        self.attr = cached
+
+    def _apply_sgr(self, attr, params):
+        items = params.split(";") if params else ["0"]
+        i = 0
+        while i < len(items):
+            item = items[i]
+            if ":" in item:
+                # ITU T.416 colon form: 38:5:n / 38:2:[cs]:r:g:b / 4:n underline styles.
+                sub = [int(p) if p.isdigit() else 0 for p in item.split(":")]
+                if sub[0] in (38, 48) and len(sub) >= 3:
+                    color = sub[2] + 1 if sub[1] == 5 else self._rgb(*sub[-3:]) if sub[1] == 2 and len(sub) >= 5 else None
+                    if color is not None:
+                        attr = self._with_color(attr, color, sub[0] == 48)
+                elif sub[0] == 4:
+                    attr = attr | self.UNDERLINE if sub[1:2] != [0] else attr & ~self.UNDERLINE
+                i += 1
+                continue
+            code = int(item) if item.isdigit() else 0
+            if code == 0:
+                attr = 0
+            elif code in self._SGR_SET:
+                attr |= self._SGR_SET[code]
+            elif code in self._SGR_CLEAR:
+                attr &= ~self._SGR_CLEAR[code]
+            elif 30 <= code <= 37:
+                attr = self._with_color(attr, code - 30 + 1, False)
+            elif 40 <= code <= 47:
+                attr = self._with_color(attr, code - 40 + 1, True)
+            elif 90 <= code <= 97:
+                attr = self._with_color(attr, code - 90 + 9, False)
+            elif 100 <= code <= 107:
+                attr = self._with_color(attr, code - 100 + 9, True)
+            elif code == 39:
+                attr = self._with_color(attr, 0, False)
+            elif code == 49:
+                attr = self._with_color(attr, 0, True)
+            elif code in (38, 48) and i + 1 < len(items):
+                mode = items[i + 1]
+                if mode == "5" and i + 2 < len(items):
+                    index = int(items[i + 2]) if items[i + 2].isdigit() else 0
+                    attr = self._with_color(attr, min(index, 255) + 1, code == 48)
+                    i += 2
+                elif mode == "2" and i + 4 < len(items):
+                    rgb = [int(v) if v.isdigit() else 0 for v in items[i + 2 : i + 5]]
+                    attr = self._with_color(attr, self._rgb(*rgb), code == 48)
+                    i += 4
+                else:
+                    i += 1
+            i += 1
+        return attr
+
+    def _rgb(self, r, g, b):
+        return self.TRUECOLOR | (min(r, 255) << 16) | (min(g, 255) << 8) | min(b, 255)
+
+    def _with_color(self, attr, color, background):
+        shift = self.BG_SHIFT if background else 0
+        return (attr & ~(self.COLOR_MASK << shift)) | (color << shift)
+
+    # -- grid operations ------------------------------------------------------------------------
+
+    def _write(self, text):
+        if not text.isascii() and self._WIDE_RE.search(text):
+            self._write_mixed(text)
+            return
+        x = self.x
+        n = len(text)
+        if x + n < self.cols and not (self._wrap_pending or self.insert_mode or self._graphics):
+            chars = self._chars[self.y]
+            if chars[x] == self.WIDE_PAD and x:
+                chars[x - 1] = " "
+            chars[x : x + n] = text
+            if chars[x + n] == self.WIDE_PAD:
+                chars[x + n] = " "
+            self._attrs[self.y][x : x + n] = array("Q", [self.attr]) * n
+            self.dirty.add(self.y)
+            self.x = x + n
+            return
+        self._write_narrow(text)
+
+    def _write_mixed(self, text):
+        pos = 0
+        for m in self._WIDE_RE.finditer(text):
+            if m.start() > pos:
+                self._write(text[pos : m.start()])
+            self._write_wide_run(m.group())
+            pos = m.end()
+        if pos < len(text):
+            self._write(text[pos:])
+
+    def _write_wide_run(self, run):
+        x = self.x
+        n = 2 * len(run)
+        if x + n < self.cols and not (self._wrap_pending or self.insert_mode):
+            chars = self._chars[self.y]
+            if chars[x] == self.WIDE_PAD and x:
+                chars[x - 1] = " "
+            cells = [self.WIDE_PAD] * n
+            cells[::2] = run
+            chars[x : x + n] = cells
+            if chars[x + n] == self.WIDE_PAD:
+                chars[x + n] = " "
+            self._attrs[self.y][x : x + n] = array("Q", [self.attr]) * n
+            self.dirty.add(self.y)
+            self.x = x + n
+            return
+        for ch in run:
+            self._write_wide(ch)
+
+    def _write_wide(self, ch):
+        cols = self.cols
+        if cols < 2:
+            return
+        if self._wrap_pending or self.x >= cols - 1:
+            if self.autowrap:
+                if not self._wrap_pending:
+                    self._erase(self.y, self.x, cols)
+                self.x = 0
+                self._linefeed()
+            else:
+                self.x = cols - 2
+        x = self.x
+        chars, attrs = self._chars[self.y], self._attrs[self.y]
+        fill = array("Q", [self.attr]) * 2
+        if self.insert_mode:
+            chars[x:x] = (ch, self.WIDE_PAD)
+            del chars[cols:]
+            attrs[x:x] = fill
+            del attrs[cols:]
+            if chars[-1] != self.WIDE_PAD and self._WIDE_RE.match(chars[-1]):
+                chars[-1] = " "
+        else:
+            if chars[x] == self.WIDE_PAD and x:
+                chars[x - 1] = " "
+            chars[x : x + 2] = (ch, self.WIDE_PAD)
+            attrs[x : x + 2] = fill
+            if x + 2 < cols and chars[x + 2] == self.WIDE_PAD:
+                chars[x + 2] = " "
+        self.dirty.add(self.y)
+        if x + 2 >= cols:
+            self.x = cols - 1
+            self._wrap_pending = self.autowrap
+        else:
+            self.x = x + 2
+
+    def _write_narrow(self, text):
+        if self._graphics:
+            text = text.translate(self._DEC_GRAPHICS)
+        cols = self.cols
+        if not self.autowrap and len(text) > cols - self.x:
+            text = text[: max(0, cols - self.x - 1)] + text[-1]
+        fill = array("Q", [self.attr])
+        while text:
+            if self._wrap_pending:
+                self.x = 0
+                self._linefeed()
+            x = self.x
+            piece = text[: cols - x]
+            text = text[len(piece):]
+            n = len(piece)
+            chars = self._chars[self.y]
+            attrs = self._attrs[self.y]
+            if self.insert_mode:
+                chars[x:x] = piece
+                del chars[cols:]
+                attrs[x:x] = fill * n
+                del attrs[cols:]
+            else:
+                if chars[x] == self.WIDE_PAD and x:
+                    chars[x - 1] = " "
+                chars[x : x + n] = piece
+                if x + n < cols and chars[x + n] == self.WIDE_PAD:
+                    chars[x + n] = " "
+                attrs[x : x + n] = fill * n
+            self.dirty.add(self.y)
+            if x + n >= cols:
+                self.x = cols - 1
+                self._wrap_pending = self.autowrap
+            else:
+                self.x = x + n
+
+    def _linefeed(self):
+        self._wrap_pending = False
+        if self.y == self.bottom:
+            self._scroll_up(1)
+        elif self.y < self.rows - 1:
+            self.y += 1
+
+    def _reverse_index(self):
+        self._wrap_pending = False
+        if self.y == self.top:
+            self._scroll_down(1)
+        elif self.y > 0:
+            self.y -= 1
+
+    def _blank_row(self):
+        erase = self.attr & (self.COLOR_MASK << self.BG_SHIFT)
+        return [" "] * self.cols, array("Q", [erase]) * self.cols
+
+    def _scroll_up(self, n, top=None):
+        top = self.top if top is None else top
+        bottom = self.bottom
+        keep = top == 0 and not self.alt_active
+        for _ in range(min(n, bottom - top + 1)):
+            chars = self._chars.pop(top)
+            attrs = self._attrs.pop(top)
+            if keep:
+                self.scrollback.append(self._encode_row(chars, attrs))
+            blank_chars, blank_attrs = self._blank_row()
+            self._chars.insert(bottom, blank_chars)
+            self._attrs.insert(bottom, blank_attrs)
+        self.full_dirty = True
+
+    def _scroll_down(self, n, top=None):
+        top = self.top if top is None else top
+        bottom = self.bottom
+        for _ in range(min(n, bottom - top + 1)):
+            self._chars.pop(bottom)
+            self._attrs.pop(bottom)
+            blank_chars, blank_attrs = self._blank_row()
+            self._chars.insert(top, blank_chars)
+            self._attrs.insert(top, blank_attrs)
+        self.full_dirty = True
+
+    def _insert_lines(self, n):
+        if self.top <= self.y <= self.bottom:
+            self._scroll_down(n, top=self.y)
+            self.x = 0
+
+    def _delete_lines(self, n):
+        if self.top <= self.y <= self.bottom:
+            bottom = self.bottom
+            for _ in range(min(n, bottom - self.y + 1)):
+                self._chars.pop(self.y)
+                self._attrs.pop(self.y)
+                blank_chars, blank_attrs = self._blank_row()
+                self._chars.insert(bottom, blank_chars)
+                self._attrs.insert(bottom, blank_attrs)
+            self.x = 0
+            self.full_dirty = True
+
+    def _insert_chars(self, n):
+        chars, attrs = self._chars[self.y], self._attrs[self.y]
+        n = min(n, self.cols - self.x)
+        if chars[self.x] == self.WIDE_PAD and self.x:
+            chars[self.x - 1] = chars[self.x] = " "
+        chars[self.x : self.x] = " " * n
+        if chars[self.cols] == self.WIDE_PAD:
+            chars[self.cols - 1] = " "
+        del chars[self.cols :]
+        attrs[self.x : self.x] = array("Q", [0]) * n
+        del attrs[self.cols :]
+        self.dirty.add(self.y)
+
+    def _delete_chars(self, n):
+        chars, attrs = self._chars[self.y], self._attrs[self.y]
+        n = min(n, self.cols - self.x)
+        if chars[self.x] == self.WIDE_PAD and self.x:
+            chars[self.x - 1] = " "
+        del chars[self.x : self.x + n]
+        chars.extend(" " * n)
+        if chars[self.x] == self.WIDE_PAD:
+            chars[self.x] = " "
+        del attrs[self.x : self.x + n]
+        attrs.extend(array("Q", [self.attr & (self.COLOR_MASK << self.BG_SHIFT)]) * n)
+        self.dirty.add(self.y)
+
+    def _erase(self, row, start, end):
+        if end <= start:
+            return
+        chars = self._chars[row]
+        if chars[start] == self.WIDE_PAD and start:
+            chars[start - 1] = " "
+        if end < self.cols and chars[end] == self.WIDE_PAD:
+            chars[end] = " "
+        chars[start:end] = " " * (end - start)
+        self._attrs[row][start:end] = array("Q", [self.attr & (self.COLOR_MASK << self.BG_SHIFT)]) * (end - start)
+        self.dirty.add(row)
+
+    def _erase_line(self, mode):
+        if mode == 0:
+            self._erase(self.y, self.x, self.cols)
+        elif mode == 1:
+            self._erase(self.y, 0, self.x + 1)
+        elif mode == 2:
+            self._erase(self.y, 0, self.cols)
+
+    def _erase_display(self, mode):
+        if mode == 0:
+            self._erase(self.y, self.x, self.cols)
+            rows = range(self.y + 1, self.rows)
+        elif mode == 1:
+            self._erase(self.y, 0, self.x + 1)
+            rows = range(0, self.y)
+        elif mode in (2, 3):
+            rows = range(self.rows)
+            if mode == 3:
+                self.scrollback.clear()
+                self.full_dirty = True
+        else:
+            return
+        for row in rows:
+            self._erase(row, 0, self.cols)
+
+    def _move_to(self, x, y):
+        self.x = max(0, min(self.cols - 1, x))
+        self.y = max(0, min(self.rows - 1, y))
+        self._wrap_pending = False
+
+    def _save_cursor(self):
+        self._saved = (self.x, self.y, self.attr, self._graphics)
+
+    def _restore_cursor(self):
+        if self._saved:
+            x, y, self.attr, self._graphics = self._saved
+            self._move_to(x, y)
+
+    def _set_alt_screen(self, on):
+        if on == self.alt_active:
+            return
+        if on:
+            self._main = (self._chars, self._attrs)
+            self._chars, self._attrs = self._blank_grid(self.rows)
+        else:
+            self._chars, self._attrs = self._main
+            self._main = None
+        self.alt_active = on
+        self.full_dirty = True
+
+
+TERMINAL_TRANSCRIPT_RE = re.compile(
+    r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[P^_X][^\x1b]*\x1b\\|\x1b[ -/]*[0-~]|[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]"
+)
+
+
+def regex_required_trigrams(pattern):
+    """Lower-cased trigrams that every match of `pattern` must contain; empty when nothing can be required."""
+    try:
+        from re import _parser as sre_parse  # Python 3.11+
+    except ImportError:  # pragma: no cover
+        import sre_parse
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return set()
+
+    def runs(items):
+        found, current = [], []
+        for op, arg in items:
+            if op is sre_parse.LITERAL:
+                current.append(chr(arg))
+                continue
+            found.append("".join(current))
+            current = []
+            if op is sre_parse.SUBPATTERN:
+                found.extend(runs(arg[-1]))
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and arg[0] >= 1:
+                found.extend(runs(arg[2]))
+        found.append("".join(current))
+        return found
+
+    trigrams = set()
+    for run in runs(parsed):
+        run = run.lower()
+        trigrams.update(run[i : i + 3] for i in range(len(run) - 2))
+    return trigrams
+
+
+class TerminalRecording:
+    """Append-only asciicast v2 log of a session, plus a plain transcript indexed per block by trigram.
+
+    The live files rotate into numbered, read-only segments; line numbers and cast offsets run on across them.
+    """
+
+    def __init__(self, base_path, segment=None):
+        base = Path(base_path)
+        self.base_path = base
+        self.segment = segment  # archive number, None for the live recording
+        self.cast_path = base.with_name(base.name + ".cast")
+        self.transcript_path = base.with_name(base.name + ".txt")
+        self.index_path = base.with_name(base.name + ".idx.gz")
+        self._lock = threading.Lock()
+        self._cast = None
+        self._transcript = None
+        self._carry = ""
+        self._dirty = False
+        self.started = 0.0
+        self.cast_bytes = 0
+        self.transcript_bytes = 0
+        self.line_count = 0
+        # Closed blocks: [transcript_start, transcript_end, first_line, cast_offset, time]; the open block is tracked apart.
+        self.blocks: list[list] = []
+        self.open_block = [0, 0, 0, 0.0]  # transcript_start, first_line, cast_offset, time
+        self.trigrams: dict[str, int] = {}
+        self.indexed_blocks = 0
+        self.first_line = 0  # lines and cast bytes in the segments before this one
+        self.first_cast = 0
+        self.segments: list[TerminalRecording] = []  # archived segments, oldest first
+        self._header = None
+        self._load_index()
+        if segment is None:
+            self._load_segments()
+
+    # -- writing (UI thread) --------------------------------------------------------------------
+
+    def open(self, cols, rows, title="", shell=""):
+        if self._cast is not None:
+            return
+        self._header = (cols, rows, title, shell)
+        self.cast_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.cast_bytes and self.over_limit():
+            self._archive()
+        fresh = not self.cast_bytes
+        if fresh:
+            self._reset_files()
+            if self.segments:
+                last = self.segments[-1]
+                self.first_line, self.first_cast = last.first_line + last.line_count, last.first_cast + last.cast_bytes
+            self.started = time.time()
+        self._cast = open(self.cast_path, "ab")
+        self._transcript = open(self.transcript_path, "ab")
+        if fresh:
+            header = {
+                "version": 2,
+                "width": cols,
+                "height": rows,
+                "timestamp": int(self.started),
+                "title": title,
+                "env": {"SHELL": shell, "TERM": "xterm-256color"},
+            }
+            self._write_cast(json.dumps(header) + "\n")
+            self.open_block = [0, 0, self.cast_bytes, 0.0]
+
+    def write(self, text):
+        if self._cast is None or not text:
+            return
+        elapsed = time.time() - self.started
+        self._write_cast(json.dumps([round(elapsed, 6), "o", text], ensure_ascii=False) + "\n")
+        self._append_transcript(text)
+        self._dirty = True
+        if self.transcript_bytes - self.open_block[0] >= TERMINAL_INDEX_BLOCK_BYTES:
+            self._transcript.flush()
+            start, first_line, cast_offset, started_at = self.open_block
+            with self._lock:
+                self.blocks.append([start, self.transcript_bytes, first_line, cast_offset, started_at])
+            self.open_block = [self.transcript_bytes, self.line_count, self.cast_bytes, elapsed]
+
+    def resize(self, cols, rows):
+        if self._cast is not None:
+            self._write_cast(json.dumps([round(time.time() - self.started, 6), "r", f"{cols}x{rows}"]) + "\n")
+
+    def _write_cast(self, line):
+        data = line.encode("utf-8")
+        self._cast.write(data)
+        self.cast_bytes += len(data)
+
+    def _append_transcript(self, text):
+        text = self._carry + text
+        self._carry = ""
+        tail = text.rfind("\x1b")
+        if tail >= 0 and TerminalScreen._PARTIAL_RE.match(text, tail):
+            text, self._carry = text[:tail], text[tail:]
+        text = TERMINAL_TRANSCRIPT_RE.sub("", text)
+        lines = text.split("\n")
+        self._carry = lines.pop() + self._carry
+        if len(self._carry) > TERMINAL_ESCAPE_MAX * 16:
+            lines.append(self._carry)
+            self._carry = ""
+        if not lines:
+            return
+        # Keep what a line finally showed: progress redraws after a bare CR replace the earlier text.
+        cleaned = [line.rstrip("\r").rsplit("\r", 1)[-1] for line in lines]
+        data = ("\n".join(cleaned) + "\n").encode("utf-8")
+        self._transcript.write(data)
+        self.transcript_bytes += len(data)
+        self.line_count += len(cleaned)
+
+    def flush(self):
+        for fh in (self._cast, self._transcript):
+            if fh is not None:
+                try:
+                    fh.flush()
+                except OSError:
+                    pass
+
+    def over_limit(self):
+        return self.cast_bytes > TERMINAL_RECORD_SEGMENT_BYTES or (
+            self.started and time.time() - self.started > TERMINAL_RECORD_SEGMENT_AGE
+        )
+
+    def rotate(self):
+        """Archive the live files as a segment and continue in fresh ones; no worker may be using it.
+
+        Returns the new segment (seal() it off the UI thread), or None when the files could not be moved
+        and were dropped instead.
+        """
+        reopen = self._cast is not None
+        self.flush()
+        for fh in (self._cast, self._transcript):
+            if fh is not None:
+                try:
+                    fh.close()
+                except OSError:
+                    pass
+        self._cast = self._transcript = None
+        segment = self._archive()
+        if segment is None:
+            self._reset_files()
+        if reopen:
+            self.open(*self._header)
+        return segment
+
+    def _archive(self):
+        number = self.segments[-1].segment + 1 if self.segments else 1
+        segment = TerminalRecording(self.base_path.with_name(f"{self.base_path.name}.{number}"), segment=number)
+        try:
+            os.replace(self.cast_path, segment.cast_path)
+            os.replace(self.transcript_path, segment.transcript_path)
+            if self.index_path.exists():
+                # Stale until seal(), but after a crash it still covers the segment up to the last checkpoint.
+                os.replace(self.index_path, segment.index_path)
+        except OSError:
+            return None
+        with self._lock:
+            segment.blocks, self.blocks = self.blocks, []
+            segment.trigrams, self.trigrams = self.trigrams, {}
+            segment.indexed_blocks, self.indexed_blocks = self.indexed_blocks, 0
+        for name in ("started", "cast_bytes", "transcript_bytes", "line_count", "open_block", "first_line", "first_cast"):
+            setattr(segment, name, getattr(self, name))
+        segment._dirty = True
+        self.first_line += self.line_count
+        self.first_cast += self.cast_bytes
+        self.cast_bytes = self.transcript_bytes = self.line_count = 0
+        self.open_block = [0, 0, 0, 0.0]
+        self.segments = [*self.segments, segment]
+        self._prune()
+        return segment
+
+    def seal(self):
+        """Index the rest of an archived segment and save its index; runs on a worker thread."""
+        self.index_pending()
+        self.save_index()
+
+    def _prune(self):
+        # The list is replaced, never mutated, so a search iterating the old one is unaffected.
+        segments = list(self.segments)
+        total = self.cast_bytes + sum(segment.cast_bytes for segment in segments)
+        now = time.time()
+        while segments:
+            oldest = segments[0]
+            try:
+                ended = oldest.cast_path.stat().st_mtime
+            except OSError:
+                ended = 0.0
+            if total <= TERMINAL_RECORD_MAX_BYTES and now - ended <= TERMINAL_RECORD_MAX_AGE:
+                break
+            oldest._unlink_files()
+            total -= oldest.cast_bytes
+            segments.pop(0)
+        self.segments = segments
+
+    def _load_segments(self):
+        prefix = self.base_path.name + "."
+        numbers = []
+        for path in self.base_path.parent.glob(f"{prefix}*.cast"):
+            number = path.name[len(prefix) : -len(".cast")]
+            if number.isdigit():
+                numbers.append(int(number))
+        segments = []
+        for number in sorted(numbers):
+            segment = TerminalRecording(self.base_path.with_name(f"{prefix}{number}"), segment=number)
+            if segment.cast_bytes:
+                segments.append(segment)
+            else:
+                segment._unlink_files()  # never indexed (crash mid-rotation); nothing can address it
+        self.segments = segments
+        self._prune()
+
+    def retained(self):
+        """(lines, cast bytes) still on disk across the segments and the live files."""
+        recordings = [*self.segments, self]
+        return sum(r.line_count for r in recordings), sum(r.cast_bytes for r in recordings)
+
+    def close(self):
+        self.flush()
+        for fh in (self._cast, self._transcript):
+            if fh is not None:
+                try:
+                    fh.close()
+                except OSError:
+                    pass
+        self._cast = self._transcript = None
+        self.save_index()
+
+    def discard(self):
+        self.close()
+        for recording in (*self.segments, self):
+            recording._unlink_files()
+        self.segments = []
+
+    def _unlink_files(self):
+        for path in (self.cast_path, self.transcript_path, self.index_path):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _reset_files(self):
+        self._unlink_files()
+        self.cast_bytes = self.transcript_bytes = self.line_count = 0
+        self.blocks, self.trigrams, self.indexed_blocks = [], {}, 0
+
+    # -- index ----------------------------------------------------------------------------------
+
+    def needs_indexing(self):
+        return self.indexed_blocks < len(self.blocks)
+
+    def index_pending(self):
+        """Add trigram bits for closed blocks not yet indexed; runs on a worker thread."""
+        with self._lock:
+            pending = list(enumerate(self.blocks))[self.indexed_blocks :]
+        if not pending:
+            return 0
+        with open(self.transcript_path, "rb") as fh:
+            for number, (start, end, *_rest) in pending:
+                fh.seek(start)
+                text = fh.read(end - start).decode("utf-8", errors="replace").lower()
+                # Dedupe as char tuples first; building a string per position is the slow part.
+                grams = {a + b + c for a, b, c in set(zip(text, text[1:], text[2:]))}
+                bit = 1 << number
+                with self._lock:
+                    trigrams = self.trigrams
+                    for gram in grams:
+                        trigrams[gram] = trigrams.get(gram, 0) | bit
+                    self.indexed_blocks = number + 1
+        self._dirty = True
+        return len(pending)
+
+    def index_state(self):
+        """Flush and copy the index header on the UI thread; None when nothing changed since the last save."""
+        if not self._dirty or not self.cast_bytes:
+            return None
+        self.flush()
+        self._dirty = False
+        with self._lock:
+            return {
+                "version": 1,
+                "started": self.started,
+                "cast_bytes": self.cast_bytes,
+                "transcript_bytes": self.transcript_bytes,
+                "line_count": self.line_count,
+                "first_line": self.first_line,
+                "first_cast": self.first_cast,
+                "blocks": [list(block) for block in self.blocks],
+                "open_block": list(self.open_block),
+                "indexed_blocks": self.indexed_blocks,
+            }
+
+    def save_index(self, state=None):
+        """Write the gzipped index; with a `state` from index_state() this is safe on a worker thread."""
+        if state is None:
+            state = self.index_state()
+            if state is None:
+                return
+        with self._lock:
+            trigrams = {gram: format(mask, "x") for gram, mask in self.trigrams.items()}
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.{threading.get_ident()}.tmp")
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=1) as fh:
+                json.dump({**state, "trigrams": trigrams}, fh)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            self._dirty = True
+
+    def _load_index(self):
+        try:
+            with gzip.open(self.index_path, "rt", encoding="utf-8") as fh:
+                payload = json.load(fh)
+            cast_size = self.cast_path.stat().st_size
+            transcript_size = self.transcript_path.stat().st_size
+        except (OSError, EOFError, ValueError):
+            return
+        if cast_size < payload.get("cast_bytes", 0) or transcript_size < payload.get("transcript_bytes", 0):
+            return
+        # Anything written after the last index save (a crash) is cut so the files and the index agree.
+        for path, size in ((self.cast_path, payload["cast_bytes"]), (self.transcript_path, payload["transcript_bytes"])):
+            if path.stat().st_size != size:
+                os.truncate(path, size)
+        self.started = payload.get("started", 0.0)
+        self.cast_bytes = payload["cast_bytes"]
+        self.transcript_bytes = payload["transcript_bytes"]
+        self.line_count = payload.get("line_count", 0)
+        self.first_line = payload.get("first_line", 0)
+        self.first_cast = payload.get("first_cast", 0)
+        self.blocks = payload.get("blocks", [])
+        self.open_block = payload.get("open_block", [self.transcript_bytes, self.line_count, self.cast_bytes, 0.0])
+        self.indexed_blocks = min(payload.get("indexed_blocks", 0), len(self.blocks))
+        self.trigrams = {gram: int(mask, 16) for gram, mask in payload.get("trigrams", {}).items()}
+
+    # -- queries (worker thread) ----------------------------------------------------------------
+
+    def search(self, pattern, flags=re.IGNORECASE, limit=1000):
+        """Regex search over the transcripts, newest segment first; only blocks holding every required trigram are read."""
+        regex = re.compile(pattern, flags)
+        required = regex_required_trigrams(pattern)
+        recordings = [*self.segments, self]
+        batches = []
+        remaining = limit
+        blocks_read = 0
+        for recording in reversed(recordings):
+            if remaining <= 0:
+                break
+            try:
+                results, read = recording._search_blocks(regex, required, remaining)
+            except OSError:
+                if recording is self:
+                    raise
+                continue  # pruned while the search ran
+            batches.append(results)
+            remaining -= len(results)
+            blocks_read += read
+        return {
+            "results": [result for batch in reversed(batches) for result in batch],
+            "blocks_read": blocks_read,
+            "blocks": sum(len(recording.blocks) + 1 for recording in recordings),
+            "truncated": remaining <= 0,
+        }
+
+    def _search_blocks(self, regex, required, limit):
+        with self._lock:
+            blocks = [list(block) for block in self.blocks]
+            indexed = self.indexed_blocks
+            mask = -1
+            for gram in required:
+                mask &= self.trigrams.get(gram, 0)
+        start, first_line, cast_offset, started_at = self.open_block
+        ranges = [block for number, block in enumerate(blocks) if number >= indexed or (mask >> number) & 1]
+        ranges.append([start, self.transcript_bytes, first_line, cast_offset, started_at])
+        results = []
+        blocks_read = 0
+        with open(self.transcript_path, "rb") as fh:
+            for block_start, block_end, line, offset, at in ranges:
+                if block_end <= block_start:
+                    continue
+                blocks_read += 1
+                fh.seek(block_start)
+                text = fh.read(block_end - block_start).decode("utf-8", errors="replace")
+                pos = 0
+                last_line = -1
+                for m in regex.finditer(text):
+                    line += text.count("\n", pos, m.start())
+                    pos = m.start()
+                    if line == last_line:
+                        continue
+                    last_line = line
+                    line_start = text.rfind("\n", 0, m.start()) + 1
+                    line_end = text.find("\n", m.start())
+                    results.append(
+                        {
+                            "line": self.first_line + line,
+                            "column": m.start() - line_start,
+                            "text": text[line_start : line_end if line_end >= 0 else None],
+                            "cast_offset": self.first_cast + offset,
+                            "time": at,
+                        }
+                    )
+                    if len(results) >= limit:
+                        return results, blocks_read
+        return results, blocks_read
+
+    def context(self, line, radius=20):
+        """Transcript lines around `line` as (first_line_number, [lines]), read from the segment holding it."""
+        recordings = [*self.segments, self]
+        recording = recordings[max(0, bisect.bisect_right([r.first_line for r in recordings], line) - 1)]
+        first, lines = recording._context_lines(line - recording.first_line, radius)
+        return recording.first_line + first, lines
+
+    def _context_lines(self, line, radius):
+        with self._lock:
+            blocks = [list(block) for block in self.blocks]
+        blocks.append([self.open_block[0], self.transcript_bytes, self.open_block[1]])
+        firsts = [block[2] for block in blocks]
+        lo = max(0, bisect.bisect_right(firsts, max(0, line - radius)) - 1)
+        hi = bisect.bisect_right(firsts, line + radius)
+        with open(self.transcript_path, "rb") as fh:
+            fh.seek(blocks[lo][0])
+            text = fh.read(blocks[hi - 1][1] - blocks[lo][0]).decode("utf-8", errors="replace")
+        lines = text.split("\n")
+        offset = max(0, line - radius - firsts[lo])
+        return firsts[lo] + offset, lines[offset : offset + 2 * radius + 1]
+
+    def events(self, offset=0):
+        """Yield (time, kind, data) cast events from cast `offset` on, through every later segment.
+
+        Offsets run on across segments (0 = just after the oldest kept header); times are shifted so they
+        keep counting from the oldest segment's start.
+        """
+        recordings = [*self.segments, self]
+        origin = recordings[0].started
+        for recording in recordings:
+            if recording is not self and offset >= recording.first_cast + recording.cast_bytes:
+                continue
+            shift = recording.started - origin
+            for at, kind, data in recording._segment_events(max(0, offset - recording.first_cast)):
+                yield [at + shift, kind, data]
+
+    def _segment_events(self, offset):
+        with open(self.cast_path, "rb") as fh:
+            if offset:
+                fh.seek(offset)
+            else:
+                fh.readline()
+            for raw in fh:
+                try:
+                    event = json.loads(raw)
+                except ValueError:
+                    continue
+                if isinstance(event, list) and len(event) == 3:
+                    yield event
+
+
+class _CellMatch:
+    """A regex match re-expressed in screen cell columns (double-width characters span two)."""
+
+    __slots__ = ("_start", "_end")
+
+    def __init__(self, start, end):
+        self._start, self._end = start, end
+
+    def start(self):
+        return self._start
+
+    def end(self):
+        return self._end
+
+
+class PhotonTerminalDisplay(QtWidgets.QAbstractScrollArea):
+    """Paints a TerminalScreen; only rows the parser marked dirty are repainted."""
+
+    size_changed = QtCore.pyqtSignal(int, int)
+    focused = QtCore.pyqtSignal()
+
     KEY_MAP = {
         QtCore.Qt.Key_Left: "\x1b[D",
         QtCore.Qt.Key_Right: "\x1b[C",
@@ -423,52 +2027,407 @@ class PhotonTerminalDisplay(QtWidgets.QPlainTextEdit):
         QtCore.Qt.Key_End: "\x1b[F",
         QtCore.Qt.Key_PageUp: "\x1b[5~",
         QtCore.Qt.Key_PageDown: "\x1b[6~",
+        QtCore.Qt.Key_Insert: "\x1b[2~",
+        QtCore.Qt.Key_Delete: "\x1b[3~",
         QtCore.Qt.Key_Tab: "\t",
         QtCore.Qt.Key_Backtab: "\x1b[Z",
         QtCore.Qt.Key_Backspace: "\x7f",
         QtCore.Qt.Key_Return: "\r",
         QtCore.Qt.Key_Enter: "\r",
+        QtCore.Qt.Key_F1: "\x1bOP",
+        QtCore.Qt.Key_F2: "\x1bOQ",
+        QtCore.Qt.Key_F3: "\x1bOR",
+        QtCore.Qt.Key_F4: "\x1bOS",
+        QtCore.Qt.Key_F5: "\x1b[15~",
+        QtCore.Qt.Key_F6: "\x1b[17~",
+        QtCore.Qt.Key_F7: "\x1b[18~",
+        QtCore.Qt.Key_F8: "\x1b[19~",
+        QtCore.Qt.Key_F9: "\x1b[20~",
+        QtCore.Qt.Key_F10: "\x1b[21~",
+        QtCore.Qt.Key_F11: "\x1b[23~",
+        QtCore.Qt.Key_F12: "\x1b[24~",
+    }
+    APP_CURSOR_KEYS = {
+        QtCore.Qt.Key_Left: "\x1bOD",
+        QtCore.Qt.Key_Right: "\x1bOC",
+        QtCore.Qt.Key_Up: "\x1bOA",
+        QtCore.Qt.Key_Down: "\x1bOB",
+        QtCore.Qt.Key_Home: "\x1bOH",
+        QtCore.Qt.Key_End: "\x1bOF",
     }
+    BASE_COLORS = (
+        "#0b1220", "#ff5c7a", "#5cffb1", "#ffd166", "#5ca8ff", "#c77dff", "#4ee6ff", "#d8f6ff",
+        "#3b4a63", "#ff8fa3", "#8dffc9", "#ffe29a", "#8cc4ff", "#dcb0ff", "#9ce4ff", "#ffffff",
+    )
 
     def __init__(self, on_input, sound_engine, parent=None):
         super().__init__(parent)
         self.on_input = on_input
         self.sound_engine = sound_engine
-        self.setReadOnly(True)
-        self.setWordWrapMode(QtGui.QTextOption.WrapAnywhere)
-        self.setUndoRedoEnabled(False)
-        self.document().setMaximumBlockCount(8000)
+        self.screen = TerminalScreen()
+        self.follow_output = True
+        self.foreground = QtGui.QColor("#d8f6ff")
+        self.background = QtGui.QColor("#050a13")
+        self.selection_color = QtGui.QColor(156, 228, 255, 90)
+        self.cursor_color = QtGui.QColor(156, 228, 255, 170)
+        self._palette = self._build_palette()
+        self._rgb_cache: dict[int, QtGui.QColor] = {}
+        self._fonts: dict[tuple, QtGui.QFont] = {}
+        self._selection = None
+        self._selecting = False
         font = QtGui.QFont("JetBrains Mono")
         font.setStyleHint(QtGui.QFont.Monospace)
         self.setFont(font)
+        self._update_metrics()
+        self.setFocusPolicy(QtCore.Qt.StrongFocus)
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.viewport().setCursor(QtGui.QCursor(QtCore.Qt.IBeamCursor))
+        self.viewport().setAttribute(QtCore.Qt.WA_OpaquePaintEvent, True)
+        self.verticalScrollBar().valueChanged.connect(lambda _value: self.viewport().update())
         self.setContextMenuPolicy(QtCore.Qt.DefaultContextMenu)
+        self._sync_scrollbar()
+
+    def _build_palette(self):
+        colors = [QtGui.QColor(c) for c in self.BASE_COLORS]
+        steps = (0, 95, 135, 175, 215, 255)
+        colors += [QtGui.QColor(r, g, b) for r in steps for g in steps for b in steps]
+        colors += [QtGui.QColor(8 + 10 * i, 8 + 10 * i, 8 + 10 * i) for i in range(24)]
+        return colors
+
+    def _update_metrics(self):
+        metrics = QtGui.QFontMetrics(self.font())
+        advance = getattr(metrics, "horizontalAdvance", metrics.width)
+        self._cell_w = max(1, advance("M"))
+        self._cell_h = max(1, metrics.height())
+        self._ascent = metrics.ascent()
+        self._fonts.clear()
+
+    # -- output ---------------------------------------------------------------------------------
+
+    def feed(self, text):
+        """Run `text` through the emulator and schedule repaints for whatever it touched."""
+        bar = self.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum()
+        self.screen.feed(text)
+        full, rows = self.screen.take_dirty()
+        self._sync_scrollbar(follow=at_bottom and self.follow_output)
+        if not (full or rows):
+            return
+        if full or bar.value() < bar.maximum():
+            self.viewport().update()
+            return
+        width = self.viewport().width()
+        for row in rows:
+            self.viewport().update(0, row * self._cell_h, width, self._cell_h)
+
+    def take_responses(self):
+        responses, self.screen.responses = self.screen.responses, []
+        return "".join(responses)
+
+    def clear(self):
+        self.screen.clear()
+        self._selection = None
+        self._sync_scrollbar(follow=True)
+        self.viewport().update()
+
+    def reset(self):
+        self.screen.reset()
+        self._selection = None
+        self.viewport().update()
+
+    def scrollback_trimmed(self):
+        self._selection = None
+        self._sync_scrollbar(follow=True)
+        self.viewport().update()
+
+    def scroll_to_bottom(self):
+        bar = self.verticalScrollBar()
+        bar.setValue(bar.maximum())
+
+    def _sync_scrollbar(self, follow=False):
+        bar = self.verticalScrollBar()
+        backlog = len(self.screen.scrollback)
+        if bar.maximum() != backlog or bar.pageStep() != self.screen.rows:
+            bar.blockSignals(True)
+            try:
+                bar.setRange(0, backlog)
+                bar.setPageStep(self.screen.rows)
+            finally:
+                bar.blockSignals(False)
+        if follow and bar.value() != backlog:
+            bar.setValue(backlog)
+
+    # -- painting -------------------------------------------------------------------------------
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self.viewport())
+        top_line = self.verticalScrollBar().value()
+        cell_h = self._cell_h
+        for rect in event.region().rects():
+            painter.fillRect(rect, self.background)
+            first = max(0, rect.top() // cell_h)
+            last = min(self.screen.rows - 1, rect.bottom() // cell_h)
+            for row in range(first, last + 1):
+                self._paint_line(painter, row, top_line + row)
+        screen = self.screen
+        if screen.cursor_visible and top_line >= len(screen.scrollback) and self.hasFocus():
+            cursor_rect = QtCore.QRect(screen.x * self._cell_w, screen.y * cell_h, self._cell_w, cell_h)
+            if event.region().intersects(cursor_rect):
+                painter.fillRect(cursor_rect, self.cursor_color)
+        painter.end()
+
+    def _paint_line(self, painter, row, index):
+        text, runs = self.screen.line(index)
+        cell_w, cell_h = self._cell_w, self._cell_h
+        pad = TerminalScreen.WIDE_PAD
+        y = row * cell_h
+        if not runs:
+            runs = ((0, 0),)
+        for i, (start, attr) in enumerate(runs):
+            end = runs[i + 1][0] if i + 1 < len(runs) else self.screen.cols
+            fg, bg = self._colors(attr)
+            if bg is not None:
+                painter.fillRect(start * cell_w, y, (end - start) * cell_w, cell_h, bg)
+            segment = text[start:end]
+            if segment.strip():
+                painter.setFont(self._font_for(attr))
+                painter.setPen(fg)
+                if pad in segment:
+                    self._paint_wide_segment(painter, segment, start, y)
+                else:
+                    painter.drawText(QtCore.QPointF(start * cell_w, y + self._ascent), segment)
+        span = self._selection_span(index)
+        if span:
+            painter.fillRect(span[0] * cell_w, y, (span[1] - span[0]) * cell_w, cell_h, self.selection_color)
+
+    def _paint_wide_segment(self, painter, segment, start, y):
+        # Each double-width character is drawn at its own cell so the glyphs after it stay on the grid.
+        column = start
+        for piece in re.split(r"(.\x00)", segment):
+            if not piece:
+                continue
+            if piece.endswith(TerminalScreen.WIDE_PAD):
+                painter.drawText(QtCore.QRectF(column * self._cell_w, y, 2 * self._cell_w, self._cell_h), QtCore.Qt.AlignCenter, piece[0])
+            elif piece.strip(TerminalScreen.WIDE_PAD + " "):
+                painter.drawText(QtCore.QPointF(column * self._cell_w, y + self._ascent), piece.replace(TerminalScreen.WIDE_PAD, " "))
+            column += len(piece)
+
+    def _color(self, value):
+        if value & TerminalScreen.TRUECOLOR:
+            color = self._rgb_cache.get(value)
+            if color is None:
+                color = QtGui.QColor((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)
+                self._rgb_cache[value] = color
+            return color
+        return self._palette[min(value - 1, 255)]
+
+    def _colors(self, attr):
+        mask = TerminalScreen.COLOR_MASK
+        fg_value = attr & mask
+        bg_value = (attr >> TerminalScreen.BG_SHIFT) & mask
+        fg = self._color(fg_value) if fg_value else self.foreground
+        bg = self._color(bg_value) if bg_value else None
+        if attr & TerminalScreen.REVERSE:
+            fg, bg = (bg or self.background), fg
+        if attr & TerminalScreen.HIDDEN:
+            fg = bg or self.background
+        elif attr & TerminalScreen.DIM:
+            fg = fg.darker(160)
+        return fg, bg
+
+    def _font_for(self, attr):
+        key = (
+            bool(attr & TerminalScreen.BOLD),
+            bool(attr & TerminalScreen.ITALIC),
+            bool(attr & TerminalScreen.UNDERLINE),
+            bool(attr & TerminalScreen.STRIKE),
+        )
+        font = self._fonts.get(key)
+        if font is None:
+            font = QtGui.QFont(self.font())
+            font.setBold(key[0])
+            font.setItalic(key[1])
+            font.setUnderline(key[2])
+            font.setStrikeOut(key[3])
+            self._fonts[key] = font
+        return font
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        viewport = self.viewport()
+        cols = max(2, viewport.width() // self._cell_w)
+        rows = max(1, viewport.height() // self._cell_h)
+        if (cols, rows) != (self.screen.cols, self.screen.rows):
+            bar = self.verticalScrollBar()
+            at_bottom = bar.value() >= bar.maximum()
+            self.screen.resize(cols, rows)
+            self.screen.take_dirty()
+            self._sync_scrollbar(follow=at_bottom)
+            viewport.update()
+            self.size_changed.emit(cols, rows)
+
+    # -- selection ------------------------------------------------------------------------------
+
+    def _cell_at(self, pos):
+        line = self.verticalScrollBar().value() + max(0, pos.y()) // self._cell_h
+        col = max(0, min(self.screen.cols, round(pos.x() / self._cell_w)))
+        return min(line, self.screen.line_count() - 1), col
+
+    def _ordered_selection(self):
+        if not self._selection or self._selection[0] == self._selection[1]:
+            return None
+        return tuple(sorted(self._selection))
+
+    def _selection_span(self, index):
+        ordered = self._ordered_selection()
+        if not ordered or not (ordered[0][0] <= index <= ordered[1][0]):
+            return None
+        start = ordered[0][1] if index == ordered[0][0] else 0
+        end = ordered[1][1] if index == ordered[1][0] else self.screen.cols
+        return (start, end) if end > start else None
+
+    def selected_text(self):
+        ordered = self._ordered_selection()
+        if not ordered:
+            return ""
+        lines = []
+        for index in range(ordered[0][0], ordered[1][0] + 1):
+            start, end = self._selection_span(index) or (0, 0)
+            lines.append(self.screen.line(index)[0][start:end].replace(TerminalScreen.WIDE_PAD, "").rstrip())
+        return "\n".join(lines)
+
+    def find(self, pattern, backwards=False, flags=re.IGNORECASE):
+        """Select the next regex match after (or before) the current selection, wrapping; False when none."""
+        regex = re.compile(pattern, flags)
+        total = self.screen.line_count()
+        ordered = self._ordered_selection()
+        if ordered:
+            origin_line, origin_col = ordered[0] if backwards else (ordered[0][0], ordered[0][1] + 1)
+        else:
+            origin_line, origin_col = (total - 1, self.screen.cols) if backwards else (self.verticalScrollBar().value(), 0)
+        step = -1 if backwards else 1
+        for offset in range(total + 1):
+            index = (origin_line + step * offset) % total
+            text = self.screen.line(index)[0]
+            cells = None
+            if TerminalScreen.WIDE_PAD in text:
+                # Match on what is shown, then map character offsets back to cell columns.
+                cells = [col for col, ch in enumerate(text) if ch != TerminalScreen.WIDE_PAD]
+                cells.append(len(text))
+                text = text.replace(TerminalScreen.WIDE_PAD, "")
+            matches = [m for m in regex.finditer(text) if m.end() > m.start()]
+            if cells is not None:
+                matches = [_CellMatch(cells[m.start()], cells[m.end()]) for m in matches]
+            if offset == 0:
+                matches = [m for m in matches if (m.start() < origin_col if backwards else m.start() >= origin_col)]
+            elif offset == total:
+                matches = [m for m in matches if (m.start() >= origin_col if backwards else m.start() < origin_col)]
+            if not matches:
+                continue
+            match = matches[-1] if backwards else matches[0]
+            self._selection = ((index, match.start()), (index, match.end()))
+            bar = self.verticalScrollBar()
+            if not bar.value() <= index < bar.value() + self.screen.rows:
+                bar.setValue(max(0, min(bar.maximum(), index - self.screen.rows // 2)))
+            self.viewport().update()
+            return True
+        return False
+
+    def mousePressEvent(self, event):
+        if event.button() == QtCore.Qt.LeftButton:
+            cell = self._cell_at(event.pos())
+            self._selection = (cell, cell)
+            self._selecting = True
+            self.viewport().update()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._selecting and self._selection:
+            self._selection = (self._selection[0], self._cell_at(event.pos()))
+            self.viewport().update()
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == QtCore.Qt.LeftButton and self._selecting:
+            self._selecting = False
+            text = self.selected_text()
+            clipboard = QtWidgets.QApplication.clipboard()
+            if text and clipboard.supportsSelection():
+                clipboard.setText(text, QtGui.QClipboard.Selection)
+        super().mouseReleaseEvent(event)
+
+    def copy(self):
+        text = self.selected_text()
+        if text:
+            QtWidgets.QApplication.clipboard().setText(text)
+
+    def paste(self):
+        payload = QtWidgets.QApplication.clipboard().text()
+        if not payload:
+            return
+        if self.screen.bracketed_paste:
+            payload = f"\x1b[200~{payload}\x1b[201~"
+        self.on_input(payload)
+        self.sound_engine.play("key")
+
+    def contextMenuEvent(self, event):
+        menu = QtWidgets.QMenu(self)
+        copy_action = menu.addAction("Copy")
+        copy_action.setEnabled(bool(self._ordered_selection()))
+        copy_action.triggered.connect(self.copy)
+        menu.addAction("Paste").triggered.connect(self.paste)
+        menu.addSeparator()
+        menu.addAction("Clear").triggered.connect(self.clear)
+        menu.exec_(event.globalPos())
+
+    # -- input ----------------------------------------------------------------------------------
+
+    def focusNextPrevChild(self, next_child):
+        return False  # Tab belongs to the shell
+
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        self.viewport().update()
+        self.focused.emit()
+
+    def focusOutEvent(self, event):
+        super().focusOutEvent(event)
+        self.viewport().update()
 
     def keyPressEvent(self, event):
+        modifiers = event.modifiers()
+        shift_ctrl = QtCore.Qt.ControlModifier | QtCore.Qt.ShiftModifier
+        if (modifiers & shift_ctrl) == shift_ctrl and event.key() in (QtCore.Qt.Key_C, QtCore.Qt.Key_V):
+            if event.key() == QtCore.Qt.Key_C:
+                self.copy()
+            else:
+                self.paste()
+            event.accept()
+            return
         if event.matches(QtGui.QKeySequence.Paste):
-            clipboard = QtWidgets.QApplication.clipboard()
-            payload = clipboard.text()
-            if payload:
-                self.on_input(payload)
-                self.sound_engine.play("key")
+            self.paste()
             event.accept()
             return
         sequence = self._map_key(event)
+        if not sequence:
+            sequence = event.text()
+            if sequence and modifiers & QtCore.Qt.AltModifier:
+                sequence = "\x1b" + sequence
         if sequence:
+            self._selection = None
+            self.scroll_to_bottom()
             self.on_input(sequence)
             self.sound_engine.play("key")
             event.accept()
             return
-        text = event.text()
-        if text:
-            self.on_input(text)
-            self.sound_engine.play("key")
-            event.accept()
-            return
         super().keyPressEvent(event)
 
     def _map_key(self, event):
-        if event.key() in self.KEY_MAP:
-            return self.KEY_MAP[event.key()]
+        key = event.key()
+        if self.screen.app_cursor and key in self.APP_CURSOR_KEYS:
+            return self.APP_CURSOR_KEYS[key]
+        if key in self.KEY_MAP:
+            return self.KEY_MAP[key]
         return None
 
 
@@ -619,94 +2578,898 @@ class TerminalDoorOverlay(QtWidgets.QWidget):
         self.animation.start()
 
 
-class PhotonTerminalWidget(QtWidgets.QWidget):
-    back_requested = QtCore.pyqtSignal()
+class TerminalSession(QtCore.QObject):
+    """One shell: its display, a lazily spawned TerminalProcess and scrollback persisted under DATA_DIR."""
 
-    def __init__(self, sound_engine, accent_primary, accent_glow, parent=None, base_env=None):
-        super().__init__(parent)
-        self.sound_engine = sound_engine
-        self.accent_primary = accent_primary
-        self.accent_glow = accent_glow
-        self.animation_enabled = True
-        self.auto_scroll = True
-        self.cwd_label = None
-        self.base_env = base_env or os.environ.copy()
-        self.shell_path = resolve_user_shell()
-        self._build_ui()
-        self._spawn_terminal()
+    cwd_changed = QtCore.pyqtSignal(str)
+    terminated = QtCore.pyqtSignal(int)
 
-    def _build_ui(self):
-        layout = self._register_layout(QtWidgets.QVBoxLayout(self))
-        layout.setContentsMargins(10, 10, 10, 10)
-        layout.setSpacing(8)
-        control_bar = QtWidgets.QWidget()
-        control_layout = QtWidgets.QHBoxLayout(control_bar)
-        control_layout.setContentsMargins(0, 0, 0, 0)
-        control_layout.setSpacing(8)
-        self.singularity_btn = QtWidgets.QPushButton("≪ ⟬ SINGULARITY ⟭")
-        self.singularity_btn.setCursor(QtGui.QCursor(QtCore.Qt.PointingHandCursor))
-        self.singularity_btn.setToolTip("Return to the Singularity interface")
-        self.singularity_btn.clicked.connect(self._request_return_to_interface)
-        control_layout.addWidget(self.singularity_btn)
-        control_layout.addStretch(1)
-        right_controls = QtWidgets.QWidget()
-        right_layout = QtWidgets.QHBoxLayout(right_controls)
-        right_layout.setContentsMargins(0, 0, 0, 0)
-        right_layout.setSpacing(4)
-        self.clear_btn = QtWidgets.QPushButton("Clear")
-        self.sigint_btn = QtWidgets.QPushButton("SIGINT")
-        self.reset_btn = QtWidgets.QPushButton("Reset")
-        for btn in (self.clear_btn, self.sigint_btn, self.reset_btn):
-            btn.setCursor(QtGui.QCursor(QtCore.Qt.PointingHandCursor))
-        self.scroll_lock_checkbox = QtWidgets.QCheckBox("Scroll Lock")
-        self.scroll_lock_checkbox.setStyleSheet("color:#9ce4ff;")
-        self.scroll_lock_checkbox.setChecked(False)
-        right_layout.addWidget(self.clear_btn)
-        right_layout.addWidget(self.sigint_btn)
-        right_layout.addWidget(self.reset_btn)
-        right_layout.addWidget(self.scroll_lock_checkbox)
-        control_layout.addWidget(right_controls)
-        layout.addWidget(control_bar)
-        self.cwd_label = QtWidgets.QLabel("Working directory: …")
-        self.cwd_label.setStyleSheet("color:#9ce4ff; font-size:11px;")
-        layout.addWidget(self.cwd_label)
-        self.display = PhotonTerminalDisplay(self._send_input, sound_engine=self.sound_engine, parent=self)
+    def __init__(self, session_id, sound_engine, shell_path, base_env, cwd, project=None, title=None, record=TERMINAL_RECORD_SESSIONS, parent=None):
+        super().__init__(parent)
+        self.session_id = session_id
+        self.shell_path = shell_path
+        self.base_env = base_env
+        self.cwd = cwd
+        self.project = project
+        self.title = title or project or os.path.basename(cwd.rstrip("/")) or "shell"
+        self.process: TerminalProcess | None = None
+        self.last_active = time.monotonic()
+        self.display = PhotonTerminalDisplay(self.write, sound_engine=sound_engine)
         self.display.setStyleSheet("background-color:#050a13; border-radius:6px; padding:8px;")
-        layout.addWidget(self.display)
-        self.status_label = QtWidgets.QLabel("PHØTØN terminal ready")
-        self.status_label.setStyleSheet("color:#b3f2ff; font-size:11px;")
-        layout.addWidget(self.status_label)
-        self.overlay = TerminalDoorOverlay(self, self.accent_primary, self.accent_glow)
-        self.clear_btn.clicked.connect(self._clear_display)
-        self.sigint_btn.clicked.connect(lambda: self._send_signal(signal.SIGINT))
-        self.reset_btn.clicked.connect(self._reset_terminal)
-        self.scroll_lock_checkbox.stateChanged.connect(self._on_scroll_lock_changed)
-
-    def _register_layout(self, layout):
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(6)
-        return layout
+        self.display.size_changed.connect(self.resize)
+        # Rows on disk that are no longer in memory: set after spill() and for restored sessions.
+        self._spilled = False
+        self._kept = 0
+        self._restored_at = None
+        # Spill writes and reloads run on the pool; the generation lets save()/discard() void an in-flight write.
+        self._spill_lock = threading.Lock()
+        self._spill_generation = 0
+        self._spill_worker = None
+        self._spill_written = None  # (snapshot, keep, started) of a landed write not yet applied to memory
+        self._load_worker = None
+        self.recording = TerminalRecording(TERMINAL_SESSION_DIR / session_id) if record else None
+        self._index_worker = None
+        self._index_retry_at = 0.0
+        self._checkpoint_due = False
+
+    @property
+    def path(self):
+        return TERMINAL_SESSION_DIR / f"{self.session_id}.jsonl.gz"
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.process is not None
+
+    def spec(self):
+        return {
+            "id": self.session_id,
+            "title": self.title,
+            "project": self.project,
+            "cwd": self.display.screen.cwd or self.cwd,
+            "record": self.recording is not None,
+        }
 
-    def _spawn_terminal(self):
+    def ensure_started(self):
+        if self.process is not None:
+            return
         env = self.base_env.copy()
         env.setdefault("TERM", "xterm-256color")
         env["SHELL"] = self.shell_path
         shell_name = os.path.basename(self.shell_path or "").lower()
-        marker = 'printf "__PHOTON_CWD__%s__\\n" "$PWD"'
+        marker = 'printf "\\033]7;file://%s%s\\007" "${HOSTNAME:-localhost}" "$PWD"'
+        # For non-bash shells we avoid prompt injection to keep shells clean.
         if shell_name in {"bash", "sh"}:
             existing = env.get("PROMPT_COMMAND", "")
             env["PROMPT_COMMAND"] = f"{marker}; {existing}" if existing else marker
-        self.terminal_process = TerminalProcess(shell=self.shell_path, cwd=os.getcwd(), env=env, parent=self)
-        self.terminal_process.output_ready.connect(self._on_process_output)
-        self.terminal_process.terminated.connect(self._on_process_terminated)
-        # For non-bash shells we avoid prompt injection to keep shells clean.
+        cwd = self.cwd if os.path.isdir(self.cwd) else str(Path.home())
+        self.process = TerminalProcess(shell=self.shell_path, cwd=cwd, env=env, parent=self)
+        self.process.output_ready.connect(self._on_output)
+        self.process.terminated.connect(self._on_terminated)
+        self.process.resize(self.display.screen.cols, self.display.screen.rows)
+        if self.recording is not None:
+            self.recording.open(self.display.screen.cols, self.display.screen.rows, self.title, self.shell_path)
+
+    def write(self, payload):
+        if not payload:
+            return
+        self.ensure_started()
+        self.last_active = time.monotonic()
+        self.process.write(payload if isinstance(payload, bytes) else payload.encode("utf-8"))
 
-    def focus_terminal(self):
-        self.display.setFocus()
+    def resize(self, cols, rows):
+        if self.process is not None:
+            self.process.resize(cols, rows)
+        if self.recording is not None:
+            self.recording.resize(cols, rows)
 
-    def _request_return_to_interface(self):
-        if self.back_requested:
-            self.back_requested.emit()
+    def send_signal(self, sig):
+        if self.process is not None:
+            self.process.send_signal(sig)
+
+    def restart(self):
+        self.display.reset()
+        if self.process is None:
+            self.ensure_started()
+        else:
+            self.process.restart()
+
+    def shutdown(self):
+        if self.process is not None:
+            self.process.close()
+            self.process.deleteLater()
+            self.process = None
+        if self.recording is not None:
+            self.recording.close()
+
+    def set_recording(self, enabled):
+        if enabled and self.recording is None:
+            self.recording = TerminalRecording(TERMINAL_SESSION_DIR / self.session_id)
+            if self.process is not None:
+                self.recording.open(self.display.screen.cols, self.display.screen.rows, self.title, self.shell_path)
+        elif not enabled and self.recording is not None:
+            self.recording.close()
+            self.recording = None
+
+    def _on_output(self, text):
+        self.display.feed(text)
+        if self.recording is not None:
+            self.recording.write(text)
+            if self._index_worker is None:
+                self._schedule_recording_work()
+        responses = self.display.take_responses()
+        if responses:
+            self.write(responses)
+        cwd = self.display.screen.cwd
+        if cwd and cwd != self.cwd:
+            self.cwd = cwd
+            self.cwd_changed.emit(cwd)
+
+    def _schedule_recording_work(self):
+        # One background job per recording at a time: indexing and index saves share the trigram map,
+        # and rotation may only move files while neither is running.
+        recording = self.recording
+        if recording is None or self._index_worker is not None:
+            return
+        if recording.over_limit():
+            segment = recording.rotate()
+            if segment is not None:
+                self._start_recording_worker(segment.seal)
+            return
+        if self._checkpoint_due:
+            self._checkpoint_due = False
+            state = recording.index_state()
+            if state is not None:
+                self._start_recording_worker(recording.save_index, state)
+                return
+        if recording.needs_indexing() and time.monotonic() >= self._index_retry_at:
+            self._start_recording_worker(recording.index_pending)
+
+    def _start_recording_worker(self, fn, *args):
+        worker = Worker(fn, *args)
+        worker.signals.result.connect(self._on_recording_work_done, QtCore.Qt.QueuedConnection)
+        worker.signals.error.connect(self._on_recording_work_failed, QtCore.Qt.QueuedConnection)
+        self._index_worker = worker
+        QtCore.QThreadPool.globalInstance().start(worker)
+
+    def _on_recording_work_done(self, _result):
+        self._index_worker = None
+        self._schedule_recording_work()
+
+    def _on_recording_work_failed(self, _message):
+        self._index_worker = None
+        self._index_retry_at = time.monotonic() + 60
+
+    def checkpoint(self):
+        """Flush the recording and save its index off the UI thread; a crash loses at most what came after."""
+        if self.recording is not None:
+            self._checkpoint_due = True
+            self._schedule_recording_work()
+
+    def _on_terminated(self, code):
+        # Drop the dead process; the next keystroke spawns a fresh shell in the last known cwd.
+        if self.process is not None:
+            self.process.deleteLater()
+            self.process = None
+        self.terminated.emit(code)
+
+    # -- scrollback persistence -----------------------------------------------------------------
+
+    def touch(self):
+        self.last_active = time.monotonic()
+        if self._spilled and self._spill_worker is None and self._load_worker is None:
+            worker = Worker(self._read_spilled, self._kept)
+            worker.signals.result.connect(self._on_spill_loaded, QtCore.Qt.QueuedConnection)
+            worker.signals.error.connect(self._on_spill_load_failed, QtCore.Qt.QueuedConnection)
+            self._load_worker = worker
+            QtCore.QThreadPool.globalInstance().start(worker)
+
+    def history(self):
+        """Full scrollback as exported rows: spilled rows on disk followed by what is still in memory."""
+        rows = self._load_rows()[: -self._kept or None] if self._spilled else []
+        return (rows + self.display.screen.export_scrollback())[-TERMINAL_SCROLLBACK_LINES:]
+
+    def _header(self):
+        return {"session": self.session_id, "saved": now_str(), "cwd": self.display.screen.cwd or self.cwd}
+
+    def save(self):
+        with self._spill_lock:
+            self._spill_generation += 1
+            self._apply_spill()
+            rows = self.history()
+            self._write_rows(self._header(), rows)
+        return len(rows)
+
+    def _write_rows(self, header, rows):
+        path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as fh:
+                fh.write((json.dumps(header) + "\n").encode("utf-8"))
+                for row in rows:
+                    fh.write((json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8"))
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def spill(self, keep=TERMINAL_IDLE_SCROLLBACK_LINES):
+        """Write the scrollback to disk on a worker, then keep only the newest `keep` rows in memory."""
+        scrollback = self.display.screen.scrollback
+        if len(scrollback) <= keep or self._spill_worker is not None or self._load_worker is not None:
+            return False
+        # Entries are immutable tuples, so a shallow copy is a consistent snapshot for the worker.
+        snapshot = list(scrollback)
+        worker = Worker(self._write_spill, snapshot, keep, time.monotonic(), self._spilled, self._kept, self._header(), self._spill_generation)
+        worker.signals.result.connect(self._on_spilled, QtCore.Qt.QueuedConnection)
+        worker.signals.error.connect(self._on_spill_failed, QtCore.Qt.QueuedConnection)
+        self._spill_worker = worker
+        QtCore.QThreadPool.globalInstance().start(worker)
+        return True
+
+    def _write_spill(self, snapshot, keep, started, spilled, kept, header, generation):
+        rows = self._load_rows()[: -kept or None] if spilled else []
+        rows = (rows + TerminalScreen.export_rows(snapshot))[-TERMINAL_SCROLLBACK_LINES:]
+        with self._spill_lock:
+            if generation == self._spill_generation:
+                self._write_rows(header, rows)
+                self._spill_written = (snapshot, keep, started)
+
+    def _on_spilled(self, _result):
+        self._spill_worker = None
+        with self._spill_lock:
+            started = self._apply_spill()
+        if started is not None and self.last_active > started:
+            self.touch()
+
+    def _apply_spill(self):
+        """Trim memory to match a landed spill write; caller holds _spill_lock. Returns when that spill started."""
+        if self._spill_written is None:
+            return None
+        snapshot, keep, started = self._spill_written
+        self._spill_written = None
+        # Output may have arrived meanwhile: drop only the written rows the ring still holds, count the rest as kept.
+        scrollback = self.display.screen.scrollback
+        cut = len(snapshot) - keep
+        dropped = {id(entry) for entry in snapshot[:cut]}
+        while scrollback and id(scrollback[0]) in dropped:
+            scrollback.popleft()
+        retained = {id(entry) for entry in snapshot[cut:]}
+        kept = 0
+        for entry in scrollback:
+            if id(entry) not in retained:
+                break
+            kept += 1
+        self._spilled = True
+        self._kept = kept
+        self.display.scrollback_trimmed()
+        return started
+
+    def _on_spill_failed(self, _message):
+        self._spill_worker = None
+
+    def mark_restored(self, saved_at):
+        self._spilled = True
+        self._kept = 0
+        self._restored_at = saved_at or "earlier"
+
+    def _read_spilled(self, kept):
+        rows = self._load_rows()
+        if kept:
+            rows = rows[:-kept]
+        return TerminalScreen.decode_rows(rows[-TERMINAL_SCROLLBACK_LINES:])
+
+    def _on_spill_loaded(self, entries):
+        self._load_worker = None
+        if not self._spilled:
+            return
+        self._spilled = False
+        self._kept = 0
+        self.display.screen.prepend_scrollback(entries)
+        if self._restored_at:
+            self.display.feed(f"\x1b[2m── session restored from {self._restored_at} ──\x1b[0m\r\n")
+            self._restored_at = None
+        self.display.scrollback_trimmed()
+
+    def _on_spill_load_failed(self, _message):
+        # Stay spilled; the next touch() tries again.
+        self._load_worker = None
+
+    def _load_rows(self):
+        rows = []
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as fh:
+                next(fh, None)
+                for line in fh:
+                    row = json.loads(line)
+                    if isinstance(row, list) and len(row) == 2:
+                        rows.append(row)
+        except (OSError, EOFError, ValueError):
+            pass
+        return rows
+
+    @staticmethod
+    def read_header(path):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                return json.loads(fh.readline() or "{}")
+        except (OSError, EOFError, ValueError):
+            return {}
+
+    def discard(self):
+        with self._spill_lock:
+            self._spill_generation += 1
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+        if self.recording is not None:
+            self.recording.discard()
+
+
+class TerminalReplay(QtCore.QObject):
+    """Streams a recording's output events into a display at `speed`x, capping long idle gaps."""
+
+    finished = QtCore.pyqtSignal()
+
+    def __init__(self, recording, display, speed=1.0, offset=0, parent=None):
+        super().__init__(parent)
+        self.display = display
+        self.speed = max(0.01, speed)
+        self._events = recording.events(offset)
+        self._next = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._step)
+
+    def start(self):
+        self._next = next(self._events, None)
+        self._step()
+
+    def stop(self):
+        self._timer.stop()
+        self._events.close()
+        self._next = None
+
+    def _step(self):
+        chunks = []
+        while self._next is not None:
+            at, kind, data = self._next
+            if kind == "o":
+                chunks.append(data)
+            self._next = next(self._events, None)
+            if self._next is None:
+                break
+            gap = min(TERMINAL_REPLAY_MAX_IDLE, max(0.0, self._next[0] - at) / self.speed)
+            if gap >= 0.01 or len(chunks) >= 256:
+                self.display.feed("".join(chunks))
+                self._timer.start(int(gap * 1000))
+                return
+        if chunks:
+            self.display.feed("".join(chunks))
+        self.finished.emit()
+
+
+class TerminalHistoryDialog(QtWidgets.QDialog):
+    """Regex search over a session recording, with context preview and paced replay."""
+
+    def __init__(self, session, parent=None):
+        super().__init__(parent)
+        self.session = session
+        self.recording = session.recording
+        self.replay = None
+        self._results = []
+        self._search_started = 0.0
+        self.setWindowTitle(f"Terminal History — {session.title}")
+        self.resize(980, 720)
+        layout = QtWidgets.QVBoxLayout(self)
+        search_row = QtWidgets.QHBoxLayout()
+        self.pattern_edit = QtWidgets.QLineEdit()
+        self.pattern_edit.setPlaceholderText("Regex (case-insensitive)")
+        self.search_btn = QtWidgets.QPushButton("Search")
+        search_row.addWidget(self.pattern_edit, 1)
+        search_row.addWidget(self.search_btn)
+        layout.addLayout(search_row)
+        self.status_label = QtWidgets.QLabel("")
+        layout.addWidget(self.status_label)
+        splitter = QtWidgets.QSplitter(QtCore.Qt.Vertical)
+        self.results_list = QtWidgets.QListWidget()
+        self.context_view = QtWidgets.QPlainTextEdit()
+        self.context_view.setReadOnly(True)
+        self.context_view.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        self.context_view.setFont(session.display.font())
+        self.replay_display = PhotonTerminalDisplay(lambda _payload: None, sound_engine=session.display.sound_engine)
+        self.replay_display.setStyleSheet("background-color:#050a13; border-radius:6px; padding:8px;")
+        for widget in (self.results_list, self.context_view, self.replay_display):
+            splitter.addWidget(widget)
+        layout.addWidget(splitter, 1)
+        replay_row = QtWidgets.QHBoxLayout()
+        self.speed_spin = QtWidgets.QDoubleSpinBox()
+        self.speed_spin.setRange(0.25, 100.0)
+        self.speed_spin.setValue(1.0)
+        self.speed_spin.setSuffix("×")
+        self.replay_start_btn = QtWidgets.QPushButton("Replay from start")
+        self.replay_match_btn = QtWidgets.QPushButton("Replay from match")
+        self.replay_stop_btn = QtWidgets.QPushButton("Stop")
+        replay_row.addWidget(QtWidgets.QLabel("Replay speed"))
+        replay_row.addWidget(self.speed_spin)
+        replay_row.addStretch(1)
+        replay_row.addWidget(self.replay_start_btn)
+        replay_row.addWidget(self.replay_match_btn)
+        replay_row.addWidget(self.replay_stop_btn)
+        layout.addLayout(replay_row)
+        self.search_btn.clicked.connect(self.run_search)
+        self.pattern_edit.returnPressed.connect(self.run_search)
+        self.results_list.currentRowChanged.connect(self._show_context)
+        self.results_list.itemDoubleClicked.connect(lambda _item: self.replay_from_match())
+        self.speed_spin.valueChanged.connect(self._on_speed_changed)
+        self.replay_start_btn.clicked.connect(lambda: self.start_replay(0))
+        self.replay_match_btn.clicked.connect(self.replay_from_match)
+        self.replay_stop_btn.clicked.connect(self.stop_replay)
+        self.replay_match_btn.setEnabled(False)
+        lines, size = self.recording.retained() if self.recording else (0, 0)
+        self.status_label.setText(f"{lines:,} recorded lines · {format_bytes(size)}")
+
+    def run_search(self):
+        pattern = self.pattern_edit.text()
+        if not pattern or self.recording is None:
+            return
+        try:
+            re.compile(pattern)
+        except re.error as exc:
+            self.status_label.setText(f"Invalid pattern: {exc}")
+            return
+        self.recording.flush()
+        self.search_btn.setEnabled(False)
+        self.status_label.setText("Searching…")
+        self._search_started = time.perf_counter()
+        worker = Worker(self.recording.search, pattern)
+        worker.signals.result.connect(self._on_search_result, QtCore.Qt.QueuedConnection)
+        worker.signals.error.connect(self._on_search_error, QtCore.Qt.QueuedConnection)
+        self._search_worker = worker
+        QtCore.QThreadPool.globalInstance().start(worker)
+
+    def _on_search_result(self, found):
+        self.search_btn.setEnabled(True)
+        elapsed_ms = (time.perf_counter() - self._search_started) * 1000
+        self._results = found["results"]
+        self.results_list.clear()
+        for result in self._results:
+            self.results_list.addItem(f"{result['line'] + 1:>9}  {result['text'][:240]}")
+        more = "+" if found["truncated"] else ""
+        self.status_label.setText(
+            f"{len(self._results)}{more} matching lines · read {found['blocks_read']}/{found['blocks']} blocks in {elapsed_ms:.0f} ms"
+        )
+        if self._results:
+            self.results_list.setCurrentRow(0)
+
+    def _on_search_error(self, message):
+        self.search_btn.setEnabled(True)
+        self.status_label.setText(f"Search failed: {message}")
+
+    def _show_context(self, row):
+        self.replay_match_btn.setEnabled(0 <= row < len(self._results))
+        if not 0 <= row < len(self._results):
+            return
+        result = self._results[row]
+        try:
+            first, lines = self.recording.context(result["line"])
+        except OSError as exc:
+            self.context_view.setPlainText(f"Unable to read transcript: {exc}")
+            return
+        marked = [f"{'▶' if first + i == result['line'] else ' '} {first + i + 1:>9}  {text}" for i, text in enumerate(lines)]
+        self.context_view.setPlainText("\n".join(marked))
+        block = self.context_view.document().findBlockByNumber(max(0, result["line"] - first))
+        cursor = QtGui.QTextCursor(block)
+        self.context_view.setTextCursor(cursor)
+        self.context_view.centerCursor()
+
+    def replay_from_match(self):
+        row = self.results_list.currentRow()
+        if 0 <= row < len(self._results):
+            self.start_replay(self._results[row]["cast_offset"])
+
+    def start_replay(self, offset):
+        if self.recording is None:
+            return
+        self.stop_replay()
+        self.recording.flush()
+        self.replay_display.reset()
+        self.replay_display.screen.scrollback.clear()
+        self.replay = TerminalReplay(self.recording, self.replay_display, speed=self.speed_spin.value(), offset=offset, parent=self)
+        self.replay.finished.connect(lambda: self.status_label.setText("Replay finished"))
+        self.replay.start()
+
+    def stop_replay(self):
+        if self.replay is not None:
+            self.replay.stop()
+            self.replay.deleteLater()
+            self.replay = None
+
+    def _on_speed_changed(self, value):
+        if self.replay is not None:
+            self.replay.speed = max(0.01, value)
+
+    def done(self, result):
+        self.stop_replay()
+        super().done(result)
+
+
+class PhotonTerminalWidget(QtWidgets.QWidget):
+    back_requested = QtCore.pyqtSignal()
+
+    def __init__(self, sound_engine, accent_primary, accent_glow, parent=None, base_env=None):
+        super().__init__(parent)
+        self.sound_engine = sound_engine
+        self.accent_primary = accent_primary
+        self.accent_glow = accent_glow
+        self.animation_enabled = True
+        self.auto_scroll = True
+        self.cwd_label = None
+        self.base_env = base_env or os.environ.copy()
+        self.shell_path = resolve_user_shell()
+        self.sessions: dict[str, TerminalSession] = {}
+        self._active_session_id = None
+        self._build_ui()
+        self.index_store = JsonFileStore(TERMINAL_SESSION_DIR / "sessions.json", self._session_index, parent=self)
+        self._restore_sessions()
+        self._idle_timer = QtCore.QTimer(self)
+        self._idle_timer.setInterval(60_000)
+        self._idle_timer.timeout.connect(self._trim_idle_sessions)
+        self._idle_timer.start()
+
+    def _build_ui(self):
+        layout = self._register_layout(QtWidgets.QVBoxLayout(self))
+        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setSpacing(8)
+        control_bar = QtWidgets.QWidget()
+        control_layout = QtWidgets.QHBoxLayout(control_bar)
+        control_layout.setContentsMargins(0, 0, 0, 0)
+        control_layout.setSpacing(8)
+        self.singularity_btn = QtWidgets.QPushButton("≪ ⟬ SINGULARITY ⟭")
+        self.singularity_btn.setCursor(QtGui.QCursor(QtCore.Qt.PointingHandCursor))
+        self.singularity_btn.setToolTip("Return to the Singularity interface")
+        self.singularity_btn.clicked.connect(self._request_return_to_interface)
+        control_layout.addWidget(self.singularity_btn)
+        control_layout.addStretch(1)
+        right_controls = QtWidgets.QWidget()
+        right_layout = QtWidgets.QHBoxLayout(right_controls)
+        right_layout.setContentsMargins(0, 0, 0, 0)
+        right_layout.setSpacing(4)
+        self.new_tab_btn = QtWidgets.QPushButton("New Tab")
+        self.split_btn = QtWidgets.QPushButton("Split")
+        self.clear_btn = QtWidgets.QPushButton("Clear")
+        self.sigint_btn = QtWidgets.QPushButton("SIGINT")
+        self.reset_btn = QtWidgets.QPushButton("Reset")
+        for btn in (self.new_tab_btn, self.split_btn, self.clear_btn, self.sigint_btn, self.reset_btn):
+            btn.setCursor(QtGui.QCursor(QtCore.Qt.PointingHandCursor))
+        self.split_btn.setToolTip("Open another shell beside the current one")
+        self.scroll_lock_checkbox = QtWidgets.QCheckBox("Scroll Lock")
+        self.scroll_lock_checkbox.setStyleSheet("color:#9ce4ff;")
+        self.scroll_lock_checkbox.setChecked(False)
+        self.record_checkbox = QtWidgets.QCheckBox("Rec")
+        self.record_checkbox.setStyleSheet("color:#9ce4ff;")
+        self.record_checkbox.setToolTip("Record this session's output to an indexed, replayable log")
+        right_layout.addWidget(self.new_tab_btn)
+        right_layout.addWidget(self.split_btn)
+        right_layout.addWidget(self.clear_btn)
+        right_layout.addWidget(self.sigint_btn)
+        right_layout.addWidget(self.reset_btn)
+        right_layout.addWidget(self.scroll_lock_checkbox)
+        right_layout.addWidget(self.record_checkbox)
+        control_layout.addWidget(right_controls)
+        layout.addWidget(control_bar)
+        self.cwd_label = QtWidgets.QLabel("Working directory: …")
+        self.cwd_label.setStyleSheet("color:#9ce4ff; font-size:11px;")
+        layout.addWidget(self.cwd_label)
+        self.session_tabs = QtWidgets.QTabWidget()
+        self.session_tabs.setTabsClosable(True)
+        self.session_tabs.setMovable(True)
+        self.session_tabs.setDocumentMode(True)
+        self.session_tabs.tabCloseRequested.connect(self.close_tab)
+        self.session_tabs.currentChanged.connect(self._on_session_tab_changed)
+        self.session_tabs.tabBar().tabMoved.connect(lambda *_: self.index_store.mark_dirty())
+        layout.addWidget(self.session_tabs, 1)
+        find_row = QtWidgets.QHBoxLayout()
+        find_row.setContentsMargins(0, 0, 0, 0)
+        find_row.setSpacing(4)
+        self.find_edit = QtWidgets.QLineEdit()
+        self.find_edit.setPlaceholderText("Find in scrollback (regex)")
+        self.find_prev_btn = QtWidgets.QPushButton("▲")
+        self.find_next_btn = QtWidgets.QPushButton("▼")
+        self.history_btn = QtWidgets.QPushButton("History…")
+        self.history_btn.setToolTip("Search and replay the full session recording")
+        for btn in (self.find_prev_btn, self.find_next_btn, self.history_btn):
+            btn.setCursor(QtGui.QCursor(QtCore.Qt.PointingHandCursor))
+        find_row.addWidget(self.find_edit, 1)
+        find_row.addWidget(self.find_prev_btn)
+        find_row.addWidget(self.find_next_btn)
+        find_row.addWidget(self.history_btn)
+        layout.addLayout(find_row)
+        self.status_label = QtWidgets.QLabel("PHØTØN terminal ready")
+        self.status_label.setStyleSheet("color:#b3f2ff; font-size:11px;")
+        layout.addWidget(self.status_label)
+        self.overlay = TerminalDoorOverlay(self, self.accent_primary, self.accent_glow)
+        self.new_tab_btn.clicked.connect(lambda: self.new_tab(focus=True))
+        self.split_btn.clicked.connect(self.split_current)
+        self.clear_btn.clicked.connect(self._clear_display)
+        self.sigint_btn.clicked.connect(lambda: self._send_signal(signal.SIGINT))
+        self.reset_btn.clicked.connect(self._reset_terminal)
+        self.scroll_lock_checkbox.stateChanged.connect(self._on_scroll_lock_changed)
+        self.record_checkbox.toggled.connect(self._on_record_toggled)
+        self.find_edit.returnPressed.connect(lambda: self._find(backwards=False))
+        self.find_prev_btn.clicked.connect(lambda: self._find(backwards=True))
+        self.find_next_btn.clicked.connect(lambda: self._find(backwards=False))
+        self.history_btn.clicked.connect(self.open_history)
+        find_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+F"), self)
+        find_shortcut.activated.connect(lambda: (self.find_edit.setFocus(), self.find_edit.selectAll()))
+
+    def _register_layout(self, layout):
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(6)
+        return layout
+
+    # -- sessions -------------------------------------------------------------------------------
+
+    @property
+    def display(self):
+        session = self.current_session()
+        return session.display if session else None
+
+    def current_session(self):
+        splitter = self.session_tabs.currentWidget()
+        if splitter is None:
+            return None
+        sessions = self._tab_sessions(splitter)
+        for session in sessions:
+            if session.session_id == self._active_session_id:
+                return session
+        return sessions[0] if sessions else None
+
+    def _tab_sessions(self, splitter):
+        ids = [splitter.widget(i).property("session_id") for i in range(splitter.count())]
+        return [self.sessions[sid] for sid in ids if sid in self.sessions]
+
+    def _create_session(self, project=None, cwd=None, title=None, session_id=None, record=TERMINAL_RECORD_SESSIONS):
+        session = TerminalSession(
+            session_id or uuid.uuid4().hex[:12],
+            self.sound_engine,
+            self.shell_path,
+            self.base_env,
+            cwd or os.getcwd(),
+            project=project,
+            title=title,
+            record=record,
+            parent=self,
+        )
+        session.display.setProperty("session_id", session.session_id)
+        session.display.follow_output = self.auto_scroll
+        session.display.focused.connect(partial(self._on_session_focused, session.session_id))
+        session.cwd_changed.connect(partial(self._on_session_cwd_changed, session.session_id))
+        session.terminated.connect(partial(self._on_session_terminated, session.session_id))
+        self.sessions[session.session_id] = session
+        return session
+
+    def new_tab(self, project=None, cwd=None, title=None, focus=False):
+        session = self._create_session(project=project, cwd=cwd, title=title)
+        splitter = QtWidgets.QSplitter(QtCore.Qt.Horizontal)
+        splitter.setChildrenCollapsible(False)
+        splitter.addWidget(session.display)
+        index = self.session_tabs.addTab(splitter, session.title)
+        self._active_session_id = session.session_id
+        self.session_tabs.setCurrentIndex(index)
+        self._refresh_tab_title(splitter)
+        self.index_store.mark_dirty()
+        if self.isVisible():
+            session.ensure_started()
+        if focus:
+            session.display.setFocus()
+        return session
+
+    def split_current(self):
+        current = self.current_session()
+        splitter = self.session_tabs.currentWidget()
+        if current is None or splitter is None:
+            return self.new_tab(focus=True)
+        session = self._create_session(project=current.project, cwd=current.display.screen.cwd or current.cwd)
+        splitter.addWidget(session.display)
+        sizes = [1] * splitter.count()
+        splitter.setSizes(sizes)
+        self._active_session_id = session.session_id
+        self._refresh_tab_title(splitter)
+        self.index_store.mark_dirty()
+        session.ensure_started()
+        session.display.setFocus()
+        return session
+
+    def open_project_session(self, project, path):
+        """Switch to the project's shell, creating it (started in the project directory) on first use."""
+        for index in range(self.session_tabs.count()):
+            for session in self._tab_sessions(self.session_tabs.widget(index)):
+                if session.project == project:
+                    self._active_session_id = session.session_id
+                    self.session_tabs.setCurrentIndex(index)
+                    return session
+        return self.new_tab(project=project, cwd=path)
+
+    def close_tab(self, index):
+        splitter = self.session_tabs.widget(index)
+        if splitter is None:
+            return
+        for session in self._tab_sessions(splitter):
+            self._close_session(session)
+        self.session_tabs.removeTab(index)
+        splitter.deleteLater()
+        if not self.session_tabs.count():
+            self.new_tab(focus=True)
+        self.index_store.mark_dirty()
+
+    def _close_session(self, session):
+        self.sessions.pop(session.session_id, None)
+        session.shutdown()
+        session.discard()
+        session.display.setParent(None)
+        session.display.deleteLater()
+        session.deleteLater()
+
+    def _refresh_tab_title(self, splitter):
+        index = self.session_tabs.indexOf(splitter)
+        sessions = self._tab_sessions(splitter)
+        if index < 0 or not sessions:
+            return
+        self.session_tabs.setTabText(index, " | ".join(s.title for s in sessions))
+        self.session_tabs.setTabToolTip(index, "\n".join(s.display.screen.cwd or s.cwd for s in sessions))
+
+    def _splitter_for(self, session_id):
+        for index in range(self.session_tabs.count()):
+            splitter = self.session_tabs.widget(index)
+            if any(s.session_id == session_id for s in self._tab_sessions(splitter)):
+                return splitter
+        return None
+
+    def _on_session_tab_changed(self, index):
+        splitter = self.session_tabs.widget(index)
+        if splitter is None:
+            return
+        sessions = self._tab_sessions(splitter)
+        for session in sessions:
+            session.touch()
+            if self.isVisible():
+                session.ensure_started()
+        current = self.current_session()
+        if current:
+            self._active_session_id = current.session_id
+            self.cwd_label.setText(f"Working directory: {current.display.screen.cwd or current.cwd}")
+            self._sync_record_checkbox(current)
+        self.index_store.mark_dirty()
+
+    def _on_session_focused(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            return
+        self._active_session_id = session_id
+        session.touch()
+        self.cwd_label.setText(f"Working directory: {session.display.screen.cwd or session.cwd}")
+        self._sync_record_checkbox(session)
+
+    def _on_session_cwd_changed(self, session_id, cwd):
+        if session_id == self._active_session_id:
+            self.cwd_label.setText(f"Working directory: {cwd}")
+        splitter = self._splitter_for(session_id)
+        if splitter is not None:
+            self._refresh_tab_title(splitter)
+        self.index_store.mark_dirty()
+
+    def _on_session_terminated(self, session_id, code):
+        session = self.sessions.get(session_id)
+        splitter = self._splitter_for(session_id)
+        if session is None or splitter is None:
+            return
+        if splitter.count() > 1:
+            # `exit` in a split closes that pane; a lone shell stays so its output can still be read.
+            self._close_session(session)
+            if self._active_session_id == session_id:
+                self._active_session_id = None
+            self._refresh_tab_title(splitter)
+            self.index_store.mark_dirty()
+            return
+        self.status_label.setText(f"PHØTØN shell terminated (exit {code}). Type to start a new shell.")
+
+    def _session_index(self):
+        tabs = []
+        for index in range(self.session_tabs.count()):
+            specs = [session.spec() for session in self._tab_sessions(self.session_tabs.widget(index))]
+            if specs:
+                tabs.append(specs)
+        return {"version": 1, "current": self.session_tabs.currentIndex(), "tabs": tabs}
+
+    def _restore_sessions(self):
+        try:
+            with open(TERMINAL_SESSION_DIR / "sessions.json", "r", encoding="utf-8") as fh:
+                index = json.load(fh)
+            loaded = isinstance(index, dict)
+        except (OSError, ValueError):
+            loaded = False
+        if not loaded:
+            index = {}
+        known = set()
+        blocker = QtCore.QSignalBlocker(self.session_tabs)
+        for specs in index.get("tabs") or []:
+            splitter = None
+            for spec in specs if isinstance(specs, list) else []:
+                if not isinstance(spec, dict) or not spec.get("id"):
+                    continue
+                session = self._create_session(
+                    project=spec.get("project"),
+                    cwd=spec.get("cwd"),
+                    title=spec.get("title"),
+                    session_id=str(spec["id"]),
+                    record=bool(spec.get("record", TERMINAL_RECORD_SESSIONS)),
+                )
+                known.add(session.session_id)
+                if session.path.exists():
+                    session.mark_restored(TerminalSession.read_header(session.path).get("saved"))
+                if splitter is None:
+                    splitter = QtWidgets.QSplitter(QtCore.Qt.Horizontal)
+                    splitter.setChildrenCollapsible(False)
+                    self.session_tabs.addTab(splitter, session.title)
+                splitter.addWidget(session.display)
+            if splitter is not None:
+                self._refresh_tab_title(splitter)
+        del blocker
+        # Without a readable index nothing is known to be stale; keep the files rather than wipe every session.
+        for stale in TERMINAL_SESSION_DIR.iterdir() if loaded and TERMINAL_SESSION_DIR.exists() else []:
+            if stale.name != "sessions.json" and stale.name.split(".", 1)[0] not in known:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+        if not self.session_tabs.count():
+            self.new_tab(title="shell")
+            return
+        current = index.get("current", 0)
+        if isinstance(current, int) and 0 <= current < self.session_tabs.count():
+            self.session_tabs.setCurrentIndex(current)
+        self._on_session_tab_changed(self.session_tabs.currentIndex())
+
+    def _trim_idle_sessions(self):
+        visible = {s.session_id for s in self._tab_sessions(self.session_tabs.currentWidget())} if self.session_tabs.count() else set()
+        cutoff = time.monotonic() - TERMINAL_IDLE_SECS
+        for session in list(self.sessions.values()):
+            try:
+                session.checkpoint()
+            except Exception:
+                pass
+            if session.session_id in visible or session.last_active > cutoff:
+                continue
+            try:
+                session.spill()
+            except Exception:
+                pass
+
+    def save_sessions(self):
+        for session in list(self.sessions.values()):
+            try:
+                session.save()
+            except Exception:
+                pass
+        self.index_store.mark_dirty()
+        self.index_store.flush(sync=True)
+
+    # -- controls -------------------------------------------------------------------------------
+
+    def focus_terminal(self):
+        session = self.current_session()
+        if session:
+            session.ensure_started()
+            session.display.setFocus()
+
+    def _request_return_to_interface(self):
+        if self.back_requested:
+            self.back_requested.emit()
 
     def tab_activated(self):
         if not self.animation_enabled:
@@ -731,70 +3494,91 @@ class PhotonTerminalWidget(QtWidgets.QWidget):
         self.overlay.set_accent(primary, glow)
 
     def _send_input(self, payload):
-        if not payload:
-            return
-        if isinstance(payload, bytes):
-            data = payload
-        else:
-            data = payload.encode("utf-8")
-        self.terminal_process.write(data)
+        session = self.current_session()
+        if session:
+            session.write(payload)
 
     def _on_scroll_lock_changed(self, state):
         self.auto_scroll = state != QtCore.Qt.Checked
+        for session in self.sessions.values():
+            session.display.follow_output = self.auto_scroll
 
     def _clear_display(self):
-        self.display.clear()
+        session = self.current_session()
+        if session:
+            session.display.clear()
         self.status_label.setText("Terminal buffer cleared")
 
     def _reset_terminal(self):
-        self.status_label.setText("Resetting PHØTØN shell…")
-        self.terminal_process.restart()
+        session = self.current_session()
+        if session:
+            self.status_label.setText("Resetting PHØTØN shell…")
+            session.restart()
 
     def _send_signal(self, sig):
-        self.terminal_process.send_signal(sig)
-
-    def _on_process_output(self, chunk):
-        text = chunk.decode("utf-8", errors="ignore")
-        cleaned = self._strip_ansi(text)
-        cleaned, cwd = self._extract_cwd(cleaned)
-        if cwd:
-            self.cwd_label.setText(f"Working directory: {cwd}")
-        cursor = self.display.textCursor()
-        cursor.movePosition(QtGui.QTextCursor.End)
-        cursor.insertText(cleaned)
-        if self.auto_scroll:
-            self.display.ensureCursorVisible()
-
-    def _extract_cwd(self, text):
-        marker = "__PHOTON_CWD__"
-        if marker not in text:
-            return text, None
-        pieces = text.split(marker)
-        rebuilt = [pieces[0]]
-        cwd = None
-        for fragment in pieces[1:]:
-            if "__" in fragment:
-                candidate, rest = fragment.split("__", 1)
-                cwd = candidate
-                rebuilt.append(rest)
-            else:
-                rebuilt.append(marker + fragment)
-        return "".join(rebuilt), cwd
-
-    def _strip_ansi(self, text: str) -> str:
-        ansi_escape = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
-        osc = re.compile(r"\x1B\].*?(?:\x07|\x1b\\)")
-        text = ansi_escape.sub("", text)
-        text = osc.sub("", text)
-        text = text.replace("\r", "")
-        return text
+        session = self.current_session()
+        if session:
+            session.send_signal(sig)
+
+    def _sync_record_checkbox(self, session):
+        blocker = QtCore.QSignalBlocker(self.record_checkbox)
+        self.record_checkbox.setChecked(session.recording is not None)
+        del blocker
+        self.history_btn.setEnabled(session.recording is not None)
+
+    def _on_record_toggled(self, enabled):
+        session = self.current_session()
+        if session is None:
+            return
+        session.set_recording(enabled)
+        self.history_btn.setEnabled(enabled)
+        self.index_store.mark_dirty()
+        self.status_label.setText("Recording session output" if enabled else "Session recording stopped")
+
+    def _find(self, backwards=False):
+        session = self.current_session()
+        pattern = self.find_edit.text()
+        if session is None or not pattern:
+            return
+        try:
+            found = session.display.find(pattern, backwards=backwards)
+        except re.error as exc:
+            self.status_label.setText(f"Invalid pattern: {exc}")
+            return
+        if found:
+            self.status_label.setText("")
+        elif session.recording is not None:
+            self.status_label.setText("No match in scrollback — try History… to search the full recording")
+        else:
+            self.status_label.setText("No match in scrollback")
 
-    def _on_process_terminated(self, code):
-        self.status_label.setText(f"PHØTØN shell terminated (exit {code}).")
+    def open_history(self):
+        session = self.current_session()
+        if session is None or session.recording is None:
+            return
+        dialog = TerminalHistoryDialog(session, self)
+        dialog.setAttribute(QtCore.Qt.WA_DeleteOnClose, True)
+        if self.find_edit.text():
+            dialog.pattern_edit.setText(self.find_edit.text())
+            dialog.run_search()
+        dialog.show()
 
     def shutdown(self):
-        if hasattr(self, "terminal_process"):
-            self.terminal_process.close()
+        self._idle_timer.stop()
+        try:
+            self.save_sessions()
+        except Exception:
+            pass
+        for session in list(self.sessions.values()):
+            session.shutdown()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Shells are spawned lazily: the visible tab starts when the terminal is first shown.
+        splitter = self.session_tabs.currentWidget()
+        if splitter is not None:
+            for session in self._tab_sessions(splitter):
+                session.ensure_started()
 
     def focusInEvent(self, event):
         super().focusInEvent(event)
@@ -843,18 +3627,1516 @@ def now_str():
     return datetime.now().replace(microsecond=0).isoformat()
 
 
+def file_stat_key(path):
+    """(mtime_ns, size) of ``path``, or None when it can't be stat'ed; cheap change detection for cached files."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def atomic_write_text(path, text, mode=0o600):
+    """Write via temp file + fsync + os.replace so readers never see a torn file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    try:
+        dir_fd = os.open(str(path.parent), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+
+def read_json_file(path, default=None):
+    """Load JSON, falling back to the newest readable .bak.N copy if the main file is missing or corrupt."""
+    path = Path(path)
+    for candidate in [path] + [path.with_name(f"{path.name}.bak.{i}") for i in range(1, PERSIST_BACKUPS + 1)]:
+        try:
+            with open(candidate, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            continue
+    return {} if default is None else default
+
+
+def next_occurrence(rule, interval, base):
+    """Next date after ``base`` for a recurrence rule; monthly keeps day ``interval`` (or base.day), clamped to month end."""
+    if rule == "daily":
+        return base + timedelta(days=1)
+    if rule == "weekdays":
+        step = {4: 3, 5: 2}.get(base.weekday(), 1)
+        return base + timedelta(days=step)
+    if rule == "weekly":
+        return base + timedelta(days=7)
+    if rule == "monthly":
+        anchor = interval if interval and 1 <= int(interval) <= 31 else base.day
+        year, month = (base.year + 1, 1) if base.month == 12 else (base.year, base.month + 1)
+        return date(year, month, min(int(anchor), calendar.monthrange(year, month)[1]))
+    if rule == "custom":
+        return base + timedelta(days=max(1, int(interval or 0)))
+    return None
+
+
+def format_bytes(size):
+    size = float(size or 0)
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{int(size)} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def index_project_tree(path):
+    """Walk a project once: total size, file count, per-language (files, bytes), newest mtime and the dirs seen."""
+    stats = {"size_bytes": 0, "file_count": 0, "newest_mtime": 0.0, "languages": {}, "dirs": [path]}
+    languages = stats["languages"]
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in PROJECT_INDEX_SKIP_DIRS:
+                        continue
+                    stack.append(entry.path)
+                    stats["dirs"].append(entry.path)
+                    # Directory mtimes capture deletions and renames, which leave no newer file behind.
+                    stats["newest_mtime"] = max(stats["newest_mtime"], entry.stat(follow_symlinks=False).st_mtime)
+                    continue
+                if not entry.is_file(follow_symlinks=False) or entry.name == PROJECT_MANIFEST:
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            stats["size_bytes"] += st.st_size
+            stats["file_count"] += 1
+            stats["newest_mtime"] = max(stats["newest_mtime"], st.st_mtime)
+            language = LANGUAGE_EXTENSIONS.get(os.path.splitext(entry.name)[1].lower())
+            if language:
+                files, size = languages.get(language, (0, 0))
+                languages[language] = (files + 1, size + st.st_size)
+    return stats
+
+
+def read_git_head(path):
+    """Short HEAD commit read straight from .git (loose or packed ref); None when there is no repository or commit."""
+    git_dir = os.path.join(path, ".git")
+    try:
+        if os.path.isfile(git_dir):
+            with open(git_dir, "r", encoding="utf-8") as fh:
+                line = fh.readline().strip()
+            if not line.startswith("gitdir:"):
+                return None
+            git_dir = os.path.normpath(os.path.join(path, line[len("gitdir:"):].strip()))
+        with open(os.path.join(git_dir, "HEAD"), "r", encoding="utf-8") as fh:
+            head = fh.readline().strip()
+    except OSError:
+        return None
+    if not head.startswith("ref:"):
+        return head[:12] or None
+    ref = head[4:].strip()
+    try:
+        with open(os.path.join(git_dir, ref), "r", encoding="utf-8") as fh:
+            return fh.readline().strip()[:12] or None
+    except OSError:
+        pass
+    try:
+        with open(os.path.join(git_dir, "packed-refs"), "r", encoding="utf-8") as fh:
+            for line in fh:
+                sha, _, name = line.strip().partition(" ")
+                if name == ref:
+                    return sha[:12]
+    except OSError:
+        pass
+    return None
+
+
+def git_worktree_dirty(path):
+    """True/False from ``git status --porcelain``; None when git is unavailable or the call fails."""
+    if not os.path.exists(os.path.join(path, ".git")):
+        return None
+    try:
+        # --no-optional-locks keeps status from refreshing .git/index, which would wake our own watcher.
+        proc = run_subprocess(
+            ["git", "--no-optional-locks", "-C", path, "status", "--porcelain", "--ignore-submodules"],
+            capture_output=True,
+            text=True,
+            timeout=20,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if proc.returncode != 0:
+        return None
+    return bool(proc.stdout.strip())
+
+
+def _proc_paths_under(pid, prefixes):
+    """(kind, path) pairs of one process that fall under any prefix: cwd, root, exe, open fds and mapped files."""
+    base = f"/proc/{pid}"
+    hits = []
+
+    def match(kind, target):
+        if target.endswith(" (deleted)"):
+            target = target[: -len(" (deleted)")]
+        for prefix in prefixes:
+            if target == prefix or target.startswith(prefix + "/"):
+                hits.append((kind, target))
+                return
+
+    for kind in ("cwd", "root", "exe"):
+        try:
+            match(kind, os.readlink(f"{base}/{kind}"))
+        except OSError:
+            pass
+    try:
+        fds = os.listdir(f"{base}/fd")
+    except OSError:
+        fds = []
+    for fd in fds:
+        try:
+            target = os.readlink(f"{base}/fd/{fd}")
+        except OSError:
+            continue
+        if target.startswith("/"):
+            match(f"fd {fd}", target)
+    try:
+        with open(f"{base}/maps", "r", encoding="utf-8", errors="replace") as fh:
+            mapped = set()
+            for line in fh:
+                fields = line.split(None, 5)
+                if len(fields) == 6 and fields[5].startswith("/"):
+                    mapped.add(fields[5].rstrip("\n"))
+        for target in sorted(mapped):
+            match("mem", target)
+    except OSError:
+        pass
+    if not hits:
+        return None
+    try:
+        with open(f"{base}/cmdline", "rb") as fh:
+            command = fh.read().replace(b"\0", b" ").decode("utf-8", "replace").strip()
+    except OSError:
+        command = ""
+    if not command:
+        try:
+            with open(f"{base}/comm", "r", encoding="utf-8") as fh:
+                command = fh.read().strip()
+        except OSError:
+            command = "?"
+    return {"pid": int(pid), "command": command, "paths": hits}
+
+
+def scan_open_handles(path, timeout=PROC_SCAN_TIMEOUT, workers=PROC_SCAN_WORKERS):
+    """Processes holding anything under ``path``, read natively from /proc instead of ``lsof +D``.
+
+    Returns {"processes": [{"pid", "command", "paths": [(kind, path)]}], "complete": bool, "scanned": n}.
+    ``complete`` is False when the deadline hit first; the list is then a lower bound.
+    """
+    prefixes = sorted({os.path.normpath(path), os.path.realpath(path)})
+    try:
+        pids = [name for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return {"processes": [], "complete": False, "scanned": 0}
+    deadline = time.monotonic() + timeout
+    chunk = max(1, len(pids) // (workers * 4) + 1)
+
+    def scan_chunk(chunk_pids):
+        found = []
+        for pid in chunk_pids:
+            if time.monotonic() > deadline:
+                return found, False
+            hit = _proc_paths_under(pid, prefixes)
+            if hit:
+                found.append(hit)
+        return found, True
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = [executor.submit(scan_chunk, pids[i : i + chunk]) for i in range(0, len(pids), chunk)]
+    done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()) + 0.5)
+    executor.shutdown(wait=False, cancel_futures=True)
+    processes, complete = [], not not_done
+    for future in done:
+        found, finished = future.result()
+        processes.extend(found)
+        complete = complete and finished
+    processes.sort(key=lambda proc: proc["pid"])
+    return {"processes": processes, "complete": complete, "scanned": len(pids)}
+
+
 def glyph_transform(text: str) -> str:
     return " ".join(GLYPH_MAP.get(c, c) for c in text)
 
 
-def normalize_lines(lines: list[str]) -> list[str]:
-    max_width = max(len(line) for line in lines)
-    return [
-        (" " * ((max_width - len(line)) // 2)) +
-        line +
-        (" " * (max_width - len(line) - ((max_width - len(line)) // 2)))
-        for line in lines
-    ]
+def normalize_lines(lines: list[str]) -> list[str]:
+    max_width = max(len(line) for line in lines)
+    return [
+        (" " * ((max_width - len(line)) // 2)) +
+        line +
+        (" " * (max_width - len(line) - ((max_width - len(line)) // 2)))
+        for line in lines
+    ]
+
+
+class TraceSpan:
+    __slots__ = ("name", "cat", "start", "end", "tid", "span_id", "parent_id", "args")
+
+    def __init__(self, name, cat, start, tid, span_id, parent_id, args):
+        self.name = name
+        self.cat = cat
+        self.start = start
+        self.end = None
+        self.tid = tid
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.args = args
+
+    @property
+    def duration_ms(self):
+        return None if self.end is None else (self.end - self.start) * 1000
+
+
+class _SpanScope:
+    __slots__ = ("tracer", "span", "attach_only")
+
+    def __init__(self, tracer, span, attach_only=False):
+        self.tracer = tracer
+        self.span = span
+        self.attach_only = attach_only
+
+    def __enter__(self):
+        if self.span is not None:
+            self.tracer._stack().append(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return False
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self.span:
+            stack.pop()
+        elif self.span in stack:
+            stack.remove(self.span)
+        if not self.attach_only:
+            if exc is not None:
+                self.span.args["error"] = f"{exc_type.__name__}: {exc}"[:300]
+            self.tracer.end_span(self.span)
+        return False
+
+
+class Tracer:
+    """Nested spans on the monotonic clock, kept in a ring buffer and exported as Chrome trace-event JSON."""
+
+    def __init__(self, capacity=TRACE_BUFFER_SPANS):
+        self.enabled = True
+        self.spans = deque(maxlen=capacity)
+        self.origin = time.perf_counter()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._threads = {}
+        self._stacks = {}
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._threads[threading.get_ident()] = threading.current_thread().name
+            self._stacks[threading.get_ident()] = stack
+        return stack
+
+    def current(self):
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    def current_on(self, thread_id):
+        """Innermost open span of another thread; read without locking, so only a best-effort hint."""
+        stack = self._stacks.get(thread_id)
+        try:
+            return stack[-1] if stack else None
+        except IndexError:
+            return None
+
+    def start_span(self, name, cat="app", parent=None, **args):
+        """Open a span without making it current; close it with end_span (for work that spans callbacks)."""
+        if parent is None:
+            parent = self.current()
+        return TraceSpan(
+            name,
+            cat,
+            time.perf_counter(),
+            threading.get_ident(),
+            next(self._ids),
+            parent.span_id if parent is not None else None,
+            args,
+        )
+
+    def end_span(self, span, **args):
+        if span is None or span.end is not None:
+            return
+        span.end = time.perf_counter()
+        if args:
+            span.args.update(args)
+        if self.enabled:
+            self.spans.append(span)
+
+    def span(self, name, cat="app", parent=None, **args):
+        """Context manager: a child of `parent` (default: the current span on this thread) that is current inside."""
+        if not self.enabled:
+            return _SpanScope(self, None)
+        self._stack()
+        return _SpanScope(self, self.start_span(name, cat, parent, **args))
+
+    def attach(self, span):
+        """Make an existing span current on this thread, e.g. to parent work handed over from another thread."""
+        return _SpanScope(self, span, attach_only=True)
+
+    def record(self, name, cat, start, end, parent=None, **args):
+        """Add an already finished span measured with time.perf_counter()."""
+        if not self.enabled:
+            return None
+        self._stack()
+        span = self.start_span(name, cat, parent, **args)
+        span.start, span.end = start, end
+        self.spans.append(span)
+        return span
+
+    def instant(self, name, cat="app", **args):
+        if self.enabled:
+            now = time.perf_counter()
+            self.record(name, cat, now, now, **args)
+
+    def snapshot(self, since=None):
+        spans = list(self.spans)
+        if since is not None:
+            cutoff = time.perf_counter() - since
+            spans = [span for span in spans if span.end >= cutoff]
+        return spans
+
+    def slowest(self, limit=200, cat=None, since=None):
+        """Finished top-level spans (no recorded parent), slowest first."""
+        spans = self.snapshot(since)
+        known = {span.span_id for span in spans}
+        roots = [s for s in spans if (s.parent_id is None or s.parent_id not in known) and (cat is None or s.cat == cat)]
+        roots.sort(key=lambda s: s.end - s.start, reverse=True)
+        return roots[:limit]
+
+    def children(self, span_id):
+        return [span for span in self.spans if span.parent_id == span_id]
+
+    def export_chrome(self, path=None, since=None):
+        """Chrome trace-event JSON (chrome://tracing, ui.perfetto.dev); cross-thread parents become flow arrows."""
+        spans = self.snapshot(since)
+        pid = os.getpid()
+        by_id = {span.span_id: span for span in spans}
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self._threads.items())
+        ]
+        for span in spans:
+            ts = (span.start - self.origin) * 1e6
+            args = {k: v if isinstance(v, (int, float, str, bool, type(None))) else str(v) for k, v in span.args.items()}
+            args["span_id"] = span.span_id
+            if span.parent_id is not None:
+                args["parent_id"] = span.parent_id
+            if span.end == span.start:
+                events.append({"name": span.name, "cat": span.cat, "ph": "i", "s": "t", "ts": ts, "pid": pid, "tid": span.tid, "args": args})
+                continue
+            events.append(
+                {"name": span.name, "cat": span.cat, "ph": "X", "ts": ts, "dur": (span.end - span.start) * 1e6, "pid": pid, "tid": span.tid, "args": args}
+            )
+            parent = by_id.get(span.parent_id)
+            if parent is not None and parent.tid != span.tid:
+                flow_ts = (min(max(span.start, parent.start), parent.end) - self.origin) * 1e6
+                events.append({"name": "handoff", "cat": "flow", "ph": "s", "id": span.span_id, "ts": flow_ts, "pid": pid, "tid": parent.tid})
+                events.append({"name": "handoff", "cat": "flow", "ph": "f", "bp": "e", "id": span.span_id, "ts": ts, "pid": pid, "tid": span.tid})
+        trace = {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"app": "focus_manager", "exported": now_str()}}
+        if path is not None:
+            atomic_write_text(path, json.dumps(trace))
+        return trace
+
+
+TRACER = Tracer()
+
+
+def _command_label(cmd):
+    if isinstance(cmd, str):
+        return "shell"
+    argv = [str(part) for part in cmd]
+    if not argv:
+        return "subprocess"
+    program = os.path.basename(argv[0])
+    rest = argv[1:]
+    if program == "sudo":
+        rest = [part for part in rest if not part.startswith("-")]
+        return "sudo " + (os.path.basename(rest[0]) if rest else "")
+    if program == "git":
+        skip = False
+        for part in rest:
+            if skip:
+                skip = False
+            elif part in ("-C", "-c"):
+                skip = True
+            elif not part.startswith("-"):
+                return f"git {part}"
+    return program
+
+
+def run_subprocess(cmd, **kwargs):
+    """subprocess.run inside a tracing span; only the program (and git subcommand) is recorded, never the argv."""
+    label = _command_label(cmd)
+    start = time.perf_counter()
+    result = None
+    try:
+        with TRACER.span(label, "subprocess") as span:
+            result = subprocess.run(cmd, **kwargs)
+            if span is not None:
+                span.args["returncode"] = result.returncode
+            return result
+    finally:
+        METRIC_SUBPROCESS.labels(label).observe(time.perf_counter() - start)
+        if result is None or result.returncode != 0:
+            METRIC_SUBPROCESS_FAILED.labels(label).inc()
+
+
+def open_url(request, timeout=None):
+    """urllib.request.urlopen inside a tracing span covering the request up to the response headers."""
+    if isinstance(request, urllib.request.Request):
+        url, method = request.full_url, request.get_method()
+    else:
+        url, method = str(request), "GET"
+    parts = urllib.parse.urlsplit(url)
+    host = parts.hostname or ""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        with TRACER.span(f"http {method} {host}", "http", path=parts.path) as span:
+            try:
+                response = urllib.request.urlopen(request, timeout=timeout)
+            except urllib.error.HTTPError as exc:
+                status = exc.code
+                raise
+            status = getattr(response, "status", None)
+            if span is not None:
+                span.args["status"] = status
+            return response
+    finally:
+        METRIC_HTTP.labels(method, host).observe(time.perf_counter() - start)
+        METRIC_HTTP_RESPONSES.labels(host, status).inc()
+
+
+class TracedCursor(sqlite3.Cursor):
+    def execute(self, sql, *params):
+        return self.connection._traced(super().execute, sql, params)
+
+    def executemany(self, sql, *params):
+        return self.connection._traced(super().executemany, sql, params)
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection that records each transaction (and slow statements) as tracing spans."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._txn_started = None
+        self._txn_statements = 0
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, *params):
+        return self._traced(super().execute, sql, params)
+
+    def executemany(self, sql, *params):
+        return self._traced(super().executemany, sql, params)
+
+    def _traced(self, call, sql, params):
+        start = time.perf_counter()
+        try:
+            return call(sql, *params)
+        finally:
+            end = time.perf_counter()
+            METRIC_DB_STATEMENT.observe(end - start)
+            if self.in_transaction:
+                if self._txn_started is None:
+                    self._txn_started = start
+                self._txn_statements += 1
+            if (end - start) * 1000 >= TRACE_DB_STATEMENT_MIN_MS and TRACER.enabled:
+                TRACER.record("db " + (sql.lstrip().split(None, 1) or ["?"])[0].upper(), "db", start, end, sql=sql.strip()[:200])
+
+    def __exit__(self, exc_type, exc, tb):
+        # The C implementation commits/rolls back without going through the overrides below.
+        if exc_type is None:
+            try:
+                self.commit()
+            except Exception:
+                # Match sqlite3.Connection: a failed commit must not leave the transaction open.
+                self.rollback()
+                raise
+        else:
+            self.rollback()
+        return False
+
+    def commit(self):
+        self._close_transaction("commit", super().commit)
+
+    def rollback(self):
+        self._close_transaction("rollback", super().rollback)
+
+    def _close_transaction(self, kind, call):
+        started, statements = self._txn_started, self._txn_statements
+        self._txn_started, self._txn_statements = None, 0
+        if started is None:
+            return call()
+        try:
+            return call()
+        finally:
+            end = time.perf_counter()
+            METRIC_DB_TRANSACTION.labels(kind).observe(end - started)
+            TRACER.record("db transaction", "db", started, end, outcome=kind, statements=statements)
+
+
+class LogWriter:
+    """Queue-fed writer thread: lines are appended in batches, logs rotate by size/age and rotated files are gzipped."""
+
+    def __init__(self, interval=LOG_FLUSH_INTERVAL, max_bytes=LOG_ROTATE_BYTES, max_age=LOG_ROTATE_SECS, backups=LOG_BACKUPS):
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+        self._files = {}  # path -> [handle, size, started_at]
+        self.stats = {"lines": 0, "batches": 0, "replaced": 0, "rotations": 0, "dropped": 0, "errors": 0}
+
+    # -- producers (any thread, never touch the filesystem) ------------------------------------
+
+    def append(self, path, line):
+        if self._queue.qsize() >= LOG_QUEUE_LIMIT:
+            self.stats["dropped"] += 1
+            return
+        self._queue.put(("append", Path(path), line if line.endswith("\n") else line + "\n"))
+        self._ensure_thread()
+
+    def replace(self, path, text):
+        """Atomically rewrite `path` with `text`; only the newest text queued per batch is written."""
+        self._queue.put(("replace", Path(path), text))
+        self._ensure_thread()
+
+    def submit(self, fn, *args):
+        """Run `fn(*args)` on the writer thread after the lines queued before it (batched stores hook in here)."""
+        self._queue.put(("call", None, (fn, args)))
+        self._ensure_thread()
+
+    def flush(self, timeout=2.0):
+        """Block until everything queued so far is on disk (or `timeout` passes)."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(("flush", None, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=2.0):
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(("close", None, done))
+        done.wait(timeout)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+
+    # -- writer thread --------------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            # Gather whatever arrives within the interval so bursts turn into one write per file.
+            while batch[-1][0] not in ("flush", "close"):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if not self._write_batch(batch):
+                return
+
+    def _write_batch(self, batch):
+        appends, replaces, calls, waiters, closing = {}, {}, [], [], False
+        for kind, path, payload in batch:
+            if kind == "append":
+                appends.setdefault(path, []).append(payload)
+            elif kind == "replace":
+                replaces[path] = payload
+            elif kind == "call":
+                calls.append(payload)
+            else:
+                waiters.append(payload)
+                closing = closing or kind == "close"
+        for path, lines in appends.items():
+            try:
+                self._append(path, "".join(lines).encode("utf-8"))
+                self.stats["lines"] += len(lines)
+            except Exception:
+                self.stats["errors"] += 1
+        for path, text in replaces.items():
+            try:
+                atomic_write_text(path, text)
+                self.stats["replaced"] += 1
+            except Exception:
+                self.stats["errors"] += 1
+        for fn, args in calls:
+            try:
+                fn(*args)
+            except Exception:
+                self.stats["errors"] += 1
+        self.stats["batches"] += 1
+        for entry in self._files.values():
+            try:
+                entry[0].flush()
+            except Exception:
+                pass
+        if closing:
+            for entry in self._files.values():
+                try:
+                    entry[0].close()
+                except Exception:
+                    pass
+            self._files.clear()
+            with self._start_lock:
+                self._thread = None
+        for done in waiters:
+            done.set()
+        return not closing
+
+    def _append(self, path, data):
+        entry = self._files.get(path)
+        if entry is not None and (entry[1] + len(data) > self.max_bytes or time.time() - entry[2] > self.max_age) and entry[1]:
+            self._rotate(path, entry)
+            entry = None
+        if entry is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle = open(path, "ab")
+            size = handle.tell()
+            # The live file began when the previous one was rotated away; with no history, treat it as new.
+            try:
+                started = path.with_name(f"{path.name}.1.gz").stat().st_mtime if size else time.time()
+            except OSError:
+                started = time.time()
+            entry = self._files[path] = [handle, size, started]
+            if size and (size + len(data) > self.max_bytes or time.time() - started > self.max_age):
+                self._rotate(path, entry)
+                return self._append(path, data)
+        entry[0].write(data)
+        entry[1] += len(data)
+
+    def _rotate(self, path, entry):
+        entry[0].close()
+        self._files.pop(path, None)
+        for idx in range(self.backups - 1, 0, -1):
+            src = path.with_name(f"{path.name}.{idx}.gz")
+            if src.exists():
+                os.replace(src, path.with_name(f"{path.name}.{idx + 1}.gz"))
+        rotated = path.with_name(f"{path.name}.1")
+        os.replace(path, rotated)
+        with open(rotated, "rb") as src, gzip.open(path.with_name(f"{path.name}.1.gz.tmp"), "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(path.with_name(f"{path.name}.1.gz.tmp"), path.with_name(f"{path.name}.1.gz"))
+        os.remove(rotated)
+        self.stats["rotations"] += 1
+
+
+LOG_WRITER = LogWriter()
+
+
+class _CounterValue:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self, lock):
+        self._lock = lock
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def read(self):
+        return self.value
+
+
+class _GaugeValue:
+    __slots__ = ("_lock", "value", "function")
+
+    def __init__(self, lock):
+        self._lock = lock
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Read the gauge from `function()` at sample/export time instead of storing a value."""
+        self.function = function
+
+    def read(self):
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class _HistogramValue:
+    """HDR-style histogram: log-linear buckets (HISTOGRAM_SUB_BUCKETS per power of two) for ~3% quantile error."""
+
+    __slots__ = ("_lock", "counts", "count", "sum", "max")
+
+    def __init__(self, lock):
+        self._lock = lock
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def _key(value):
+        if value <= 0:
+            return -(1 << 30)
+        mantissa, exponent = math.frexp(value)
+        return exponent * HISTOGRAM_SUB_BUCKETS + int((mantissa - 0.5) * 2 * HISTOGRAM_SUB_BUCKETS)
+
+    @staticmethod
+    def upper_bound(key):
+        if key == -(1 << 30):
+            return 0.0
+        exponent, sub = divmod(key, HISTOGRAM_SUB_BUCKETS)
+        return math.ldexp(0.5 + (sub + 1) / (2 * HISTOGRAM_SUB_BUCKETS), exponent)
+
+    def observe(self, value):
+        key = self._key(value)
+        with self._lock:
+            counts = self.counts
+            counts[key] = counts.get(key, 0) + 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts), self.count, self.sum
+
+    @classmethod
+    def quantile(cls, counts, q):
+        total = sum(counts.values())
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for key in sorted(counts):
+            seen += counts[key]
+            if seen >= rank:
+                return cls.upper_bound(key)
+        return cls.upper_bound(max(counts))
+
+    def read(self):
+        return self.count
+
+
+class Metric:
+    """A metric family: one value per label combination; without labels it forwards to its single value."""
+
+    VALUE_TYPES = {"counter": _CounterValue, "gauge": _GaugeValue, "histogram": _HistogramValue}
+
+    def __init__(self, kind, name, help_text, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.children: dict[tuple, object] = {}
+        self._value = None if self.labelnames else self.labels()
+
+    def labels(self, *values):
+        # Label values are text in the exposition; mixing e.g. 200 and "error" would also break sorting.
+        values = tuple(map(str, values))
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self.children.setdefault(values, self.VALUE_TYPES[self.kind](self._lock))
+        return child
+
+    def inc(self, amount=1):
+        self._value.inc(amount)
+
+    def set(self, value):
+        self._value.set(value)
+
+    def set_function(self, function):
+        self._value.set_function(function)
+
+    def observe(self, value):
+        self._value.observe(value)
+
+    def series_name(self, values):
+        if not values:
+            return self.name
+        return self.name + "{" + ",".join(f'{k}="{v}"' for k, v in zip(self.labelnames, values)) + "}"
+
+
+def _prom_labels(names, values, extra=None):
+    pairs = list(zip(names, map(str, values))) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = ((k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms; Prometheus text export and per-second history for sparklines."""
+
+    def __init__(self, prefix="focus_manager"):
+        self.prefix = prefix
+        self.metrics: dict[str, Metric] = {}
+        self.history: dict[tuple, deque] = {}
+        self._previous: dict[tuple, object] = {}
+        self._last_sample = None
+        self._lock = threading.Lock()
+        self._server = None
+        self._server_thread = None
+
+    def _register(self, kind, name, help_text, labelnames=(), **kwargs):
+        name = f"{self.prefix}_{name}"
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric(kind, name, help_text, labelnames, **kwargs)
+            elif metric.kind != kind or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered as {metric.kind}{metric.labelnames}")
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register("counter", name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register("gauge", name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        return self._register("histogram", name, help_text, labelnames, buckets=buckets)
+
+    # -- sparkline history (UI thread, once a second) -------------------------------------------
+
+    def sample(self):
+        """Append one point per series: counters as a per-second rate, gauges as-is, histograms as p99 of the interval."""
+        now = time.monotonic()
+        elapsed = max(1e-3, now - self._last_sample) if self._last_sample is not None else None
+        self._last_sample = now
+        for metric in list(self.metrics.values()):
+            for values, child in list(metric.children.items()):
+                key = (metric.name, values)
+                if metric.kind == "counter":
+                    current = child.value
+                    previous = self._previous.get(key, current)
+                    self._previous[key] = current
+                    point = (current - previous) / elapsed if elapsed else 0.0
+                elif metric.kind == "gauge":
+                    point = child.read()
+                else:
+                    counts, _count, _sum = child.snapshot()
+                    previous = self._previous.get(key, {})
+                    self._previous[key] = counts
+                    delta = {k: n - previous.get(k, 0) for k, n in counts.items() if n != previous.get(k, 0)}
+                    point = _HistogramValue.quantile(delta, 0.99)
+                series = self.history.get(key)
+                if series is None:
+                    series = self.history[key] = deque(maxlen=METRICS_HISTORY_POINTS)
+                series.append(point)
+
+    # -- Prometheus text exposition -------------------------------------------------------------
+
+    def render(self):
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            if not metric.children:
+                continue
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for values, child in sorted(metric.children.items()):
+                labels = _prom_labels(metric.labelnames, values)
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{labels} {child.read()}")
+                    continue
+                counts, count, total = child.snapshot()
+                cumulative = 0
+                keys = sorted(counts)
+                index = 0
+                for bound in metric.buckets:
+                    while index < len(keys) and _HistogramValue.upper_bound(keys[index]) <= bound * 1.0001:
+                        cumulative += counts[keys[index]]
+                        index += 1
+                    lines.append(f"{name}_bucket{_prom_labels(metric.labelnames, values, ('le', repr(float(bound))))} {cumulative}")
+                lines.append(f"{name}_bucket{_prom_labels(metric.labelnames, values, ('le', '+Inf'))} {count}")
+                lines.append(f"{name}_sum{labels} {total}")
+                lines.append(f"{name}_count{labels} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=METRICS_FILE):
+        LOG_WRITER.replace(path, self.render())
+
+    def serve(self, path=METRICS_SOCKET):
+        """Answer each connection on a Unix socket with the current exposition (plain, or HTTP if it sent a GET)."""
+        if self._server is not None or not hasattr(socket, "AF_UNIX"):
+            return False
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.is_socket():
+                path.unlink()
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # Bind under a restrictive umask so the socket is never reachable by other users, even briefly.
+            previous_umask = os.umask(0o177)
+            try:
+                server.bind(str(path))
+            finally:
+                os.umask(previous_umask)
+            server.listen(8)
+        except OSError:
+            return False
+        self._server = server
+        self._server_path = path
+        self._server_thread = threading.Thread(target=self._serve, args=(server,), name="metrics-socket", daemon=True)
+        self._server_thread.start()
+        return True
+
+    def _serve(self, server):
+        while True:
+            try:
+                conn, _addr = server.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(0.2)
+                    try:
+                        request = conn.recv(4096)
+                    except socket.timeout:
+                        request = b""
+                    body = self.render().encode("utf-8")
+                    if request.startswith(b"GET"):
+                        header = f"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: {len(body)}\r\n\r\n"
+                        body = header.encode("ascii") + body
+                    conn.settimeout(2)
+                    conn.sendall(body)
+                except Exception:
+                    continue
+
+    def close(self):
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        server.close()
+        try:
+            self._server_path.unlink()
+        except OSError:
+            pass
+
+
+METRICS = MetricsRegistry()
+METRIC_DB_STATEMENT = METRICS.histogram("db_statement_seconds", "SQLite statement execution time (task and audit stores).")
+METRIC_DB_TRANSACTION = METRICS.histogram("db_transaction_seconds", "SQLite transaction time from first statement to commit/rollback.", ("outcome",))
+METRIC_SUBPROCESS = METRICS.histogram("subprocess_seconds", "Subprocess run time by program (git by subcommand).", ("command",))
+METRIC_SUBPROCESS_FAILED = METRICS.counter("subprocess_failures_total", "Subprocesses that exited non-zero or failed to start.", ("command",))
+METRIC_HTTP = METRICS.histogram("http_request_seconds", "HTTP time to response headers by method and host.", ("method", "host"))
+METRIC_HTTP_RESPONSES = METRICS.counter("http_responses_total", "HTTP responses by host and status (error: no response).", ("host", "status"))
+METRIC_SYNC_FILES = METRICS.counter("localsync_files_total", "Files copied by LocalSync.")
+METRIC_SYNC_BYTES = METRICS.counter("localsync_bytes_total", "Bytes copied by LocalSync.")
+METRIC_SYNC_SECONDS = METRICS.histogram("localsync_seconds", "LocalSync pass duration.")
+METRIC_TERMINAL_OUT = METRICS.counter("terminal_output_bytes_total", "Bytes read from terminal ptys.")
+METRIC_TERMINAL_IN = METRICS.counter("terminal_input_bytes_total", "Bytes written to terminal ptys.")
+METRIC_UI_MUTATION_LATENCY = METRICS.histogram("ui_mutation_latency_seconds", "Time from queuing a UI mutation to running it.")
+METRIC_UI_MUTATION_QUEUE = METRICS.gauge("ui_mutation_queue_depth", "UI mutations still queued after a drain.")
+METRIC_UI_LAG = METRICS.histogram("ui_event_loop_lag_seconds", "How late each event-loop heartbeat fired.")
+METRIC_UI_STALLS = METRICS.counter("ui_stalls_total", "Event-loop stalls at or past UI_STALL_MS.")
+
+
+class AuditStore:
+    """SQLite audit trail: events are batched onto the log writer thread, a trigger keeps per-day rollups."""
+
+    COLUMNS = ("id", "ts", "day", "op_type", "target", "outcome", "dry_run", "duration_ms", "user", "error")
+    GROUP_COLUMNS = ("day", "op_type", "target", "outcome")
+    MIGRATIONS = (
+        (1, "_migration_base_schema"),
+        (2, "_migration_import_text_log"),
+    )
+    SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+    def __init__(self, db_path=AUDIT_DB, writer=None):
+        self.db_path = str(db_path)
+        self.writer = writer or LOG_WRITER
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            self.conn.execute("PRAGMA journal_mode=WAL;")
+            self.conn.execute("PRAGMA synchronous=NORMAL;")
+        except sqlite3.DatabaseError:
+            pass
+        self._apply_migrations()
+        self._lock = threading.Lock()
+        self._pending = []
+        self.user = getpass.getuser()
+        self.stats = {"recorded": 0, "batches": 0, "errors": 0}
+
+    def _apply_migrations(self):
+        current = self.conn.execute("PRAGMA user_version;").fetchone()[0]
+        if current >= self.SCHEMA_VERSION:
+            return current
+        for version, step in self.MIGRATIONS:
+            if version <= current:
+                continue
+            cur = self.conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                getattr(self, step)(cur)
+                cur.execute(f"PRAGMA user_version = {int(version)};")
+            except Exception:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+            current = version
+        return current
+
+    def _migration_base_schema(self, cur):
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS audit_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                day TEXT NOT NULL,
+                op_type TEXT NOT NULL,
+                target TEXT,
+                outcome TEXT NOT NULL,
+                dry_run INTEGER NOT NULL DEFAULT 0,
+                duration_ms REAL,
+                user TEXT,
+                error TEXT
+            );
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_events(ts);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_op_ts ON audit_events(op_type, ts);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_target_ts ON audit_events(target, ts);")
+        # One row per (day, op, target, outcome): aggregations over years read this instead of the event log.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS audit_daily (
+                day TEXT NOT NULL,
+                op_type TEXT NOT NULL,
+                target TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                total_ms REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, op_type, target, outcome)
+            ) WITHOUT ROWID;
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_daily_op ON audit_daily(op_type, outcome, target, day);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_daily_target ON audit_daily(target, day);")
+        # Same rollup without the project: all-project aggregations stay small however many projects exist.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS audit_daily_ops (
+                day TEXT NOT NULL,
+                op_type TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                total_ms REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, op_type, outcome)
+            ) WITHOUT ROWID;
+            """
+        )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_audit_daily AFTER INSERT ON audit_events BEGIN
+                INSERT INTO audit_daily (day, op_type, target, outcome, count, total_ms)
+                VALUES (NEW.day, NEW.op_type, COALESCE(NEW.target, '-'), NEW.outcome, 1, COALESCE(NEW.duration_ms, 0))
+                ON CONFLICT(day, op_type, target, outcome)
+                DO UPDATE SET count = count + 1, total_ms = total_ms + COALESCE(NEW.duration_ms, 0);
+                INSERT INTO audit_daily_ops (day, op_type, outcome, count, total_ms)
+                VALUES (NEW.day, NEW.op_type, NEW.outcome, 1, COALESCE(NEW.duration_ms, 0))
+                ON CONFLICT(day, op_type, outcome)
+                DO UPDATE SET count = count + 1, total_ms = total_ms + COALESCE(NEW.duration_ms, 0);
+            END;
+            """
+        )
+
+    def _migration_import_text_log(self, cur):
+        # Carry over the free-form audit.log lines written before the store existed.
+        pattern = re.compile(r"^\[(?P<stamp>[^\]]+)\] (?P<op>\S+) project=(?P<target>.*?) (?P<outcome>\S+?)(?P<dry> dry-run)?$")
+        try:
+            fh = open(AUDIT_LOG, "r", encoding="utf-8", errors="replace")
+        except OSError:
+            return
+        rows = []
+        with fh:
+            for line in fh:
+                m = pattern.match(line.rstrip("\n"))
+                if not m:
+                    continue
+                try:
+                    stamp = datetime.fromisoformat(m.group("stamp"))
+                except ValueError:
+                    continue
+                target = None if m.group("target") == "-" else m.group("target")
+                rows.append(
+                    (stamp.timestamp(), stamp.date().isoformat(), m.group("op"), target, m.group("outcome"), int(bool(m.group("dry"))), None, None, None)
+                )
+        cur.executemany(
+            "INSERT INTO audit_events (ts, day, op_type, target, outcome, dry_run, duration_ms, user, error) VALUES (?,?,?,?,?,?,?,?,?);",
+            rows,
+        )
+
+    # -- recording ------------------------------------------------------------------------------
+
+    def record(self, op_type, target, outcome, dry_run=False, duration_ms=None, error=None, user=None):
+        """Queue one event; rows gathered within a writer interval are inserted in a single transaction."""
+        now = datetime.now()
+        row = (
+            now.timestamp(),
+            now.date().isoformat(),
+            str(op_type or "unknown"),
+            target,
+            str(outcome),
+            int(bool(dry_run)),
+            None if duration_ms is None else round(float(duration_ms), 3),
+            user or self.user,
+            None if error is None else str(error)[:2000],
+        )
+        with self._lock:
+            self._pending.append(row)
+            first = len(self._pending) == 1
+        if first:
+            self.writer.submit(self._write_pending)
+
+    def _write_pending(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO audit_events (ts, day, op_type, target, outcome, dry_run, duration_ms, user, error) "
+                    "VALUES (?,?,?,?,?,?,?,?,?);",
+                    rows,
+                )
+            self.stats["recorded"] += len(rows)
+            self.stats["batches"] += 1
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+
+    def flush(self, timeout=2.0):
+        return self.writer.flush(timeout)
+
+    # -- queries (any thread; each call uses its own read connection) ----------------------------
+
+    def _reader(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _where(since=None, until=None, op_type=None, target=None, outcome=None, day_column=False):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("day >= ?" if day_column else "ts >= ?")
+            params.append(datetime.fromtimestamp(since).date().isoformat() if day_column else since)
+        if until is not None:
+            clauses.append("day <= ?" if day_column else "ts < ?")
+            params.append(datetime.fromtimestamp(until).date().isoformat() if day_column else until)
+        for column, value in (("op_type", op_type), ("target", target), ("outcome", outcome)):
+            if value is None:
+                continue
+            if column == "target" and value == "-" and not day_column:
+                clauses.append("target IS NULL")
+            elif isinstance(value, (list, tuple, set)):
+                clauses.append(f"{column} IN ({','.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, since=None, until=None, op_type=None, target=None, outcome=None, limit=500, before_id=None):
+        """Newest-first events matching the filters; `since`/`until` are epoch seconds. Page with `before_id`."""
+        where, params = self._where(since, until, op_type, target, outcome)
+        if before_id is not None:
+            where += (" AND " if where else " WHERE ") + "id < ?"
+            params.append(before_id)
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM audit_events{where} ORDER BY id DESC LIMIT ?;"
+        conn = self._reader()
+        try:
+            return [dict(row) for row in conn.execute(sql, params + [int(limit)])]
+        finally:
+            conn.close()
+
+    def aggregate(self, group_by=("target", "day"), since=None, until=None, op_type=None, target=None, outcome=None, limit=5000):
+        """Event counts and total duration grouped by any of day/op_type/target/outcome, read from the daily rollup.
+
+        `aggregate(("target", "day"), op_type="autogit_commit", outcome="failed")` gives failed commits per project per day.
+        """
+        columns = [column for column in group_by if column in self.GROUP_COLUMNS]
+        table = "audit_daily" if target is not None or "target" in columns else "audit_daily_ops"
+        where, params = self._where(since, until, op_type, target, outcome, day_column=True)
+        select = ", ".join(columns + ["SUM(count) AS count", "SUM(total_ms) AS total_ms"])
+        group = f" GROUP BY {', '.join(columns)}" if columns else ""
+        order = " ORDER BY " + ", ".join(f"{c} DESC" if c == "day" else c for c in columns) if columns else ""
+        sql = f"SELECT {select} FROM {table}{where}{group}{order} LIMIT ?;"
+        conn = self._reader()
+        try:
+            return [dict(row) for row in conn.execute(sql, params + [int(limit)])]
+        finally:
+            conn.close()
+
+    def distinct(self, column):
+        if column not in self.GROUP_COLUMNS:
+            raise ValueError(column)
+        conn = self._reader()
+        try:
+            table = "audit_daily" if column == "target" else "audit_daily_ops"
+            return [row[0] for row in conn.execute(f"SELECT DISTINCT {column} FROM {table} ORDER BY {column};")]
+        finally:
+            conn.close()
+
+    def close(self):
+        self.flush()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+# Lines that (re-)enter a Qt event loop; the Python frame after the innermost one is the callback Qt dispatched.
+EVENT_LOOP_CALL_RE = re.compile(r"\.exec_?\(|processEvents\(|QMessageBox\.\w+\(|QFileDialog\.get\w+\(|QInputDialog\.get\w+\(")
+
+
+class EventLoopMonitor(QtCore.QObject):
+    """UI-thread heartbeat measuring event-loop lag, plus a watchdog thread that samples the UI stack during stalls."""
+
+    stall_detected = QtCore.pyqtSignal(dict)
+    stats_changed = QtCore.pyqtSignal()
+
+    def __init__(self, parent=None, interval_ms=UI_HEARTBEAT_MS, stall_ms=UI_STALL_MS):
+        super().__init__(parent)
+        self.interval = interval_ms / 1000
+        self.stall_ms = stall_ms
+        self.lags: deque[float] = deque(maxlen=UI_LAG_WINDOW)
+        self.histogram = dict.fromkeys([*UI_MUTATION_LATENCY_BUCKETS_MS, "inf"], 0)
+        self.stalls: deque[dict] = deque(maxlen=100)
+        self.beats = 0
+        self.stall_count = 0
+        self.max_lag_ms = 0.0
+        self._ui_ident = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._capture = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._hang_file = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._beat)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._ui_ident = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="ui-watchdog", daemon=True)
+        self._thread.start()
+        try:
+            UI_HANG_DUMP.parent.mkdir(parents=True, exist_ok=True)
+            self._hang_file = open(UI_HANG_DUMP, "a")
+        except OSError:
+            self._hang_file = None
+        self._arm_hang_dump()
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        try:
+            faulthandler.cancel_dump_traceback_later()
+        except Exception:
+            pass
+        if self._hang_file is not None:
+            try:
+                self._hang_file.close()
+            except OSError:
+                pass
+            self._hang_file = None
+
+    def _arm_hang_dump(self):
+        # The watchdog below needs the GIL; faulthandler's C thread still fires if a C call hangs holding it.
+        if self._hang_file is None:
+            return
+        try:
+            faulthandler.dump_traceback_later(UI_HANG_SECS, repeat=False, file=self._hang_file)
+        except Exception:
+            pass
+
+    # -- UI thread ------------------------------------------------------------------------------
+
+    def _beat(self):
+        now = time.perf_counter()
+        previous = self._last_beat
+        self._last_beat = now
+        lag_ms = max(0.0, (now - previous - self.interval) * 1000)
+        self.beats += 1
+        self.lags.append(lag_ms)
+        METRIC_UI_LAG.observe(lag_ms / 1000)
+        self.histogram[next((b for b in UI_MUTATION_LATENCY_BUCKETS_MS if lag_ms <= b), "inf")] += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if lag_ms >= self.stall_ms:
+            self._record_stall(previous, now, lag_ms)
+        if self.beats % 20 == 0:
+            self._arm_hang_dump()
+            self.stats_changed.emit()
+
+    def _record_stall(self, started, ended, lag_ms):
+        with self._lock:
+            capture, self._capture = self._capture, None
+            if capture is None or capture["beat"] != started:
+                capture = {"samples": [], "span": None}
+            samples = list(capture["samples"])
+        handler = samples[0]["handler"] if samples else "unknown (stack not sampled; GIL held?)"
+        stall = {
+            "at": now_str(),
+            "lag_ms": round(lag_ms, 1),
+            "handler": handler,
+            "span": capture["span"],
+            "samples": samples,
+        }
+        self.stall_count += 1
+        stall["id"] = self.stall_count
+        METRIC_UI_STALLS.inc()
+        self.stalls.append(stall)
+        TRACER.record("ui stall", "ui", started + self.interval, ended, handler=handler, span=capture["span"])
+        LOG_WRITER.append(
+            UI_STALL_LOG,
+            json.dumps({k: v for k, v in stall.items() if k != "samples"} | {"stack": samples[0]["stack"] if samples else []}),
+        )
+        self.stall_detected.emit(stall)
+
+    def summary(self):
+        lags = sorted(self.lags)
+
+        def pct(p):
+            return lags[min(len(lags) - 1, int(len(lags) * p))] if lags else 0.0
+
+        return {
+            "p50_ms": round(pct(0.50), 1),
+            "p90_ms": round(pct(0.90), 1),
+            "p99_ms": round(pct(0.99), 1),
+            "window_max_ms": round(lags[-1], 1) if lags else 0.0,
+            "max_ms": round(self.max_lag_ms, 1),
+            "beats": self.beats,
+            "stalls": self.stall_count,
+        }
+
+    # -- watchdog thread ------------------------------------------------------------------------
+
+    def _watch(self):
+        poll = min(self.interval, self.stall_ms / 4000)
+        stall_secs = self.stall_ms / 1000
+        while not self._stop.wait(poll):
+            beat = self._last_beat
+            now = time.perf_counter()
+            if now - beat - self.interval < stall_secs:
+                continue
+            with self._lock:
+                capture = self._capture
+                if capture is None or capture["beat"] != beat:
+                    span = TRACER.current_on(self._ui_ident)
+                    capture = self._capture = {"beat": beat, "samples": [], "span": span.name if span else None, "next": now}
+            if len(capture["samples"]) >= UI_STALL_SAMPLES or now < capture["next"]:
+                continue
+            sample = self._sample_ui_stack(now - beat)
+            if sample is not None:
+                with self._lock:
+                    capture["samples"].append(sample)
+                    capture["next"] = now + stall_secs
+
+    def _sample_ui_stack(self, stalled_for):
+        frame = sys._current_frames().get(self._ui_ident)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame, limit=40)
+        del frame
+        # Python frames of a Qt callback hang directly off the frame that entered the (innermost) event loop.
+        handler = stack[0]
+        for index in range(len(stack) - 2, -1, -1):
+            if stack[index].line and EVENT_LOOP_CALL_RE.search(stack[index].line):
+                handler = stack[index + 1]
+                break
+        return {
+            "after_ms": round(stalled_for * 1000),
+            "handler": f"{handler.name} ({os.path.basename(handler.filename)}:{handler.lineno})",
+            "top": f"{stack[-1].name} ({os.path.basename(stack[-1].filename)}:{stack[-1].lineno})",
+            "stack": [line.rstrip("\n") for line in traceback.format_list(stack)],
+        }
 
 
 class StabilitySupervisor:
@@ -867,6 +5149,7 @@ class StabilitySupervisor:
         self.state.setdefault("failures", [])
         self.state.setdefault("success", [])
         self.state.setdefault("corrections", [])
+        self._cap_state()
         self.debug_level = debug_level
         self.on_event = on_event
         self.log_fn = log_fn
@@ -893,16 +5176,22 @@ class StabilitySupervisor:
         except Exception:
             return {}
 
+    def _cap_state(self):
+        for key in ("failures", "corrections"):
+            entries = self.state.get(key)
+            if isinstance(entries, list) and len(entries) > STABILITY_STATE_CAP:
+                self.state[key] = entries[-STABILITY_STATE_CAP:]
+
     def _save_state(self):
+        self._cap_state()
         try:
-            STABILITY_STATE.write_text(json.dumps(self.state, indent=2))
+            LOG_WRITER.replace(STABILITY_STATE, json.dumps(self.state, indent=2, default=str))
         except Exception:
             pass
 
     def _log(self, scope, data):
         try:
-            with open(STABILITY_LOG, "a", encoding="utf-8") as fh:
-                fh.write(f"[{now_str()}] {scope}: {json.dumps(data)}\n")
+            LOG_WRITER.append(STABILITY_LOG, f"[{now_str()}] {scope}: {json.dumps(data, default=str)}")
         except Exception:
             pass
         self._emit(scope, data)
@@ -1458,11 +5747,12 @@ class RuntimeStateStrip(QtWidgets.QFrame):
         self.state_lbl = QtWidgets.QLabel("State: Idle")
         self.stability_lbl = QtWidgets.QLabel("Stability: Normal")
         self.alert_lbl = QtWidgets.QLabel("Warnings: 0")
-        for lbl in (self.project_lbl, self.state_lbl, self.stability_lbl, self.alert_lbl):
+        self.lag_lbl = QtWidgets.QLabel("UI lag: –")
+        for lbl in (self.project_lbl, self.state_lbl, self.stability_lbl, self.alert_lbl, self.lag_lbl):
             lbl.setStyleSheet("color: #9ce4ff; font-weight: bold;")
             layout.addWidget(lbl)
         layout.addStretch(1)
-        self.setToolTip("Runtime heartbeat\nShows active project, state, stability, and warnings.")
+        self.setToolTip("Runtime heartbeat\nShows active project, state, stability, warnings, and event-loop lag.")
 
     def update_state(self, project="None", state="Idle", stability="Normal", warnings=0):
         self.project_lbl.setText(f"Project: {project or 'None'}")
@@ -1470,13 +5760,106 @@ class RuntimeStateStrip(QtWidgets.QFrame):
         self.stability_lbl.setText(f"Stability: {stability}")
         self.alert_lbl.setText(f"Warnings: {warnings}")
 
+    def update_lag(self, summary, last_stall=None, recent=False):
+        text = f"UI lag: p50 {summary['p50_ms']:.0f} ms · p99 {summary['p99_ms']:.0f} ms"
+        if summary["stalls"]:
+            text += f" · stalls {summary['stalls']}"
+        self.lag_lbl.setText(text)
+        color = "#ffb347" if recent else "#9ce4ff"
+        self.lag_lbl.setStyleSheet(f"color: {color}; font-weight: bold;")
+        tip = f"Event-loop lag over the last {UI_LAG_WINDOW} heartbeats; max {summary['max_ms']:.0f} ms since start."
+        if last_stall:
+            tip += f"\nLast stall: {last_stall['lag_ms']:.0f} ms at {last_stall['at']} in {last_stall['handler']}"
+            if last_stall.get("span"):
+                tip += f" [{last_stall['span']}]"
+        self.lag_lbl.setToolTip(tip)
+
+class ProgressBarDelegate(QtWidgets.QStyledItemDelegate):
+    """Paints a (done, total) pair stored on an item as a compact progress bar."""
+
+    ROLE = QtCore.Qt.UserRole + 1
+
+    def paint(self, painter, option, index):
+        value = index.data(self.ROLE)
+        if not value:
+            super().paint(painter, option, index)
+            return
+        done, total = value
+        bar = QtWidgets.QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(2, 3, -2, -3)
+        bar.minimum = 0
+        bar.maximum = max(1, int(total))
+        bar.progress = min(int(done), int(total))
+        bar.text = index.data(QtCore.Qt.DisplayRole) or f"{done}/{total}"
+        bar.textVisible = True
+        QtWidgets.QApplication.style().drawControl(QtWidgets.QStyle.CE_ProgressBar, bar, painter)
+
+
+class SortKeyItem(QtWidgets.QTableWidgetItem):
+    """Table item that sorts on a stored key (bytes, timestamps) rather than its display text."""
+
+    SORT_ROLE = QtCore.Qt.UserRole + 2
+
+    def __init__(self, text, key):
+        super().__init__(text)
+        self.setData(self.SORT_ROLE, key)
+
+    def __lt__(self, other):
+        mine, theirs = self.data(self.SORT_ROLE), other.data(self.SORT_ROLE)
+        if mine is None or theirs is None:
+            return super().__lt__(other)
+        return mine < theirs
+
+
+class ComboBoxDelegate(QtWidgets.QStyledItemDelegate):
+    """Paints a cell as a combo box and only creates a real QComboBox while it is being edited."""
+
+    def __init__(self, options, parent=None):
+        super().__init__(parent)
+        self.options = list(options)
+
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget else QtWidgets.QApplication.style()
+        style.drawPrimitive(QtWidgets.QStyle.PE_PanelItemViewItem, option, painter, option.widget)
+        combo = QtWidgets.QStyleOptionComboBox()
+        combo.rect = option.rect.adjusted(2, 2, -2, -2)
+        combo.state = option.state | QtWidgets.QStyle.State_Enabled
+        combo.palette = option.palette
+        combo.currentText = index.data(QtCore.Qt.DisplayRole) or ""
+        style.drawComplexControl(QtWidgets.QStyle.CC_ComboBox, combo, painter, option.widget)
+        style.drawControl(QtWidgets.QStyle.CE_ComboBoxLabel, combo, painter, option.widget)
+
+    def createEditor(self, parent, option, index):
+        editor = QtWidgets.QComboBox(parent)
+        editor.addItems(self.options)
+        editor.activated.connect(partial(self._commit, editor))
+        QtCore.QTimer.singleShot(0, editor.showPopup)
+        return editor
+
+    def setEditorData(self, editor, index):
+        value = index.data(QtCore.Qt.DisplayRole)
+        if value in self.options:
+            editor.setCurrentText(value)
+
+    def setModelData(self, editor, model, index):
+        if editor.currentText() != index.data(QtCore.Qt.DisplayRole):
+            model.setData(index, editor.currentText(), QtCore.Qt.EditRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(option.rect)
+
+    def _commit(self, editor, *_args):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor, QtWidgets.QAbstractItemDelegate.NoHint)
+
+
 class DebugWindow(QtWidgets.QMainWindow):
     """Structured, read-only debug inspector window."""
 
     new_entry = QtCore.pyqtSignal(str, object, str)
     closed = QtCore.pyqtSignal()
 
-    def __init__(self, scopes):
+    def __init__(self, scopes, audit_store=None, tracer=None, loop_monitor=None, metrics=None):
         super().__init__()
         self.setWindowTitle("Debug Window")
         self.resize(900, 640)
@@ -1514,7 +5897,25 @@ class DebugWindow(QtWidgets.QMainWindow):
         self.log_view.setReadOnly(True)
         self.log_view.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
         layout.addWidget(self.log_view)
-        self.setCentralWidget(central)
+        self.tabs = QtWidgets.QTabWidget()
+        self.tabs.addTab(central, "Events")
+        self.audit_viewer = None
+        if audit_store is not None:
+            self.audit_viewer = AuditViewer(audit_store)
+            self.tabs.addTab(self.audit_viewer, "Audit")
+        self.trace_viewer = None
+        if tracer is not None:
+            self.trace_viewer = TraceViewer(tracer)
+            self.tabs.addTab(self.trace_viewer, "Traces")
+        self.responsiveness_viewer = None
+        if loop_monitor is not None:
+            self.responsiveness_viewer = ResponsivenessViewer(loop_monitor)
+            self.tabs.addTab(self.responsiveness_viewer, "Responsiveness")
+        self.metrics_viewer = None
+        if metrics is not None:
+            self.metrics_viewer = MetricsViewer(metrics)
+            self.tabs.addTab(self.metrics_viewer, "Metrics")
+        self.setCentralWidget(self.tabs)
         self.new_entry.connect(self._handle_entry)
 
     def closeEvent(self, event):
@@ -1600,6 +6001,447 @@ class DebugWindow(QtWidgets.QMainWindow):
             sb.setValue(sb.maximum())
 
 
+class AuditViewer(QtWidgets.QWidget):
+    """Debug-window tab over AuditStore: filtered event listing or grouped counts from the daily rollup."""
+
+    RANGES = (("Last 24 hours", 86400), ("Last 7 days", 7 * 86400), ("Last 30 days", 30 * 86400), ("Last year", 365 * 86400), ("All time", None))
+    GROUPS = (("Project", "target"), ("Day", "day"), ("Operation", "op_type"), ("Outcome", "outcome"))
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._worker = None
+        self._started = 0.0
+        self._generation = 0  # bumped per refresh; results from an older one are dropped
+        layout = QtWidgets.QVBoxLayout(self)
+        filters = WrapLayout()
+        self.range_combo = QtWidgets.QComboBox()
+        for label, seconds in self.RANGES:
+            self.range_combo.addItem(label, seconds)
+        self.range_combo.setCurrentIndex(2)
+        self.op_combo = QtWidgets.QComboBox()
+        self.target_combo = QtWidgets.QComboBox()
+        self.outcome_combo = QtWidgets.QComboBox()
+        self.mode_combo = QtWidgets.QComboBox()
+        self.mode_combo.addItems(["Events", "Aggregate"])
+        for widget in (self.range_combo, self.op_combo, self.target_combo, self.outcome_combo, self.mode_combo):
+            filters.addWidget(widget)
+        self.group_boxes = {}
+        for label, column in self.GROUPS:
+            box = QtWidgets.QCheckBox(label)
+            box.setChecked(column in ("target", "day"))
+            box.toggled.connect(lambda _checked: self.refresh())
+            self.group_boxes[column] = box
+            filters.addWidget(box)
+        self.refresh_btn = QtWidgets.QPushButton("Refresh")
+        self.preset_btn = QtWidgets.QPushButton("Failed commits / project / day")
+        filters.addWidget(self.refresh_btn)
+        filters.addWidget(self.preset_btn)
+        layout.addLayout(filters)
+        self.table = QtWidgets.QTableWidget(0, 0)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(qt_select_rows())
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table, 1)
+        self.status_label = QtWidgets.QLabel("")
+        layout.addWidget(self.status_label)
+        for combo in (self.range_combo, self.op_combo, self.target_combo, self.outcome_combo):
+            combo.activated.connect(lambda _index: self.refresh())
+        self.mode_combo.currentIndexChanged.connect(self._on_mode_changed)
+        self.refresh_btn.clicked.connect(self.reload)
+        self.preset_btn.clicked.connect(self._apply_failed_commit_preset)
+        self._on_mode_changed()
+        self.reload()
+
+    def reload(self):
+        """Refresh the filter choices, then the table."""
+        self._run(self._load_choices, self._on_choices)
+
+    def _load_choices(self):
+        return {column: self.store.distinct(column) for column in ("op_type", "target", "outcome")}
+
+    def _on_choices(self, choices):
+        for combo, column, label in (
+            (self.op_combo, "op_type", "All operations"),
+            (self.target_combo, "target", "All projects"),
+            (self.outcome_combo, "outcome", "All outcomes"),
+        ):
+            current = combo.currentData()
+            blocker = QtCore.QSignalBlocker(combo)
+            combo.clear()
+            combo.addItem(label, None)
+            for value in choices.get(column, []):
+                combo.addItem(value, value)
+            index = combo.findData(current)
+            combo.setCurrentIndex(max(0, index))
+            del blocker
+        self.refresh()
+
+    def _on_mode_changed(self, *_args):
+        aggregate = self.mode_combo.currentIndex() == 1
+        for box in self.group_boxes.values():
+            box.setEnabled(aggregate)
+        self.refresh()
+
+    def _apply_failed_commit_preset(self):
+        for combo, value in ((self.op_combo, "autogit_commit"), (self.outcome_combo, "failed"), (self.target_combo, None)):
+            index = combo.findData(value)
+            if index < 0:
+                combo.addItem(value, value)
+                index = combo.count() - 1
+            combo.setCurrentIndex(index)
+        for column, box in self.group_boxes.items():
+            blocker = QtCore.QSignalBlocker(box)
+            box.setChecked(column in ("target", "day"))
+            del blocker
+        self.mode_combo.setCurrentIndex(1)
+        self.refresh()
+
+    def _filters(self):
+        seconds = self.range_combo.currentData()
+        return {
+            "since": time.time() - seconds if seconds else None,
+            "op_type": self.op_combo.currentData(),
+            "target": self.target_combo.currentData(),
+            "outcome": self.outcome_combo.currentData(),
+        }
+
+    def refresh(self):
+        self._generation += 1
+        generation = self._generation
+        filters = self._filters()
+        if self.mode_combo.currentIndex() == 1:
+            group_by = tuple(column for column, box in self.group_boxes.items() if box.isChecked())
+            self._run(lambda: (generation, group_by + ("count", "total_ms"), self.store.aggregate(group_by, **filters)), self._show_rows)
+        else:
+            columns = ("ts", "op_type", "target", "outcome", "dry_run", "duration_ms", "user", "error")
+            self._run(lambda: (generation, columns, self.store.query(limit=2000, **filters)), self._show_rows)
+
+    def _run(self, fn, on_result):
+        self._started = time.perf_counter()
+        worker = Worker(fn)
+        worker.signals.result.connect(on_result, QtCore.Qt.QueuedConnection)
+        worker.signals.error.connect(lambda err: self.status_label.setText(f"Audit query failed: {err}"), QtCore.Qt.QueuedConnection)
+        self._worker = worker
+        QtCore.QThreadPool.globalInstance().start(worker)
+
+    def _show_rows(self, result):
+        generation, columns, rows = result
+        if generation != self._generation:
+            return  # a slower query for filters that have since changed
+        elapsed_ms = (time.perf_counter() - self._started) * 1000
+        headers = {"ts": "time", "op_type": "operation", "target": "project", "duration_ms": "ms", "total_ms": "total ms"}
+        self.table.setSortingEnabled(False)
+        self.table.clear()
+        self.table.setColumnCount(len(columns))
+        self.table.setHorizontalHeaderLabels([headers.get(c, c) for c in columns])
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, column in enumerate(columns):
+                value = row.get(column)
+                if column == "ts" and value is not None:
+                    text = datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+                elif column == "dry_run":
+                    text = "yes" if value else ""
+                elif isinstance(value, float):
+                    text = f"{value:.1f}"
+                else:
+                    text = "" if value is None else str(value)
+                item = SortKeyItem(text, value if isinstance(value, (int, float)) or value is None else text)
+                self.table.setItem(r, c, item)
+        self.table.setSortingEnabled(True)
+        self.table.resizeColumnsToContents()
+        self.status_label.setText(f"{len(rows):,} rows in {elapsed_ms:.0f} ms")
+
+
+class TraceViewer(QtWidgets.QWidget):
+    """Debug-window tab: slowest recent top-level spans with their span tree, and Chrome trace export."""
+
+    def __init__(self, tracer, parent=None):
+        super().__init__(parent)
+        self.tracer = tracer
+        self._children = {}
+        layout = QtWidgets.QVBoxLayout(self)
+        controls = WrapLayout()
+        self.enabled_box = QtWidgets.QCheckBox("Tracing enabled")
+        self.enabled_box.setChecked(tracer.enabled)
+        self.cat_combo = QtWidgets.QComboBox()
+        self.cat_combo.addItem("All categories", None)
+        for cat in ("operation", "job", "ui", "subprocess", "http", "db"):
+            self.cat_combo.addItem(cat, cat)
+        self.refresh_btn = QtWidgets.QPushButton("Refresh")
+        self.export_btn = QtWidgets.QPushButton("Export Chrome trace…")
+        self.export_btn.setToolTip("Trace-event JSON for chrome://tracing or ui.perfetto.dev")
+        for widget in (self.enabled_box, self.cat_combo, self.refresh_btn, self.export_btn):
+            controls.addWidget(widget)
+        layout.addLayout(controls)
+        self.tree = QtWidgets.QTreeWidget()
+        self.tree.setHeaderLabels(["span", "category", "ms", "start", "details"])
+        self.tree.setUniformRowHeights(True)
+        self.tree.itemExpanded.connect(self._load_children)
+        layout.addWidget(self.tree, 1)
+        self.status_label = QtWidgets.QLabel("")
+        layout.addWidget(self.status_label)
+        self.enabled_box.toggled.connect(self._on_enabled_toggled)
+        self.cat_combo.activated.connect(lambda _index: self.refresh())
+        self.refresh_btn.clicked.connect(self.refresh)
+        self.export_btn.clicked.connect(self.export)
+        self.refresh()
+
+    def _item(self, span):
+        details = ", ".join(f"{k}={v}" for k, v in span.args.items() if v not in (None, ""))
+        started = (span.start - self.tracer.origin)
+        item = QtWidgets.QTreeWidgetItem([span.name, span.cat, f"{span.duration_ms:.2f}", f"{started:.3f}s", details[:300]])
+        item.setData(0, QtCore.Qt.UserRole, span.span_id)
+        item.setToolTip(4, details)
+        if span.span_id in self._children:
+            item.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.ShowIndicator)
+        return item
+
+    def refresh(self):
+        roots = self.tracer.slowest(limit=300, cat=self.cat_combo.currentData())
+        # One pass over the buffer; looking children up per item would be O(roots x spans).
+        self._children = {}
+        for span in self.tracer.snapshot():
+            if span.parent_id is not None:
+                self._children.setdefault(span.parent_id, []).append(span)
+        self.tree.clear()
+        self.tree.addTopLevelItems([self._item(span) for span in roots])
+        for column in range(4):
+            self.tree.resizeColumnToContents(column)
+        self.status_label.setText(f"{len(self.tracer.spans):,} spans buffered (max {self.tracer.spans.maxlen:,}); slowest {len(roots)} roots shown")
+
+    def _load_children(self, item):
+        if item.childCount():
+            return
+        children = sorted(self._children.get(item.data(0, QtCore.Qt.UserRole), ()), key=lambda span: span.start)
+        item.addChildren([self._item(span) for span in children])
+
+    def _on_enabled_toggled(self, enabled):
+        self.tracer.enabled = bool(enabled)
+
+    def export(self):
+        TRACE_DIR.mkdir(parents=True, exist_ok=True)
+        default = TRACE_DIR / f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export trace", str(default), "Trace JSON (*.json)")
+        if not path:
+            return
+        try:
+            trace = self.tracer.export_chrome(path)
+        except OSError as exc:
+            self.status_label.setText(f"Export failed: {exc}")
+            return
+        self.status_label.setText(f"Exported {len(trace['traceEvents']):,} events to {path}")
+
+
+class ResponsivenessViewer(QtWidgets.QWidget):
+    """Debug-window tab: event-loop lag percentiles and histogram, and recent UI stalls with sampled stacks."""
+
+    def __init__(self, monitor, parent=None):
+        super().__init__(parent)
+        self.monitor = monitor
+        layout = QtWidgets.QVBoxLayout(self)
+        self.summary_label = QtWidgets.QLabel("")
+        layout.addWidget(self.summary_label)
+        splitter = QtWidgets.QSplitter(QtCore.Qt.Vertical)
+        self.histogram_table = QtWidgets.QTableWidget(0, 3)
+        self.histogram_table.setHorizontalHeaderLabels(["lag ≤ ms", "beats", ""])
+        self.histogram_table.horizontalHeader().setStretchLastSection(True)
+        self.histogram_table.verticalHeader().setVisible(False)
+        self.histogram_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.histogram_table.setItemDelegateForColumn(2, ProgressBarDelegate(self.histogram_table))
+        self.stall_tree = QtWidgets.QTreeWidget()
+        self.stall_tree.setHeaderLabels(["time", "lag ms", "handler", "span", "samples"])
+        self.stall_tree.setRootIsDecorated(False)
+        self.stack_view = QtWidgets.QPlainTextEdit()
+        self.stack_view.setReadOnly(True)
+        self.stack_view.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        for widget in (self.histogram_table, self.stall_tree, self.stack_view):
+            splitter.addWidget(widget)
+        layout.addWidget(splitter, 1)
+        self.stall_tree.currentItemChanged.connect(self._show_stall)
+        self._shown_stalls = -1
+        monitor.stats_changed.connect(self.refresh)
+        monitor.stall_detected.connect(lambda _stall: self.refresh())
+        self.refresh()
+
+    def refresh(self):
+        summary = self.monitor.summary()
+        self.summary_label.setText(
+            f"p50 {summary['p50_ms']:.1f} ms · p90 {summary['p90_ms']:.1f} ms · p99 {summary['p99_ms']:.1f} ms"
+            f" · window max {summary['window_max_ms']:.1f} ms · max {summary['max_ms']:.1f} ms"
+            f" · {summary['beats']:,} beats · {summary['stalls']} stalls (≥ {self.monitor.stall_ms} ms)"
+        )
+        histogram = self.monitor.histogram
+        total = max(1, sum(histogram.values()))
+        self.histogram_table.setRowCount(len(histogram))
+        for row, (bucket, count) in enumerate(histogram.items()):
+            self.histogram_table.setItem(row, 0, QtWidgets.QTableWidgetItem("∞" if bucket == "inf" else str(bucket)))
+            self.histogram_table.setItem(row, 1, QtWidgets.QTableWidgetItem(f"{count:,}"))
+            bar = QtWidgets.QTableWidgetItem(f"{count * 100 / total:.1f}%")
+            bar.setData(ProgressBarDelegate.ROLE, [count, total])
+            self.histogram_table.setItem(row, 2, bar)
+        if self._shown_stalls == self.monitor.stall_count:
+            return
+        self._shown_stalls = self.monitor.stall_count
+        current = self.stall_tree.currentIndex().row()
+        self.stall_tree.clear()
+        for stall in reversed(self.monitor.stalls):
+            item = QtWidgets.QTreeWidgetItem(
+                [stall["at"], f"{stall['lag_ms']:.0f}", stall["handler"], stall.get("span") or "", str(len(stall["samples"]))]
+            )
+            # An id rather than the dict: Qt would otherwise free Python objects during interpreter teardown.
+            item.setData(0, QtCore.Qt.UserRole, stall["id"])
+            self.stall_tree.addTopLevelItem(item)
+        for column in range(4):
+            self.stall_tree.resizeColumnToContents(column)
+        if self.stall_tree.topLevelItemCount():
+            self.stall_tree.setCurrentItem(self.stall_tree.topLevelItem(max(0, current)))
+
+    def _show_stall(self, item, _previous=None):
+        if item is None:
+            self.stack_view.clear()
+            return
+        stall_id = item.data(0, QtCore.Qt.UserRole)
+        stall = next((entry for entry in self.monitor.stalls if entry["id"] == stall_id), None)
+        if stall is None:
+            self.stack_view.setPlainText("This stall is no longer retained.")
+            return
+        lines = [f"{stall['lag_ms']:.0f} ms stall at {stall['at']} — {stall['handler']}"]
+        if stall.get("span"):
+            lines.append(f"open span: {stall['span']}")
+        if not stall["samples"]:
+            lines.append("No stack was sampled (the UI thread held the GIL throughout; see faulthandler dumps for hangs).")
+        for sample in stall["samples"]:
+            lines.append("")
+            lines.append(f"--- after {sample['after_ms']} ms, in {sample['top']}")
+            lines.extend(sample["stack"])
+        self.stack_view.setPlainText("\n".join(lines))
+
+
+class SparklineWidget(QtWidgets.QWidget):
+    """Small line chart of one metric series with its latest value."""
+
+    def __init__(self, title, points, formatter, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.points = points
+        self.formatter = formatter
+        self.setMinimumSize(240, 64)
+        self.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        self.setToolTip(title)
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
+        rect = self.rect().adjusted(1, 1, -1, -1)
+        painter.fillRect(rect, QtGui.QColor("#0b1320"))
+        points = [p for p in self.points if p == p]  # drop NaN gauge reads
+        latest = self.formatter(points[-1]) if points else "–"
+        painter.setPen(QtGui.QColor("#9ce4ff"))
+        metrics = painter.fontMetrics()
+        title = metrics.elidedText(self.title, QtCore.Qt.ElideMiddle, rect.width() - 20 - metrics.horizontalAdvance(latest))
+        painter.drawText(rect.adjusted(6, 2, -6, 0), QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop, title)
+        painter.drawText(rect.adjusted(6, 2, -6, 0), QtCore.Qt.AlignRight | QtCore.Qt.AlignTop, latest)
+        if len(points) < 2:
+            return
+        top = rect.top() + metrics.height() + 4
+        height = max(1, rect.bottom() - 4 - top)
+        highest = max(points)
+        peak = highest or 1.0
+        step = (rect.width() - 12) / max(1, (self.points.maxlen or len(points)) - 1)
+        x0 = rect.right() - 6 - step * (len(points) - 1)
+        path = QtGui.QPainterPath()
+        for index, value in enumerate(points):
+            point = QtCore.QPointF(x0 + index * step, top + height * (1 - max(0.0, value) / peak))
+            if index:
+                path.lineTo(point)
+            else:
+                path.moveTo(point)
+        painter.setPen(QtGui.QPen(QtGui.QColor("#2e9b8f"), 1.4))
+        painter.drawPath(path)
+        painter.setPen(QtGui.QColor("#5b7a99"))
+        painter.drawText(rect.adjusted(6, 0, -6, -2), QtCore.Qt.AlignRight | QtCore.Qt.AlignBottom, f"max {self.formatter(highest)}")
+
+
+class MetricsViewer(QtWidgets.QWidget):
+    """Debug-window tab: live sparklines for every metric series, with Prometheus export controls."""
+
+    def __init__(self, registry, parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self.panels: dict[tuple, SparklineWidget] = {}
+        layout = QtWidgets.QVBoxLayout(self)
+        controls = WrapLayout()
+        self.filter_edit = QtWidgets.QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter series (e.g. git, http, ui_)")
+        self.filter_edit.setMinimumWidth(260)
+        self.export_btn = QtWidgets.QPushButton("Write metrics file")
+        self.copy_btn = QtWidgets.QPushButton("Copy exposition")
+        for widget in (self.filter_edit, self.export_btn, self.copy_btn):
+            controls.addWidget(widget)
+        layout.addLayout(controls)
+        scroll = QtWidgets.QScrollArea()
+        scroll.setWidgetResizable(True)
+        container = QtWidgets.QWidget()
+        self.grid = QtWidgets.QGridLayout(container)
+        self.grid.setAlignment(QtCore.Qt.AlignTop)
+        scroll.setWidget(container)
+        layout.addWidget(scroll, 1)
+        socket_note = f" · socket {METRICS_SOCKET}" if registry._server is not None else ""
+        self.status_label = QtWidgets.QLabel(f"Exported every {METRICS_EXPORT_SECS}s to {METRICS_FILE}{socket_note}")
+        self.status_label.setTextInteractionFlags(QtCore.Qt.TextSelectableByMouse)
+        layout.addWidget(self.status_label)
+        self.filter_edit.textChanged.connect(lambda _text: self._rebuild())
+        self.export_btn.clicked.connect(self._write_now)
+        self.copy_btn.clicked.connect(lambda: QtWidgets.QApplication.clipboard().setText(self.registry.render()))
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start()
+        self.refresh()
+
+    @staticmethod
+    def _formatter(metric):
+        if metric.kind == "histogram" and metric.name.endswith("_seconds"):
+            return lambda v: f"p99 {v * 1000:.1f} ms"
+        if metric.kind == "counter" and metric.name.endswith("_bytes_total"):
+            return lambda v: f"{format_bytes(v)}/s"
+        if metric.kind == "counter":
+            return lambda v: f"{v:.1f}/s"
+        return lambda v: f"{v:g}"
+
+    def _rebuild(self):
+        for panel in self.panels.values():
+            panel.deleteLater()
+        self.panels.clear()
+        self.refresh()
+
+    def refresh(self):
+        needle = self.filter_edit.text().strip().lower()
+        for key, points in sorted(self.registry.history.items()):
+            if key in self.panels:
+                continue
+            metric = self.registry.metrics.get(key[0])
+            title = metric.series_name(key[1]).removeprefix(self.registry.prefix + "_")
+            if needle and needle not in title.lower():
+                continue
+            panel = SparklineWidget(title, points, self._formatter(metric))
+            panel.setToolTip(f"{title}\n{metric.help}")
+            count = len(self.panels)
+            self.grid.addWidget(panel, count // 3, count % 3)
+            self.panels[key] = panel
+        for panel in self.panels.values():
+            panel.update()
+
+    def _write_now(self):
+        self.registry.write()
+        LOG_WRITER.flush()
+        self.status_label.setText(f"Wrote {len(self.registry.metrics)} metrics to {METRICS_FILE}")
+
+
 class WorkspaceGraphView(QtWidgets.QGraphicsView):
     """Lightweight graph viewer that mirrors project structure and tasks."""
 
@@ -1627,7 +6469,7 @@ class WorkspaceGraphView(QtWidgets.QGraphicsView):
         factor = 1.15 if event.angleDelta().y() > 0 else 1 / 1.15
         self.scale(factor, factor)
 
-    def load_graph(self, nodes: list[dict], edges: list[tuple[str, str]]):
+    def load_graph(self, nodes: list[dict], edges: list[tuple]):
         self.clear()
         if not nodes:
             return
@@ -1642,23 +6484,38 @@ class WorkspaceGraphView(QtWidgets.QGraphicsView):
             item = self._add_node(node, x, y, radius)
             self.node_items[node["id"]] = item
             self.meta[node["id"]] = node
-        for src, dst in edges:
+        for edge in edges:
+            src, dst = edge[0], edge[1]
+            kind = edge[2] if len(edge) > 2 else "tree"
             if src in self.node_items and dst in self.node_items:
                 s_item = self.node_items[src]
                 d_item = self.node_items[dst]
                 s_center = s_item.sceneBoundingRect().center()
                 d_center = d_item.sceneBoundingRect().center()
-                self.scene.addLine(QtCore.QLineF(s_center, d_center), QtGui.QPen(QtGui.QColor("#355a8a"), 1.4))
+                if kind == "critical":
+                    pen = QtGui.QPen(QtGui.QColor("#ff5c8a"), 2.6)
+                elif kind == "depends":
+                    pen = QtGui.QPen(QtGui.QColor("#d2a446"), 1.6)
+                    pen.setStyle(QtCore.Qt.PenStyle.DashLine)
+                else:
+                    pen = QtGui.QPen(QtGui.QColor("#355a8a"), 1.4)
+                self.scene.addLine(QtCore.QLineF(s_center, d_center), pen)
         self._auto_center()
 
     def _add_node(self, node, x, y, radius):
         color = "#2e9b8f" if node.get("type") == "folder" else "#3b6aff"
         if node.get("type") == "task":
             color = "#d2a446" if node.get("status") != "completed" else "#2e9b8f"
+            if node.get("status") != "completed" and node.get("open_deps"):
+                color = "#d14b4b"
         pen = QtGui.QPen(QtGui.QColor(color))
         if node.get("status") != "completed" and node.get("type") == "task":
             pen.setStyle(QtCore.Qt.PenStyle.DotLine)
         pen.setWidth(2)
+        if node.get("critical"):
+            pen.setColor(QtGui.QColor("#ff5c8a"))
+            pen.setStyle(QtCore.Qt.PenStyle.SolidLine)
+            pen.setWidth(3)
         ellipse = self.scene.addEllipse(x, y, radius * 2, radius * 2, pen, QtGui.QBrush(QtGui.QColor("#0f1626")))
         label = self.scene.addSimpleText(node.get("label", ""))
         label.setPos(x + 6, y + radius - 6)
@@ -1822,17 +6679,62 @@ class NetworkGraphView(QtWidgets.QGraphicsView):
 
 
 class TaskStore:
-    def __init__(self, db_path=DB_PATH):
+    def __init__(self, db_path=DB_PATH, task_cap=TASK_CAP):
         DATA_DIR.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(db_path)
+        self.task_cap = int(task_cap or 0)
+        self.db_path = str(db_path)
+        self.conn = sqlite3.connect(db_path, factory=TracedConnection)
         self.conn.row_factory = sqlite3.Row
-        self._init_db()
-        self._migrate_tasks_schema()
+        # WAL keeps readers (exports, external tools) from blocking UI writes on large stores.
+        try:
+            self.conn.execute("PRAGMA journal_mode=WAL;")
+            self.conn.execute("PRAGMA synchronous=NORMAL;")
+        except sqlite3.DatabaseError:
+            pass
+        self._apply_migrations()
+        self._aggregate_day = None
+        self.refresh_aggregate_day()
         self.system_ids = self._ensure_system_lists()
         self.default_list_id = self._ensure_default_list()
 
-    def _init_db(self):
-        cur = self.conn.cursor()
+    # Ordered schema steps keyed on PRAGMA user_version. Steps must stay idempotent (IF NOT EXISTS,
+    # WHERE-guarded backfills) because pre-versioned databases replay them all from version 0.
+    MIGRATIONS = (
+        (1, "_migration_base_schema"),
+        (2, "_migration_task_columns"),
+        (3, "_migration_backfill_identity"),
+        (4, "_migration_view_indexes"),
+        (5, "_migration_store_meta"),
+        (6, "_migration_aggregates"),
+        (7, "_migration_change_journal"),
+        (8, "_migration_dependencies"),
+        (9, "_migration_scheduler"),
+        (10, "_migration_project_index"),
+        (11, "_migration_journal_project"),
+        (12, "_migration_reference_indexes"),
+    )
+    SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+    def _apply_migrations(self):
+        current = self.conn.execute("PRAGMA user_version;").fetchone()[0]
+        if current >= self.SCHEMA_VERSION:
+            return current
+        for version, step in self.MIGRATIONS:
+            if version <= current:
+                continue
+            cur = self.conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                getattr(self, step)(cur)
+                cur.execute(f"PRAGMA user_version = {int(version)};")
+            except Exception:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+            current = version
+        return current
+
+    def _migration_base_schema(self, cur):
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS lists (
@@ -1885,20 +6787,15 @@ class TaskStore:
         cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_list ON tasks(list_id);")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(due_date);")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed);")
-        self.conn.commit()
 
-    def _migrate_tasks_schema(self):
-        cur = self.conn.cursor()
+    def _migration_task_columns(self, cur):
         cur.execute("PRAGMA table_info(tasks);")
         cols = {row[1] for row in cur.fetchall()}
-        if "uuid" not in cols:
-            cur.execute("ALTER TABLE tasks ADD COLUMN uuid TEXT;")
-        if "source_id" not in cols:
-            cur.execute("ALTER TABLE tasks ADD COLUMN source_id TEXT;")
-        if "status" not in cols:
-            cur.execute("ALTER TABLE tasks ADD COLUMN status TEXT DEFAULT 'pending';")
-        # Atlas/phase metadata columns (added for expanded CSV compatibility)
-        atlas_cols = {
+        added_cols = {
+            "uuid": "TEXT",
+            "source_id": "TEXT",
+            "status": "TEXT DEFAULT 'pending'",
+            # Atlas/phase metadata columns (added for expanded CSV compatibility)
             "phase_id": "TEXT",
             "operation_id": "TEXT",
             "function_id": "TEXT",
@@ -1909,31 +6806,570 @@ class TaskStore:
             "dependency_task_ids": "TEXT",
             "estimated_complexity": "TEXT",
         }
-        for col, ctype in atlas_cols.items():
+        for col, ctype in added_cols.items():
             if col not in cols:
                 cur.execute(f"ALTER TABLE tasks ADD COLUMN {col} {ctype};")
+
+    def _migration_backfill_identity(self, cur):
+        # Set-based backfill of uuid/status/source_id; uuid4 strings are generated inside SQLite.
+        uuid4_sql = (
+            "lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' || "
+            "substr(lower(hex(randomblob(2))), 2) || '-' || substr('89ab', 1 + (abs(random()) % 4), 1) || "
+            "substr(lower(hex(randomblob(2))), 2) || '-' || lower(hex(randomblob(6)))"
+        )
+        cur.execute(f"UPDATE tasks SET uuid = {uuid4_sql} WHERE uuid IS NULL OR uuid = '';")
+        cur.execute(
+            f"UPDATE tasks SET uuid = {uuid4_sql} WHERE id NOT IN (SELECT MIN(id) FROM tasks GROUP BY uuid);"
+        )
+        cur.execute(
+            "UPDATE tasks SET status = CASE WHEN completed THEN 'completed' ELSE 'pending' END "
+            "WHERE status IS NULL OR status = '';"
+        )
+        cur.execute("UPDATE tasks SET source_id = CAST(id AS TEXT) WHERE source_id IS NULL OR source_id = '';")
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_uuid ON tasks(uuid);")
+
+    def _migration_view_indexes(self, cur):
+        # One index per tasks_for_list view so filtering and ordering never sort the full table.
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_list_view ON tasks(list_id, completed, order_index, id);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_list_order ON tasks(list_id, order_index);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_my_day_view ON tasks(my_day_date, completed, order_index, id);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_planned_view ON tasks(due_date, completed, id) WHERE due_date IS NOT NULL;")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_important_view ON tasks(priority, completed, order_index, id);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_completed_view ON tasks(completed, COALESCE(completed_at, ''), id);")
+
+    def _migration_store_meta(self, cur):
+        cur.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0);")
+        # Seed once; the triggers below keep the count exact from here on.
+        cur.execute("DELETE FROM store_meta WHERE key='task_count';")
+        cur.execute("INSERT INTO store_meta (key, value) SELECT 'task_count', COUNT(*) FROM tasks;")
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_count_insert AFTER INSERT ON tasks
+            BEGIN
+                UPDATE store_meta SET value = value + 1 WHERE key='task_count';
+            END;
+            """
+        )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_count_delete AFTER DELETE ON tasks
+            BEGIN
+                UPDATE store_meta SET value = value - 1 WHERE key='task_count';
+            END;
+            """
+        )
+
+    def _aggregate_exprs(self, alias):
+        # Per-task contribution to each aggregate column; overdue/My Day are relative to store_meta.aggregate_day.
+        day = "(SELECT value FROM store_meta WHERE key='aggregate_day')"
+        return {
+            "total": "1",
+            "pending": f"(COALESCE({alias}.status, 'pending')='pending')",
+            "in_progress": f"({alias}.status='in_progress')",
+            "blocked": f"({alias}.status='blocked')",
+            "review": f"({alias}.status='review')",
+            "completed": f"({alias}.completed=1)",
+            "overdue": f"({alias}.completed=0 AND {alias}.due_date IS NOT NULL AND {alias}.due_date < {day})",
+            "my_day": f"({alias}.my_day_date IS NOT NULL AND {alias}.my_day_date = {day})",
+            "planned": f"({alias}.due_date IS NOT NULL)",
+            "important": f"({alias}.priority=1)",
+        }
+
+    def _aggregate_trigger_body(self, alias, sign):
+        exprs = self._aggregate_exprs(alias)
+        cols = ", ".join(TASK_AGGREGATE_COLUMNS)
+        values = ", ".join(exprs[c] for c in TASK_AGGREGATE_COLUMNS)
+        if sign > 0:
+            merge = ", ".join(f"{c} = {c} + excluded.{c}" for c in TASK_AGGREGATE_COLUMNS)
+            return (
+                f"INSERT INTO list_aggregates (list_id, {cols}) VALUES ({alias}.list_id, {values}) "
+                f"ON CONFLICT(list_id) DO UPDATE SET {merge};\n"
+                f"INSERT INTO project_aggregates (project, {cols}) SELECT {alias}.project, {values} "
+                f"WHERE {alias}.project IS NOT NULL ON CONFLICT(project) DO UPDATE SET {merge};\n"
+            )
+        sub = ", ".join(f"{c} = {c} - {exprs[c]}" for c in TASK_AGGREGATE_COLUMNS)
+        return (
+            f"UPDATE list_aggregates SET {sub} WHERE list_id = {alias}.list_id;\n"
+            f"UPDATE project_aggregates SET {sub} WHERE project = {alias}.project;\n"
+        )
+
+    def _migration_aggregates(self, cur):
+        col_defs = ", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in TASK_AGGREGATE_COLUMNS)
+        cur.execute(f"CREATE TABLE IF NOT EXISTS list_aggregates (list_id INTEGER PRIMARY KEY, {col_defs});")
+        cur.execute(f"CREATE TABLE IF NOT EXISTS project_aggregates (project TEXT PRIMARY KEY, {col_defs}) WITHOUT ROWID;")
+        cur.execute("DELETE FROM store_meta WHERE key='aggregate_day';")
+        cur.execute("INSERT INTO store_meta (key, value) VALUES ('aggregate_day', ?);", (today_str(),))
+        exprs = self._aggregate_exprs("t")
+        cols = ", ".join(TASK_AGGREGATE_COLUMNS)
+        sums = ", ".join(f"SUM({exprs[c]})" for c in TASK_AGGREGATE_COLUMNS)
+        cur.execute("DELETE FROM list_aggregates;")
+        cur.execute("DELETE FROM project_aggregates;")
+        cur.execute(f"INSERT INTO list_aggregates (list_id, {cols}) SELECT t.list_id, {sums} FROM tasks t GROUP BY t.list_id;")
+        cur.execute(
+            f"INSERT INTO project_aggregates (project, {cols}) SELECT t.project, {sums} FROM tasks t "
+            "WHERE t.project IS NOT NULL GROUP BY t.project;"
+        )
+        watched = "list_id, project, status, completed, due_date, my_day_date, priority"
+        cur.execute(
+            "CREATE TRIGGER IF NOT EXISTS trg_tasks_agg_insert AFTER INSERT ON tasks BEGIN\n"
+            + self._aggregate_trigger_body("NEW", 1)
+            + "END;"
+        )
+        cur.execute(
+            "CREATE TRIGGER IF NOT EXISTS trg_tasks_agg_delete AFTER DELETE ON tasks BEGIN\n"
+            + self._aggregate_trigger_body("OLD", -1)
+            + "END;"
+        )
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_tasks_agg_update AFTER UPDATE OF {watched} ON tasks BEGIN\n"
+            + self._aggregate_trigger_body("OLD", -1)
+            + self._aggregate_trigger_body("NEW", 1)
+            + "END;"
+        )
+
+    def _migration_change_journal(self, cur):
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS task_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                uuid TEXT,
+                op TEXT NOT NULL CHECK(op IN ('insert','update','delete')),
+                columns TEXT,
+                changed_at TEXT NOT NULL
+            );
+            """
+        )
+        stamp = "strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')"
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_journal_insert AFTER INSERT ON tasks
+            BEGIN
+                INSERT INTO task_changes (uuid, op, columns, changed_at) VALUES (NEW.uuid, 'insert', NULL, {stamp});
+            END;
+            """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_journal_delete AFTER DELETE ON tasks
+            BEGIN
+                INSERT INTO task_changes (uuid, op, columns, changed_at) VALUES (OLD.uuid, 'delete', NULL, {stamp});
+            END;
+            """
+        )
+        # Record which columns actually changed; no-op UPDATEs (and updated_at-only touches) leave no entry.
+        cur.execute("PRAGMA table_info(tasks);")
+        tracked = [row[1] for row in cur.fetchall() if row[1] not in ("id", "created_at", "updated_at")]
+        diff = " || ".join(f"CASE WHEN OLD.{c} IS NOT NEW.{c} THEN '{c},' ELSE '' END" for c in tracked)
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_journal_update AFTER UPDATE ON tasks
+            BEGIN
+                INSERT INTO task_changes (uuid, op, columns, changed_at)
+                SELECT NEW.uuid, 'update', cols, {stamp} FROM (SELECT rtrim({diff}, ',') AS cols) WHERE cols <> '';
+            END;
+            """
+        )
+
+    def _weight_sql(self, alias):
+        cases = " ".join(f"WHEN '{k}' THEN {v}" for k, v in TASK_COMPLEXITY_WEIGHTS.items())
+        return f"(CASE WHEN {alias}.completed=1 THEN 0 ELSE (CASE lower(trim(COALESCE({alias}.estimated_complexity, ''))) {cases} ELSE 1 END) END)"
+
+    def _migration_dependencies(self, cur):
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS task_deps (task_id INTEGER NOT NULL, depends_on INTEGER NOT NULL, "
+            "PRIMARY KEY (task_id, depends_on)) WITHOUT ROWID;"
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_task_deps_reverse ON task_deps(depends_on, task_id);")
+        # open_deps: incomplete prerequisites; chain: weighted length of the longest open path ending here.
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS task_readiness (task_id INTEGER PRIMARY KEY, "
+            "open_deps INTEGER NOT NULL DEFAULT 0, chain INTEGER NOT NULL DEFAULT 0);"
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_task_readiness_open ON task_readiness(open_deps, chain);")
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_deps_insert AFTER INSERT ON tasks
+            BEGIN
+                INSERT OR REPLACE INTO task_readiness (task_id, open_deps, chain) VALUES (NEW.id, 0, {self._weight_sql("NEW")});
+            END;
+            """
+        )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_deps_delete AFTER DELETE ON tasks
+            BEGIN
+                DELETE FROM task_deps WHERE task_id = OLD.id OR depends_on = OLD.id;
+                DELETE FROM task_readiness WHERE task_id = OLD.id;
+            END;
+            """
+        )
+        cur.execute(f"INSERT OR REPLACE INTO task_readiness (task_id, open_deps, chain) SELECT t.id, 0, {self._weight_sql('t')} FROM tasks t;")
+        cur.execute("SELECT id FROM tasks WHERE dependency_task_ids IS NOT NULL AND trim(dependency_task_ids) <> ''")
+        task_ids = [row[0] for row in cur.fetchall()]
+        self._link_dependencies(cur, task_ids)
+        self._propagate_readiness(cur, task_ids)
+
+    def _resolve_dependency_refs(self, cur, task_id, raw, project):
+        targets = []
+        for ref in TASK_DEPENDENCY_REF_RE.findall(raw or ""):
+            # Atlas ids are only unique per import, so prefer a match inside the same project.
+            cur.execute(
+                "SELECT id FROM tasks WHERE (atlas_task_id=? OR uuid=? OR source_id=?) AND id<>? "
+                "ORDER BY (project IS ?) DESC, id LIMIT 1",
+                (ref, ref, ref, task_id, project),
+            )
+            row = cur.fetchone()
+            if row and row[0] not in targets:
+                targets.append(row[0])
+        return targets
+
+    def _creates_cycle(self, cur, task_id, depends_on):
+        cur.execute(
+            """
+            WITH RECURSIVE upstream(id) AS (
+                SELECT ?
+                UNION
+                SELECT d.depends_on FROM task_deps d JOIN upstream u ON d.task_id = u.id
+            )
+            SELECT 1 FROM upstream WHERE id = ? LIMIT 1
+            """,
+            (depends_on, task_id),
+        )
+        return cur.fetchone() is not None
+
+    def _link_dependencies(self, cur, task_ids):
+        """Rebuild edges for ``task_ids`` from dependency_task_ids; returns the (task, dep) pairs rejected as cycles."""
+        rejected = []
+        for task_id in task_ids:
+            cur.execute("SELECT dependency_task_ids, project FROM tasks WHERE id=?", (task_id,))
+            row = cur.fetchone()
+            if not row:
+                continue
+            cur.execute("DELETE FROM task_deps WHERE task_id=?", (task_id,))
+            for dep_id in self._resolve_dependency_refs(cur, task_id, row[0], row[1]):
+                if self._creates_cycle(cur, task_id, dep_id):
+                    rejected.append((task_id, dep_id))
+                    continue
+                cur.execute("INSERT OR IGNORE INTO task_deps (task_id, depends_on) VALUES (?, ?)", (task_id, dep_id))
+        return rejected
+
+    def _propagate_readiness(self, cur, seed_ids):
+        """Recompute open_deps/chain for the seeds and everything downstream of them, in topological order."""
+        seeds = set(seed_ids)
+        if not seeds:
+            return 0
+        affected = set(seeds)
+        frontier = list(seeds)
+        while frontier:
+            batch, frontier = frontier[:500], frontier[500:]
+            marks = ",".join("?" for _ in batch)
+            cur.execute(f"SELECT task_id FROM task_deps WHERE depends_on IN ({marks})", batch)
+            for (child,) in cur.fetchall():
+                if child not in affected:
+                    affected.add(child)
+                    frontier.append(child)
+        deps = {}
+        for task_id in affected:
+            cur.execute(
+                "SELECT d.depends_on, t.completed, r.chain FROM task_deps d JOIN tasks t ON t.id = d.depends_on "
+                "LEFT JOIN task_readiness r ON r.task_id = d.depends_on WHERE d.task_id=?",
+                (task_id,),
+            )
+            deps[task_id] = [tuple(r) for r in cur.fetchall()]
+        pending = {tid: sum(1 for d in deps[tid] if d[0] in affected) for tid in affected}
+        ready = deque(tid for tid, n in pending.items() if n == 0)
+        chains = {}
+        changed = set()
+        weight = self._weight_sql("t")
+        while ready:
+            task_id = ready.popleft()
+            if task_id in seeds or any(d[0] in changed for d in deps[task_id]):
+                open_deps = sum(1 for d in deps[task_id] if not d[1])
+                longest = max((chains.get(d[0], d[2] or 0) for d in deps[task_id] if not d[1]), default=0)
+                cur.execute(f"SELECT {weight} FROM tasks t WHERE t.id=?", (task_id,))
+                row = cur.fetchone()
+                own = row[0] if row else 0
+                chain = own + longest if own else 0
+                cur.execute("SELECT open_deps, chain FROM task_readiness WHERE task_id=?", (task_id,))
+                prev = cur.fetchone()
+                if prev is None or tuple(prev) != (open_deps, chain):
+                    cur.execute(
+                        "INSERT OR REPLACE INTO task_readiness (task_id, open_deps, chain) VALUES (?, ?, ?)",
+                        (task_id, open_deps, chain),
+                    )
+                    changed.add(task_id)
+                chains[task_id] = chain
+            cur.execute("SELECT task_id FROM task_deps WHERE depends_on=?", (task_id,))
+            for (child,) in cur.fetchall():
+                if child in pending:
+                    pending[child] -= 1
+                    if pending[child] == 0:
+                        ready.append(child)
+        return len(changed)
+
+    def refresh_dependencies(self, task_uuids, relink=False):
+        """Re-derive readiness after external edits; ``relink`` also re-parses dependency_task_ids."""
+        cur = self.conn.cursor()
+        ids = [pk for pk in (self._task_pk(u) for u in task_uuids) if pk is not None]
+        rejected = self._link_dependencies(cur, ids) if relink else []
+        self._propagate_readiness(cur, ids)
         self.conn.commit()
-        # backfill uuid and status based on completed flag
-        cur.execute("SELECT id, uuid, completed, status, source_id FROM tasks;")
-        rows = cur.fetchall()
-        for row in rows:
-            updates = {}
-            if not row["uuid"]:
-                updates["uuid"] = str(uuid.uuid4())
-            if not row["status"]:
-                updates["status"] = "completed" if row["completed"] else "pending"
-            if not row["source_id"]:
-                updates["source_id"] = str(row["id"])
-            if updates:
-                set_frag = ", ".join(f"{k}=?" for k in updates.keys())
-                params = list(updates.values()) + [row["id"]]
-                cur.execute(f"UPDATE tasks SET {set_frag} WHERE id=?", params)
+        return rejected
+
+    def ready_tasks(self, project=None, limit=TASK_PAGE_SIZE):
+        return self._readiness_query("r.open_deps = 0", project, limit)
+
+    def blocked_tasks(self, project=None, limit=TASK_PAGE_SIZE):
+        return self._readiness_query("r.open_deps > 0", project, limit)
+
+    def _readiness_query(self, condition, project, limit):
+        params = []
+        where = f"t.completed=0 AND {condition}"
+        if project is not None:
+            # Unary + keeps the planner on idx_tasks_project; one project's slice beats every ready task.
+            where = f"t.completed=0 AND t.project=? AND +{condition}"
+            params.append(project)
+        params.append(int(limit))
+        cur = self.conn.cursor()
+        cur.execute(
+            f"SELECT t.*, r.open_deps, r.chain FROM task_readiness r JOIN tasks t ON t.id = r.task_id "
+            f"WHERE {where} ORDER BY r.chain DESC, t.id LIMIT ?",
+            params,
+        )
+        return [dict(row) for row in cur.fetchall()]
+
+    def critical_path(self, project=None):
+        """Longest chain of open work (by complexity weight), in execution order."""
+        cur = self.conn.cursor()
+        params = [] if project is None else [project]
+        cur.execute(
+            "SELECT t.id FROM task_readiness r JOIN tasks t ON t.id = r.task_id WHERE t.completed=0 "
+            + ("AND t.project=? " if project is not None else "")
+            + "ORDER BY r.chain DESC, t.id LIMIT 1",
+            params,
+        )
+        row = cur.fetchone()
+        path = []
+        task_id = row[0] if row else None
+        while task_id is not None:
+            path.append(task_id)
+            cur.execute(
+                "SELECT d.depends_on FROM task_deps d JOIN tasks t ON t.id = d.depends_on "
+                "JOIN task_readiness r ON r.task_id = d.depends_on WHERE d.task_id=? AND t.completed=0 "
+                "ORDER BY r.chain DESC, d.depends_on LIMIT 1",
+                (task_id,),
+            )
+            nxt = cur.fetchone()
+            task_id = nxt[0] if nxt and nxt[0] not in path else None
+        if not path:
+            return []
+        cur.execute(f"SELECT id, uuid FROM tasks WHERE id IN ({','.join('?' for _ in path)})", path)
+        by_id = {row["id"]: row["uuid"] for row in cur.fetchall()}
+        return [by_id[t] for t in reversed(path)]
+
+    def dependency_edges(self, project=None):
+        """(task_uuid, depends_on_uuid) pairs, optionally limited to tasks in ``project``."""
+        cur = self.conn.cursor()
+        sql = (
+            "SELECT a.uuid AS task_uuid, b.uuid AS dep_uuid FROM task_deps d "
+            "JOIN tasks a ON a.id = d.task_id JOIN tasks b ON b.id = d.depends_on"
+        )
+        params = []
+        if project is not None:
+            sql += " WHERE a.project=?"
+            params.append(project)
+        cur.execute(sql, params)
+        return [(row["task_uuid"], row["dep_uuid"]) for row in cur.fetchall()]
+
+    def _migration_scheduler(self, cur):
+        cur.execute("PRAGMA table_info(tasks);")
+        cols = {row[1] for row in cur.fetchall()}
+        if "reminder_fired_at" not in cols:
+            cur.execute("ALTER TABLE tasks ADD COLUMN reminder_fired_at TEXT;")
+            # Reminders already in the past were handled (or missed) before the scheduler; don't fire them all on upgrade.
+            stamp = now_str()
+            cur.execute(
+                "UPDATE tasks SET reminder_fired_at=? WHERE reminder IS NOT NULL AND reminder <= ?;",
+                (stamp, stamp),
+            )
+        if "recurrence_spawned" not in cols:
+            cur.execute("ALTER TABLE tasks ADD COLUMN recurrence_spawned INTEGER DEFAULT 0;")
+        # Completed recurring tasks already produced their successor under the spawn-on-complete rule.
+        cur.execute("UPDATE tasks SET recurrence_spawned=1 WHERE completed=1 AND COALESCE(recurrence, 'none') <> 'none';")
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_reminder_pending ON tasks(reminder) "
+            "WHERE reminder IS NOT NULL AND reminder_fired_at IS NULL AND completed=0;"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_recurrence_heads ON tasks(due_date) "
+            "WHERE recurrence IS NOT NULL AND recurrence <> 'none' AND recurrence_spawned=0;"
+        )
+
+    def _migration_project_index(self, cur):
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS project_index (
+                project TEXT PRIMARY KEY,
+                root_mtime REAL,
+                size_bytes INTEGER NOT NULL DEFAULT 0,
+                file_count INTEGER NOT NULL DEFAULT 0,
+                languages TEXT,
+                newest_mtime REAL,
+                git_head TEXT,
+                git_dirty INTEGER,
+                indexed_at REAL
+            );
+            """
+        )
+
+    def _migration_reference_indexes(self, cur):
+        # Dependency refs resolve by uuid/atlas/source id; readiness, critical-path and graph queries filter by project.
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_uuid ON tasks(uuid);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_atlas_id ON tasks(atlas_task_id) WHERE atlas_task_id IS NOT NULL;")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_source_id ON tasks(source_id) WHERE source_id IS NOT NULL;")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_project ON tasks(project, completed);")
+
+    def _migration_journal_project(self, cur):
+        # Deletes and project moves leave a project the row no longer names; journal the one it had.
+        cur.execute("PRAGMA table_info(task_changes);")
+        if "project" not in {row[1] for row in cur.fetchall()}:
+            cur.execute("ALTER TABLE task_changes ADD COLUMN project TEXT;")
+        stamp = "strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')"
+        cur.execute("DROP TRIGGER IF EXISTS trg_tasks_journal_delete;")
+        cur.execute(
+            f"""
+            CREATE TRIGGER trg_tasks_journal_delete AFTER DELETE ON tasks
+            BEGIN
+                INSERT INTO task_changes (uuid, op, columns, changed_at, project)
+                VALUES (OLD.uuid, 'delete', NULL, {stamp}, OLD.project);
+            END;
+            """
+        )
+        cur.execute("PRAGMA table_info(tasks);")
+        tracked = [row[1] for row in cur.fetchall() if row[1] not in ("id", "created_at", "updated_at")]
+        diff = " || ".join(f"CASE WHEN OLD.{c} IS NOT NEW.{c} THEN '{c},' ELSE '' END" for c in tracked)
+        cur.execute("DROP TRIGGER IF EXISTS trg_tasks_journal_update;")
+        cur.execute(
+            f"""
+            CREATE TRIGGER trg_tasks_journal_update AFTER UPDATE ON tasks
+            BEGIN
+                INSERT INTO task_changes (uuid, op, columns, changed_at, project)
+                SELECT NEW.uuid, 'update', cols, {stamp}, OLD.project FROM (SELECT rtrim({diff}, ',') AS cols) WHERE cols <> '';
+            END;
+            """
+        )
+
+    def data_version(self):
+        """PRAGMA data_version; changes whenever another connection commits to the database."""
+        return self.conn.execute("PRAGMA data_version;").fetchone()[0]
+
+    def change_seq(self):
+        row = self.conn.execute("SELECT MAX(seq) FROM task_changes").fetchone()
+        return row[0] or 0
+
+    def changes_since(self, seq, limit=TASK_PAGE_SIZE):
+        """Journal entries after ``seq`` as (changes, next_seq, complete).
+
+        ``complete`` is False when entries after ``seq`` were already pruned; the caller has
+        missed changes and should reload from scratch before resuming from ``next_seq``.
+        """
+        cur = self.conn.cursor()
+        cur.execute("SELECT MIN(seq) FROM task_changes")
+        oldest = cur.fetchone()[0]
+        complete = oldest is None or seq >= oldest - 1
+        cur.execute(
+            "SELECT seq, uuid, op, columns, changed_at, project FROM task_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (int(seq), int(limit)),
+        )
+        changes = []
+        for row in cur.fetchall():
+            change = dict(row)
+            change["columns"] = change["columns"].split(",") if change["columns"] else []
+            changes.append(change)
+        next_seq = changes[-1]["seq"] if changes else max(int(seq), self.change_seq())
+        return changes, next_seq, complete
+
+    def prune_changes(self, keep=TASK_JOURNAL_RETAIN):
+        cur = self.conn.cursor()
+        cur.execute("DELETE FROM task_changes WHERE seq <= (SELECT MAX(seq) FROM task_changes) - ?", (int(keep),))
         self.conn.commit()
+        return cur.rowcount
+
+    def refresh_aggregate_day(self):
+        """Re-base the date-relative aggregates (overdue, My Day) when the calendar day changes."""
+        today = today_str()
+        if self._aggregate_day == today:
+            return False
+        cur = self.conn.cursor()
+        cur.execute("SELECT value FROM store_meta WHERE key='aggregate_day'")
+        row = cur.fetchone()
+        if row and row[0] == today:
+            self._aggregate_day = today
+            return False
+        cur.execute("BEGIN")
         try:
-            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_uuid ON tasks(uuid);")
-            self.conn.commit()
+            cur.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('aggregate_day', ?)", (today,))
+            cur.execute("UPDATE list_aggregates SET overdue = 0, my_day = 0;")
+            cur.execute("UPDATE project_aggregates SET overdue = 0, my_day = 0;")
+            cur.execute(
+                "SELECT list_id, project, COUNT(*) FROM tasks WHERE due_date < ? AND completed=0 GROUP BY list_id, project",
+                (today,),
+            )
+            overdue_rows = cur.fetchall()
+            cur.execute("SELECT list_id, project, COUNT(*) FROM tasks WHERE my_day_date=? GROUP BY list_id, project", (today,))
+            my_day_rows = cur.fetchall()
+            for column, rows in (("overdue", overdue_rows), ("my_day", my_day_rows)):
+                cur.executemany(
+                    f"UPDATE list_aggregates SET {column} = {column} + ? WHERE list_id=?",
+                    [(r[2], r[0]) for r in rows],
+                )
+                cur.executemany(
+                    f"UPDATE project_aggregates SET {column} = {column} + ? WHERE project=?",
+                    [(r[2], r[1]) for r in rows if r[1] is not None],
+                )
         except Exception:
-            pass
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        self._aggregate_day = today
+        return True
+
+    def list_aggregates(self):
+        self.refresh_aggregate_day()
+        cur = self.conn.cursor()
+        cur.execute("SELECT * FROM list_aggregates")
+        return {row["list_id"]: dict(row) for row in cur.fetchall()}
+
+    def project_aggregates(self):
+        self.refresh_aggregate_day()
+        cur = self.conn.cursor()
+        cur.execute("SELECT * FROM project_aggregates")
+        return {row["project"]: dict(row) for row in cur.fetchall()}
+
+    def project_aggregate(self, project):
+        """One project's aggregate row (primary-key lookup), or None when it has no tasks."""
+        self.refresh_aggregate_day()
+        cur = self.conn.cursor()
+        cur.execute("SELECT * FROM project_aggregates WHERE project=?", (project,))
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+    def system_aggregates(self):
+        """Totals for the system lists, summed from the per-list aggregates."""
+        self.refresh_aggregate_day()
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT SUM(my_day) AS my_day, SUM(planned) AS planned, SUM(important) AS important, "
+            "SUM(completed) AS completed, SUM(total) AS total FROM list_aggregates"
+        )
+        row = cur.fetchone()
+        totals = {k: (row[k] or 0) for k in row.keys()} if row else {}
+        return {
+            "My Day": totals.get("my_day", 0),
+            "Planned": totals.get("planned", 0),
+            "Important": totals.get("important", 0),
+            "Completed": totals.get("completed", 0),
+        }
 
     def _ensure_system_lists(self):
         ids = {}
@@ -1989,8 +7425,8 @@ class TaskStore:
         recurrence="none",
         recurrence_interval=0,
     ):
-        if self.count_tasks() >= TASK_CAP:
-            raise ValueError(f"Task cap of {TASK_CAP} reached. No new tasks created.")
+        if self.task_cap and self.count_tasks() >= self.task_cap:
+            raise ValueError(f"Task cap of {self.task_cap} reached. No new tasks created.")
         cur = self.conn.cursor()
         cur.execute("SELECT COALESCE(MAX(order_index), 0) + 1 FROM tasks WHERE list_id=?", (list_id,))
         next_order = cur.fetchone()[0]
@@ -2030,6 +7466,10 @@ class TaskStore:
         task_id = self._task_pk(task_uuid)
         if task_id is None:
             raise ValueError("Task not found.")
+        if "reminder" in fields and "reminder_fired_at" not in fields:
+            current = self.conn.execute("SELECT reminder FROM tasks WHERE id=?", (task_id,)).fetchone()
+            if current is None or current[0] != fields["reminder"]:
+                fields["reminder_fired_at"] = None
         sets = []
         params = []
         for key, value in fields.items():
@@ -2041,6 +7481,13 @@ class TaskStore:
         sql = f"UPDATE tasks SET {', '.join(sets)} WHERE id=?"
         cur = self.conn.cursor()
         cur.execute(sql, params)
+        if "dependency_task_ids" in fields:
+            rejected = self._link_dependencies(cur, [task_id])
+            if rejected:
+                self.conn.rollback()
+                raise ValueError("Dependency would create a cycle.")
+        if {"completed", "estimated_complexity", "dependency_task_ids"} & set(fields):
+            self._propagate_readiness(cur, [task_id])
         self.conn.commit()
 
     def delete_task(self, task_uuid):
@@ -2048,7 +7495,10 @@ class TaskStore:
         if task_id is None:
             return
         cur = self.conn.cursor()
+        cur.execute("SELECT task_id FROM task_deps WHERE depends_on=?", (task_id,))
+        dependents = [row[0] for row in cur.fetchall()]
         cur.execute("DELETE FROM tasks WHERE id=?", (task_id,))
+        self._propagate_readiness(cur, dependents)
         self.conn.commit()
 
     def set_complete(self, task_uuid, completed=True):
@@ -2078,27 +7528,49 @@ class TaskStore:
         self.conn.commit()
 
     def tasks_for_list(self, list_ref):
-        cur = self.conn.cursor()
+        rows = []
+        cursor = None
+        while True:
+            page, cursor = self.tasks_page(list_ref, after=cursor)
+            rows.extend(page)
+            if cursor is None:
+                return rows
+
+    def tasks_page(self, list_ref, after=None, limit=TASK_PAGE_SIZE):
+        """Return (rows, next_cursor) for one keyset page; next_cursor is None on the last page."""
         system = list_ref.get("system")
-        today = today_str()
-        base_query = "SELECT t.*, l.name AS list_name, l.scope AS list_scope, l.project AS list_project FROM tasks t JOIN lists l ON t.list_id=l.id"
+        where, keys, direction = TASK_LIST_VIEWS.get(system, TASK_LIST_VIEWS[None])
+        params = []
         if system == "My Day":
-            cur.execute(base_query + " WHERE t.my_day_date=? ORDER BY t.completed ASC, t.order_index ASC", (today,))
-            return [self._with_derived(dict(r)) for r in cur.fetchall()]
-        if system == "Planned":
-            cur.execute(base_query + " WHERE t.due_date IS NOT NULL ORDER BY t.due_date ASC, t.completed ASC", ())
-            return [self._with_derived(dict(r)) for r in cur.fetchall()]
-        if system == "Important":
-            cur.execute(base_query + " WHERE t.priority=1 ORDER BY t.completed ASC, t.order_index ASC", ())
-            return [self._with_derived(dict(r)) for r in cur.fetchall()]
-        if system == "Completed":
-            cur.execute(base_query + " WHERE t.completed=1 ORDER BY t.completed_at DESC", ())
-            return [self._with_derived(dict(r)) for r in cur.fetchall()]
-        cur.execute(
-            base_query + " WHERE t.list_id=? ORDER BY t.completed ASC, t.order_index ASC",
-            (list_ref["id"],),
+            params.append(today_str())
+        elif system is None or system not in TASK_LIST_VIEWS:
+            params.append(list_ref["id"])
+        key_cols = ", ".join(keys)
+        key_select = ", ".join(f"{col} AS _k{i}" for i, col in enumerate(keys))
+        clauses = [where]
+        if after is not None:
+            op = ">" if direction == "ASC" else "<"
+            clauses.append(f"({key_cols}) {op} ({', '.join('?' for _ in keys)})")
+            params.extend(after)
+        order = ", ".join(f"{col} {direction}" for col in keys)
+        sql = (
+            f"SELECT t.*, l.name AS list_name, l.scope AS list_scope, l.project AS list_project, {key_select} "
+            f"FROM tasks t CROSS JOIN lists l ON t.list_id=l.id WHERE {' AND '.join(clauses)} ORDER BY {order} LIMIT ?"
         )
-        return [self._with_derived(dict(r)) for r in cur.fetchall()]
+        params.append(int(limit) + 1)
+        cur = self.conn.cursor()
+        cur.execute(sql, params)
+        fetched = cur.fetchall()
+        has_more = len(fetched) > limit
+        fetched = fetched[:limit]
+        rows = []
+        for r in fetched:
+            row = dict(r)
+            for i in range(len(keys)):
+                row.pop(f"_k{i}", None)
+            rows.append(self._with_derived(row))
+        next_cursor = tuple(fetched[-1][f"_k{i}"] for i in range(len(keys))) if has_more and fetched else None
+        return rows, next_cursor
 
     def _with_derived(self, row):
         status = row.get("status") or ("completed" if row.get("completed") else "pending")
@@ -2112,7 +7584,8 @@ class TaskStore:
         derived = {
             "completion_percent": 1.0 if status == "completed" else (0.5 if status == "in_progress" else 0.0),
             "is_overdue": is_overdue,
-            "has_blockers": status == "blocked",
+            "has_blockers": status == "blocked" or bool(row.get("open_deps")),
+            "ready": status != "completed" and row.get("open_deps") == 0,
         }
         row["derived"] = derived
         return row
@@ -2143,7 +7616,8 @@ class TaskStore:
     def get_task(self, task_uuid):
         cur = self.conn.cursor()
         cur.execute(
-            "SELECT t.*, l.name AS list_name, l.scope AS list_scope, l.project AS list_project FROM tasks t JOIN lists l ON t.list_id=l.id WHERE t.uuid=?",
+            "SELECT t.*, l.name AS list_name, l.scope AS list_scope, l.project AS list_project, r.open_deps, r.chain "
+            "FROM tasks t JOIN lists l ON t.list_id=l.id LEFT JOIN task_readiness r ON r.task_id=t.id WHERE t.uuid=?",
             (task_uuid,),
         )
         row = cur.fetchone()
@@ -2161,178 +7635,393 @@ class TaskStore:
             dt = datetime.strptime(base_date, "%Y-%m-%d").date()
         except ValueError:
             dt = date.today()
-        if rec == "daily":
-            dt += timedelta(days=1)
-        elif rec == "weekly":
-            dt += timedelta(days=7)
-        elif rec == "monthly":
-            dt += timedelta(days=30)
-        elif rec == "custom":
-            interval = row["recurrence_interval"] or 0
-            dt += timedelta(days=max(1, interval))
-        return dt.isoformat()
+        nxt = next_occurrence(rec, row["recurrence_interval"], dt)
+        return nxt.isoformat() if nxt else None
+
+    def _recurrence_interval(self, row):
+        interval = row["recurrence_interval"]
+        if row["recurrence"] == "monthly" and not interval and row["due_date"]:
+            # Pin the day of month so Jan 31 -> Feb 28 -> Mar 31 instead of drifting to the 28th.
+            try:
+                interval = date.fromisoformat(row["due_date"]).day
+            except ValueError:
+                pass
+        return interval
+
+    def _insert_occurrence(self, cur, row, due_date):
+        reminder = row["reminder"]
+        if reminder and row["due_date"]:
+            # Keep the reminder at the same offset from the due date.
+            try:
+                shift = date.fromisoformat(due_date) - date.fromisoformat(row["due_date"])
+                reminder = (datetime.fromisoformat(reminder) + shift).isoformat()
+            except ValueError:
+                pass
+        interval = self._recurrence_interval(row)
+        now = now_str()
+        cur.execute("SELECT COALESCE(MAX(order_index), 0) + 1 FROM tasks WHERE list_id=?", (row["list_id"],))
+        next_order = cur.fetchone()[0]
+        task_uuid = str(uuid.uuid4())
+        cur.execute(
+            """
+            INSERT INTO tasks (list_id, uuid, title, notes, due_date, reminder, priority, completed, status,
+                               created_at, updated_at, project, order_index, recurrence, recurrence_interval,
+                               estimated_complexity)
+            VALUES (?,?,?,?,?,?,?,0,'pending',?,?,?,?,?,?,?)
+            """,
+            (
+                row["list_id"],
+                task_uuid,
+                row["title"],
+                row["notes"],
+                due_date,
+                reminder,
+                1 if row["priority"] else 0,
+                now,
+                now,
+                row["project"],
+                next_order,
+                row["recurrence"],
+                interval,
+                row["estimated_complexity"],
+            ),
+        )
+        cur.execute("UPDATE tasks SET source_id=? WHERE id=?", (str(cur.lastrowid), cur.lastrowid))
+        cur.execute("UPDATE tasks SET recurrence_spawned=1 WHERE uuid=?", (row["uuid"],))
+        return task_uuid
 
     def spawn_recurrence(self, row):
         next_due = self.recurrence_next_due(row)
         if not next_due:
             return None
-        return self.add_task(
-            row["list_id"],
-            row["title"],
-            project=row["project"],
-            notes=row["notes"],
-            due_date=next_due,
-            reminder=row["reminder"],
-            priority=bool(row["priority"]),
-            recurrence=row["recurrence"],
-            recurrence_interval=row["recurrence_interval"],
+        current = self.get_task(row["uuid"])
+        if not current or current.get("recurrence_spawned"):
+            return None
+        if self.task_cap and self.count_tasks() >= self.task_cap:
+            raise ValueError(f"Task cap reached ({self.task_cap}).")
+        cur = self.conn.cursor()
+        task_uuid = self._insert_occurrence(cur, current, next_due)
+        self.conn.commit()
+        return task_uuid
+
+    def upcoming_reminders(self, until):
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT uuid, reminder FROM tasks WHERE reminder IS NOT NULL AND reminder_fired_at IS NULL AND completed=0 "
+            "AND reminder <= ? ORDER BY reminder",
+            (until,),
         )
+        return [(row["uuid"], row["reminder"]) for row in cur.fetchall()]
 
-    def export_csv(self, path, atlas_format=False):
-        # Export a richer task payload so import/export is symmetric and lossless for user-facing fields.
+    def recurrence_heads(self):
+        """Unspawned recurring tasks with the date their next occurrence becomes due."""
         cur = self.conn.cursor()
         cur.execute(
-            """
-            SELECT
-                t.uuid,
-                t.source_id,
-                t.title,
-                t.notes,
-                t.due_date,
-                t.reminder,
-                t.priority,
-                t.completed,
-                t.status,
-                t.created_at,
-                t.updated_at,
-                t.completed_at,
-                t.project,
-                t.order_index,
-                t.recurrence,
-                t.recurrence_interval,
-                t.my_day_date,
-                t.phase_id,
-                t.operation_id,
-                t.function_id,
-                t.job_id,
-                t.atlas_task_id,
-                t.source_atlas_file,
-                t.source_section,
-                t.dependency_task_ids,
-                t.estimated_complexity,
-                l.name as list_name,
-                l.scope as list_scope
-            FROM tasks t
-            JOIN lists l ON t.list_id=l.id
-            WHERE l.scope != 'system'
-            ORDER BY t.list_id, t.order_index ASC
-            """
+            "SELECT uuid, due_date, recurrence, recurrence_interval FROM tasks "
+            "WHERE recurrence IS NOT NULL AND recurrence <> 'none' AND recurrence_spawned=0"
         )
-        rows = [dict(r) for r in cur.fetchall()]
-        if atlas_format:
-            atlas_fields = [
-                "phase_id",
-                "operation_id",
-                "function_id",
-                "job_id",
-                "task_id",
-                "task_name",
-                "task_description",
-                "source_atlas_file",
-                "source_section",
-                "dependency_task_ids",
-                "estimated_complexity",
-                "status",
-            ]
-            with open(path, "w", encoding="utf-8", newline="") as fh:
-                writer = csv.DictWriter(fh, fieldnames=atlas_fields)
-                writer.writeheader()
-                for row in rows:
-                    status_raw = row.get("status") or "pending"
-                    writer.writerow(
-                        {
-                            "phase_id": row.get("phase_id") or "",
-                            "operation_id": row.get("operation_id") or "",
-                            "function_id": row.get("function_id") or "",
-                            "job_id": row.get("job_id") or "",
-                            "task_id": row.get("atlas_task_id") or row.get("source_id") or "",
-                            "task_name": row.get("title") or "",
-                            "task_description": row.get("notes") or "",
-                            "source_atlas_file": row.get("source_atlas_file") or "",
-                            "source_section": row.get("source_section") or "",
-                            "dependency_task_ids": row.get("dependency_task_ids") or "",
-                            "estimated_complexity": row.get("estimated_complexity") or "",
-                            "status": status_raw.replace("_", " ").title(),
-                        }
-                    )
-            return
+        heads = []
+        for row in cur.fetchall():
+            next_due = self.recurrence_next_due(row)
+            if next_due:
+                heads.append((row["uuid"], next_due))
+        return heads
+
+    def mark_reminders_fired(self, task_uuids):
+        if not task_uuids:
+            return []
+        cur = self.conn.cursor()
+        fired = []
+        stamp = now_str()
+        cur.execute("BEGIN")
+        try:
+            for task_uuid in task_uuids:
+                cur.execute(
+                    "UPDATE tasks SET reminder_fired_at=? WHERE uuid=? AND reminder_fired_at IS NULL AND completed=0 "
+                    "AND reminder IS NOT NULL AND reminder <= ?",
+                    (stamp, task_uuid, stamp),
+                )
+                if cur.rowcount:
+                    fired.append(task_uuid)
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return fired
 
-        fieldnames = [
-            "uuid",
-            "source_id",
-            "title",
-            "notes",
-            "due_date",
-            "reminder",
-            "priority",
-            "completed",
-            "status",
-            "created_at",
-            "updated_at",
-            "completed_at",
-            "project",
-            "list_name",
-            "list_scope",
-            "order_index",
-            "recurrence",
-            "recurrence_interval",
-            "my_day_date",
-            "phase_id",
-            "operation_id",
-            "function_id",
-            "job_id",
-            "atlas_task_id",
-            "source_atlas_file",
-            "source_section",
-            "dependency_task_ids",
-            "estimated_complexity",
-        ]
-        with open(path, "w", encoding="utf-8", newline="") as fh:
-            writer = csv.DictWriter(fh, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in rows:
-                writer.writerow(
-                    {
-                        "uuid": row.get("uuid") or "",
-                        "source_id": row.get("source_id") or "",
-                        "title": row.get("title") or "",
-                        "notes": row.get("notes") or "",
-                        "due_date": row.get("due_date") or "",
-                        "reminder": row.get("reminder") or "",
-                        "priority": int(bool(row.get("priority"))),
-                        "completed": int(bool(row.get("completed"))),
-                        "status": row.get("status") or "pending",
-                        "created_at": row.get("created_at") or "",
-                        "updated_at": row.get("updated_at") or "",
-                        "completed_at": row.get("completed_at") or "",
-                        "project": row.get("project") or "",
-                        "list_name": row.get("list_name") or "",
-                        "list_scope": row.get("list_scope") or "",
-                        "order_index": row.get("order_index") if row.get("order_index") is not None else "",
-                        "recurrence": row.get("recurrence") or "none",
-                        "recurrence_interval": row.get("recurrence_interval") if row.get("recurrence_interval") is not None else 0,
-                        "my_day_date": row.get("my_day_date") or "",
-                        "phase_id": row.get("phase_id") or "",
-                        "operation_id": row.get("operation_id") or "",
-                        "function_id": row.get("function_id") or "",
-                        "job_id": row.get("job_id") or "",
-                        "atlas_task_id": row.get("atlas_task_id") or "",
-                        "source_atlas_file": row.get("source_atlas_file") or "",
-                        "source_section": row.get("source_section") or "",
-                        "dependency_task_ids": row.get("dependency_task_ids") or "",
-                        "estimated_complexity": row.get("estimated_complexity") or "",
-                    }
+    def spawn_due_recurrences(self, task_uuids, today=None):
+        """Spawn the occurrence due by ``today`` for each head, all in one transaction.
+
+        After a long sleep only the latest missed occurrence of a series is created, not one per missed period.
+        """
+        today = today or date.today()
+        spawned = []
+        cur = self.conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            for task_uuid in task_uuids:
+                cur.execute(
+                    "SELECT * FROM tasks WHERE uuid=? AND recurrence IS NOT NULL AND recurrence <> 'none' AND recurrence_spawned=0",
+                    (task_uuid,),
                 )
+                row = cur.fetchone()
+                next_due = self.recurrence_next_due(row) if row else None
+                if not next_due or date.fromisoformat(next_due) > today:
+                    continue
+                due = date.fromisoformat(next_due)
+                interval = self._recurrence_interval(row)
+                while True:
+                    following = next_occurrence(row["recurrence"], interval, due)
+                    if not following or following > today:
+                        break
+                    due = following
+                if self.task_cap and self.count_tasks() >= self.task_cap:
+                    break
+                spawned.append(self._insert_occurrence(cur, row, due.isoformat()))
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return spawned
+
+    EXPORT_COLUMNS = (
+        "uuid",
+        "source_id",
+        "title",
+        "notes",
+        "due_date",
+        "reminder",
+        "priority",
+        "completed",
+        "status",
+        "created_at",
+        "updated_at",
+        "completed_at",
+        "project",
+        "list_name",
+        "list_scope",
+        "order_index",
+        "recurrence",
+        "recurrence_interval",
+        "my_day_date",
+        "phase_id",
+        "operation_id",
+        "function_id",
+        "job_id",
+        "atlas_task_id",
+        "source_atlas_file",
+        "source_section",
+        "dependency_task_ids",
+        "estimated_complexity",
+    )
+    ATLAS_COLUMNS = (
+        "phase_id",
+        "operation_id",
+        "function_id",
+        "job_id",
+        "task_id",
+        "task_name",
+        "task_description",
+        "source_atlas_file",
+        "source_section",
+        "dependency_task_ids",
+        "estimated_complexity",
+        "status",
+    )
+
+    def export_csv(self, path, atlas_format=False):
+        return self.export_tasks(path, fmt="atlas_csv" if atlas_format else "csv")
+
+    @staticmethod
+    def export_format_for_path(path):
+        """(format, compression) implied by a file name such as tasks.jsonl.gz or plan.tasks.csv."""
+        name = str(path).lower()
+        compression = None
+        if name.endswith(".gz"):
+            compression, name = "gzip", name[:-3]
+        elif name.endswith(".zst"):
+            compression, name = "zstd", name[:-4]
+        if name.endswith(".tasks.csv"):
+            return "atlas_csv", compression
+        if name.endswith(".jsonl"):
+            return "jsonl", compression
+        if name.endswith(".json"):
+            return "json", compression
+        return "csv", compression
+
+    def _export_where(self, filters):
+        clauses = ["l.scope != 'system'"]
+        params = []
+        filters = filters or {}
+        if filters.get("project"):
+            clauses.append("t.project = ?")
+            params.append(filters["project"])
+        if filters.get("list_id") is not None:
+            clauses.append("t.list_id = ?")
+            params.append(int(filters["list_id"]))
+        statuses = filters.get("status")
+        if statuses:
+            statuses = [statuses] if isinstance(statuses, str) else list(statuses)
+            clauses.append(f"t.status IN ({','.join('?' for _ in statuses)})")
+            params.extend(statuses)
+        date_field = filters.get("date_field") or "due_date"
+        if date_field not in TASK_EXPORT_DATE_FIELDS:
+            raise ValueError(f"Unsupported export date field: {date_field}")
+        if filters.get("date_from"):
+            clauses.append(f"t.{date_field} >= ?")
+            params.append(filters["date_from"])
+        if filters.get("date_to"):
+            # Inclusive end date; timestamps on that day sort below the next day's prefix.
+            clauses.append(f"t.{date_field} < ?")
+            params.append((date.fromisoformat(filters["date_to"][:10]) + timedelta(days=1)).isoformat())
+        return " AND ".join(clauses), params
+
+    def _open_export_stream(self, path, compression):
+        if compression == "gzip":
+            return io.TextIOWrapper(gzip.open(path, "wb"), encoding="utf-8", newline="")
+        if compression == "zstd":
+            if zstandard is None:
+                raise ValueError("zstd export requires the 'zstandard' package.")
+            raw = open(path, "wb")
+            return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw, closefd=True), encoding="utf-8", newline="")
+        if compression:
+            raise ValueError(f"Unsupported compression: {compression}")
+        return open(path, "w", encoding="utf-8", newline="")
+
+    def _export_record(self, row):
+        return {
+            "uuid": row["uuid"] or "",
+            "source_id": row["source_id"] or "",
+            "title": row["title"] or "",
+            "notes": row["notes"] or "",
+            "due_date": row["due_date"] or "",
+            "reminder": row["reminder"] or "",
+            "priority": int(bool(row["priority"])),
+            "completed": int(bool(row["completed"])),
+            "status": row["status"] or "pending",
+            "created_at": row["created_at"] or "",
+            "updated_at": row["updated_at"] or "",
+            "completed_at": row["completed_at"] or "",
+            "project": row["project"] or "",
+            "list_name": row["list_name"] or "",
+            "list_scope": row["list_scope"] or "",
+            "order_index": row["order_index"] if row["order_index"] is not None else "",
+            "recurrence": row["recurrence"] or "none",
+            "recurrence_interval": row["recurrence_interval"] if row["recurrence_interval"] is not None else 0,
+            "my_day_date": row["my_day_date"] or "",
+            "phase_id": row["phase_id"] or "",
+            "operation_id": row["operation_id"] or "",
+            "function_id": row["function_id"] or "",
+            "job_id": row["job_id"] or "",
+            "atlas_task_id": row["atlas_task_id"] or "",
+            "source_atlas_file": row["source_atlas_file"] or "",
+            "source_section": row["source_section"] or "",
+            "dependency_task_ids": row["dependency_task_ids"] or "",
+            "estimated_complexity": row["estimated_complexity"] or "",
+        }
+
+    def _atlas_record(self, row):
+        status_raw = row["status"] or "pending"
+        return {
+            "phase_id": row["phase_id"] or "",
+            "operation_id": row["operation_id"] or "",
+            "function_id": row["function_id"] or "",
+            "job_id": row["job_id"] or "",
+            "task_id": row["atlas_task_id"] or row["source_id"] or "",
+            "task_name": row["title"] or "",
+            "task_description": row["notes"] or "",
+            "source_atlas_file": row["source_atlas_file"] or "",
+            "source_section": row["source_section"] or "",
+            "dependency_task_ids": row["dependency_task_ids"] or "",
+            "estimated_complexity": row["estimated_complexity"] or "",
+            "status": status_raw.replace("_", " ").title(),
+        }
+
+    def export_tasks(self, path, fmt=None, compression=None, filters=None, progress=None, cancelled=None):
+        """Stream tasks to ``path`` in chunks; safe to call from a worker thread.
+
+        Uses its own read connection (a consistent WAL snapshot) and writes to a temp file that
+        replaces ``path`` only on success. ``progress(done, total)`` is called once per chunk.
+        """
+        guessed_fmt, guessed_compression = self.export_format_for_path(path)
+        fmt = fmt or guessed_fmt
+        compression = compression if compression is not None else guessed_compression
+        if fmt not in {"atlas_csv", "csv", "jsonl", "json"}:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        where, params = self._export_where(filters)
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        tmp_path = f"{path}.part"
+        written = 0
+        try:
+            cur = conn.cursor()
+            cur.execute("BEGIN")
+            cur.execute(f"SELECT COUNT(*) FROM tasks t JOIN lists l ON t.list_id=l.id WHERE {where}", params)
+            total = cur.fetchone()[0]
+            select_cols = ", ".join(f"t.{c}" for c in self.EXPORT_COLUMNS if c not in {"list_name", "list_scope"})
+            cur.execute(
+                f"SELECT {select_cols}, t.list_id, l.name AS list_name, l.scope AS list_scope "
+                f"FROM tasks t JOIN lists l ON t.list_id=l.id WHERE {where} ORDER BY t.list_id, t.order_index ASC",
+                params,
+            )
+            with self._open_export_stream(tmp_path, compression) as fh:
+                if fmt in {"atlas_csv", "csv"}:
+                    columns = self.ATLAS_COLUMNS if fmt == "atlas_csv" else self.EXPORT_COLUMNS
+                    to_record = self._atlas_record if fmt == "atlas_csv" else self._export_record
+                    writer = csv.DictWriter(fh, fieldnames=columns)
+                    writer.writeheader()
+
+                    def write_chunk(rows):
+                        writer.writerows(to_record(r) for r in rows)
+
+                elif fmt == "jsonl":
+
+                    def write_chunk(rows):
+                        fh.writelines(json.dumps(self._export_record(r)) + "\n" for r in rows)
+
+                else:
+                    # Same {"lists", "tasks"} shape the decomposition import produces, streamed one task at a time.
+                    lists_cur = conn.cursor()
+                    lists_cur.execute(
+                        f"SELECT id, name, scope, project FROM lists WHERE id IN "
+                        f"(SELECT DISTINCT t.list_id FROM tasks t JOIN lists l ON t.list_id=l.id WHERE {where}) ORDER BY id",
+                        params,
+                    )
+                    fh.write('{"lists": ')
+                    fh.write(json.dumps([dict(r) for r in lists_cur.fetchall()]))
+                    fh.write(', "tasks": [')
+                    first = [True]
+
+                    def write_chunk(rows):
+                        for r in rows:
+                            record = self._export_record(r)
+                            record["id"] = record["source_id"] or record["uuid"]
+                            record["list_id"] = r["list_id"]
+                            fh.write(("" if first[0] else ", ") + json.dumps(record))
+                            first[0] = False
+
+                while True:
+                    if cancelled and cancelled():
+                        raise InterruptedError("Export cancelled.")
+                    rows = cur.fetchmany(TASK_EXPORT_CHUNK_ROWS)
+                    if not rows:
+                        break
+                    write_chunk(rows)
+                    written += len(rows)
+                    if progress:
+                        progress(written, total)
+                if fmt == "json":
+                    fh.write("]}\n")
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        finally:
+            conn.close()
+        return {"path": str(path), "format": fmt, "compression": compression, "rows": written}
 
     def _validate_task_payload(self, task):
         status = task.get("status", "pending")
@@ -2344,12 +8033,13 @@ class TaskStore:
         with open(path, "r", encoding="utf-8") as fh:
             reader = csv.DictReader(fh)
             rows = list(reader)
-        if len(rows) + self.count_tasks() > TASK_CAP:
-            raise ValueError(f"Task import would exceed cap of {TASK_CAP}.")
+        if self.task_cap and len(rows) + self.count_tasks() > self.task_cap:
+            raise ValueError(f"Task import would exceed cap of {self.task_cap}.")
 
         atlas_format = self._is_atlas_format(reader.fieldnames or [])
         cur = self.conn.cursor()
         cur.execute("BEGIN")
+        imported_ids = []
 
         def _parse_bool(value):
             if value is None:
@@ -2491,7 +8181,13 @@ class TaskStore:
                     extra_fields.get("estimated_complexity") or None,
                 ),
             )
+            if cur.rowcount == 1:
+                imported_ids.append(cur.lastrowid)
+        # Edges are linked after every row is in, so forward references within the file resolve.
+        rejected = self._link_dependencies(cur, imported_ids)
+        self._propagate_readiness(cur, imported_ids)
         self.conn.commit()
+        return {"imported": len(imported_ids), "dependency_cycles": rejected}
 
     def transition_status(self, task_uuid, new_status):
         if new_status not in TASK_STATUS_VALUES:
@@ -2511,28 +8207,658 @@ class TaskStore:
 
     def count_tasks(self):
         cur = self.conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM tasks;")
+        cur.execute("SELECT value FROM store_meta WHERE key='task_count'")
         row = cur.fetchone()
         return row[0] if row else 0
 
+    def project_index(self):
+        cur = self.conn.cursor()
+        cur.execute("SELECT * FROM project_index")
+        entries = {}
+        for row in cur.fetchall():
+            entry = dict(row)
+            try:
+                entry["languages"] = {k: tuple(v) for k, v in json.loads(entry["languages"] or "{}").items()}
+            except (TypeError, ValueError):
+                entry["languages"] = {}
+            entry["git_dirty"] = None if entry["git_dirty"] is None else bool(entry["git_dirty"])
+            entries[entry["project"]] = entry
+        return entries
+
+    def save_project_index(self, entries):
+        if not entries:
+            return
+        self.conn.executemany(
+            """
+            INSERT OR REPLACE INTO project_index
+                (project, root_mtime, size_bytes, file_count, languages, newest_mtime, git_head, git_dirty, indexed_at)
+            VALUES (?,?,?,?,?,?,?,?,?)
+            """,
+            [
+                (
+                    e["project"],
+                    e.get("root_mtime"),
+                    int(e.get("size_bytes") or 0),
+                    int(e.get("file_count") or 0),
+                    json.dumps(e.get("languages") or {}),
+                    e.get("newest_mtime"),
+                    e.get("git_head"),
+                    None if e.get("git_dirty") is None else int(bool(e["git_dirty"])),
+                    e.get("indexed_at"),
+                )
+                for e in entries
+            ],
+        )
+        self.conn.commit()
+
+    def forget_project_index(self, projects):
+        if not projects:
+            return
+        self.conn.executemany("DELETE FROM project_index WHERE project=?", [(p,) for p in projects])
+        self.conn.commit()
+
     def project_incomplete_count(self, project_name):
         cur = self.conn.cursor()
         cur.execute(
-            "SELECT COUNT(*) FROM tasks WHERE project=? AND completed=0",
+            "SELECT total - completed FROM project_aggregates WHERE project=?",
             (project_name,),
         )
         row = cur.fetchone()
         return row[0] if row else 0
 
 
+class TaskScheduler(QtCore.QObject):
+    """Min-heap of reminder and recurrence deadlines behind a single QTimer."""
+
+    reminders_due = QtCore.pyqtSignal(list)
+    occurrences_spawned = QtCore.pyqtSignal(list)
+
+    HORIZON = timedelta(days=2)
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._heap = []
+        self._horizon_end = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timeout)
+        self._reload_pending = False
+
+    def start(self):
+        self.reload()
+
+    def stop(self):
+        self._timer.stop()
+        self._heap.clear()
+
+    def invalidate(self):
+        # Coalesce bursts of task edits into one reload on the next event-loop turn.
+        if self._reload_pending:
+            return
+        self._reload_pending = True
+        QtCore.QTimer.singleShot(0, self.reload)
+
+    def reload(self):
+        self._reload_pending = False
+        now = datetime.now()
+        self._horizon_end = now + self.HORIZON
+        heap = []
+        # Reminders beyond the horizon are picked up by the reload armed at the horizon itself.
+        for task_uuid, reminder in self.store.upcoming_reminders(self._horizon_end.isoformat()):
+            try:
+                when = datetime.fromisoformat(reminder)
+            except ValueError:
+                continue
+            heap.append((when, "reminder", task_uuid))
+        for task_uuid, next_due in self.store.recurrence_heads():
+            try:
+                when = datetime.combine(date.fromisoformat(next_due), datetime.min.time())
+            except ValueError:
+                continue
+            heap.append((when, "recurrence", task_uuid))
+        heapq.heapify(heap)
+        self._heap = heap
+        self._arm()
+
+    def _arm(self):
+        self._timer.stop()
+        deadline = self._heap[0][0] if self._heap else self._horizon_end
+        if self._horizon_end and deadline > self._horizon_end:
+            deadline = self._horizon_end
+        if deadline is None:
+            return
+        delay_ms = int((deadline - datetime.now()).total_seconds() * 1000)
+        self._timer.start(max(0, min(delay_ms, SCHEDULER_MAX_SLEEP_MS)))
+
+    def _on_timeout(self):
+        now = datetime.now()
+        if self._horizon_end and now >= self._horizon_end:
+            self.reload()
+            now = datetime.now()
+        reminders, recurrences = [], []
+        # Everything already due (including deadlines missed during sleep) is handled in one batch.
+        while self._heap and self._heap[0][0] <= now:
+            _, kind, task_uuid = heapq.heappop(self._heap)
+            (reminders if kind == "reminder" else recurrences).append(task_uuid)
+        if recurrences:
+            spawned = self.store.spawn_due_recurrences(recurrences, today=now.date())
+            if spawned:
+                self.occurrences_spawned.emit(spawned)
+                self.invalidate()
+        if reminders:
+            fired = self.store.mark_reminders_fired(reminders)
+            if fired:
+                self.reminders_due.emit(fired)
+        self._arm()
+
+    def pending(self):
+        return len(self._heap)
+
+
+class ProjectIndexer(QtCore.QObject):
+    """Per-project size/file/language/git index built off the UI thread, cached in TaskStore, refreshed on change."""
+
+    indexed = QtCore.pyqtSignal(list)
+
+    def __init__(self, store, root=PROJECT_ROOT, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.root = root
+        self.entries = store.project_index()
+        self._queue = {}  # insertion-ordered set of projects awaiting a re-index
+        self._busy = False
+        self._stopped = False
+        self._watch_paths = {}  # project -> watched paths
+        self._path_project = {}
+        self._watcher = QtCore.QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_path_changed)
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(PROJECT_INDEX_DEBOUNCE_MS)
+        self._timer.timeout.connect(self._drain)
+        self._stale_timer = QtCore.QTimer(self)
+        self._stale_timer.setInterval(PROJECT_INDEX_SWEEP_SECS * 1000)
+        self._stale_timer.timeout.connect(self._queue_stale)
+        self._stale_timer.start()
+        self.stats = {"indexed": 0, "events": 0, "watches": 0}
+
+    def entry(self, project):
+        return self.entries.get(project)
+
+    def sync(self, projects):
+        """Reconcile with a fresh scan ({name: root dir mtime}); only new or changed projects are walked.
+
+        Age alone never queues a walk here; the rate-limited stale sweep picks those up a few at a time.
+        """
+        vanished = [name for name in self.entries if name not in projects]
+        if vanished:
+            for name in vanished:
+                self.entries.pop(name, None)
+                self._unwatch(name)
+                self._queue.pop(name, None)
+            self.store.forget_project_index(vanished)
+        for name, root_mtime in projects.items():
+            entry = self.entries.get(name)
+            if entry is None or entry.get("root_mtime") != root_mtime:
+                self._queue[name] = True
+            elif name not in self._watch_paths:
+                # Cached and current: watch the root and .git now; deeper directories are added on the next walk.
+                path = os.path.join(self.root, name)
+                self._watch(name, [path, os.path.join(path, ".git")])
+        if self._queue and not self._busy:
+            self._timer.start(0)
+
+    def invalidate(self, project):
+        if self._stopped or not project:
+            return
+        self._queue[project] = True
+        # No restart: a steady stream of events (builds, checkouts) must not postpone indexing forever.
+        if not self._timer.isActive() and not self._busy:
+            self._timer.start(PROJECT_INDEX_DEBOUNCE_MS)
+
+    def stop(self):
+        self._stopped = True
+        self._timer.stop()
+        self._stale_timer.stop()
+        self._queue.clear()
+        paths = self._watcher.directories()
+        if paths:
+            self._watcher.removePaths(paths)
+
+    def _queue_stale(self):
+        cutoff = time.time() - PROJECT_INDEX_STALE_SECS
+        stale = (
+            ((entry.get("indexed_at") or 0), name)
+            for name, entry in self.entries.items()
+            if name not in self._queue and (entry.get("indexed_at") or 0) < cutoff
+        )
+        for _, name in heapq.nsmallest(PROJECT_INDEX_SWEEP_MAX, stale):
+            self.invalidate(name)
+
+    def _on_path_changed(self, path):
+        project = self._path_project.get(path)
+        if project:
+            self.stats["events"] += 1
+            self.invalidate(project)
+
+    def _drain(self):
+        if self._busy or self._stopped or not self._queue:
+            return
+        batch = list(self._queue)[:PROJECT_INDEX_BATCH]
+        for name in batch:
+            self._queue.pop(name, None)
+        self._busy = True
+        worker = Worker(self._index_batch, batch)
+        worker.signals.result.connect(self._on_indexed, QtCore.Qt.QueuedConnection)
+        worker.signals.error.connect(self._on_index_error, QtCore.Qt.QueuedConnection)
+        QtCore.QThreadPool.globalInstance().start(worker)
+
+    def _index_batch(self, projects):
+        results = []
+        for name in projects:
+            path = os.path.join(self.root, name)
+            try:
+                root_mtime = os.stat(path).st_mtime
+            except OSError:
+                results.append((name, None))
+                continue
+            stats = index_project_tree(path)
+            git_dir = os.path.join(path, ".git")
+            if os.path.isdir(git_dir):
+                stats["dirs"].append(git_dir)
+            stats.update(
+                {
+                    "project": name,
+                    "root_mtime": root_mtime,
+                    "git_head": read_git_head(path),
+                    "git_dirty": git_worktree_dirty(path),
+                    "indexed_at": time.time(),
+                }
+            )
+            results.append((name, stats))
+        return results
+
+    def _on_index_error(self, err):
+        self._busy = False
+        if self._queue and not self._stopped:
+            self._timer.start(PROJECT_INDEX_DEBOUNCE_MS)
+
+    def _on_indexed(self, results):
+        self._busy = False
+        if self._stopped:
+            return
+        changed, fresh = [], []
+        for name, stats in results:
+            if stats is None:
+                if self.entries.pop(name, None) is not None:
+                    self.store.forget_project_index([name])
+                    changed.append(name)
+                self._unwatch(name)
+                continue
+            self._watch(name, stats.pop("dirs"))
+            previous = self.entries.get(name)
+            self.entries[name] = stats
+            fresh.append(stats)
+            self.stats["indexed"] += 1
+            if previous is None or any(previous.get(k) != stats.get(k) for k in ("size_bytes", "file_count", "languages", "newest_mtime", "git_head", "git_dirty")):
+                changed.append(name)
+        self.store.save_project_index(fresh)
+        if changed:
+            self.indexed.emit(changed)
+        if self._queue:
+            self._timer.start(0)
+
+    def _watch(self, project, paths):
+        self._unwatch(project)
+        budget = PROJECT_INDEX_MAX_WATCHES - len(self._path_project)
+        # Shallow directories first so a truncated watch set still covers the most likely edit targets.
+        paths = sorted(paths, key=lambda p: p.count(os.sep))[: max(0, budget)]
+        failed = set(self._watcher.addPaths(paths) or []) if paths else set()
+        watched = [p for p in paths if p not in failed]
+        self._watch_paths[project] = watched
+        for path in watched:
+            self._path_project[path] = project
+        self.stats["watches"] = len(self._path_project)
+
+    def _unwatch(self, project):
+        paths = self._watch_paths.pop(project, None)
+        if not paths:
+            return
+        for path in paths:
+            self._path_project.pop(path, None)
+        self._watcher.removePaths(paths)
+        self.stats["watches"] = len(self._path_project)
+
+
+class JsonFileStore(QtCore.QObject):
+    """Dirty-tracked JSON file: edits are debounced and written atomically off the UI thread."""
+
+    def __init__(self, path, get_data, delay_ms=PERSIST_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.path = Path(path)
+        self.get_data = get_data
+        self._dirty = False
+        self._generation = 0
+        self._written_generation = 0
+        self._last_text = None
+        self._last_stat = None
+        self._write_lock = threading.Lock()
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.flush)
+        self.stats = {"marks": 0, "writes": 0, "skipped": 0, "failed": 0}
+
+    def mark_dirty(self):
+        self._dirty = True
+        self.stats["marks"] += 1
+        # Restarting the timer keeps pushing the write out while edits keep arriving (slider drags etc.).
+        self._timer.start()
+
+    def flush(self, sync=False):
+        self._timer.stop()
+        if not self._dirty:
+            return
+        self._dirty = False
+        # Serialize on the caller's thread so the worker never sees a dict that is still being mutated.
+        try:
+            text = json.dumps(self.get_data(), indent=2)
+        except (TypeError, ValueError):
+            return
+        self._generation += 1
+        if sync:
+            error = self._write(text, self._generation)
+            if error:
+                raise OSError(f"{self.path}: {error}")
+        else:
+            QtCore.QThreadPool.globalInstance().start(Worker(self._write, text, self._generation))
+
+    def _write(self, text, generation):
+        with self._write_lock:
+            if generation <= self._written_generation:
+                return
+            if text == self._last_text and file_stat_key(self.path) == self._last_stat:
+                self._written_generation = generation
+                self.stats["skipped"] += 1
+                return
+            try:
+                self._rotate_backups()
+                atomic_write_text(self.path, text)
+            except Exception as exc:  # noqa: BLE001
+                self.stats["failed"] += 1
+                return str(exc)
+            self._last_text = text
+            self._last_stat = file_stat_key(self.path)
+            self._written_generation = generation
+            self.stats["writes"] += 1
+
+    def _rotate_backups(self):
+        if not self.path.exists():
+            return
+        newest = self.path.with_name(f"{self.path.name}.bak.1")
+        try:
+            if newest.exists() and time.time() - newest.stat().st_mtime < PERSIST_BACKUP_INTERVAL:
+                return
+        except OSError:
+            pass
+        for idx in range(PERSIST_BACKUPS - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.bak.{idx}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.bak.{idx + 1}"))
+        shutil.copy2(self.path, newest)
+
+
+class ManifestCache:
+    """Per-project .project.json cache validated by (mtime_ns, size); writes only real changes, atomically."""
+
+    def __init__(self, root=PROJECT_ROOT, on_dirty=None):
+        self.root = root
+        self.on_dirty = on_dirty
+        self._entries = {}  # project -> (stat_key, data)
+        self._pending = {}  # project -> fields awaiting flush
+        self._lock = threading.Lock()
+        self.stats = {"reads": 0, "writes": 0, "skipped_writes": 0}
+
+    def path(self, project):
+        return os.path.join(self.root, project, PROJECT_MANIFEST)
+
+    def _load(self, project):
+        path = self.path(project)
+        key = file_stat_key(path)
+        entry = self._entries.get(project)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        data = {}
+        if key is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    data = json.load(fh)
+                self.stats["reads"] += 1
+            except Exception:
+                data = {}
+        if not isinstance(data, dict):
+            data = {}
+        self._entries[project] = (key, data)
+        return data
+
+    def get(self, project):
+        with self._lock:
+            data = dict(self._load(project))
+            data.update(self._pending.get(project, {}))
+            return data
+
+    def load_many(self, projects):
+        """Validate/read many manifests at once; safe to run on a worker thread."""
+        return {project: self.get(project) for project in projects}
+
+    def update(self, project, **fields):
+        with self._lock:
+            current = dict(self._load(project))
+            current.update(self._pending.get(project, {}))
+            changed = {k: v for k, v in fields.items() if k not in current or current[k] != v}
+            if not changed:
+                return False
+            schedule = not self._pending
+            self._pending.setdefault(project, {}).update(changed)
+        if schedule and self.on_dirty:
+            self.on_dirty()
+        return True
+
+    def replace(self, project, data):
+        with self._lock:
+            self._pending.pop(project, None)
+            self._write(project, dict(data))
+
+    def forget(self, project):
+        with self._lock:
+            self._entries.pop(project, None)
+            self._pending.pop(project, None)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            for project, fields in pending.items():
+                # Re-validate first so an external edit made since the update is merged, not clobbered.
+                data = dict(self._load(project))
+                merged = dict(data)
+                merged.update(fields)
+                if merged == data:
+                    self.stats["skipped_writes"] += 1
+                    continue
+                self._write(project, merged)
+
+    def _write(self, project, data):
+        path = self.path(project)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=".project.", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                    json.dump(data, fh, indent=2)
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                os.chmod(tmp_path, 0o600)
+                os.replace(tmp_path, path)
+            except Exception:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception:
+            return
+        self.stats["writes"] += 1
+        self._entries[project] = (file_stat_key(path), data)
+
+
+class MountTable:
+    """Parsed /proc/self/mountinfo, re-read only after poll() on the open file reports a mount-table change."""
+
+    OCTAL_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+    def __init__(self, path="/proc/self/mountinfo"):
+        self.path = path
+        self._fd = None
+        self._poller = None
+        self._mounts = None
+        self._stale = False
+        self._lock = threading.Lock()
+        self.stats = {"reads": 0, "hits": 0}
+
+    def _open(self):
+        if self._fd is not None:
+            return True
+        try:
+            self._fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+        except OSError:
+            return False
+        self._poller = select.poll()
+        # The kernel raises POLLPRI|POLLERR on this fd whenever a mount is added, removed or changed.
+        self._poller.register(self._fd, select.POLLPRI | select.POLLERR)
+        return True
+
+    def fileno(self):
+        return self._fd if self._open() else None
+
+    def invalidate(self):
+        """Force a re-read; for callers that consumed the poll event themselves (e.g. a QSocketNotifier)."""
+        self._stale = True
+
+    def changed(self):
+        """True if the mount table may differ from the cached copy (non-blocking)."""
+        if self._mounts is None or not self._open():
+            return True
+        if not self._stale:
+            # The kernel reports each mount event once per open file, so latch it until the next re-read.
+            try:
+                self._stale = bool(self._poller.poll(0))
+            except OSError:
+                self._stale = True
+        return self._stale
+
+    def _read(self):
+        chunks = []
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        while True:
+            chunk = os.read(self._fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self.stats["reads"] += 1
+        return b"".join(chunks).decode("utf-8", "replace")
+
+    def _unescape(self, value):
+        return self.OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), value)
+
+    def _parse(self, text):
+        mounts = []
+        for line in text.splitlines():
+            pre, sep, post = line.partition(" - ")
+            fields = pre.split()
+            if not sep or len(fields) < 6:
+                continue
+            tail = post.split()
+            mounts.append(
+                {
+                    "id": fields[0],
+                    "parent": fields[1],
+                    "dev": fields[2],
+                    "root": self._unescape(fields[3]),
+                    "mount_point": self._unescape(fields[4]),
+                    "options": fields[5],
+                    "fstype": tail[0] if tail else "",
+                    "source": self._unescape(tail[1]) if len(tail) > 1 else "",
+                }
+            )
+        return mounts
+
+    def mounts(self):
+        with self._lock:
+            if not self.changed():
+                self.stats["hits"] += 1
+                return self._mounts
+            if not self._open():
+                return []
+            self._stale = False
+            try:
+                self._mounts = self._parse(self._read())
+            except OSError:
+                self._mounts = []
+            return self._mounts
+
+    def find(self, mount_point):
+        """Topmost mount at ``mount_point`` (later entries stack over earlier ones), or None."""
+        mount_point = os.path.normpath(mount_point)
+        found = None
+        for mount in self.mounts():
+            if mount["mount_point"] == mount_point:
+                found = mount
+        return found
+
+    def source_path(self, mount_point):
+        """Directory a (bind) mount exposes, mapped back through a mount of the same device; None if not mounted."""
+        target = self.find(mount_point)
+        if target is None:
+            return None
+        best = None
+        for mount in self.mounts():
+            if mount is target or mount["dev"] != target["dev"]:
+                continue
+            root = mount["root"].rstrip("/")
+            if target["root"] == mount["root"] or target["root"].startswith(root + "/"):
+                if best is None or len(mount["root"]) > len(best["root"]):
+                    best = mount
+        if best is None:
+            return target["root"]
+        suffix = target["root"][len(best["root"].rstrip("/")):]
+        return os.path.normpath(os.path.join(best["mount_point"], suffix.lstrip("/")))
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                try:
+                    os.close(self._fd)
+                except OSError:
+                    pass
+            self._fd = None
+            self._poller = None
+            self._mounts = None
+
+
 class Backend:
+    def __init__(self):
+        self.mount_table = MountTable()
+
     def run(self, command, sudo_password=None):
         sudo_fn = ""
         if sudo_password:
             # override sudo to read from stdin via piped password
             sudo_fn = f"SUDO_PASSWORD={shlex.quote(sudo_password)}; sudo() {{ echo \"$SUDO_PASSWORD\" | command sudo -S \"$@\"; }}; "
         full_cmd = f"{sudo_fn}source ~/.focus_unfocus.sh >/dev/null 2>&1; {command}"
-        return subprocess.run(
+        return run_subprocess(
             ["bash", "-lc", full_cmd],
             capture_output=True,
             text=True,
@@ -2541,21 +8867,9 @@ class Backend:
     def detect_active(self):
         if not USE_BIND_MOUNT:
             return None
-        script = textwrap.dedent(
-            """
-            source ~/.focus_unfocus.sh >/dev/null 2>&1
-            if mountpoint -q "$HOME/active_project"; then
-              findmnt -n -o SOURCE "$HOME/active_project"
-            fi
-            """
-        )
-        result = subprocess.run(
-            ["bash", "-lc", script],
-            capture_output=True,
-            text=True,
-        )
-        source_path = result.stdout.strip()
-        if source_path and source_path.startswith(PROJECT_ROOT + "/"):
+        # Cached mountinfo lookup; only re-parsed after the kernel signals a mount-table change.
+        source_path = self.mount_table.source_path(os.path.realpath(ACTIVE_PROJECT_PATH))
+        if source_path and source_path.startswith(os.path.realpath(PROJECT_ROOT) + "/"):
             return os.path.basename(source_path)
         return None
 
@@ -2580,7 +8894,7 @@ class Backend:
         if not USE_BIND_MOUNT:
             # Only unmount if a stale mount exists; otherwise succeed silently.
             if os.path.ismount(ACTIVE_PROJECT_PATH):
-                return subprocess.run(
+                return run_subprocess(
                     ["sudo", "-n", "umount", ACTIVE_PROJECT_PATH],
                     capture_output=True,
                     text=True,
@@ -2625,8 +8939,8 @@ class AutoGITIntegration:
 
     def _ensure_identity(self, project_path, env):
         name, email = self._git_identity(env)
-        subprocess.run(["git", "-C", project_path, "config", "user.name", name], capture_output=True, text=True, env=env)
-        subprocess.run(["git", "-C", project_path, "config", "user.email", email], capture_output=True, text=True, env=env)
+        run_subprocess(["git", "-C", project_path, "config", "user.name", name], capture_output=True, text=True, env=env)
+        run_subprocess(["git", "-C", project_path, "config", "user.email", email], capture_output=True, text=True, env=env)
 
     def _find_autogit_bin(self):
         candidates = [
@@ -2662,7 +8976,7 @@ class AutoGITIntegration:
                 "LOG_FILE": str(AUTOGIT_LOG),
             }
         )
-        result = subprocess.run(
+        result = run_subprocess(
             [self.autogit_bin, "run-once"],
             capture_output=True,
             text=True,
@@ -2674,7 +8988,7 @@ class AutoGITIntegration:
         if result.returncode == 0:
             return result
         env = self._merge_env(env)
-        status = subprocess.run(
+        status = run_subprocess(
             ["git", "-C", project_path, "status", "--short"],
             capture_output=True,
             text=True,
@@ -2703,7 +9017,7 @@ class AutoGITIntegration:
 
     def git_status(self, project_path, env=None):
         env = self._merge_env(env)
-        return subprocess.run(
+        return run_subprocess(
             ["git", "-C", project_path, "status", "--short"],
             capture_output=True,
             text=True,
@@ -2712,7 +9026,7 @@ class AutoGITIntegration:
 
     def is_git_repo(self, project_path, env=None):
         env = self._merge_env(env)
-        result = subprocess.run(
+        result = run_subprocess(
             ["git", "-C", project_path, "rev-parse", "--is-inside-work-tree"],
             capture_output=True,
             text=True,
@@ -2730,7 +9044,7 @@ class AutoGITIntegration:
             # ensure we are on a usable branch
             self.ensure_branch(project_path, env=env)
             return subprocess.CompletedProcess([], 0, "", "")
-        result = subprocess.run(
+        result = run_subprocess(
             ["git", "-C", project_path, "init", "-b", "main"],
             capture_output=True,
             text=True,
@@ -2744,7 +9058,7 @@ class AutoGITIntegration:
     def ensure_branch(self, project_path, branch="main", env=None):
         env = self._merge_env(env)
         # Determine current branch
-        head = subprocess.run(
+        head = run_subprocess(
             ["git", "-C", project_path, "rev-parse", "--abbrev-ref", "HEAD"],
             capture_output=True,
             text=True,
@@ -2754,7 +9068,7 @@ class AutoGITIntegration:
         if current and current != "HEAD":
             return head
         # list branches
-        branches = subprocess.run(
+        branches = run_subprocess(
             ["git", "-C", project_path, "branch", "--list"],
             capture_output=True,
             text=True,
@@ -2762,12 +9076,12 @@ class AutoGITIntegration:
         )
         existing = [b.strip().lstrip("* ").strip() for b in branches.stdout.splitlines() if b.strip()]
         if branch in existing:
-            return subprocess.run(["git", "-C", project_path, "checkout", branch], capture_output=True, text=True, env=env)
+            return run_subprocess(["git", "-C", project_path, "checkout", branch], capture_output=True, text=True, env=env)
         if existing:
             # pick first existing branch
-            return subprocess.run(["git", "-C", project_path, "checkout", existing[0]], capture_output=True, text=True, env=env)
+            return run_subprocess(["git", "-C", project_path, "checkout", existing[0]], capture_output=True, text=True, env=env)
         # no branches: create main
-        return subprocess.run(["git", "-C", project_path, "checkout", "-b", branch], capture_output=True, text=True, env=env)
+        return run_subprocess(["git", "-C", project_path, "checkout", "-b", branch], capture_output=True, text=True, env=env)
 
     def is_dubious_error(self, result):
         msg = (getattr(result, "stderr", "") or "") + (getattr(result, "stdout", "") or "")
@@ -2775,7 +9089,7 @@ class AutoGITIntegration:
 
     def config_has_safe_directory(self, project_path, env=None):
         env = self._merge_env(env)
-        res = subprocess.run(
+        res = run_subprocess(
             ["git", "config", "--global", "--get-all", "safe.directory"],
             capture_output=True,
             text=True,
@@ -2792,7 +9106,7 @@ class AutoGITIntegration:
         env = self._merge_env(env)
         if self.config_has_safe_directory(project_path, env=env):
             return True
-        res = subprocess.run(
+        res = run_subprocess(
             ["git", "config", "--global", "--add", "safe.directory", project_path],
             capture_output=True,
             text=True,
@@ -2800,8 +9114,7 @@ class AutoGITIntegration:
         )
         if res.returncode == 0:
             ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            with open(SAFE_DIR_LOG, "a", encoding="utf-8") as fh:
-                fh.write(f"{ts} added {project_path} reason={reason}\n")
+            LOG_WRITER.append(SAFE_DIR_LOG, f"{ts} added {project_path} reason={reason}")
             return True
         return False
 
@@ -2862,6 +9175,7 @@ class ProjectImporter:
 class WorkerSignals(QtCore.QObject):
     result = QtCore.pyqtSignal(object)
     error = QtCore.pyqtSignal(str)
+    progress = QtCore.pyqtSignal(object)
 
 
 class Worker(QtCore.QRunnable):
@@ -2881,6 +9195,288 @@ class Worker(QtCore.QRunnable):
             self.signals.result.emit(res)
 
 
+class JobCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """Cooperative cancellation flag; jobs submitted with cancellable=True receive it as ``cancel``."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise JobCancelled("cancelled")
+
+
+class Job:
+    """One scheduled unit of work plus every caller waiting on it (coalesced submits share a Job)."""
+
+    def __init__(self, fn, kind, priority, key, resource, timeout, cache_ttl, cancellable):
+        self.fn = fn
+        self.kind = kind
+        self.priority = priority
+        self.key = key
+        self.resource = resource
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cancellable = cancellable
+        self.token = CancelToken()
+        self.callbacks = []  # (on_result, on_error, on_progress)
+        self.state = "queued"
+        self.submitted = time.monotonic()
+        self.started = None
+        self.timer = None
+        self.trace_parent = TRACER.current()
+        self.trace_span = None
+
+    def cancel(self):
+        self.token.cancel()
+
+
+class JobScheduler(QtCore.QObject):
+    """Priority queue in front of the thread pool: coalescing keys, per-resource limits, timeouts, result cache."""
+
+    job_finished = QtCore.pyqtSignal(str, dict)
+    callback_failed = QtCore.pyqtSignal(str, str)  # kind, traceback
+
+    def __init__(self, pool=None, parent=None):
+        super().__init__(parent)
+        self.pool = pool or QtCore.QThreadPool.globalInstance()
+        self.max_running = max(2, self.pool.maxThreadCount())
+        self._heap = []
+        self._seq = 0
+        self._by_key = {}  # key -> queued/running Job
+        self._running = set()
+        self._resource_use = {}
+        self._cache = {}  # key -> (expires_at, result)
+        self._metrics = {}
+        self._stopped = False
+
+    def submit(
+        self,
+        fn,
+        on_result=None,
+        on_error=None,
+        on_progress=None,
+        kind=None,
+        priority=JOB_PRIORITY_NORMAL,
+        key=None,
+        resource=None,
+        timeout=None,
+        cache_ttl=0,
+        cancellable=False,
+    ):
+        kind = kind or getattr(fn, "__name__", "job")
+        stats = self._stats(kind)
+        stats["submitted"] += 1
+        if key is not None and cache_ttl:
+            cached = self._cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                stats["cache_hits"] += 1
+                # Still asynchronous, so callers see the same ordering as a real run.
+                QtCore.QTimer.singleShot(0, partial(self._call, kind, on_result, cached[1]))
+                return None
+        existing = self._by_key.get(key) if key is not None else None
+        if existing is not None and not existing.token.cancelled:
+            stats["coalesced"] += 1
+            existing.callbacks.append((on_result, on_error, on_progress))
+            return existing
+        job = Job(fn, kind, priority, key, resource, timeout, cache_ttl, cancellable)
+        job.callbacks.append((on_result, on_error, on_progress))
+        if key is not None:
+            self._by_key[key] = job
+        self._seq += 1
+        heapq.heappush(self._heap, (priority, self._seq, job))
+        self._dispatch()
+        return job
+
+    def cancel(self, job_or_key):
+        job = self._by_key.get(job_or_key) if not isinstance(job_or_key, Job) else job_or_key
+        if job is None or job.state not in ("queued", "running"):
+            return False
+        job.cancel()
+        if job.state == "queued":
+            self._heap = [entry for entry in self._heap if entry[2] is not job]
+            heapq.heapify(self._heap)
+            self._finish(job, "cancelled", "cancelled")
+        return True
+
+    def stop(self):
+        self._stopped = True
+        for _, _, job in self._heap:
+            job.cancel()
+        self._heap.clear()
+        for job in list(self._running):
+            job.cancel()
+            if job.timer:
+                job.timer.stop()
+
+    def pending(self):
+        return len(self._heap)
+
+    def running(self):
+        return len(self._running)
+
+    def metrics(self):
+        snapshot = {}
+        for kind, stats in self._metrics.items():
+            done = max(1, stats["completed"] + stats["failed"])
+            snapshot[kind] = dict(
+                stats,
+                avg_wait_ms=round(stats["wait_ms"] / max(1, stats["started"]), 2),
+                avg_run_ms=round(stats["run_ms"] / done, 2),
+            )
+        return snapshot
+
+    def _stats(self, kind):
+        stats = self._metrics.get(kind)
+        if stats is None:
+            stats = dict.fromkeys(
+                ("submitted", "started", "completed", "failed", "cancelled", "timeouts", "coalesced", "cache_hits", "callback_errors"), 0
+            )
+            stats.update({"wait_ms": 0.0, "run_ms": 0.0, "max_wait_ms": 0.0, "max_run_ms": 0.0})
+            self._metrics[kind] = stats
+        return stats
+
+    def _resource_limit(self, resource):
+        prefix = resource.split(":", 1)[0]
+        return JOB_RESOURCE_LIMITS.get(resource, JOB_RESOURCE_LIMITS.get(prefix, 1))
+
+    def _dispatch(self):
+        if self._stopped:
+            return
+        deferred = []
+        while self._heap and len(self._running) < self.max_running:
+            entry = heapq.heappop(self._heap)
+            job = entry[2]
+            if job.resource and self._resource_use.get(job.resource, 0) >= self._resource_limit(job.resource):
+                # Busy resource: keep its place and let lower-priority jobs on other resources run.
+                deferred.append(entry)
+                continue
+            self._start(job)
+        for entry in deferred:
+            heapq.heappush(self._heap, entry)
+
+    def _start(self, job):
+        job.state = "running"
+        self._running.add(job)
+        if job.resource:
+            self._resource_use[job.resource] = self._resource_use.get(job.resource, 0) + 1
+        kwargs = {}
+        if job.cancellable:
+            kwargs["cancel"] = job.token
+
+        def run(**extra):
+            job.started = time.monotonic()
+            job.token.raise_if_cancelled()
+            wait_ms = round((job.started - job.submitted) * 1000, 2)
+            with TRACER.span(f"job {job.kind}", "job", parent=job.trace_parent, wait_ms=wait_ms, resource=job.resource) as span:
+                job.trace_span = span
+                return job.fn(**extra)
+
+        worker = Worker(run, **kwargs)
+        if any(cb[2] for cb in job.callbacks):
+            worker.kwargs["progress"] = worker.signals.progress.emit
+            worker.signals.progress.connect(partial(self._on_progress, job), QtCore.Qt.QueuedConnection)
+        worker.signals.result.connect(partial(self._on_worker_done, job, True), QtCore.Qt.QueuedConnection)
+        worker.signals.error.connect(partial(self._on_worker_done, job, False), QtCore.Qt.QueuedConnection)
+        if job.timeout:
+            job.timer = QtCore.QTimer(self)
+            job.timer.setSingleShot(True)
+            job.timer.timeout.connect(partial(self._on_timeout, job))
+            job.timer.start(int(job.timeout * 1000))
+        self.pool.start(worker)
+
+    def _on_progress(self, job, payload):
+        if job.state != "running" or job.token.cancelled:
+            return
+        for _, _, on_progress in job.callbacks:
+            self._call(job.kind, on_progress, payload)
+
+    def _on_timeout(self, job):
+        if job.state != "running":
+            return
+        job.cancel()
+        self._stats(job.kind)["timeouts"] += 1
+        # The thread cannot be killed; callers hear about the timeout now and its late result is dropped.
+        self._deliver(job, False, f"{job.kind} timed out after {job.timeout:g}s")
+        job.state = "timed_out"
+        if job.key is not None and self._by_key.get(job.key) is job:
+            self._by_key.pop(job.key, None)
+
+    def _on_worker_done(self, job, ok, payload):
+        if job.timer:
+            job.timer.stop()
+        self._running.discard(job)
+        if job.resource:
+            self._resource_use[job.resource] = max(0, self._resource_use.get(job.resource, 1) - 1)
+        stats = self._stats(job.kind)
+        now = time.monotonic()
+        wait_ms = run_ms = None
+        if job.started is not None:
+            wait_ms = (job.started - job.submitted) * 1000
+            run_ms = (now - job.started) * 1000
+            stats["started"] += 1
+            stats["wait_ms"] += wait_ms
+            stats["run_ms"] += run_ms
+            stats["max_wait_ms"] = max(stats["max_wait_ms"], round(wait_ms, 2))
+            stats["max_run_ms"] = max(stats["max_run_ms"], round(run_ms, 2))
+        if job.state == "running":
+            if job.token.cancelled:
+                self._finish(job, "cancelled", "cancelled")
+            else:
+                if ok and job.key is not None and job.cache_ttl:
+                    self._cache[job.key] = (now + job.cache_ttl, payload)
+                # Callbacks run under the job's span so the UI work they queue is traced back to it.
+                with TRACER.attach(job.trace_span or job.trace_parent):
+                    self._finish(job, "completed" if ok else "failed", payload, ok)
+        self.job_finished.emit(
+            job.kind,
+            {
+                "state": job.state,
+                "wait_ms": None if wait_ms is None else round(wait_ms, 2),
+                "run_ms": None if run_ms is None else round(run_ms, 2),
+                "queued": len(self._heap),
+                "running": len(self._running),
+            },
+        )
+        self._dispatch()
+
+    def _finish(self, job, state, payload, ok=False):
+        job.state = state
+        self._stats(job.kind)[state] += 1
+        if job.key is not None and self._by_key.get(job.key) is job:
+            self._by_key.pop(job.key, None)
+        if state == "cancelled":
+            # Whoever cancelled already knows; nobody waits on a cancelled job's callbacks.
+            job.callbacks = []
+            return
+        self._deliver(job, ok, payload)
+
+    def _deliver(self, job, ok, payload):
+        callbacks, job.callbacks = job.callbacks, []
+        for on_result, on_error, _ in callbacks:
+            self._call(job.kind, on_result if ok else on_error, payload)
+
+    def _call(self, kind, callback, payload):
+        if callback is None:
+            return
+        try:
+            callback(payload)
+        except Exception:
+            self._stats(kind)["callback_errors"] += 1
+            self.callback_failed.emit(kind, traceback.format_exc())
+
+
 class CreateProjectDialog(QtWidgets.QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -2945,11 +9541,62 @@ class ImportOptionsDialog(QtWidgets.QDialog):
         }
 
 
+class ExportTasksDialog(QtWidgets.QDialog):
+    def __init__(self, projects, current_list=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Tasks")
+        self.current_list = current_list
+        layout = QtWidgets.QFormLayout(self)
+        self.project_combo = QtWidgets.QComboBox()
+        self.project_combo.addItem("All projects", None)
+        for name in projects:
+            self.project_combo.addItem(name, name)
+        self.list_checkbox = QtWidgets.QCheckBox(f"Only '{current_list['name']}'" if current_list else "Only current list")
+        self.list_checkbox.setEnabled(bool(current_list))
+        self.status_combo = QtWidgets.QComboBox()
+        self.status_combo.addItem("Any status", None)
+        self.status_combo.addItem("Open (not completed)", [v for v in TASK_STATUS_VALUES if v != "completed"])
+        for value in TASK_STATUS_VALUES:
+            self.status_combo.addItem(value, [value])
+        self.date_field_combo = QtWidgets.QComboBox()
+        self.date_field_combo.addItems(list(TASK_EXPORT_DATE_FIELDS))
+        self.date_checkbox = QtWidgets.QCheckBox("Limit to range")
+        self.date_from = QtWidgets.QDateEdit(date.today() - timedelta(days=30))
+        self.date_to = QtWidgets.QDateEdit(date.today())
+        for edit in (self.date_from, self.date_to):
+            edit.setCalendarPopup(True)
+        date_row = QtWidgets.QHBoxLayout()
+        date_row.addWidget(self.date_field_combo)
+        date_row.addWidget(self.date_from)
+        date_row.addWidget(self.date_to)
+        date_row.addWidget(self.date_checkbox)
+        layout.addRow("Project", self.project_combo)
+        layout.addRow("List", self.list_checkbox)
+        layout.addRow("Status", self.status_combo)
+        layout.addRow("Dates", date_row)
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+
+    def get_filters(self):
+        filters = {"project": self.project_combo.currentData(), "status": self.status_combo.currentData()}
+        if self.list_checkbox.isChecked() and self.current_list:
+            filters["list_id"] = self.current_list["id"]
+        if self.date_checkbox.isChecked():
+            filters["date_field"] = self.date_field_combo.currentText()
+            filters["date_from"] = self.date_from.date().toString("yyyy-MM-dd")
+            filters["date_to"] = self.date_to.date().toString("yyyy-MM-dd")
+        return filters
+
+
 class FocusManager(QtWidgets.QMainWindow):
     def __init__(self, supervisor=None, settings=None, debug_level=None):
         super().__init__()
         # Debug control plane levels: normal | debug | diagnostic
         self.settings = settings or self.load_settings()
+        self.settings_store = JsonFileStore(SETTINGS_FILE, lambda: self.settings, parent=self)
+        self.project_meta_store = JsonFileStore(PROJECT_META_FILE, lambda: self.project_meta, parent=self)
         self.debug_level = debug_level or self.settings.get("debug_level", "normal")
         self.supervisor = supervisor or StabilitySupervisor(debug_level=self.debug_level, on_event=self._stability_event, log_fn=None)
         # ensure supervisor routes events to this debug system
@@ -2959,10 +9606,22 @@ class FocusManager(QtWidgets.QMainWindow):
         self._ui_ready = False
         self._ui_tearing_down = False
         self._ui_mutation_active = False
-        self._ui_mutation_queue: deque[tuple[str, callable, tuple, dict]] = deque()
+        self._ui_mutation_scheduled = False
+        # Entries are [reason, func, args, kwargs, enqueued_at, live]; a superseded duplicate is marked dead in place.
+        self._ui_mutation_queue: deque[list] = deque()
+        self._ui_mutation_pending = {}
+        self.ui_mutation_stats = {
+            "executed": 0,
+            "collapsed": 0,
+            "batches": 0,
+            "max_batch": 0,
+            "max_latency_ms": 0.0,
+            "histogram": dict.fromkeys([*UI_MUTATION_LATENCY_BUCKETS_MS, "inf"], 0),
+        }
         self._auto_commit_toggle_active = False
         self.backend = Backend()
-        self.store = TaskStore()
+        self.store = TaskStore(task_cap=self.settings.get("task_cap", TASK_CAP))
+        self.audit_store = AuditStore()
         self.autogit = AutoGITIntegration()
         self.importer = ProjectImporter(self.autogit)
         self.tooltip_manager = TooltipManager(self)
@@ -2978,9 +9637,16 @@ class FocusManager(QtWidgets.QMainWindow):
         self.view_mode = "canonical"
         self.current_list_ref = None
         self.current_task_id = None
+        self._task_page_cursor = None
         self.current_state = "Idle"
         self.threadpool = QtCore.QThreadPool.globalInstance()
+        self.jobs = JobScheduler(self.threadpool, self)
+        self.jobs.job_finished.connect(self._on_job_finished)
+        self.jobs.callback_failed.connect(self._on_job_callback_failed)
         self.project_meta = self.load_project_meta()
+        self.manifest_cache = ManifestCache(on_dirty=self._schedule_manifest_flush)
+        self.project_indexer = ProjectIndexer(self.store, parent=self)
+        self.project_indexer.indexed.connect(self._on_projects_indexed)
         self.column_visibility: dict[str, dict[str, bool]] = self.settings.get("column_visibility", {})
         self.table_registry: dict[str, QtWidgets.QTableWidget] = {}
         # localsync folder mapping per project
@@ -3046,6 +9712,8 @@ class FocusManager(QtWidgets.QMainWindow):
         self.responsive_layouts: list[QtWidgets.QBoxLayout] = []
         self.responsive_base_dir: dict[QtWidgets.QBoxLayout, QtWidgets.QBoxLayout.Direction] = {}
         self.operation_ctx = {"state": "idle", "name": None, "target": None, "dry_run": False}
+        self.operation_span = None
+        self._last_stall_at = 0.0
         self.debug_scopes = [
             "APPLICATION",
             "PROJECTS",
@@ -3128,6 +9796,24 @@ class FocusManager(QtWidgets.QMainWindow):
         self._start_consistency_monitor()
         self.update_identity_banner()
         self._init_task_watcher()
+        self.task_scheduler = TaskScheduler(self.store, self)
+        self.task_scheduler.reminders_due.connect(self._on_task_reminders_due)
+        self.task_scheduler.occurrences_spawned.connect(self._on_task_occurrences_spawned)
+        self.task_scheduler.start()
+        self.loop_monitor = EventLoopMonitor(self)
+        self.loop_monitor.stall_detected.connect(self._on_ui_stall)
+        self.loop_monitor.stats_changed.connect(self._update_lag_strip)
+        self.loop_monitor.start()
+        METRICS.gauge("threadpool_active_threads", "Busy threads in the global worker pool.").set_function(self.threadpool.activeThreadCount)
+        METRICS.gauge("jobs_running", "Background jobs currently running.").set_function(self.jobs.running)
+        METRICS.gauge("jobs_queued", "Background jobs waiting for a slot.").set_function(self.jobs.pending)
+        METRICS.gauge("trace_spans_buffered", "Finished tracing spans held in memory.").set_function(lambda: len(TRACER.spans))
+        METRICS.serve()
+        self._metrics_ticks = 0
+        self.metrics_timer = QtCore.QTimer(self)
+        self.metrics_timer.setInterval(1000)
+        self.metrics_timer.timeout.connect(self._sample_metrics)
+        self.metrics_timer.start()
         self.log_debug(
             "APPLICATION",
             {
@@ -3154,11 +9840,8 @@ class FocusManager(QtWidgets.QMainWindow):
 
     def load_project_meta(self):
         DATA_DIR.mkdir(parents=True, exist_ok=True)
-        if not PROJECT_META_FILE.exists():
-            return {}
         try:
-            with open(PROJECT_META_FILE, "r", encoding="utf-8") as fh:
-                raw = json.load(fh)
+            raw = read_json_file(PROJECT_META_FILE)
             normalized = {}
             for k, v in raw.items():
                 if isinstance(v, dict):
@@ -3191,11 +9874,7 @@ class FocusManager(QtWidgets.QMainWindow):
             return {}
 
     def save_project_meta(self):
-        try:
-            with open(PROJECT_META_FILE, "w", encoding="utf-8") as fh:
-                json.dump(self.project_meta, fh, indent=2)
-        except Exception:
-            pass
+        self.project_meta_store.mark_dirty()
 
     def _build_ui(self):
         central = QtWidgets.QWidget()
@@ -3401,8 +10080,19 @@ class FocusManager(QtWidgets.QMainWindow):
 
         project_box = QtWidgets.QGroupBox("Projects")
         project_layout = self._register_layout(QtWidgets.QVBoxLayout(project_box))
-        self.project_table = QtWidgets.QTableWidget(0, 6)
-        self.project_table.setHorizontalHeaderLabels(["Project", "Last Modified", "Status", "Origin", "LocalSync", "Local Path"])
+        self.project_table = QtWidgets.QTableWidget(0, 11)
+        self.project_table.setHorizontalHeaderLabels(
+            ["Project", "Last Activity", "Status", "Origin", "LocalSync", "Local Path", "Tasks", "Size", "Files", "Languages", "Git"]
+        )
+        self.project_table.horizontalHeader().setSortIndicator(1, QtCore.Qt.DescendingOrder)
+        self.project_table.setSortingEnabled(True)
+        self.project_progress_delegate = ProgressBarDelegate(self.project_table)
+        self.project_table.setItemDelegateForColumn(6, self.project_progress_delegate)
+        self.project_status_delegate = ComboBoxDelegate(STATUS_OPTIONS, self.project_table)
+        self.project_table.setItemDelegateForColumn(2, self.project_status_delegate)
+        self._project_row_specs = {}
+        self._project_scan_running = False
+        self._project_scan_pending = False
         self.project_table.horizontalHeader().setStretchLastSection(True)
         try:
             self.project_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
@@ -3820,7 +10510,9 @@ class FocusManager(QtWidgets.QMainWindow):
         list_box = QtWidgets.QGroupBox("Task Lists")
         list_inner_layout = self._register_layout(QtWidgets.QVBoxLayout(list_box))
         self.list_tree = QtWidgets.QTreeWidget()
-        self.list_tree.setHeaderLabels(["List", "Scope"])
+        self.list_tree.setHeaderLabels(["List", "Scope", "Progress"])
+        self.list_progress_delegate = ProgressBarDelegate(self.list_tree)
+        self.list_tree.setItemDelegateForColumn(2, self.list_progress_delegate)
         self.list_tree.setSelectionMode(qt_single_select())
         self._enable_vertical_scroll(self.list_tree)
         list_inner_layout.addWidget(self.list_tree)
@@ -3890,12 +10582,13 @@ class FocusManager(QtWidgets.QMainWindow):
         reminder_row.addWidget(self.reminder_checkbox)
         self.priority_checkbox = QtWidgets.QCheckBox("Important")
         self.recurrence_combo = QtWidgets.QComboBox()
-        self.recurrence_combo.addItems(["none", "daily", "weekly", "monthly", "custom"])
+        self.recurrence_combo.addItems(TASK_RECURRENCE_RULES)
         self.recur_interval_spin = QtWidgets.QSpinBox()
         self.recur_interval_spin.setRange(1, 365)
+        self.recur_interval_label = QtWidgets.QLabel("Interval days")
         recur_row = QtWidgets.QHBoxLayout()
         recur_row.addWidget(self.recurrence_combo)
-        recur_row.addWidget(QtWidgets.QLabel("Interval days"))
+        recur_row.addWidget(self.recur_interval_label)
         recur_row.addWidget(self.recur_interval_spin)
         form.addRow("Title", self.title_edit)
         form.addRow("Notes", self.notes_edit)
@@ -4202,7 +10895,7 @@ class FocusManager(QtWidgets.QMainWindow):
             # Try sudo -n first, then plain umount; keep it quick/non-blocking.
             for cmd in (["sudo", "-n", "umount", ACTIVE_PROJECT_PATH], ["umount", ACTIVE_PROJECT_PATH]):
                 try:
-                    res = subprocess.run(cmd, capture_output=True, text=True, timeout=6)
+                    res = run_subprocess(cmd, capture_output=True, text=True, timeout=6)
                     if res.returncode == 0:
                         self.backend.remove_focus_marker()
                         return True
@@ -4217,11 +10910,89 @@ class FocusManager(QtWidgets.QMainWindow):
         return False
 
     def _start_consistency_monitor(self):
+        # Checks run when something that defines focus state changes; the timer is only a safety net.
+        self._consistency_reasons = set()
+        self._consistency_resyncing = False
+        self._consistency_last_resync = 0.0
+        self.consistency_debounce = QtCore.QTimer(self)
+        self.consistency_debounce.setSingleShot(True)
+        self.consistency_debounce.setInterval(CONSISTENCY_DEBOUNCE_MS)
+        self.consistency_debounce.timeout.connect(self._run_consistency_check)
         self.consistency_timer = QtCore.QTimer(self)
-        self.consistency_timer.setInterval(5000)
-        self.consistency_timer.timeout.connect(self._check_consistency_state)
+        self.consistency_timer.setInterval(CONSISTENCY_SAFETY_NET_MS)
+        self.consistency_timer.timeout.connect(partial(self._request_consistency_check, "safety_net"))
         self.consistency_timer.start()
-        self.log_debug("STABILITY", {"monitor": "started", "interval_ms": 5000, "debug_level": getattr(self, "debug_level", "normal")})
+        self.consistency_watcher = QtCore.QFileSystemWatcher(self)
+        self.consistency_watcher.fileChanged.connect(self._on_consistency_path_changed)
+        self.consistency_watcher.directoryChanged.connect(self._on_consistency_path_changed)
+        self._rewatch_consistency_paths()
+        self.mountinfo_notifier = None
+        if USE_BIND_MOUNT:
+            fd = self.backend.mount_table.fileno()
+            if fd is not None:
+                # mountinfo signals mount-table changes as an exceptional condition (POLLPRI) on the open fd.
+                self.mountinfo_notifier = QtCore.QSocketNotifier(fd, QtCore.QSocketNotifier.Exception, self)
+                self.mountinfo_notifier.activated.connect(self._on_mountinfo_changed)
+        self.log_debug(
+            "STABILITY",
+            {
+                "monitor": "started",
+                "mode": "event",
+                "safety_net_ms": CONSISTENCY_SAFETY_NET_MS,
+                "mountinfo": self.mountinfo_notifier is not None,
+                "debug_level": getattr(self, "debug_level", "normal"),
+            },
+        )
+
+    def _consistency_watch_paths(self):
+        paths = {os.path.dirname(FOCUS_MARKER)}
+        if os.path.exists(FOCUS_MARKER):
+            paths.add(FOCUS_MARKER)
+        project = self.active_project
+        if project:
+            manifest = self.manifest_cache.path(project)
+            if os.path.exists(manifest):
+                paths.add(manifest)
+        return paths
+
+    def _rewatch_consistency_paths(self):
+        watcher = getattr(self, "consistency_watcher", None)
+        if watcher is None:
+            return
+        wanted = self._consistency_watch_paths()
+        current = set(watcher.files()) | set(watcher.directories())
+        # Atomic replaces (marker rewrite, manifest flush) drop file watches, so this runs after every check.
+        stale = current - wanted
+        missing = wanted - current
+        if stale:
+            watcher.removePaths(list(stale))
+        if missing:
+            watcher.addPaths(list(missing))
+
+    def _on_consistency_path_changed(self, path):
+        self._request_consistency_check("manifest" if path.endswith(PROJECT_MANIFEST) else "marker")
+
+    def _on_mountinfo_changed(self, *_args):
+        # The notifier already consumed the kernel's one-shot event; tell the cache it must re-read.
+        self.backend.mount_table.invalidate()
+        self._request_consistency_check("mountinfo")
+
+    def _request_consistency_check(self, reason):
+        timer = getattr(self, "consistency_debounce", None)
+        if timer is None or self.teardown_active:
+            return
+        self._consistency_reasons.add(reason)
+        if not timer.isActive():
+            timer.start()
+
+    def _run_consistency_check(self):
+        reasons = sorted(self._consistency_reasons)
+        self._consistency_reasons.clear()
+        start = time.perf_counter()
+        self._check_consistency_state()
+        self._rewatch_consistency_paths()
+        if self.debug_level != "normal":
+            self.log_debug("STABILITY", {"monitor_check": reasons, "latency_ms": round((time.perf_counter() - start) * 1000, 2)})
 
     def _check_consistency_state(self):
         if not self.session_active:
@@ -4254,15 +11025,26 @@ class FocusManager(QtWidgets.QMainWindow):
             self._handle_desync(mount_project, marker_project, ui_project, manifest_project)
         if hasattr(self, "supervisor"):
             self.supervisor.monitor_tick()
-            if self.debug_level != "normal":
-                self.log_debug("STABILITY", {"monitor_tick": True, "qt_messages": len(getattr(self.supervisor, "qt_messages", []))})
 
     def _handle_desync(self, mount_project, marker_project, ui_project, manifest_project):
         if not self._ui_alive(self):
             return
-        self.set_state("Error", "Active project desynchronized")
-        self.show_error_banner("Active project desynchronized. Resyncing...")
-        self._resync_focus(mount_project, marker_project, ui_project, manifest_project)
+        now = time.monotonic()
+        # A resync fires marker/mount events of its own; don't let a persistent desync turn that into a loop.
+        if self._consistency_resyncing or now - self._consistency_last_resync < CONSISTENCY_RESYNC_BACKOFF:
+            self.log_debug(
+                "STABILITY",
+                {"desync": "deferred", "mount": mount_project, "marker": marker_project, "ui": ui_project, "manifest": manifest_project},
+            )
+            return
+        self._consistency_resyncing = True
+        self._consistency_last_resync = now
+        try:
+            self.set_state("Error", "Active project desynchronized")
+            self.show_error_banner("Active project desynchronized. Resyncing...")
+            self._resync_focus(mount_project, marker_project, ui_project, manifest_project)
+        finally:
+            self._consistency_resyncing = False
 
     def _resync_focus(self, mount_project, marker_project, ui_project, manifest_project):
         if not self._ui_alive(self):
@@ -4270,8 +11052,6 @@ class FocusManager(QtWidgets.QMainWindow):
         self.detach_fs_view()
         self._unmount_active_mount(no_prompt=True)
         self.backend.remove_focus_marker()
-        if hasattr(self, "photon_terminal_widget"):
-            self.photon_terminal_widget.shutdown()
         self.active_project = None
         self.update_active_label()
         self.refresh_health_panel()
@@ -4285,6 +11065,7 @@ class FocusManager(QtWidgets.QMainWindow):
             if result.returncode == 0:
                 self.backend.write_focus_marker(target)
                 self.active_project = target
+                self._open_project_terminal(target)
                 self.update_active_label()
                 self.update_context_labels()
                 self.refresh_health_panel()
@@ -5103,6 +11884,35 @@ class FocusManager(QtWidgets.QMainWindow):
         state_val = state or getattr(self, "current_state", "Idle")
         self.runtime_strip.update_state(project=project, state=state_val, stability=stability, warnings=self.warning_count)
 
+    def _sample_metrics(self):
+        METRICS.sample()
+        self._metrics_ticks += 1
+        if self._metrics_ticks % METRICS_EXPORT_SECS == 0:
+            METRICS.write()
+
+    def _update_lag_strip(self):
+        if not hasattr(self, "runtime_strip"):
+            return
+        monitor = self.loop_monitor
+        last = monitor.stalls[-1] if monitor.stalls else None
+        recent = last is not None and time.monotonic() - self._last_stall_at < 10
+        self.runtime_strip.update_lag(monitor.summary(), last, recent)
+
+    def _on_ui_stall(self, stall):
+        self._last_stall_at = time.monotonic()
+        sample = stall["samples"][0] if stall["samples"] else {}
+        self.log_debug(
+            "PERFORMANCE",
+            {
+                "ui_stall_ms": stall["lag_ms"],
+                "handler": stall["handler"],
+                "span": stall.get("span"),
+                "top": sample.get("top"),
+                "stack": sample.get("stack", [])[-8:],
+            },
+        )
+        self._update_lag_strip()
+
     def _safe_show_operation(self, message, state):
         if not self._ui_alive(self):
             return
@@ -5112,9 +11922,12 @@ class FocusManager(QtWidgets.QMainWindow):
         self.set_state(state, message)
 
     def show_operation(self, message, state="Loading"):
+        TRACER.instant("status", "operation", message=message, state=state)
         self.request_ui_mutation("show_operation", self._safe_show_operation, message, state)
 
     def finish_operation(self, message=""):
+        TRACER.instant("status done", "operation", message=message)
+
         def _finish():
             if not self._ui_alive(self):
                 return
@@ -5138,8 +11951,16 @@ class FocusManager(QtWidgets.QMainWindow):
         if self.current_state == "Error":
             self.set_state("Idle", "")
 
-    # ---- Task file watcher ----
+    # ---- Task change feed ----
     def _init_task_watcher(self):
+        # Other processes write straight to the database; the task_changes journal records what they did
+        # and PRAGMA data_version tells us when to look. TASKS_WATCH_FILE is kept as a doorbell only.
+        self._task_change_seq = self.store.change_seq()
+        self._task_data_version = self.store.data_version()
+        self.task_change_timer = QtCore.QTimer(self)
+        self.task_change_timer.setInterval(TASK_CHANGE_POLL_MS)
+        self.task_change_timer.timeout.connect(self._poll_task_changes)
+        self.task_change_timer.start()
         try:
             TASKS_WATCH_FILE.parent.mkdir(parents=True, exist_ok=True)
             if not TASKS_WATCH_FILE.exists():
@@ -5150,23 +11971,169 @@ class FocusManager(QtWidgets.QMainWindow):
             self.tasks_watcher = None
 
     def _handle_tasks_file_change(self):
-        list_ref = getattr(self, "current_list_ref", None)
-        selected_task = self.current_task_id
-        try:
-            self.store.import_json(str(TASKS_WATCH_FILE), mode=self._current_import_mode())
-        except Exception as exc:  # noqa: BLE001
-            QtWidgets.QMessageBox.critical(self, "Tasks Reload Failed", f"{exc}")
-            self.show_error_banner(str(exc))
-            return
         if self.tasks_watcher and TASKS_WATCH_FILE.exists():
             if str(TASKS_WATCH_FILE) not in self.tasks_watcher.files():
                 self.tasks_watcher.addPath(str(TASKS_WATCH_FILE))
+        self._poll_task_changes(force=True)
+
+    def _poll_task_changes(self, force=False):
+        if self.teardown_active:
+            return
+        try:
+            version = self.store.data_version()
+            if not force and version == self._task_data_version:
+                return
+            self._task_data_version = version
+            changes, next_seq, complete = self.store.changes_since(self._task_change_seq)
+        except Exception as exc:  # noqa: BLE001
+            self.log_debug("TASKS", {"change_feed_error": str(exc)})
+            return
+        if not changes and complete:
+            return
+        # A full page means a bulk write (import, other tool); one reload is cheaper than patching row by row.
+        if not complete or len(changes) >= TASK_PAGE_SIZE:
+            self._task_change_seq = self.store.change_seq()
+            self._reload_task_views()
+            self.task_scheduler.invalidate()
+            self.log_debug("TASKS", {"change_feed": "reload", "complete": complete, "seq": self._task_change_seq})
+            return
+        self._task_change_seq = next_seq
+        self._apply_task_changes(changes)
+        if next_seq % 1000 < len(changes):
+            self.store.prune_changes()
+
+    def _reload_task_views(self):
+        list_ref = getattr(self, "current_list_ref", None)
+        selected_task = self.current_task_id
         self.populate_lists()
         if list_ref:
             self._restore_list_selection(list_ref)
         self.load_tasks()
         if selected_task:
             self._auto_select_task(selected_task)
+        self.refresh_projects()
+
+    def _apply_task_changes(self, changes):
+        # Columns that can move a task into or out of the current view, or change its position in it.
+        membership = {"list_id", "my_day_date", "due_date", "priority", "completed", "completed_at", "order_index", "uuid"}
+        touched = {}
+        inserted = set()
+        reload_view = False
+        for change in changes:
+            touched.setdefault(change["uuid"], set()).update(change["columns"])
+            if change["op"] == "insert":
+                inserted.add(change["uuid"])
+            if change["op"] != "update" or membership.intersection(change["columns"]):
+                reload_view = True
+        if reload_view:
+            selected_task = self.current_task_id
+            self.load_tasks()
+            if selected_task:
+                self._auto_select_task(selected_task)
+        else:
+            for task_uuid in touched:
+                self._patch_task_row(task_uuid)
+            if self.current_task_id in touched:
+                self.on_task_selection()
+        # Writers outside this store don't maintain dependency readiness; re-derive it for what they touched.
+        relink = [u for u, cols in touched.items() if u in inserted or "dependency_task_ids" in cols]
+        reready = [u for u, cols in touched.items() if u not in relink and cols & {"completed", "estimated_complexity"}]
+        if relink:
+            self.store.refresh_dependencies(relink, relink=True)
+        if reready:
+            self.store.refresh_dependencies(reready)
+        # The journal carries the project a row had before a delete or move; the store has the current one.
+        projects = {change["project"] for change in changes if change.get("project")}
+        for task_uuid in touched:
+            task = self.store.get_task(task_uuid)
+            if task and task.get("project"):
+                projects.add(task["project"])
+        for project in projects:
+            self.update_project_status_from_tasks(project)
+        self._refresh_list_tree_counts()
+        scheduled = {"reminder", "recurrence", "recurrence_interval", "due_date", "completed", "reminder_fired_at"}
+        if reload_view or any(cols & scheduled for cols in touched.values()):
+            self.task_scheduler.invalidate()
+        self.log_debug("TASKS", {"change_feed": len(changes), "tasks": len(touched), "reloaded": reload_view})
+
+    def _task_row_for_uuid(self, task_uuid):
+        for row in range(self.task_table.rowCount()):
+            item = self.task_table.item(row, 0)
+            if item and item.data(QtCore.Qt.UserRole) == task_uuid:
+                return row
+        return None
+
+    def _patch_task_row(self, task_uuid):
+        row = self._task_row_for_uuid(task_uuid)
+        task = self.store.get_task(task_uuid) if row is not None else None
+        if not task:
+            return
+        values = {
+            0: task.get("title", ""),
+            1: task.get("due_date") or "",
+            2: "★" if task.get("priority") else "",
+            3: task.get("status", "pending"),
+            4: task.get("list_name", ""),
+            5: task.get("project") or task.get("list_project") or "",
+        }
+        for col, text in values.items():
+            item = self.task_table.item(row, col)
+            if item:
+                item.setText(text)
+        title_item = self.task_table.item(row, 0)
+        if title_item:
+            title_item.setForeground(QtGui.QColor("#6e7b8f") if task.get("completed") else self.task_table.palette().text().color())
+
+    def _refresh_list_tree_counts(self):
+        list_aggs = self.store.list_aggregates()
+        project_aggs = self.store.project_aggregates()
+        system_counts = self.store.system_aggregates()
+
+        def walk(item):
+            ref = item.data(0, QtCore.Qt.UserRole) or {}
+            if ref.get("system"):
+                item.setText(2, str(system_counts.get(ref["system"], 0) or ""))
+            elif ref.get("id") is not None:
+                self._set_tree_progress(item, list_aggs.get(ref["id"]))
+            elif item.parent() is not None and item.text(1) == "project":
+                self._set_tree_progress(item, project_aggs.get(item.text(0)))
+            for i in range(item.childCount()):
+                walk(item.child(i))
+
+        for i in range(self.list_tree.topLevelItemCount()):
+            walk(self.list_tree.topLevelItem(i))
+
+    def _on_recurrence_rule_changed(self, rule):
+        self.recur_interval_label.setText("Day of month" if rule == "monthly" else "Interval days")
+        self.recur_interval_spin.setRange(1, 31 if rule == "monthly" else 365)
+        self.recur_interval_spin.setEnabled(rule in {"custom", "monthly"})
+
+    def _on_task_reminders_due(self, task_uuids):
+        tasks = [t for t in (self.store.get_task(u) for u in task_uuids) if t]
+        if not tasks:
+            return
+        self.sound_engine.play("focus")
+        lines = [f"• {t['title']}" + (f"  (due {t['due_date']})" if t.get("due_date") else "") for t in tasks[:12]]
+        if len(tasks) > 12:
+            lines.append(f"… and {len(tasks) - 12} more")
+        box = QtWidgets.QMessageBox(self)
+        box.setWindowTitle("Task Reminder")
+        box.setIcon(QtWidgets.QMessageBox.Information)
+        box.setText("\n".join(lines))
+        box.setWindowModality(QtCore.Qt.NonModal)
+        box.setAttribute(QtCore.Qt.WA_DeleteOnClose, True)
+        box.show()
+        self.log_debug("TASKS", {"reminders_fired": len(tasks)})
+
+    def _on_task_occurrences_spawned(self, task_uuids):
+        self.log_debug("TASKS", {"occurrences_spawned": len(task_uuids)})
+        selected_task = self.current_task_id
+        self.load_tasks()
+        if selected_task:
+            self._auto_select_task(selected_task)
+        for project in {t["project"] for t in (self.store.get_task(u) for u in task_uuids) if t and t.get("project")}:
+            self.update_project_status_from_tasks(project)
+        self._refresh_list_tree_counts()
 
     def _restore_list_selection(self, list_ref):
         target_id = list_ref.get("id")
@@ -5313,8 +12280,15 @@ class FocusManager(QtWidgets.QMainWindow):
                 return False
         return True
 
-    def run_in_background(self, fn, on_result, on_error=None):
-        worker = Worker(fn)
+    def run_in_background(self, fn, on_result, on_error=None, on_progress=None, **job_options):
+        """Queue fn on the job scheduler; job_options are JobScheduler.submit's kind/priority/key/resource/timeout/cache_ttl/cancellable.
+
+        With on_progress, fn receives progress=<callable>; with cancellable=True it receives cancel=<CancelToken>.
+        """
+
+        def safe_progress(payload):
+            if self._ui_alive():
+                on_progress(payload)
 
         def safe_result(res):
             if not self._ui_alive():
@@ -5329,25 +12303,28 @@ class FocusManager(QtWidgets.QMainWindow):
             if on_error:
                 self.request_ui_mutation("worker_error", on_error, err)
 
-        worker.signals.result.connect(safe_result, QtCore.Qt.QueuedConnection)
-        if on_error:
-            worker.signals.error.connect(safe_error, QtCore.Qt.QueuedConnection)
-        self.threadpool.start(worker)
+        # Jobs started while an operation is open nest under it even when submitted from a plain slot.
+        with TRACER.attach(None if TRACER.current() else getattr(self, "operation_span", None)):
+            return self.jobs.submit(fn, safe_result, safe_error, safe_progress if on_progress else None, **job_options)
+
+    def _on_job_finished(self, kind, info):
+        if self.debug_level != "normal" or info["state"] not in ("completed", "failed"):
+            self.log_debug("PERFORMANCE", {"job": kind, **info, "totals": self.jobs.metrics().get(kind)})
 
-    def processes_using_active_mount(self):
+    def _on_job_callback_failed(self, kind, trace):
+        self.log_debug("ERRORS", {"source": "JOBS", "job": kind, "message": trace.strip().splitlines()[-1], "traceback": trace})
+
+    def processes_using_active_mount(self, timeout=PROC_SCAN_TIMEOUT):
+        """Structured /proc scan of handles under the active mount; safe to run on a worker."""
         if not USE_BIND_MOUNT:
-            return []
-        try:
-            proc = subprocess.run(
-                ["lsof", "+D", ACTIVE_PROJECT_PATH],
-                capture_output=True,
-                text=True,
-            )
-            if proc.returncode == 0 and proc.stdout:
-                return proc.stdout.strip().splitlines()
-        except FileNotFoundError:
-            return []
-        return []
+            return {"processes": [], "complete": True, "scanned": 0}
+        start = time.monotonic()
+        result = scan_open_handles(ACTIVE_PROJECT_PATH, timeout=timeout)
+        own = os.getpid()
+        # This process already chdir'd out and detached its views; leftover self-handles are not a reason to abort.
+        result["processes"] = [proc for proc in result["processes"] if proc["pid"] != own]
+        result["latency_ms"] = int((time.monotonic() - start) * 1000)
+        return result
 
     def ensure_fs_model(self, root_path):
         if self.fs_view is None:
@@ -5393,32 +12370,90 @@ class FocusManager(QtWidgets.QMainWindow):
         if self._ui_tearing_down or self.teardown_active:
             self.log_debug("STABILITY", {"mutation_dropped": reason, "teardown": True})
             return
-        self._ui_mutation_queue.append((reason, func, args, kwargs))
-        if not self._ui_mutation_active:
-            QtCore.QTimer.singleShot(0, self._process_mutations)
+        entry = [reason, func, args, kwargs, time.monotonic(), True, TRACER.current()]
+        try:
+            key = (reason, func, args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            key = None
+        if key is not None:
+            # Same reason, target and arguments: only the latest request runs, at the latest position,
+            # so the final UI state matches what running every request in order would have produced.
+            previous = self._ui_mutation_pending.get(key)
+            if previous is not None and previous[5]:
+                previous[5] = False
+                self.ui_mutation_stats["collapsed"] += 1
+            self._ui_mutation_pending[key] = entry
+        self._ui_mutation_queue.append(entry)
+        self._schedule_mutations()
+
+    def _schedule_mutations(self):
+        if self._ui_mutation_scheduled:
+            return
+        self._ui_mutation_scheduled = True
+        QtCore.QTimer.singleShot(0, self._process_mutations)
 
     def _process_mutations(self):
+        self._ui_mutation_scheduled = False
         if self._ui_mutation_active or self._ui_tearing_down:
             return
         if not self._ui_mutation_queue:
             return
-        if QtCore.QThread.currentThread() != self.thread():
-            QtCore.QTimer.singleShot(0, self._process_mutations)
-            return
-        if not self._ui_ready:
-            QtCore.QTimer.singleShot(0, self._process_mutations)
+        if QtCore.QThread.currentThread() != self.thread() or not self._ui_ready:
+            self._schedule_mutations()
             return
-        reason, func, args, kwargs = self._ui_mutation_queue.popleft()
+        stats = self.ui_mutation_stats
+        histogram = stats["histogram"]
+        start = time.monotonic()
+        deadline = start + UI_MUTATION_BUDGET_MS / 1000
+        executed = 0
+        reasons = {}
         self._ui_mutation_active = True
         try:
-            func(*args, **kwargs)
-            self.log_debug("STABILITY", {"mutation_executed": reason})
-        except Exception as exc:  # noqa: BLE001
-            self.log_debug("STABILITY", {"mutation_failed": reason, "error": str(exc)})
+            # Drain as many as fit in the frame budget; always at least one so a slow mutation can't stall the queue.
+            while self._ui_mutation_queue and (executed == 0 or time.monotonic() < deadline):
+                entry = self._ui_mutation_queue.popleft()
+                reason, func, args, kwargs, enqueued_at, live, trace_parent = entry
+                if not live:
+                    continue
+                try:
+                    key = (reason, func, args, tuple(sorted(kwargs.items())))
+                    if self._ui_mutation_pending.get(key) is entry:
+                        del self._ui_mutation_pending[key]
+                except TypeError:
+                    pass
+                latency_ms = (time.monotonic() - enqueued_at) * 1000
+                METRIC_UI_MUTATION_LATENCY.observe(latency_ms / 1000)
+                bucket = next((b for b in UI_MUTATION_LATENCY_BUCKETS_MS if latency_ms <= b), "inf")
+                histogram[bucket] += 1
+                stats["max_latency_ms"] = max(stats["max_latency_ms"], round(latency_ms, 2))
+                executed += 1
+                reasons[reason] = reasons.get(reason, 0) + 1
+                try:
+                    with TRACER.span(f"ui {reason}", "ui", parent=trace_parent, latency_ms=round(latency_ms, 2)):
+                        func(*args, **kwargs)
+                except Exception as exc:  # noqa: BLE001
+                    self.log_debug("STABILITY", {"mutation_failed": reason, "error": str(exc)})
+                if self._ui_tearing_down:
+                    break
         finally:
             self._ui_mutation_active = False
-            if self._ui_mutation_queue:
-                QtCore.QTimer.singleShot(0, self._process_mutations)
+        METRIC_UI_MUTATION_QUEUE.set(len(self._ui_mutation_queue))
+        stats["executed"] += executed
+        stats["batches"] += 1
+        stats["max_batch"] = max(stats["max_batch"], executed)
+        if executed and self.debug_level != "normal":
+            self.log_debug(
+                "STABILITY",
+                {
+                    "mutations_executed": reasons,
+                    "batch_ms": round((time.monotonic() - start) * 1000, 2),
+                    "remaining": len(self._ui_mutation_queue),
+                    "collapsed_total": stats["collapsed"],
+                },
+            )
+        if self._ui_mutation_queue and not self._ui_tearing_down:
+            self._schedule_mutations()
 
     # ---- Safe UI mutation helpers ----
     def _set_checked_safely(self, widget, value):
@@ -5487,10 +12522,7 @@ class FocusManager(QtWidgets.QMainWindow):
         if scope == "STABILITY" and self.debug_level == "diagnostic":
             try:
                 # Persist a diagnostic snapshot for later inspection
-                diag_log = DATA_DIR / "stability_diagnostic.log"
-                diag_log.parent.mkdir(parents=True, exist_ok=True)
-                with open(diag_log, "a", encoding="utf-8") as fh:
-                    fh.write(f"[{timestamp}] {json.dumps(data)}\n")
+                LOG_WRITER.append(STABILITY_DIAGNOSTIC_LOG, f"[{timestamp}] {json.dumps(data, default=str)}")
             except Exception:
                 pass
         try:
@@ -5523,7 +12555,13 @@ class FocusManager(QtWidgets.QMainWindow):
             self.debug_window = None
             self.debug_window_btn.setChecked(False)
             return
-        self.debug_window = DebugWindow(self.debug_scopes)
+        self.debug_window = DebugWindow(
+            self.debug_scopes,
+            audit_store=self.audit_store,
+            tracer=TRACER,
+            loop_monitor=getattr(self, "loop_monitor", None),
+            metrics=METRICS,
+        )
         self.debug_window.closed.connect(self._on_debug_window_closed)
         self.debug_window.append_history(self.debug_history)
         self.debug_window.show()
@@ -5572,7 +12610,9 @@ class FocusManager(QtWidgets.QMainWindow):
 
     # ---- Operation lifecycle and audit ----
     def start_operation(self, name, target=None, dry_run=False):
-        self.operation_ctx = {"state": "preparing", "name": name, "target": target, "dry_run": dry_run}
+        TRACER.end_span(self.operation_span, outcome="superseded")
+        self.operation_span = TRACER.start_span(f"operation {name}", "operation", target=target, dry_run=bool(dry_run))
+        self.operation_ctx = {"state": "preparing", "name": name, "target": target, "dry_run": dry_run, "started": time.monotonic()}
         self.set_state("Loading", f"{name} preparing...")
         self.log_audit(name, target, "start", dry_run=dry_run)
         self.log_debug("APPLICATION", {"operation": name, "target": target, "state": "start", "dry_run": dry_run})
@@ -5581,81 +12621,88 @@ class FocusManager(QtWidgets.QMainWindow):
         if not self.operation_ctx:
             return
         self.operation_ctx["state"] = state
+        TRACER.instant(f"operation state {state}", "operation", parent=self.operation_span)
         if state == "executing":
             self.operation_progress.setStyleSheet(
                 f"QProgressBar::chunk{{background-color:{getattr(self,'accent_primary',ACCENTS['sunset']['primary'])};}}"
                 f"QProgressBar{{border:1px solid {getattr(self,'accent_glow',ACCENTS['sunset']['glow'])}; border-radius:4px; text-align:center;}}"
             )
 
-    def finalize_operation(self, outcome):
+    def finalize_operation(self, outcome, error=None):
         # outcome: committed / rolled_back / failed
         if not self.operation_ctx:
             return
         self.operation_ctx["state"] = outcome
-        self.log_audit(self.operation_ctx.get("name"), self.operation_ctx.get("target"), outcome, dry_run=self.operation_ctx.get("dry_run"))
+        started = self.operation_ctx.get("started")
+        self.log_audit(
+            self.operation_ctx.get("name"),
+            self.operation_ctx.get("target"),
+            outcome,
+            dry_run=self.operation_ctx.get("dry_run"),
+            duration_ms=(time.monotonic() - started) * 1000 if started else None,
+            error=error,
+        )
+        TRACER.end_span(self.operation_span, outcome=outcome)
+        self.operation_span = None
         self.operation_ctx = {"state": "idle", "name": None, "target": None, "dry_run": False}
         self.log_debug("APPLICATION", {"operation": "finalize", "outcome": outcome})
 
-    def log_audit(self, op_type, target, outcome, dry_run=False):
+    def log_audit(self, op_type, target, outcome, dry_run=False, duration_ms=None, error=None):
         try:
-            DATA_DIR.mkdir(parents=True, exist_ok=True)
-            stamp = now_str()
-            tgt = target or "-"
-            suffix = " dry-run" if dry_run else ""
-            with open(AUDIT_LOG, "a", encoding="utf-8") as fh:
-                fh.write(f"[{stamp}] {op_type} project={tgt} {outcome}{suffix}\n")
+            self.audit_store.record(op_type, target, outcome, dry_run=dry_run, duration_ms=duration_ms, error=error)
         except Exception:
             pass
 
     # ---- Manifest helpers ----
     def manifest_path(self, project):
-        return os.path.join(PROJECT_ROOT, project, PROJECT_MANIFEST)
+        return self.manifest_cache.path(project)
 
     def load_manifest(self, project):
-        path = self.manifest_path(project)
-        try:
-            if os.path.exists(path):
-                with open(path, "r", encoding="utf-8") as fh:
-                    return json.load(fh)
-        except Exception:
-            return {}
-        return {}
+        return self.manifest_cache.get(project)
 
     def write_manifest(self, project, data):
-        path = self.manifest_path(project)
-        try:
-            with open(path, "w", encoding="utf-8") as fh:
-                json.dump(data, fh, indent=2)
-            os.chmod(path, 0o600)
-        except Exception:
-            pass
+        self.manifest_cache.replace(project, data)
+
+    def _schedule_manifest_flush(self):
+        QtCore.QTimer.singleShot(0, self.manifest_cache.flush)
 
     def ensure_manifest(self, project, origin="Local", origin_path=None):
-        existing = self.load_manifest(project)
-        manifest = existing if isinstance(existing, dict) else {}
-        if "project_id" not in manifest:
-            manifest["project_id"] = str(uuid.uuid4())
-        manifest.setdefault("project_name", project)
-        manifest["origin"] = origin
-        manifest["origin_path"] = origin_path
-        manifest.setdefault("creation_timestamp", now_str())
-        manifest.setdefault("preferred_credentials", self.selected_cred_label)
+        manifest = self.load_manifest(project)
         meta_entry = self.project_meta.get(project, {})
-        manifest["auto_commit_enabled"] = bool(meta_entry.get("auto_commit", False))
-        manifest["localsync_enabled"] = bool(meta_entry.get("localsync", False))
-        manifest["localsync_path"] = meta_entry.get("localsync_path")
-        manifest.setdefault("redacted", False)
-        manifest.setdefault("tags", [])
-        self.write_manifest(project, manifest)
+        fields = self._manifest_ensure_fields(project, manifest, meta_entry, origin, origin_path, self.selected_cred_label)
+        if fields:
+            self.manifest_cache.update(project, **fields)
+
+    @staticmethod
+    def _manifest_ensure_fields(project, manifest, meta_entry, origin, origin_path, cred_label):
+        """Fields ensure_manifest would change; pure so project scans can compute it off the UI thread."""
+        fields = {
+            "origin": origin,
+            "origin_path": origin_path,
+            "auto_commit_enabled": bool(meta_entry.get("auto_commit", False)),
+            "localsync_enabled": bool(meta_entry.get("localsync", False)),
+            "localsync_path": meta_entry.get("localsync_path"),
+        }
+        defaults = {
+            "project_id": lambda: str(uuid.uuid4()),
+            "project_name": lambda: project,
+            "creation_timestamp": now_str,
+            "preferred_credentials": lambda: cred_label,
+            "redacted": lambda: False,
+            "tags": list,
+        }
+        for key, make in defaults.items():
+            if key not in manifest:
+                fields[key] = make()
+        return {key: value for key, value in fields.items() if key not in manifest or manifest[key] != value}
 
     def update_manifest_fields(self, project, **fields):
         manifest = self.load_manifest(project)
-        if not isinstance(manifest, dict):
-            manifest = {}
-        manifest.setdefault("project_id", str(uuid.uuid4()))
-        manifest.setdefault("project_name", project)
-        manifest.update(fields)
-        self.write_manifest(project, manifest)
+        if "project_id" not in manifest:
+            fields.setdefault("project_id", str(uuid.uuid4()))
+        if "project_name" not in manifest:
+            fields.setdefault("project_name", project)
+        self.manifest_cache.update(project, **fields)
 
     # ---- System health ----
     def refresh_health_panel(self, github_status=None):
@@ -5708,7 +12755,7 @@ class FocusManager(QtWidgets.QMainWindow):
         def work():
             try:
                 req = urllib.request.Request("https://api.github.com", method="HEAD")
-                urllib.request.urlopen(req, timeout=5)
+                open_url(req, timeout=5)
                 return True
             except Exception:
                 return False
@@ -5717,12 +12764,12 @@ class FocusManager(QtWidgets.QMainWindow):
             self.github_reachable = ok
             self.refresh_health_panel("Reachable" if ok else "Unreachable")
 
-        self.run_in_background(work, on_result)
+        self.run_in_background(work, on_result, kind="github", key="github:ping", resource="network", cache_ttl=30)
 
     def last_commit_hash(self, path):
         try:
             env = self.git_env()
-            res = subprocess.run(["git", "-C", path, "rev-parse", "HEAD"], capture_output=True, text=True, env=env)
+            res = run_subprocess(["git", "-C", path, "rev-parse", "HEAD"], capture_output=True, text=True, env=env)
             if res.returncode == 0:
                 return res.stdout.strip()
         except Exception:
@@ -6073,8 +13120,13 @@ class FocusManager(QtWidgets.QMainWindow):
         self.import_project_btn.clicked.connect(self.import_existing_folder)
         self.delete_project_btn.clicked.connect(self.delete_project)
         self.project_table.itemSelectionChanged.connect(self._on_project_selection)
+        self.project_table.itemChanged.connect(self._on_project_item_changed)
+        self.project_table.clicked.connect(self._on_project_cell_clicked)
         self.list_tree.itemSelectionChanged.connect(self.on_list_selection)
         self.task_table.itemSelectionChanged.connect(self.on_task_selection)
+        self.task_table.verticalScrollBar().valueChanged.connect(self._on_task_table_scrolled)
+        self.recurrence_combo.currentTextChanged.connect(self._on_recurrence_rule_changed)
+        self._on_recurrence_rule_changed(self.recurrence_combo.currentText())
         self.new_list_btn.clicked.connect(self.create_list)
         self.rename_list_btn.clicked.connect(self.rename_list)
         self.new_task_btn.clicked.connect(self.add_task_dialog)
@@ -6190,66 +13242,73 @@ class FocusManager(QtWidgets.QMainWindow):
         )
 
     def refresh_projects(self):
+        # Discovery and manifest reads run on a worker; overlapping requests collapse into one rescan.
+        if self._project_scan_running:
+            self._project_scan_pending = True
+            return
+        self._project_scan_running = True
+        self._project_scan_pending = False
         self.set_state("Loading", "Loading projects...")
+        meta = {name: dict(entry) for name, entry in self.project_meta.items() if isinstance(entry, dict)}
+        cred_label = self.selected_cred_label
+
+        def scan():
+            return self._scan_projects(meta, cred_label)
+
+        self.run_in_background(scan, self._apply_project_scan, self._on_project_scan_error, kind="projects", priority=JOB_PRIORITY_HIGH)
+
+    def _scan_projects(self, meta, cred_label):
         try:
             projects = self.backend.list_projects()
         except FileNotFoundError:
+            return None
+        manifests = self.manifest_cache.load_many([name for name, _ in projects])
+        rows = []
+        ensure = {}
+        for name, mtime in projects:
+            meta_entry = meta.get(name, {})
+            manifest = manifests.get(name, {})
+            fields = self._manifest_ensure_fields(
+                name,
+                manifest,
+                meta_entry,
+                meta_entry.get("origin", "Local"),
+                meta_entry.get("origin_path"),
+                cred_label,
+            )
+            if fields:
+                ensure[name] = fields
+            rows.append((name, mtime, bool(manifest.get("redacted", False))))
+        return {"rows": rows, "ensure": ensure}
+
+    def _on_project_scan_error(self, err):
+        self._project_scan_running = False
+        self.set_state("Idle", "")
+        self.show_error_banner(f"Project scan failed: {err}")
+        self.log_debug("FILESYSTEM", {"project_root": PROJECT_ROOT, "error": err})
+
+    def _apply_project_scan(self, scan):
+        self._project_scan_running = False
+        if self._project_scan_pending:
+            QtCore.QTimer.singleShot(0, self.refresh_projects)
+        if scan is None:
             QtWidgets.QMessageBox.critical(self, "Error", f"Project root not found: {PROJECT_ROOT}")
             self.show_error_banner(f"Project root not found: {PROJECT_ROOT}")
+            self.set_state("Idle", "")
             return
-
+        start = time.perf_counter()
+        for name, fields in scan["ensure"].items():
+            self.manifest_cache.update(name, **fields)
+        rows = scan["rows"]
+        self._project_scan_rows = rows
+        self.project_indexer.sync({name: mtime for name, mtime, _ in rows})
         self.active_project = self.get_marker_project()
-        names = [p[0] for p in projects]
-        self.redaction_state = {k: v for k, v in self.redaction_state.items() if k in names}
+        names = {name for name, _, _ in rows}
+        self.redaction_state = {name: redacted for name, _, redacted in rows}
         if self.selected_project and self.selected_project not in names:
             self.selected_project = None
-        self.project_table.setRowCount(len(projects))
-        for row, (name, mtime) in enumerate(projects):
-            # ensure manifest exists and capture redaction state
-            meta_entry = self.project_meta.get(name, {"origin": "Local", "auto_commit": False, "localsync": False})
-            origin_val = meta_entry.get("origin", "Local")
-            self.ensure_manifest(name, origin=origin_val, origin_path=meta_entry.get("origin_path"))
-            manifest = self.load_manifest(name) or {}
-            redacted = bool(manifest.get("redacted", False))
-            self.redaction_state[name] = redacted
-            display_name = f"{name} [REDACTED]" if redacted else name
-            name_item = QtWidgets.QTableWidgetItem(display_name)
-            name_item.setData(QtCore.Qt.UserRole, name)
-            time_str = self._format_ui_datetime(datetime.fromtimestamp(mtime))
-            time_item = QtWidgets.QTableWidgetItem(time_str)
-            origin_item = QtWidgets.QTableWidgetItem(origin_val)
-            name_item.setFlags(qt_no_edit(name_item.flags()))
-            time_item.setFlags(qt_no_edit(time_item.flags()))
-            origin_item.setFlags(qt_no_edit(origin_item.flags()))
-            if redacted:
-                name_item.setForeground(QtGui.QColor("#d14b4b"))
-            self.project_table.setItem(row, 0, name_item)
-            self.project_table.setItem(row, 1, time_item)
-
-            status_value = self.status_map.get(name, "Pending Review")
-            combo = QtWidgets.QComboBox()
-            combo.addItems(STATUS_OPTIONS)
-            if status_value in STATUS_OPTIONS:
-                combo.setCurrentText(status_value)
-            combo.currentTextChanged.connect(partial(self._on_status_changed, name))
-            self.project_table.setCellWidget(row, 2, combo)
-            self.project_table.setItem(row, 3, origin_item)
-            localsync_cb = QtWidgets.QCheckBox("LocalSync")
-            localsync_cb.setToolTip('syncs Remote project location with data from local system prioritizing the most up to date version')
-            localsync_cb.setChecked(bool(meta_entry.get("localsync", False)))
-            localsync_cb.stateChanged.connect(partial(self._on_localsync_changed, name, localsync_cb))
-            self.ensure_interactable(localsync_cb)
-            self.project_table.setCellWidget(row, 4, localsync_cb)
-            # show selected localsync path (truncated)
-            path_preview = meta_entry.get("localsync_path") or ""
-            path_item = QtWidgets.QTableWidgetItem(path_preview if len(path_preview) < 48 else "…" + path_preview[-46:])
-            path_item.setFlags(qt_no_edit(path_item.flags()))
-            self.project_table.setItem(row, 5, path_item)
-
-            if self.active_project and name == self.active_project:
-                name_item.setBackground(QtGui.QColor("#1b2742"))
-                time_item.setBackground(QtGui.QColor("#1b2742"))
-                origin_item.setBackground(QtGui.QColor("#1b2742"))
+        specs = self._project_specs(rows)
+        diff = self._sync_project_rows(specs)
 
         self.update_active_label()
         self.populate_lists()
@@ -6264,10 +13323,152 @@ class FocusManager(QtWidgets.QMainWindow):
             "FILESYSTEM",
             {
                 "project_root": PROJECT_ROOT,
-                "projects": len(projects),
+                "projects": len(rows),
+                "manifests_ensured": len(scan["ensure"]),
+                "ui_ms": round((time.perf_counter() - start) * 1000, 2),
+                **diff,
             },
         )
 
+    def _project_specs(self, rows):
+        project_aggs = self.store.project_aggregates()
+        specs = []
+        for name, mtime, redacted in rows:
+            meta_entry = self.project_meta.get(name, {})
+            aggregate = project_aggs.get(name) or {}
+            path_preview = meta_entry.get("localsync_path") or ""
+            index = self.project_indexer.entry(name) or {}
+            languages = sorted((index.get("languages") or {}).items(), key=lambda kv: kv[1][1], reverse=True)
+            specs.append(
+                (
+                    name,
+                    (
+                        redacted,
+                        max(mtime, index.get("newest_mtime") or 0),
+                        self.status_map.get(name, "Pending Review"),
+                        meta_entry.get("origin", "Local"),
+                        bool(meta_entry.get("localsync", False)),
+                        path_preview if len(path_preview) < 48 else "…" + path_preview[-46:],
+                        (aggregate.get("completed", 0), aggregate.get("total", 0)),
+                        name == self.active_project,
+                        index.get("size_bytes") if index else None,
+                        index.get("file_count") if index else None,
+                        tuple((lang, files, size) for lang, (files, size) in languages),
+                        (index.get("git_head"), index.get("git_dirty")),
+                    ),
+                )
+            )
+        return specs
+
+    def _on_projects_indexed(self, projects):
+        rows = getattr(self, "_project_scan_rows", None)
+        if not rows or not self._ui_alive(self.project_table):
+            return
+        diff = self._sync_project_rows(self._project_specs(rows))
+        self.log_debug("FILESYSTEM", {"indexed": len(projects), "projects": projects[:10], **diff, **self.project_indexer.stats})
+
+    def _project_name_at(self, row):
+        item = self.project_table.item(row, 0)
+        return item.data(QtCore.Qt.UserRole) if item else None
+
+    def _sync_project_rows(self, specs):
+        """Bring the Projects table in line with specs, touching only inserted, removed or changed rows."""
+        table = self.project_table
+        wanted = dict(specs)
+        diff = {"inserted": 0, "removed": 0, "updated": 0}
+        blocker = QtCore.QSignalBlocker(table)
+        # Row order belongs to the header's sort; sorting is suspended so edits don't reshuffle rows mid-diff.
+        table.setSortingEnabled(False)
+        for row in range(table.rowCount() - 1, -1, -1):
+            if self._project_name_at(row) not in wanted:
+                table.removeRow(row)
+                diff["removed"] += 1
+        existing = {self._project_name_at(row): row for row in range(table.rowCount())}
+        for name, spec in specs:
+            row = existing.get(name)
+            if row is None:
+                row = table.rowCount()
+                table.insertRow(row)
+                diff["inserted"] += 1
+            elif self._project_row_specs.get(name) == spec:
+                continue
+            else:
+                diff["updated"] += 1
+            self._fill_project_row(row, name, spec)
+        table.setSortingEnabled(True)
+        del blocker
+        self._project_row_specs = wanted
+        return diff
+
+    def _fill_project_row(self, row, name, spec):
+        (
+            redacted,
+            last_activity,
+            status,
+            origin,
+            localsync,
+            path_preview,
+            (done, total),
+            active,
+            size_bytes,
+            file_count,
+            languages,
+            (git_head, git_dirty),
+        ) = spec
+        name_item = QtWidgets.QTableWidgetItem(f"{name} [REDACTED]" if redacted else name)
+        name_item.setData(QtCore.Qt.UserRole, name)
+        time_item = SortKeyItem(self._format_ui_datetime(last_activity), last_activity)
+        time_item.setToolTip("Newest file or directory change in the project tree")
+        status_item = QtWidgets.QTableWidgetItem(status)
+        origin_item = QtWidgets.QTableWidgetItem(origin)
+        localsync_item = QtWidgets.QTableWidgetItem("LocalSync")
+        localsync_item.setToolTip('syncs Remote project location with data from local system prioritizing the most up to date version')
+        localsync_item.setFlags(qt_no_edit(localsync_item.flags()) | QtCore.Qt.ItemIsUserCheckable)
+        localsync_item.setCheckState(QtCore.Qt.Checked if localsync else QtCore.Qt.Unchecked)
+        path_item = QtWidgets.QTableWidgetItem(path_preview)
+        indexing = size_bytes is None
+        size_item = SortKeyItem("indexing…" if indexing else format_bytes(size_bytes), -1 if indexing else size_bytes)
+        files_item = SortKeyItem("" if indexing else str(file_count), -1 if indexing else file_count)
+        total_bytes = sum(size for _, _, size in languages) or 1
+        lang_item = QtWidgets.QTableWidgetItem(", ".join(lang for lang, _, _ in languages[:2]))
+        if languages:
+            lang_item.setToolTip(
+                "\n".join(f"{lang}: {files} files, {format_bytes(size)} ({size * 100 // total_bytes}%)" for lang, files, size in languages)
+            )
+        if git_head:
+            git_item = SortKeyItem(f"{git_head[:8]}{' *' if git_dirty else ''}", (1 if git_dirty else 0, git_head))
+            git_item.setToolTip(f"HEAD {git_head}" + (" (uncommitted changes)" if git_dirty else ""))
+        else:
+            git_item = SortKeyItem("", (-1, ""))
+        for item in (name_item, time_item, origin_item, path_item, size_item, files_item, lang_item, git_item):
+            item.setFlags(qt_no_edit(item.flags()))
+        if redacted:
+            name_item.setForeground(QtGui.QColor("#d14b4b"))
+        if git_dirty:
+            git_item.setForeground(QtGui.QColor("#d2a446"))
+        if active:
+            for item in (name_item, time_item, origin_item):
+                item.setBackground(QtGui.QColor("#1b2742"))
+        table = self.project_table
+        for column, item in enumerate(
+            (name_item, time_item, status_item, origin_item, localsync_item, path_item, self._task_progress_item({"completed": done, "total": total}),
+             size_item, files_item, lang_item, git_item)
+        ):
+            table.setItem(row, column, item)
+
+    def _on_project_item_changed(self, item):
+        project = self._project_name_at(item.row())
+        if not project:
+            return
+        if item.column() == 2:
+            self._on_status_changed(project, item.text())
+        elif item.column() == 4:
+            self._on_localsync_changed(project, item, item.checkState() == QtCore.Qt.Checked)
+
+    def _on_project_cell_clicked(self, index):
+        if index.column() == 2:
+            self.project_table.edit(index)
+
     def _set_status(self, project, value):
         self.status_map[project] = value
         self.project_meta.setdefault(project, {})["localsync"] = self.project_meta.get(project, {}).get("localsync", False)
@@ -6281,6 +13482,7 @@ class FocusManager(QtWidgets.QMainWindow):
             return
         start = time.monotonic()
         synced_files = 0
+        synced_bytes = 0
 
         def newer(src, dst):
             return os.path.getmtime(src) > os.path.getmtime(dst)
@@ -6296,6 +13498,7 @@ class FocusManager(QtWidgets.QMainWindow):
                     if not os.path.exists(dst) or newer(src, dst):
                         shutil.copy2(src, dst)
                         synced_files += 1
+                        synced_bytes += os.path.getsize(dst)
                 except Exception:
                     continue
         for root, dirs, files in os.walk(local_path):
@@ -6309,26 +13512,36 @@ class FocusManager(QtWidgets.QMainWindow):
                     if not os.path.exists(dst) or newer(src, dst):
                         shutil.copy2(src, dst)
                         synced_files += 1
+                        synced_bytes += os.path.getsize(dst)
                 except Exception:
                     continue
-        latency_ms = int((time.monotonic() - start) * 1000)
-        self.log_debug("PROJECTS", {"localsync": "completed", "project": project, "files": synced_files, "latency_ms": latency_ms})
+        elapsed = time.monotonic() - start
+        METRIC_SYNC_FILES.inc(synced_files)
+        METRIC_SYNC_BYTES.inc(synced_bytes)
+        METRIC_SYNC_SECONDS.observe(elapsed)
+        self.log_debug(
+            "PROJECTS",
+            {"localsync": "completed", "project": project, "files": synced_files, "bytes": synced_bytes, "latency_ms": int(elapsed * 1000)},
+        )
 
     def _on_status_changed(self, project, value):
         if not self._ui_alive(self.project_table):
             return
         self._set_status(project, value)
 
-    def _toggle_localsync(self, project, state, checkbox=None):
+    def _toggle_localsync(self, project, state, item=None):
         enabled = bool(state)
         # selecting ON requires explicit folder pick
         if enabled:
             path = QtWidgets.QFileDialog.getExistingDirectory(self, "Select Local Folder for LocalSync")
             if not path:
-                if checkbox:
-                    checkbox.blockSignals(True)
-                    checkbox.setChecked(False)
-                    checkbox.blockSignals(False)
+                if item is not None and item.tableWidget() is not None:
+                    table = item.tableWidget()
+                    table.blockSignals(True)
+                    try:
+                        item.setCheckState(QtCore.Qt.Unchecked)
+                    finally:
+                        table.blockSignals(False)
                 return
             self.localsync_paths[project] = path
         elif project in self.localsync_paths:
@@ -6360,10 +13573,10 @@ class FocusManager(QtWidgets.QMainWindow):
         )
         self.refresh_projects()
 
-    def _on_localsync_changed(self, project, checkbox, state):
+    def _on_localsync_changed(self, project, item, state):
         if not self._ui_alive(self.project_table):
             return
-        FocusManager._toggle_localsync(self, project, state, checkbox)
+        FocusManager._toggle_localsync(self, project, state, item)
 
     def _on_project_selection(self):
         self.update_autogit_path_label()
@@ -7310,7 +14523,7 @@ class FocusManager(QtWidgets.QMainWindow):
         def work():
             req = urllib.request.Request(url, data=payload, headers=headers, method="PATCH")
             try:
-                with urllib.request.urlopen(req, timeout=15) as resp:
+                with open_url(req, timeout=15) as resp:
                     code = resp.getcode()
                     data = json.load(resp)
                     return True, code, data, None
@@ -7334,7 +14547,8 @@ class FocusManager(QtWidgets.QMainWindow):
         def on_error(err):
             self.log_vcs(f"[redaction] Visibility update error: {err}")
 
-        self.run_in_background(work, on_result, on_error)
+        # Not coalesced: a later request for the other visibility must run after this one, not join it.
+        self.run_in_background(work, on_result, on_error, kind="github", resource=f"github:visibility:{owner}/{project}", timeout=30)
 
     def _build_workspace_graph_data(self, path, proj):
         nodes = []
@@ -7375,8 +14589,18 @@ class FocusManager(QtWidgets.QMainWindow):
                 break
         try:
             cur = self.store.conn.cursor()
-            cur.execute("SELECT uuid, title, status, priority FROM tasks WHERE project=?", (proj,))
-            for row in cur.fetchall():
+            cur.execute(
+                "SELECT t.uuid, t.title, t.status, t.priority, r.open_deps, r.chain FROM tasks t "
+                "LEFT JOIN task_readiness r ON r.task_id = t.id WHERE t.project=?",
+                (proj,),
+            )
+            task_rows = cur.fetchall()
+            dep_edges = self.store.dependency_edges(proj)
+            critical = self.store.critical_path(proj)
+            critical_set = set(critical)
+            critical_links = set(zip(critical, critical[1:]))
+            has_deps = {task_uuid for task_uuid, _ in dep_edges}
+            for row in task_rows:
                 tid = row["uuid"]
                 label = (row["title"] or tid)[:28]
                 nid = f"task:{tid}"
@@ -7389,9 +14613,17 @@ class FocusManager(QtWidgets.QMainWindow):
                         "uuid": tid,
                         "project": proj,
                         "priority": row["priority"],
+                        "open_deps": row["open_deps"] or 0,
+                        "chain": row["chain"] or 0,
+                        "critical": tid in critical_set,
                     }
                 )
-                edges.append((root_id, nid))
+                # Tasks with prerequisites hang off those instead of the project root, so the DAG reads top-down.
+                if tid not in has_deps:
+                    edges.append((root_id, nid))
+            for task_uuid, dep_uuid in dep_edges:
+                kind = "critical" if (dep_uuid, task_uuid) in critical_links else "depends"
+                edges.append((f"task:{dep_uuid}", f"task:{task_uuid}", kind))
         except Exception:
             pass
         return nodes, edges
@@ -7616,7 +14848,7 @@ class FocusManager(QtWidgets.QMainWindow):
             return False, "Missing GitHub credentials."
         def request(method, url, data=None):
             req = urllib.request.Request(url, data=data, headers=headers, method=method)
-            return urllib.request.urlopen(req, timeout=15)
+            return open_url(req, timeout=15)
         # check existence
         try:
             request("GET", f"https://api.github.com/repos/{username}/{repo}")
@@ -7641,11 +14873,11 @@ class FocusManager(QtWidgets.QMainWindow):
         env = self.git_env()
         remote_url = f"https://github.com/{username}/{repo}.git"
         if not dry_run:
-            subprocess.run(["git", "-C", path, "remote", "remove", "origin"], capture_output=True, text=True, env=env)
-            res = subprocess.run(["git", "-C", path, "remote", "add", "origin", remote_url], capture_output=True, text=True, env=env)
+            run_subprocess(["git", "-C", path, "remote", "remove", "origin"], capture_output=True, text=True, env=env)
+            res = run_subprocess(["git", "-C", path, "remote", "add", "origin", remote_url], capture_output=True, text=True, env=env)
             if res.returncode != 0:
                 # maybe already exists; set-url
-                subprocess.run(["git", "-C", path, "remote", "set-url", "origin", remote_url], capture_output=True, text=True, env=env)
+                run_subprocess(["git", "-C", path, "remote", "set-url", "origin", remote_url], capture_output=True, text=True, env=env)
         return True, "Remote ensured"
 
     def update_autogit_path_label(self):
@@ -7827,7 +15059,7 @@ class FocusManager(QtWidgets.QMainWindow):
                 self.finalize_operation("failed")
                 release_toggle_flag()
 
-            self.run_in_background(work, on_result, on_error)
+            self.run_in_background(work, on_result, on_error, kind="github", key=f"github:ensure_remote:{proj}", resource="network", timeout=60)
         else:
             if self.dry_run_checkbox.isChecked():
                 QtWidgets.QMessageBox.information(self, "Dry Run", f"[Dry run] Would disable auto-commit for {proj}")
@@ -7873,6 +15105,7 @@ class FocusManager(QtWidgets.QMainWindow):
         self.ui_state["focused_project"] = self.active_project
         self.ui_state["mount_active"] = os.path.ismount(ACTIVE_PROJECT_PATH) if USE_BIND_MOUNT else bool(self.active_project)
         self.update_manifest_fields(project, last_focused_timestamp=now_str(), preferred_credentials=self.selected_cred_label)
+        self._open_project_terminal(project)
         self.update_active_label()
         self.update_autogit_path_label()
         self.update_context_labels()
@@ -7880,6 +15113,10 @@ class FocusManager(QtWidgets.QMainWindow):
         self.refresh_health_panel()
         self.finalize_operation("committed")
 
+    def _open_project_terminal(self, project):
+        if hasattr(self, "photon_terminal_widget") and project:
+            self.photon_terminal_widget.open_project_session(project, os.path.join(PROJECT_ROOT, project))
+
     def unfocus_current(self):
         self.start_operation("unfocus", target=self.active_project, dry_run=False)
         self.ui_state["view_mode"] = "canonical"
@@ -7891,11 +15128,40 @@ class FocusManager(QtWidgets.QMainWindow):
         # detach file views to release handles before unmount
         self.detach_fs_view()
         QtWidgets.QApplication.processEvents()
-        # Check for busy processes only when a bind mount is in use.
+        # Check for busy processes only when a bind mount is in use; the /proc scan runs off the UI thread.
+        if USE_BIND_MOUNT:
+            self.show_operation("Checking for open handles...", state="Executing")
+
+            def on_scan_error(err):
+                self.log_debug("FOCUS_STATE", {"handle_scan": "failed", "error": err})
+                self._unfocus_after_scan(None)
+
+            self.run_in_background(
+                self.processes_using_active_mount,
+                self._unfocus_after_scan,
+                on_scan_error,
+                kind="handle_scan",
+                priority=JOB_PRIORITY_HIGH,
+                timeout=PROC_SCAN_TIMEOUT + 2,
+            )
+            return
+        self._unfocus_after_scan(None)
+
+    def _unfocus_after_scan(self, scan):
         if USE_BIND_MOUNT:
-            busy = self.processes_using_active_mount()
-            if busy:
-                msg = "The following processes are using the mount:\n" + "\n".join(busy[:10])
+            busy = (scan or {}).get("processes") or []
+            if scan is not None:
+                self.log_debug(
+                    "FOCUS_STATE",
+                    {"handle_scan": len(busy), "complete": scan.get("complete"), "scanned": scan.get("scanned"), "latency_ms": scan.get("latency_ms")},
+                )
+            if busy or (scan is not None and not scan.get("complete")):
+                lines = [f"{proc['pid']} {proc['command'][:60]} — {proc['paths'][0][0]} {proc['paths'][0][1]}" for proc in busy[:10]]
+                msg = "The following processes are using the mount:\n" + "\n".join(lines)
+                if len(busy) > 10:
+                    msg += f"\n… and {len(busy) - 10} more"
+                if scan is not None and not scan.get("complete"):
+                    msg += "\n(Scan timed out; the list may be incomplete.)"
                 msg += "\nAttempt lazy unmount?"
                 reply = QtWidgets.QMessageBox.question(self, "Mount Busy", msg, QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
                 if reply != QtWidgets.QMessageBox.Yes:
@@ -7916,7 +15182,7 @@ class FocusManager(QtWidgets.QMainWindow):
             msg = result.stderr.strip() or result.stdout.strip() or "Unfocus failed."
             if USE_BIND_MOUNT:
                 # Attempt lazy unmount as safe fallback if confirmed already
-                lazy = subprocess.run(["sudo", "-n", "umount", "-l", ACTIVE_PROJECT_PATH], capture_output=True, text=True)
+                lazy = run_subprocess(["sudo", "-n", "umount", "-l", ACTIVE_PROJECT_PATH], capture_output=True, text=True)
                 if lazy.returncode != 0:
                     QtWidgets.QMessageBox.critical(self, "Unfocus Error", msg)
                     self.show_error_banner(msg)
@@ -8029,12 +15295,14 @@ class FocusManager(QtWidgets.QMainWindow):
             QtWidgets.QMessageBox.critical(self, "Conflict", f"{dst} already exists.")
             self.set_state("Idle", "")
             return
+        self.manifest_cache.flush()
         try:
             os.rename(src, dst)
         except Exception as exc:  # noqa: BLE001
             QtWidgets.QMessageBox.critical(self, "Error", f"Rename failed: {exc}")
             self.set_state("Idle", "")
             return
+        self.manifest_cache.forget(project)
         if project in self.status_map:
             self.status_map[new_name] = self.status_map.pop(project)
         QtWidgets.QMessageBox.information(self, "Renamed", f"{project} → {new_name}")
@@ -8085,6 +15353,7 @@ class FocusManager(QtWidgets.QMainWindow):
             self.finalize_operation("failed")
             return
         self.project_meta.pop(project, None)
+        self.manifest_cache.forget(project)
         self.save_project_meta()
         self.active_project = self.get_marker_project()
         self.refresh_projects()
@@ -8119,7 +15388,7 @@ class FocusManager(QtWidgets.QMainWindow):
             return
 
         def work():
-            return subprocess.run(
+            return run_subprocess(
                 [gemini_bin],
                 input=prompt,
                 capture_output=True,
@@ -8144,7 +15413,7 @@ class FocusManager(QtWidgets.QMainWindow):
             self.show_error_banner(errmsg)
             self.finish_operation("Summarize failed")
 
-        self.run_in_background(work, on_result, on_error)
+        self.run_in_background(work, on_result, on_error, kind="llm", key=f"llm:summary:{target}", resource="llm")
 
     def build_summary_prompt(self, name, path):
         structure_lines = []
@@ -8396,7 +15665,7 @@ class FocusManager(QtWidgets.QMainWindow):
         )
 
         def work():
-            return subprocess.run(
+            return run_subprocess(
                 [gemini_bin],
                 input=payload,
                 capture_output=True,
@@ -8507,7 +15776,7 @@ class FocusManager(QtWidgets.QMainWindow):
                 "tokens_sent_est": len(payload.split()),
             },
         )
-        self.run_in_background(work, on_result, on_error)
+        self.run_in_background(work, on_result, on_error, kind="llm", key=f"llm:todo:{project}", resource="llm")
 
     # ---- AutoGIT ----
     def run_autogit_init_for_path(self, path):
@@ -8531,7 +15800,12 @@ class FocusManager(QtWidgets.QMainWindow):
         self.finish_operation("VCS init complete")
         try:
             proj_name = os.path.basename(path.rstrip("/"))
-            self.log_audit("autogit_init", proj_name, "success" if result.returncode == 0 else "failed")
+            self.log_audit(
+                "autogit_init",
+                proj_name,
+                "success" if result.returncode == 0 else "failed",
+                error=((result.stderr or "").strip() or None) if result.returncode != 0 else None,
+            )
         except Exception:
             pass
 
@@ -8558,31 +15832,35 @@ class FocusManager(QtWidgets.QMainWindow):
             divergence = self.git_divergence(path, env=env)
             if divergence and divergence.get("behind", 0) > 0:
                 return False, "remote ahead", f"Remote has {divergence['behind']} commits ahead of local; pull/rebase first."
-            status = subprocess.run(["git", "-C", path, "status", "--porcelain"], capture_output=True, text=True, env=env)
+            status = run_subprocess(["git", "-C", path, "status", "--porcelain"], capture_output=True, text=True, env=env)
             if status.returncode != 0:
                 return False, "git status failed", status.stderr
             if not status.stdout.strip():
                 return True, "clean", ""
-            add = subprocess.run(["git", "-C", path, "add", "-A"], capture_output=True, text=True, env=env)
+            add = run_subprocess(["git", "-C", path, "add", "-A"], capture_output=True, text=True, env=env)
             if add.returncode != 0:
                 return False, "git add failed", add.stderr
             msg = f"{'Manual' if manual else 'Auto'} commit {now_str()}"
-            commit = subprocess.run(["git", "-C", path, "commit", "-m", msg], capture_output=True, text=True, env=env)
+            commit = run_subprocess(["git", "-C", path, "commit", "-m", msg], capture_output=True, text=True, env=env)
             if commit.returncode != 0:
                 return False, "git commit failed", commit.stderr
             ok, msg_remote = self.ensure_remote_repo(proj, dry_run=False)
             if not ok:
                 return False, msg_remote, ""
-            push = subprocess.run(["git", "-C", path, "push", "-u", "origin", "main"], capture_output=True, text=True, env=env)
+            push = run_subprocess(["git", "-C", path, "push", "-u", "origin", "main"], capture_output=True, text=True, env=env)
             if push.returncode != 0:
                 return False, "git push failed", push.stderr or push.stdout
             return True, "pushed", ""
 
+        started = time.monotonic()
+
         def on_result(res):
             ok, msg, stderr = res
+            elapsed_ms = (time.monotonic() - started) * 1000
             if not ok:
                 if manual:
                     QtWidgets.QMessageBox.critical(self, "Auto Commit", msg)
+                self.log_audit("autogit_commit", proj, "failed", duration_ms=elapsed_ms, error=f"{msg}: {stderr}".strip(": "))
                 self.log_debug("VERSIONING", {"autocommit": "failed", "project": proj, "message": msg, "stderr": stderr})
                 self.finish_operation("Auto commit failed" if manual else "Auto commit idle")
                 return
@@ -8593,7 +15871,7 @@ class FocusManager(QtWidgets.QMainWindow):
                 return
             self.update_manifest_fields(proj, last_known_commit=self.last_commit_hash(path))
             self.refresh_health_panel()
-            self.log_audit("autogit_commit", proj, "success")
+            self.log_audit("autogit_commit", proj, "success", duration_ms=elapsed_ms)
             if manual:
                 self.finish_operation("Commit complete")
             self.log_debug("VERSIONING", {"autocommit": "success", "project": proj})
@@ -8601,13 +15879,14 @@ class FocusManager(QtWidgets.QMainWindow):
         def on_error(err):
             if manual:
                 QtWidgets.QMessageBox.critical(self, "Auto Commit", str(err))
+            self.log_audit("autogit_commit", proj, "failed", duration_ms=(time.monotonic() - started) * 1000, error=str(err))
             self.log_debug("VERSIONING", {"autocommit": "error", "project": proj, "error": str(err)})
             if manual:
                 self.finish_operation("Auto commit failed")
 
         if manual:
             self.show_operation("Running commit...", state="Executing")
-        self.run_in_background(work, on_result, on_error)
+        self.run_in_background(work, on_result, on_error, kind="autocommit", resource=f"git:{path}", priority=JOB_PRIORITY_LOW)
 
     def autogit_commit(self):
         path, proj = self.resolve_project_path(prefer_canonical=True)
@@ -8702,7 +15981,7 @@ class FocusManager(QtWidgets.QMainWindow):
             repos_url = "https://api.github.com/user/repos?per_page=100"
             req = urllib.request.Request(repos_url, headers=headers, method="GET")
             entries = []
-            with urllib.request.urlopen(req, timeout=20) as resp:
+            with open_url(req, timeout=20) as resp:
                 repos = json.load(resp)
             for repo in repos:
                 name = repo.get("name") or ""
@@ -8719,7 +15998,7 @@ class FocusManager(QtWidgets.QMainWindow):
                 branch_url = f"{branch_url}?per_page=100" if "?" not in branch_url else branch_url
                 try:
                     breq = urllib.request.Request(branch_url, headers=headers, method="GET")
-                    with urllib.request.urlopen(breq, timeout=15) as bresp:
+                    with open_url(breq, timeout=15) as bresp:
                         branch_data = json.load(bresp)
                         if isinstance(branch_data, list):
                             branches = [b.get("name", "") for b in branch_data if isinstance(b, dict) and b.get("name")]
@@ -8748,7 +16027,7 @@ class FocusManager(QtWidgets.QMainWindow):
             self.repo_cache = None
             self._set_repo_status(f"Failed to load repositories: {err}", error=True)
 
-        self.run_in_background(work, on_result, on_error)
+        self.run_in_background(work, on_result, on_error, kind="github", key="github:repos", resource="network", timeout=60)
 
     def autogit_status(self):
         path, proj = self.resolve_project_path(prefer_canonical=True)
@@ -8866,7 +16145,7 @@ class FocusManager(QtWidgets.QMainWindow):
             url = f"https://api.github.com/repos/{username}/{proj}/commits"
             req = urllib.request.Request(url, headers=headers, method="GET")
             try:
-                with urllib.request.urlopen(req, timeout=20) as resp:
+                with open_url(req, timeout=20) as resp:
                     code = resp.getcode()
                     data = json.load(resp)
                     return True, code, data, None
@@ -8917,7 +16196,7 @@ class FocusManager(QtWidgets.QMainWindow):
             self.finish_operation("Fetch failed")
             self.log_vcs(f"[fetch] error: {err}")
 
-        self.run_in_background(work, on_result, on_error)
+        self.run_in_background(work, on_result, on_error, kind="github", key=f"github:versions:{username}/{proj}", resource="network", timeout=45)
 
     def revert_version(self):
         proj = self.selected_project
@@ -8950,8 +16229,8 @@ class FocusManager(QtWidgets.QMainWindow):
 
         def work():
             env = self.git_env()
-            subprocess.run(["git", "-C", path, "fetch", "origin"], capture_output=True, text=True, env=env)
-            reset = subprocess.run(["git", "-C", path, "reset", "--hard", sha], capture_output=True, text=True, env=env)
+            run_subprocess(["git", "-C", path, "fetch", "origin"], capture_output=True, text=True, env=env)
+            reset = run_subprocess(["git", "-C", path, "reset", "--hard", sha], capture_output=True, text=True, env=env)
             return reset
 
         def on_result(res):
@@ -8973,7 +16252,7 @@ class FocusManager(QtWidgets.QMainWindow):
             self.finish_operation("Revert failed")
             self.finalize_operation("failed")
 
-        self.run_in_background(work, on_result, on_error)
+        self.run_in_background(work, on_result, on_error, kind="git", resource=f"git:{path}", priority=JOB_PRIORITY_HIGH)
 
     def apply_interface_settings(self):
         # simple dynamic tweaks; avoid heavy theme changes
@@ -9092,12 +16371,12 @@ class FocusManager(QtWidgets.QMainWindow):
 
     def git_divergence(self, path, env=None, branch=None):
         env = self.git_env(env or {})
-        branch_cmd = subprocess.run(["git", "-C", path, "rev-parse", "--abbrev-ref", "HEAD"], capture_output=True, text=True, env=env)
+        branch_cmd = run_subprocess(["git", "-C", path, "rev-parse", "--abbrev-ref", "HEAD"], capture_output=True, text=True, env=env)
         branch_name = branch or (branch_cmd.stdout.strip() if branch_cmd.returncode == 0 else "main")
-        fetch = subprocess.run(["git", "-C", path, "fetch", "--prune", "origin"], capture_output=True, text=True, env=env)
+        fetch = run_subprocess(["git", "-C", path, "fetch", "--prune", "origin"], capture_output=True, text=True, env=env)
         if fetch.returncode != 0:
             return None
-        cmp = subprocess.run(
+        cmp = run_subprocess(
             ["git", "-C", path, "rev-list", "--left-right", "--count", f"{branch_name}...origin/{branch_name}"],
             capture_output=True,
             text=True,
@@ -9164,7 +16443,7 @@ class FocusManager(QtWidgets.QMainWindow):
             env["GEMINI_PASSWORD"] = self.gemini_password
         cmd = [gem_bin, "--model", "gemini-pro", "--prompt", "OK", "--max-tokens", "1"]
         try:
-            res = subprocess.run(cmd, capture_output=True, text=True, env=env, timeout=20)
+            res = run_subprocess(cmd, capture_output=True, text=True, env=env, timeout=20)
         except Exception as exc:  # noqa: BLE001
             self.gemini_verified = False
             self.log_debug("GEMINI_AUTH", {"ok": False, "error": str(exc)})
@@ -9364,7 +16643,7 @@ class FocusManager(QtWidgets.QMainWindow):
             if not headers:
                 raise ValueError("Missing credentials")
             req = urllib.request.Request("https://api.github.com/user", headers=headers, method="GET")
-            with urllib.request.urlopen(req, timeout=15) as resp:
+            with open_url(req, timeout=15) as resp:
                 return json.load(resp), method_used
 
         def on_result(payload):
@@ -9399,7 +16678,7 @@ class FocusManager(QtWidgets.QMainWindow):
             self.log_vcs(f"[verify] failed: {err}")
             self.refresh_health_panel()
 
-        self.run_in_background(work, on_result, on_error)
+        self.run_in_background(work, on_result, on_error, kind="github", key="github:user", resource="network", timeout=30)
 
     def verify_gemini_credentials_ui(self):
         self.gemini_api_key = self.gemini_api_key_edit.text().strip() if hasattr(self, "gemini_api_key_edit") else self.gemini_api_key
@@ -9495,21 +16774,10 @@ class FocusManager(QtWidgets.QMainWindow):
 
     def load_settings(self):
         CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        if not SETTINGS_FILE.exists():
-            return {}
-        try:
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as fh:
-                return json.load(fh)
-        except Exception:
-            return {}
+        return read_json_file(SETTINGS_FILE)
 
     def save_settings(self):
-        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        try:
-            with open(SETTINGS_FILE, "w", encoding="utf-8") as fh:
-                json.dump(self.settings, fh, indent=2)
-        except Exception:
-            pass
+        self.settings_store.mark_dirty()
 
     # Collapsible + splitter persistence
     def get_collapsible_state(self, key, default=False):
@@ -9589,18 +16857,25 @@ class FocusManager(QtWidgets.QMainWindow):
         self.list_tree.addTopLevelItem(global_root)
         self.list_tree.addTopLevelItem(project_root_item)
 
+        system_counts = self.store.system_aggregates()
         for sys_name in SYSTEM_LISTS:
-            item = QtWidgets.QTreeWidgetItem([sys_name, "system"])
+            item = QtWidgets.QTreeWidgetItem([sys_name, "system", str(system_counts.get(sys_name, 0) or "")])
             item.setData(0, QtCore.Qt.UserRole, {"system": sys_name, "scope": "system"})
             system_root.addChild(item)
 
         lists = self.store.lists()
+        list_aggs = self.store.list_aggregates()
+        project_aggs = self.store.project_aggregates()
         for lst in lists:
             ref = {"id": lst["id"], "scope": lst["scope"], "project": lst["project"], "name": lst["name"]}
             item = QtWidgets.QTreeWidgetItem([lst["name"], lst["scope"]])
             item.setData(0, QtCore.Qt.UserRole, ref)
+            self._set_tree_progress(item, list_aggs.get(lst["id"]))
             if lst["scope"] == "project":
-                proj_item = self._find_or_create_project_node(project_root_item, lst["project"] or "Unassigned")
+                proj_name = lst["project"] or "Unassigned"
+                proj_item = self._find_or_create_project_node(project_root_item, proj_name)
+                if proj_item.childCount() == 0:
+                    self._set_tree_progress(proj_item, project_aggs.get(proj_name))
                 proj_item.addChild(item)
             elif lst["scope"] == "global":
                 global_root.addChild(item)
@@ -9676,11 +16951,34 @@ class FocusManager(QtWidgets.QMainWindow):
         if not self.current_list_ref:
             return
         self.set_state("Loading", "Loading tasks...")
-        rows = self.store.tasks_for_list(self.current_list_ref)
-        self.task_table.setRowCount(len(rows))
-        for idx, row in enumerate(rows):
+        rows, self._task_page_cursor = self.store.tasks_page(self.current_list_ref)
+        self.task_table.setRowCount(0)
+        self._append_task_rows(rows)
+        self._normalize_task_table_columns()
+        if rows:
+            self.task_table.selectRow(0)
+            self.on_task_selection()
+        else:
+            self.current_task_id = None
+            self.clear_detail_fields()
+        self.set_state("Idle", "")
+        self.log_debug(
+            "TASKS",
+            {
+                "list_scope": self.current_list_ref.get("scope") if self.current_list_ref else None,
+                "list_name": self.current_list_ref.get("name") if self.current_list_ref else None,
+                "task_rows": len(rows),
+                "more_pages": self._task_page_cursor is not None,
+            },
+        )
+
+    def _append_task_rows(self, rows):
+        start = self.task_table.rowCount()
+        self.task_table.setRowCount(start + len(rows))
+        for idx, row in enumerate(rows, start=start):
             task_uuid = row.get("uuid", "")
             title_item = QtWidgets.QTableWidgetItem(row.get("title", ""))
+            title_item.setData(QtCore.Qt.UserRole, task_uuid)
             due_item = QtWidgets.QTableWidgetItem(row.get("due_date") or "")
             prio_item = QtWidgets.QTableWidgetItem("★" if row["priority"] else "")
             state_item = QtWidgets.QTableWidgetItem(row.get("status", "pending"))
@@ -9699,22 +16997,18 @@ class FocusManager(QtWidgets.QMainWindow):
             self.task_table.setRowHeight(idx, 28)
             header_text = task_uuid[:10] if task_uuid else ""
             self.task_table.setVerticalHeaderItem(idx, QtWidgets.QTableWidgetItem(header_text))
-        self._normalize_task_table_columns()
-        if rows:
-            self.task_table.selectRow(0)
-            self.on_task_selection()
-        else:
-            self.current_task_id = None
-            self.clear_detail_fields()
-        self.set_state("Idle", "")
-        self.log_debug(
-            "TASKS",
-            {
-                "list_scope": self.current_list_ref.get("scope") if self.current_list_ref else None,
-                "list_name": self.current_list_ref.get("name") if self.current_list_ref else None,
-                "task_rows": len(rows),
-            },
-        )
+
+    def _on_task_table_scrolled(self, value):
+        # Fetch the next keyset page once the user scrolls to the bottom of the loaded rows.
+        if not self._ui_alive(self.task_table) or not self.current_list_ref:
+            return
+        if getattr(self, "_task_page_cursor", None) is None:
+            return
+        if value < self.task_table.verticalScrollBar().maximum():
+            return
+        rows, self._task_page_cursor = self.store.tasks_page(self.current_list_ref, after=self._task_page_cursor)
+        self._append_task_rows(rows)
+        self.log_debug("TASKS", {"page_loaded": len(rows), "task_rows": self.task_table.rowCount()})
 
     def current_task(self):
         if self.current_task_id is None:
@@ -9729,7 +17023,7 @@ class FocusManager(QtWidgets.QMainWindow):
             return
         row_idx = selected[0].row()
         uuid_item = self.task_table.item(row_idx, 0)
-        task_id = uuid_item.text() if uuid_item else ""
+        task_id = (uuid_item.data(QtCore.Qt.UserRole) or "") if uuid_item else ""
         if not task_id:
             header_item = self.task_table.verticalHeaderItem(row_idx)
             task_id = header_item.text() if header_item else ""
@@ -9759,7 +17053,10 @@ class FocusManager(QtWidgets.QMainWindow):
             self.reminder_checkbox.setChecked(False)
         self.priority_checkbox.setChecked(bool(task["priority"]))
         self.recurrence_combo.setCurrentText(task["recurrence"] or "none")
-        self.recur_interval_spin.setValue(task["recurrence_interval"] or 0 or 1)
+        interval = task["recurrence_interval"] or 0
+        if task["recurrence"] == "monthly" and not interval and task["due_date"]:
+            interval = int(task["due_date"][8:10] or 1)
+        self.recur_interval_spin.setValue(interval or 1)
         self.update_task_controls_enabled()
 
     def clear_detail_fields(self):
@@ -9802,11 +17099,9 @@ class FocusManager(QtWidgets.QMainWindow):
         self.set_state("Idle", "")
 
     def _auto_select_task(self, task_id):
-        for row in range(self.task_table.rowCount()):
-            header_item = self.task_table.verticalHeaderItem(row)
-            if header_item and header_item.text() == str(task_id):
-                self.task_table.selectRow(row)
-                return
+        row = self._task_row_for_uuid(str(task_id))
+        if row is not None:
+            self.task_table.selectRow(row)
 
     def save_task_details(self):
         task = self.current_task()
@@ -9823,7 +17118,7 @@ class FocusManager(QtWidgets.QMainWindow):
             self.reminder_edit.dateTime().toString("yyyy-MM-ddTHH:mm:ss") if self.reminder_checkbox.isChecked() else None
         )
         recurrence = self.recurrence_combo.currentText()
-        interval = self.recur_interval_spin.value() if recurrence == "custom" else 0
+        interval = self.recur_interval_spin.value() if recurrence in {"custom", "monthly"} else 0
         self.store.update_task(
             task["uuid"],
             title=title,
@@ -9834,6 +17129,7 @@ class FocusManager(QtWidgets.QMainWindow):
             recurrence=recurrence,
             recurrence_interval=interval,
         )
+        self.task_scheduler.invalidate()
         self.load_tasks()
         self.update_project_status_from_tasks(task["project"])
         self.set_state("Idle", "")
@@ -9854,6 +17150,7 @@ class FocusManager(QtWidgets.QMainWindow):
         if new_state:
             self.store.spawn_recurrence(task)
             self.prompt_autogit_for_task(task)
+        self.task_scheduler.invalidate()
         self.load_tasks()
         self.update_project_status_from_tasks(task["project"])
         self.set_state("Idle", "")
@@ -9889,6 +17186,7 @@ class FocusManager(QtWidgets.QMainWindow):
             return
         self.set_state("Executing", "Deleting task...")
         self.store.delete_task(task["uuid"])
+        self.task_scheduler.invalidate()
         self.load_tasks()
         self.update_project_status_from_tasks(task["project"])
         self.set_state("Idle", "")
@@ -9969,31 +17267,78 @@ class FocusManager(QtWidgets.QMainWindow):
                 target_list = self.active_project
         self.set_state("Loading", "Importing tasks...")
         try:
-            self.store.import_csv(path, target_project=target_project, target_list_name=target_list)
+            result = self.store.import_csv(path, target_project=target_project, target_list_name=target_list)
         except Exception as exc:  # noqa: BLE001
             QtWidgets.QMessageBox.critical(self, "Import Error", str(exc))
             self.show_error_banner(str(exc))
             self.set_state("Idle", "")
             return
+        cycles = result.get("dependency_cycles") or []
+        if cycles:
+            self.show_error_banner(f"Import skipped {len(cycles)} dependency edge(s) that would form a cycle.")
+            self.log_debug("TASKS", {"dependency_cycles": cycles[:20], "count": len(cycles)})
+        self.task_scheduler.invalidate()
         self.populate_lists()
         self.load_tasks()
         self.set_state("Idle", "")
 
     def export_tasks(self):
-        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export CSV", str(Path.home() / "tasks_export.csv"), "CSV Files (*.csv)")
+        if getattr(self, "_export_progress", None) is not None:
+            QtWidgets.QMessageBox.information(self, "Export Running", "An export is already in progress.")
+            return
+        file_filters = "CSV (*.csv);;Atlas CSV (*.tasks.csv);;JSON Lines (*.jsonl);;JSON (*.json);;Compressed (*.gz *.zst)"
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Tasks", str(Path.home() / "tasks_export.csv"), file_filters)
         if not path:
             return
+        list_ref = self.current_list_ref if self.current_list_ref and self.current_list_ref.get("id") is not None else None
+        dialog = ExportTasksDialog(sorted(self.store.project_aggregates().keys()), current_list=list_ref, parent=self)
+        if dialog.exec_() != QtWidgets.QDialog.Accepted:
+            return
+        filters = dialog.get_filters()
+        store = self.store
+        cancel_flag = {"cancelled": False}
+        progress_dialog = QtWidgets.QProgressDialog("Exporting tasks...", "Cancel", 0, 100, self)
+        progress_dialog.setWindowTitle("Export Tasks")
+        progress_dialog.setWindowModality(QtCore.Qt.NonModal)
+        progress_dialog.setMinimumDuration(300)
+        progress_dialog.canceled.connect(lambda: cancel_flag.update(cancelled=True))
+        self._export_progress = progress_dialog
         self.set_state("Executing", "Exporting tasks...")
-        try:
-            atlas_format = str(path).lower().endswith(".tasks.csv")
-            self.store.export_csv(path, atlas_format=atlas_format)
-        except Exception as exc:  # noqa: BLE001
-            QtWidgets.QMessageBox.critical(self, "Export Error", str(exc))
-            self.show_error_banner(str(exc))
+
+        def work(progress=None):
+            return store.export_tasks(
+                path,
+                filters=filters,
+                progress=(lambda done, total: progress((done, total))) if progress else None,
+                cancelled=lambda: cancel_flag["cancelled"],
+            )
+
+        def on_progress(payload):
+            done, total = payload
+            progress_dialog.setMaximum(max(1, total))
+            progress_dialog.setValue(done)
+            progress_dialog.setLabelText(f"Exporting tasks... {done:,} / {total:,}")
+
+        def finish():
+            self._export_progress = None
+            progress_dialog.reset()
+            progress_dialog.deleteLater()
             self.set_state("Idle", "")
-            return
-        QtWidgets.QMessageBox.information(self, "Exported", f"Tasks exported to {path}")
-        self.set_state("Idle", "")
+
+        def on_result(result):
+            finish()
+            self.log_debug("TASKS", {"export": result})
+            QtWidgets.QMessageBox.information(self, "Exported", f"Exported {result['rows']:,} tasks to {result['path']}")
+
+        def on_error(err):
+            finish()
+            if cancel_flag["cancelled"]:
+                self.log_debug("TASKS", {"export": "cancelled", "path": path})
+                return
+            QtWidgets.QMessageBox.critical(self, "Export Error", str(err))
+            self.show_error_banner(str(err))
+
+        self.run_in_background(work, on_result, on_error, on_progress=on_progress, kind="export", priority=JOB_PRIORITY_LOW)
 
     def import_existing_folder(self):
         self.set_state("Awaiting User Input", "Select folder to import")
@@ -10119,6 +17464,7 @@ class FocusManager(QtWidgets.QMainWindow):
                 self.focus_state_label.setStyleSheet("color: #d2a446;")
                 self.update_auto_cd_label(enabled=False)
         self.update_identity_banner()
+        self._request_consistency_check("focus")
 
     def update_auto_cd_label(self, enabled):
         if not hasattr(self, "auto_cd_label"):
@@ -10134,12 +17480,59 @@ class FocusManager(QtWidgets.QMainWindow):
     def update_project_status_from_tasks(self, project):
         if not project:
             return
-        incomplete = self.store.project_incomplete_count(project)
+        aggregate = self.store.project_aggregate(project)
+        incomplete = (aggregate["total"] - aggregate["completed"]) if aggregate else 0
         if incomplete == 0:
             self.status_map[project] = "Completed"
         else:
             self.status_map[project] = "In Progress (α)"
-        self.refresh_projects()
+        # Patch the one affected row instead of rebuilding the whole Projects table.
+        for row in range(self.project_table.rowCount()):
+            item = self.project_table.item(row, 0)
+            if not item or item.data(QtCore.Qt.UserRole) != project:
+                continue
+            blocker = QtCore.QSignalBlocker(self.project_table)
+            self.project_table.setSortingEnabled(False)
+            status_item = self.project_table.item(row, 2)
+            if status_item is not None:
+                status_item.setText(self.status_map[project])
+            self.project_table.setItem(row, 6, self._task_progress_item(aggregate))
+            self.project_table.setSortingEnabled(True)
+            del blocker
+            break
+        self._refresh_list_tree_counts()
+
+    def _task_progress_item(self, aggregate):
+        aggregate = aggregate or {}
+        total = aggregate.get("total", 0)
+        done = aggregate.get("completed", 0)
+        item = QtWidgets.QTableWidgetItem(f"{done}/{total}" if total else "")
+        item.setFlags(qt_no_edit(item.flags()))
+        if total:
+            item.setData(ProgressBarDelegate.ROLE, (done, total))
+            item.setToolTip(self._aggregate_tooltip(aggregate))
+        return item
+
+    def _aggregate_tooltip(self, aggregate):
+        return (
+            f"Total: {aggregate.get('total', 0)}\n"
+            f"Pending: {aggregate.get('pending', 0)} · In progress: {aggregate.get('in_progress', 0)}\n"
+            f"Blocked: {aggregate.get('blocked', 0)} · Review: {aggregate.get('review', 0)}\n"
+            f"Completed: {aggregate.get('completed', 0)} · Overdue: {aggregate.get('overdue', 0)}\n"
+            f"My Day: {aggregate.get('my_day', 0)}"
+        )
+
+    def _set_tree_progress(self, item, aggregate):
+        aggregate = aggregate or {}
+        total = aggregate.get("total", 0)
+        done = aggregate.get("completed", 0)
+        if not total:
+            return
+        item.setText(2, f"{done}/{total}")
+        item.setData(2, ProgressBarDelegate.ROLE, (done, total))
+        item.setToolTip(2, self._aggregate_tooltip(aggregate))
+        if aggregate.get("overdue"):
+            item.setForeground(2, QtGui.QColor("#d14b4b"))
 
     def update_task_controls_enabled(self):
         active = self.list_active()
@@ -10179,6 +17572,7 @@ class FocusManager(QtWidgets.QMainWindow):
         self._ui_tearing_down = True
         if hasattr(self, "_ui_mutation_queue"):
             self._ui_mutation_queue.clear()
+            self._ui_mutation_pending.clear()
         self.session_active = False
         for timer in list(self.autogit_timers.values()):
             try:
@@ -10192,11 +17586,32 @@ class FocusManager(QtWidgets.QMainWindow):
             except Exception:
                 pass
         self.autogit_watchers.clear()
+        # Pending user data first: a failure elsewhere in teardown must not cost these writes.
+        self._flush_persistence()
         try:
             if hasattr(self, "consistency_timer"):
                 self.consistency_timer.stop()
-        except Exception:
-            pass
+                self.consistency_debounce.stop()
+                if self.mountinfo_notifier is not None:
+                    self.mountinfo_notifier.setEnabled(False)
+            if hasattr(self, "task_change_timer"):
+                self.task_change_timer.stop()
+            if hasattr(self, "task_scheduler"):
+                self.task_scheduler.stop()
+            if hasattr(self, "project_indexer"):
+                self.project_indexer.stop()
+            if hasattr(self, "jobs"):
+                self.jobs.stop()
+            if hasattr(self, "loop_monitor"):
+                self.loop_monitor.stop()
+            if hasattr(self, "metrics_timer"):
+                self.metrics_timer.stop()
+                METRICS.write()
+                METRICS.close()
+            if hasattr(self, "photon_terminal_widget"):
+                self.photon_terminal_widget.shutdown()
+        except Exception as exc:  # noqa: BLE001
+            self.log_debug("ERRORS", {"source": "SHUTDOWN", "message": str(exc)})
         self.detach_fs_view()
         try:
             os.chdir(Path.home())
@@ -10216,6 +17631,19 @@ class FocusManager(QtWidgets.QMainWindow):
         if hasattr(self, "supervisor"):
             self.supervisor.clear_marker()
             self.log_debug("STABILITY", {"shutdown": "cleanup", "debug_level": getattr(self, "debug_level", "normal")})
+        # Anything teardown itself marked dirty; a no-op for stores that are already clean.
+        self._flush_persistence()
+        LOG_WRITER.flush()
+
+    def _flush_persistence(self):
+        flushes = [("settings", lambda: self.settings_store.flush(sync=True)), ("project_meta", lambda: self.project_meta_store.flush(sync=True))]
+        if hasattr(self, "manifest_cache"):
+            flushes.append(("manifests", self.manifest_cache.flush))
+        for name, flush in flushes:
+            try:
+                flush()
+            except Exception as exc:  # noqa: BLE001
+                self.log_debug("ERRORS", {"source": "PERSISTENCE", "store": name, "message": str(exc)})
 
     def _handle_termination_signal(self, *args):
         self.cleanup_session()
@@ -10282,13 +17710,7 @@ def qt_message_handler(mode, context, message):
 
 
 def main():
-    pre_settings = {}
-    if SETTINGS_FILE.exists():
-        try:
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as fh:
-                pre_settings = json.load(fh)
-        except Exception:
-            pre_settings = {}
+    pre_settings = read_json_file(SETTINGS_FILE)
     debug_level = pre_settings.get("debug_level", "normal")
     supervisor = StabilitySupervisor(debug_level=debug_level, on_event=None, log_fn=None)
     # Apply sanitized environment globally before creating the QApplication to avoid Qt/XCB instability.
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Benchmark AuditStore queries over a multi-year synthetic audit trail.
+
+Usage: python testing/bench_audit_store.py [--events 2000000] [--years 5] [--db /tmp/audit-bench.db]
+
+Rows are bulk-inserted through the same trigger that maintains the daily
+rollup, then the viewer's typical queries are timed.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import focus_manager_gui as fm  # noqa: E402
+
+OPS = ("focus", "unfocus", "autogit_commit", "autogit_init", "create", "delete", "import")
+OUTCOMES = ("start", "committed", "success", "failed", "rolled_back")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=2_000_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--db", default=None)
+    args = parser.parse_args()
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="audit-bench-"), "audit.db")
+    store = fm.AuditStore(path)
+    rng = random.Random(7)
+    now = time.time()
+    span = args.years * 365 * 86400
+    start = time.perf_counter()
+    with store.conn:
+        batch = []
+        for i in range(args.events):
+            ts = now - span + span * i / args.events
+            batch.append(
+                (ts, datetime.fromtimestamp(ts).date().isoformat(), rng.choice(OPS), f"project-{rng.randrange(args.projects)}",
+                 rng.choice(OUTCOMES), 0, rng.random() * 500, "bench", None)
+            )
+            if len(batch) >= 50_000:
+                store.conn.executemany("INSERT INTO audit_events (ts, day, op_type, target, outcome, dry_run, duration_ms, user, error) VALUES (?,?,?,?,?,?,?,?,?);", batch)
+                batch = []
+        if batch:
+            store.conn.executemany("INSERT INTO audit_events (ts, day, op_type, target, outcome, dry_run, duration_ms, user, error) VALUES (?,?,?,?,?,?,?,?,?);", batch)
+    print(f"inserted {args.events:,} events over {args.years} years in {time.perf_counter() - start:.1f}s ({path})")
+    cases = (
+        ("failed commits / project / day", lambda: store.aggregate(("target", "day"), op_type="autogit_commit", outcome="failed")),
+        ("outcomes per op, all time", lambda: store.aggregate(("op_type", "outcome"))),
+        ("one project, last 30 days", lambda: store.query(since=now - 30 * 86400, target="project-7")),
+        ("newest 500 events", lambda: store.query()),
+        ("failed focus, last year", lambda: store.query(since=now - 365 * 86400, op_type="focus", outcome="failed")),
+    )
+    print(f"{'query':>34} {'rows':>8} {'ms':>8}")
+    for name, fn in cases:
+        start = time.perf_counter()
+        rows = fn()
+        print(f"{name:>34} {len(rows):>8} {(time.perf_counter() - start) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark the /proc open-handle scanner against `lsof +D`.
+
+Usage: python testing/bench_proc_scan.py [--files 2000,20000,100000] [--holders 8]
+
+Each size builds a temp tree, starts a few child processes that chdir into it and
+keep files open, then times scan_open_handles() and `lsof +D` on the same tree.
+The /proc scan should stay flat as the tree grows; lsof stats every file.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import focus_manager_gui as fm  # noqa: E402
+
+HOLDER = "import sys, time; fh = open(sys.argv[1]); time.sleep(600)"
+
+
+def build_tree(root, total, per_dir=200):
+    for i in range(total):
+        directory = os.path.join(root, f"d{i // per_dir:04d}")
+        if i % per_dir == 0:
+            os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"f{i}.txt"), "w", encoding="utf-8") as fh:
+            fh.write("x")
+
+
+def start_holders(root, count):
+    holders = []
+    for i in range(count):
+        directory = os.path.join(root, f"d{i:04d}")
+        target = os.path.join(directory, f"f{i * 200}.txt")
+        holders.append(subprocess.Popen([sys.executable, "-c", HOLDER, target], cwd=directory))
+    time.sleep(0.5)
+    return holders
+
+
+def time_call(fn, repeats=3):
+    best, result = None, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def run_lsof(root):
+    if not shutil.which("lsof"):
+        return None
+    proc = subprocess.run(["lsof", "+D", root], capture_output=True, text=True)
+    return {int(line.split()[1]) for line in proc.stdout.splitlines()[1:] if len(line.split()) > 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", default="2000,20000,100000")
+    parser.add_argument("--holders", type=int, default=8)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.files.split(",") if s.strip()]
+    print(f"{'files':>8} {'/proc ms':>10} {'lsof ms':>10} {'procs':>6} {'lsof procs':>11}  /proc pids scanned")
+    for size in sizes:
+        root = tempfile.mkdtemp(prefix="fm_procscan_")
+        holders = []
+        try:
+            build_tree(root, size)
+            holders = start_holders(root, min(args.holders, max(1, size // 200)))
+            scan_ms, scan = time_call(lambda: fm.scan_open_handles(root))
+            lsof_ms, lsof_pids = time_call(lambda: run_lsof(root), repeats=1)
+            found = {proc["pid"] for proc in scan["processes"]}
+            lsof_col = f"{lsof_ms:>10.1f}" if lsof_pids is not None else f"{'n/a':>10}"
+            lsof_count = len(lsof_pids) if lsof_pids is not None else "-"
+            print(f"{size:>8} {scan_ms:>10.1f} {lsof_col} {len(found):>6} {lsof_count:>11}  {scan['scanned']}")
+            if lsof_pids is not None and lsof_pids - found:
+                print(f"         missed by /proc scan: {sorted(lsof_pids - found)}")
+        finally:
+            for holder in holders:
+                holder.kill()
+                holder.wait()
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
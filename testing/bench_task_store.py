@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Benchmark TaskStore list loads as the tasks table grows.
+
+Usage: python testing/bench_task_store.py [--sizes 10000,100000,1000000] [--db /tmp/bench.db]
+
+Each size is bulk-loaded into a fresh database; the first keyset page of every
+tasks_for_list view is then timed. Times should stay flat across sizes.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import focus_manager_gui as fm  # noqa: E402
+
+
+def populate(store, total, lists=50):
+    list_ids = [store.create_list(f"Bench {i}", scope="global") for i in range(lists)]
+    today = date.today()
+    now = fm.now_str()
+    batch = []
+    for i in range(total):
+        completed = 1 if i % 5 == 0 else 0
+        batch.append(
+            (
+                list_ids[i % lists],
+                str(uuid.uuid4()),
+                str(i),
+                f"Task {i}",
+                (today + timedelta(days=i % 90)).isoformat() if i % 3 == 0 else None,
+                1 if i % 11 == 0 else 0,
+                completed,
+                "completed" if completed else "pending",
+                now,
+                now,
+                now if completed else None,
+                i // lists,
+                today.isoformat() if i % 997 == 0 else None,
+            )
+        )
+        if len(batch) >= 50_000:
+            _flush(store, batch)
+    _flush(store, batch)
+    return list_ids
+
+
+def _flush(store, batch):
+    if not batch:
+        return
+    store.conn.executemany(
+        """
+        INSERT INTO tasks (list_id, uuid, source_id, title, due_date, priority, completed, status,
+                           created_at, updated_at, completed_at, order_index, my_day_date)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+        """,
+        batch,
+    )
+    store.conn.commit()
+    batch.clear()
+
+
+def time_view(store, list_ref, repeats=5):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        store.tasks_page(list_ref)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--db", default=None, help="database path (default: temp file per size)")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    views = ["My Day", "Planned", "Important", "Completed", None]
+    print(f"{'tasks':>10} " + " ".join(f"{(v or 'per-list'):>11}" for v in views) + "   (ms, first page)")
+    for size in sizes:
+        tmpdir = tempfile.mkdtemp(prefix="fm_bench_")
+        db_path = args.db or os.path.join(tmpdir, "tasks.db")
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        store = fm.TaskStore(db_path=db_path, task_cap=0)
+        list_ids = populate(store, size)
+        timings = []
+        for view in views:
+            ref = {"system": view, "scope": "system"} if view else {"id": list_ids[0], "scope": "global"}
+            timings.append(time_view(store, ref))
+        print(f"{size:>10} " + " ".join(f"{t:>11.2f}" for t in timings) + f"   count={store.count_tasks()}")
+        store.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Benchmark TerminalRecording regex search against its per-block trigram index.
+
+Usage: python testing/bench_terminal_search.py [--mb 256] [--dir /tmp/photon-bench]
+
+Writes a synthetic build-log recording of roughly --mb megabytes, indexes it,
+then times a few searches and reports how many 128 KB blocks each one read.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import focus_manager_gui as fm  # noqa: E402
+
+LINE = "\x1b[32m[{0:>9}]\x1b[0m compiling src/module_{1}/unit_{2}.c -> build/obj/unit_{2}.o\r\n"
+PATTERNS = (
+    "segfault at 0x[0-9a-f]+",
+    r"unit_4242\.c",
+    r"module_17/unit_\d+\.c",
+    r"\[\s*\d+\] compiling",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=int, default=256)
+    parser.add_argument("--dir", default=None)
+    args = parser.parse_args()
+    root = args.dir or tempfile.mkdtemp(prefix="photon-bench-")
+    recording = fm.TerminalRecording(os.path.join(root, "bench"))
+    recording.open(120, 40, "bench", "/bin/sh")
+    start = time.perf_counter()
+    target = args.mb * 1024 * 1024
+    n = 0
+    while recording.cast_bytes < target:
+        chunk = "".join(LINE.format(n + i, (n + i) % 97, (n + i) % 10007) for i in range(2000))
+        if recording.cast_bytes < target // 2 <= recording.cast_bytes + len(chunk):
+            chunk += "kernel: segfault at 0xdeadbeef ip 00007f\r\n"
+        recording.write(chunk)
+        n += 2000
+    recording.flush()
+    written = time.perf_counter() - start
+    start = time.perf_counter()
+    recording.index_pending()
+    indexed = time.perf_counter() - start
+    print(f"recorded {recording.cast_bytes / 1e6:.0f} MB, {recording.line_count:,} lines in {written:.1f}s; indexed {len(recording.blocks)} blocks in {indexed:.1f}s")
+    print(f"{'pattern':>28} {'matches':>8} {'blocks':>12} {'ms':>8}")
+    for pattern in PATTERNS:
+        start = time.perf_counter()
+        found = recording.search(pattern, limit=100)
+        elapsed = (time.perf_counter() - start) * 1000
+        blocks = f"{found['blocks_read']}/{found['blocks']}"
+        print(f"{pattern:>28} {len(found['results']):>8} {blocks:>12} {elapsed:>8.1f}")
+    recording.close()
+    print(f"index file {os.path.getsize(recording.index_path) / 1e6:.1f} MB")
+    if not args.dir:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()